@@ -1,4 +1,17 @@
-"""Helpers for downloading inputs and uploading outputs."""
+"""Helpers for downloading inputs and uploading outputs.
+
+Downloads and uploads share one pooled ``requests.Session``. A
+``DownloadManager`` fetches several inputs concurrently under a byte budget;
+each download aborts early once ``Content-Length`` exceeds its size cap,
+resumes with an HTTP ``Range`` request after a transient failure and checks
+the final size against what the server announced.
+
+``upload_many`` runs uploads with bounded parallelism, each upload retries
+transient failures, and request bodies are streamed from the artifact bytes
+rather than built by ``files=``.
+Without blob storage, artifacts fall back to data URLs up to
+``BLOB_INLINE_MAX_BYTES``; larger ones go to the caller's ``overflow`` store.
+"""
 from __future__ import annotations
 
 import base64
@@ -6,23 +19,70 @@ import json
 import logging
 import os
 import re
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
-from urllib.parse import urlparse
+from typing import Callable, List, Optional, Sequence, Tuple
+from urllib.parse import unquote_to_bytes, urlparse
 
 import requests
+from requests.adapters import HTTPAdapter
 
 DEFAULT_TIMEOUT = float(os.getenv("BLOB_DOWNLOAD_TIMEOUT", "30"))
 USER_AGENT = os.getenv("TINYUTILS_BLOB_UA", "tinyutils-backend/0.1")
 BLOB_UPLOAD_URL = os.getenv("VERCEL_BLOB_API_URL", "https://api.vercel.com/v2/blob/upload")
+UPLOAD_CONCURRENCY = max(1, int(os.getenv("BLOB_UPLOAD_CONCURRENCY", "4")))
+UPLOAD_RETRIES = max(0, int(os.getenv("BLOB_UPLOAD_RETRIES", "2")))
+UPLOAD_RETRY_BACKOFF_SECONDS = float(os.getenv("BLOB_UPLOAD_RETRY_BACKOFF_SECONDS", "0.5"))
+# Largest artifact returned inline as a data: URL when blob storage is unavailable
+INLINE_MAX_BYTES = int(os.getenv("BLOB_INLINE_MAX_BYTES", str(8 * 1024 * 1024)))
+DOWNLOAD_CONCURRENCY = max(1, int(os.getenv("BLOB_DOWNLOAD_CONCURRENCY", "4")))
+DOWNLOAD_RETRIES = max(0, int(os.getenv("BLOB_DOWNLOAD_RETRIES", "3")))
+DOWNLOAD_RETRY_BACKOFF_SECONDS = float(os.getenv("BLOB_DOWNLOAD_RETRY_BACKOFF_SECONDS", "0.5"))
+# Bytes that may be downloading at once across a DownloadManager's workers
+DOWNLOAD_BUDGET_BYTES = int(os.getenv("BLOB_DOWNLOAD_BUDGET_BYTES", str(256 * 1024 * 1024)))
+DOWNLOAD_CHUNK_BYTES = 256 * 1024
+_RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+_CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+# (name, data, content_type)
+UploadItem = Tuple[str, bytes, str]
+Overflow = Callable[[str, bytes, str], str]
 
 logger = logging.getLogger(__name__)
 
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled HTTP session used for blob traffic."""
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=max(UPLOAD_CONCURRENCY, DOWNLOAD_CONCURRENCY, 10),
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            _session = session
+        return _session
+
 
 class DownloadError(Exception):
     """Raised when an input cannot be retrieved."""
 
 
+class DownloadTooLargeError(DownloadError):
+    """Raised when an input is larger than the caller's size cap."""
+
+
 def _decode_data_url(url: str) -> Tuple[bytes, Optional[str]]:
     match = re.match(r"data:([^;,]*)(;base64)?,(.*)", url, re.IGNORECASE)
     if not match:
@@ -32,46 +92,252 @@ def _decode_data_url(url: str) -> Tuple[bytes, Optional[str]]:
     if base64_flag:
         data = base64.b64decode(payload)
     else:
-        data = requests.utils.unquote_to_bytes(payload)
+        data = unquote_to_bytes(payload)
     return data, mime_type
 
 
-def download_to_path(url: str, destination: Path) -> Tuple[int, Optional[str]]:
-    """Download *url* into *destination* and return (size_bytes, content_type)."""
+class ByteBudget:
+    """Counting semaphore over bytes shared by concurrent downloads.
+
+    A request larger than the whole budget is clamped to it, so an oversized
+    download still runs, just on its own.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(1, capacity)
+        self._available = self.capacity
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int, abort: Optional[threading.Event] = None) -> int:
+        """Block until ``size`` bytes are free; return the amount reserved."""
+
+        size = min(max(1, size), self.capacity)
+        with self._cond:
+            self._cond.wait_for(lambda: self._available >= size or (abort is not None and abort.is_set()))
+            if abort is not None and abort.is_set():
+                raise DownloadError("Download cancelled")
+            self._available -= size
+            return size
+
+    def release(self, size: int) -> None:
+        with self._cond:
+            self._available += size
+            self._cond.notify_all()
+
+    def wake(self) -> None:
+        """Wake waiters so they can notice a cancellation."""
+
+        with self._cond:
+            self._cond.notify_all()
+
+
+def download_to_path(
+    url: str,
+    destination: Path,
+    *,
+    max_bytes: Optional[int] = None,
+    budget: Optional[ByteBudget] = None,
+    cancelled: Optional[threading.Event] = None,
+) -> Tuple[int, Optional[str]]:
+    """Download *url* into *destination* and return (size_bytes, content_type).
+
+    Raises ``DownloadTooLargeError`` as soon as the announced or received size
+    passes ``max_bytes``. Connection errors, truncated bodies and retryable
+    statuses are retried up to ``BLOB_DOWNLOAD_RETRIES`` times, resuming from
+    the bytes already written when the server honours ``Range``.
+    """
 
     parsed = urlparse(url)
     if parsed.scheme == "data":
         data, mime_type = _decode_data_url(url)
+        if max_bytes is not None and len(data) > max_bytes:
+            raise DownloadTooLargeError(_too_large_message(len(data), max_bytes))
         destination.write_bytes(data)
         return len(data), mime_type
 
     if parsed.scheme not in {"http", "https"}:
         raise DownloadError(f"Unsupported URL scheme: {parsed.scheme or 'unknown'}")
 
-    headers = {"User-Agent": USER_AGENT}
-    response = requests.get(url, timeout=DEFAULT_TIMEOUT, stream=True, headers=headers)
+    state = _DownloadState()
     try:
+        with destination.open("wb") as handle:
+            attempt = 0
+            while True:
+                try:
+                    _fetch_into(url, handle, state, max_bytes, budget, cancelled)
+                    return state.written, state.content_type
+                except requests.RequestException as exc:
+                    status = exc.response.status_code if exc.response is not None else None
+                    retryable = status is None or status in _RETRY_STATUSES
+                    if not retryable or attempt >= DOWNLOAD_RETRIES:
+                        raise DownloadError(str(exc)) from exc
+                    attempt += 1
+                    delay = DOWNLOAD_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+                    logger.info(
+                        "download retry %d for %s at byte %d in %.1fs: %s",
+                        attempt,
+                        parsed.netloc,
+                        state.written,
+                        delay,
+                        exc,
+                    )
+                    if cancelled is None:
+                        time.sleep(delay)
+                    elif cancelled.wait(delay):
+                        raise DownloadError("Download cancelled") from exc
+    finally:
+        if budget is not None and state.reserved:
+            budget.release(state.reserved)
+
+
+class DownloadManager:
+    """Fetch inputs concurrently over the shared session.
+
+    ``submit`` returns a ``Future`` of ``(size_bytes, content_type)`` so the
+    caller can start on the first input while later ones are still arriving.
+    At most ``budget_bytes`` (by announced size) download at once. Closing the
+    manager cancels queued and in-progress downloads.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: Optional[int] = None,
+        budget_bytes: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.budget = ByteBudget(budget_bytes or DOWNLOAD_BUDGET_BYTES)
+        self._cancelled = threading.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or DOWNLOAD_CONCURRENCY,
+            thread_name_prefix="blob-download",
+        )
+
+    def submit(self, url: str, destination: Path) -> "Future[Tuple[int, Optional[str]]]":
+        return self._executor.submit(
+            download_to_path,
+            url,
+            destination,
+            max_bytes=self.max_bytes,
+            budget=self.budget,
+            cancelled=self._cancelled,
+        )
+
+    def close(self) -> None:
+        self._cancelled.set()
+        self.budget.wake()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "DownloadManager":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class _DownloadState:
+    """Progress carried across attempts of one download."""
+
+    def __init__(self) -> None:
+        self.written = 0
+        self.total: Optional[int] = None
+        self.content_type: Optional[str] = None
+        self.reserved = 0
+
+
+def _fetch_into(
+    url: str,
+    handle,
+    state: _DownloadState,
+    max_bytes: Optional[int],
+    budget: Optional[ByteBudget],
+    cancelled: Optional[threading.Event],
+) -> None:
+    # Identity encoding keeps Content-Length, Range offsets and the bytes we
+    # write in the same units.
+    headers = {"Accept-Encoding": "identity"}
+    if state.written:
+        headers["Range"] = f"bytes={state.written}-"
+    response = get_session().get(url, timeout=DEFAULT_TIMEOUT, stream=True, headers=headers)
+    with response:
         response.raise_for_status()
-    except requests.HTTPError as exc:  # pragma: no cover - thin wrapper
-        raise DownloadError(str(exc)) from exc
+        if state.written and not _resumes_at(response, state.written):
+            # Server ignored the Range request: start over
+            handle.seek(0)
+            handle.truncate()
+            state.written = 0
+        if state.total is None:
+            state.total = _announced_size(response)
+            state.content_type = response.headers.get("Content-Type")
+        if max_bytes is not None and state.total is not None and state.total > max_bytes:
+            raise DownloadTooLargeError(_too_large_message(state.total, max_bytes))
+        if budget is not None and not state.reserved:
+            state.reserved = budget.acquire(state.total or max_bytes or DOWNLOAD_CHUNK_BYTES, cancelled)
+
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+            if cancelled is not None and cancelled.is_set():
+                raise DownloadError("Download cancelled")
+            if not chunk:
+                continue
+            handle.write(chunk)
+            state.written += len(chunk)
+            if max_bytes is not None and state.written > max_bytes:
+                raise DownloadTooLargeError(_too_large_message(state.written, max_bytes))
+
+    if state.total is not None and state.written != state.total:
+        if state.written > state.total:
+            raise DownloadError(
+                f"Download size mismatch: expected {state.total} bytes, received {state.written}"
+            )
+        raise requests.ConnectionError(
+            f"Download truncated at {state.written} of {state.total} bytes"
+        )
 
-    content_type = response.headers.get("Content-Type")
-    with destination.open("wb") as handle:
-        for chunk in response.iter_content(chunk_size=1024 * 256):
-            if chunk:
-                handle.write(chunk)
-    size = destination.stat().st_size
-    return size, content_type
 
+def _resumes_at(response: requests.Response, offset: int) -> bool:
+    if response.status_code != 206:
+        return False
+    match = _CONTENT_RANGE_RE.fullmatch(response.headers.get("Content-Range", "").strip())
+    return bool(match) and int(match.group(1)) == offset
+
+
+def _announced_size(response: requests.Response) -> Optional[int]:
+    """Full size of the resource from Content-Range or Content-Length."""
+
+    if response.status_code == 206:
+        match = _CONTENT_RANGE_RE.fullmatch(response.headers.get("Content-Range", "").strip())
+        if match and match.group(3) != "*":
+            return int(match.group(3))
+        return None
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _too_large_message(size: int, limit: int) -> str:
+    return f"Input exceeds the {limit // (1024 * 1024)} MB limit ({size} bytes)"
+
+
+def upload_bytes(
+    name: str,
+    data: bytes,
+    content_type: str,
+    *,
+    overflow: Optional[Overflow] = None,
+) -> str:
+    """Upload bytes to blob storage or fall back to a data URL.
 
-def upload_bytes(name: str, data: bytes, content_type: str) -> str:
-    """Upload bytes to blob storage or fall back to a data URL."""
+    When blob storage is unavailable and ``data`` exceeds ``INLINE_MAX_BYTES``,
+    ``overflow(name, data, content_type)`` provides the URL instead (if given).
+    """
 
     token = os.getenv("BLOB_READ_WRITE_TOKEN")
     if token:
         token = token.strip()  # Remove trailing newlines from environment variable
         try:
-            blob_url = _upload_to_vercel_blob(name, data, content_type, token)
+            blob_url = _upload_with_retries(name, data, content_type, token)
             if blob_url:
                 return blob_url
         except requests.RequestException as exc:  # pragma: no cover - fall back
@@ -79,25 +345,107 @@ def upload_bytes(name: str, data: bytes, content_type: str) -> str:
         except ValueError as exc:  # pragma: no cover - invalid response
             logger.warning("blob upload returned invalid payload: %s", exc)
 
+    if overflow is not None and len(data) > INLINE_MAX_BYTES:
+        return overflow(name, data, content_type)
+
     encoded = base64.b64encode(data).decode("ascii")
     return f"data:{content_type};base64,{encoded}"
 
 
+def upload_many(
+    items: Sequence[UploadItem],
+    *,
+    overflow: Optional[Overflow] = None,
+    max_workers: Optional[int] = None,
+) -> List[str]:
+    """Upload several artifacts concurrently; URLs come back in input order."""
+
+    if not items:
+        return []
+    workers = min(len(items), max_workers or UPLOAD_CONCURRENCY)
+    if workers <= 1:
+        return [upload_bytes(name, data, ctype, overflow=overflow) for name, data, ctype in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="blob-upload") as pool:
+        futures = [
+            pool.submit(upload_bytes, name, data, ctype, overflow=overflow) for name, data, ctype in items
+        ]
+        return [future.result() for future in futures]
+
+
+def _upload_with_retries(name: str, data: bytes, content_type: str, token: str) -> Optional[str]:
+    attempt = 0
+    while True:
+        try:
+            return _upload_to_vercel_blob(name, data, content_type, token)
+        except requests.RequestException as exc:
+            status = exc.response.status_code if exc.response is not None else None
+            retryable = status is None or status in _RETRY_STATUSES
+            if not retryable or attempt >= UPLOAD_RETRIES:
+                raise
+            attempt += 1
+            delay = UPLOAD_RETRY_BACKOFF_SECONDS * (2 ** (attempt - 1))
+            logger.info("blob upload retry %d for %s in %.1fs: %s", attempt, name, delay, exc)
+            time.sleep(delay)
+
+
+class _MultipartBody:
+    """Stream a one-file multipart/form-data body without copying ``data``.
+
+    ``len()`` lets requests send a Content-Length instead of chunked encoding.
+    """
+
+    def __init__(self, name: str, data: bytes, content_type: str) -> None:
+        self.boundary = uuid.uuid4().hex
+        safe_name = name.replace("\\", "_").replace('"', "_").replace("\r", "_").replace("\n", "_")
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{safe_name}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        tail = f"\r\n--{self.boundary}--\r\n".encode("ascii")
+        self._parts = [memoryview(head), memoryview(data), memoryview(tail)]
+        self._length = sum(len(part) for part in self._parts)
+        self._index = 0
+        self._offset = 0
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._length
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self._length
+        out = bytearray()
+        while len(out) < size and self._index < len(self._parts):
+            part = self._parts[self._index]
+            take = part[self._offset : self._offset + size - len(out)]
+            out += take
+            self._offset += len(take)
+            if self._offset >= len(part):
+                self._index += 1
+                self._offset = 0
+        return bytes(out)
+
+
 def _upload_to_vercel_blob(
     name: str,
     data: bytes,
     content_type: str,
     token: str,
 ) -> Optional[str]:
+    body = _MultipartBody(name, data, content_type)
     headers = {
         "Authorization": f"Bearer {token}",
         "User-Agent": USER_AGENT,
+        "Content-Type": body.content_type,
     }
-    files = {"file": (name, data, content_type)}
-    response = requests.post(
+    response = get_session().post(
         BLOB_UPLOAD_URL,
         headers=headers,
-        files=files,
+        data=body,
         timeout=DEFAULT_TIMEOUT,
     )
     response.raise_for_status()
@@ -0,0 +1,470 @@
+"""ZIP-to-ZIP pipeline shared by the Bulk Find & Replace endpoint.
+
+The uploaded archive is read from a spooled file. Members are decoded,
+matched, replaced and re-encoded on a small thread pool (``workers``), while
+results come back in archive order through a bounded window: at most
+``2 * workers`` members and roughly ``window_bytes`` of uncompressed input
+are in flight at once, so memory does not grow with the archive.
+
+Text members are decoded by a layered detector: BOM sniffing, then UTF-8
+(``bytes.decode`` stops at the first invalid byte), then chardet's
+``UniversalDetector`` fed from the first invalid line only until it is
+confident. An encoding chardet settles on is reused for later members
+with the same top-level folder and extension; on the thread pool a member
+waits for the earlier members of its group, so the reuse follows archive
+order and the output never depends on thread scheduling.
+
+``iter_zip_chunks`` writes the output archive to an in-memory sink and yields
+its bytes after every member, which lets the HTTP response start with the
+first member instead of after the whole archive is built.
+"""
+
+from __future__ import annotations
+
+import bisect
+import codecs
+import os
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, MutableMapping, Optional, Tuple, Union
+
+try:
+    import chardet
+except ImportError:  # pragma: no cover - optional dependency
+    chardet = None
+
+CHARDET_AVAILABLE = chardet is not None
+
+ALLOWED_TEXT_EXTENSIONS = {
+    '.txt', '.md', '.markdown', '.html', '.htm', '.css', '.js', '.jsx',
+    '.ts', '.tsx', '.json', '.csv', '.xml', '.py', '.rb', '.php', '.java',
+    '.c', '.cpp', '.h', '.hpp', '.sql', '.yaml', '.yml', '.ini', '.env',
+    '.svelte', '.vue', '.toml', '.go', '.rs', '.rust', '.swift', '.kt',
+    '.sh', '.bash', '.zsh', '.fish', '.r', '.scala', '.clj', '.ex', '.exs'
+}
+
+WORKERS = max(1, int(os.getenv("BULK_REPLACE_WORKERS", str(min(4, os.cpu_count() or 1)))))
+# Uncompressed member bytes that may be in flight across the worker pool
+WINDOW_BYTES = int(os.getenv("BULK_REPLACE_WINDOW_BYTES", str(64 * 1024 * 1024)))
+
+# Bytes fed to chardet per file at most, and per feed() call. Probers that
+# never report "done" (e.g. Latin-1) settle well within the cap.
+DETECT_MAX_BYTES = int(os.getenv("BULK_REPLACE_DETECT_BYTES", str(64 * 1024)))
+DETECT_CHUNK_BYTES = 8 * 1024
+DETECT_MIN_CONFIDENCE = 0.7
+
+# Longest first: the UTF-32 LE BOM starts with the UTF-16 LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# (top-level folder, extension) -> encoding detected earlier in the archive
+EncodingCache = MutableMapping[Tuple[str, str], str]
+
+# (text) -> (new_text, hits per rule[, edits]); may raise MemberSkipped.
+# Edits are (start, end, replacement) spans of the original text.
+Transform = Callable[[str], Tuple]
+ZipEntry = Tuple[Union[zipfile.ZipInfo, str], bytes]
+
+
+class MemberSkipped(Exception):
+    """Raised by a transform to leave one member unchanged (e.g. regex timeout).
+
+    The message becomes ``MemberResult.skipped``.
+    """
+
+
+def is_likely_binary(data_bytes: bytes) -> bool:
+    """Detect binary files by checking for null bytes."""
+    if not data_bytes:
+        return False
+    sample = data_bytes[:1024] if len(data_bytes) > 1024 else data_bytes
+    return b'\0' in sample
+
+
+def is_safe_path(path: str) -> bool:
+    """Reject absolute paths and parent directory references."""
+    if os.path.isabs(path):
+        return False
+    parts = path.split(os.sep)
+    return '..' not in parts
+
+
+@dataclass
+class Detection:
+    """How a member's encoding was found and how long it took.
+
+    ``method`` is one of ``"empty"``, ``"bom"``, ``"utf-8"``, ``"cached"``,
+    ``"chardet"`` or ``"fallback"``.
+    """
+
+    encoding: str
+    method: str
+    seconds: float = 0.0
+
+
+def sniff_bom(raw_bytes: bytes) -> Optional[str]:
+    """Return the UTF-16/32 codec named by a leading byte order mark."""
+    for bom, encoding in _BOMS:
+        if raw_bytes.startswith(bom):
+            return encoding
+    return None
+
+
+def encoding_key(filename: str) -> Tuple[str, str]:
+    """Group members whose encoding is likely shared: top-level folder and extension."""
+    folder = filename.split('/', 1)[0] if '/' in filename else ''
+    return folder, os.path.splitext(filename)[1].lower()
+
+
+def _chardet_guess(raw_bytes: bytes, start: int) -> Tuple[Optional[str], float]:
+    """Feed chardet from ``start`` until it is confident or DETECT_MAX_BYTES were read."""
+    detector = chardet.UniversalDetector()
+    stop = min(len(raw_bytes), start + DETECT_MAX_BYTES)
+    for offset in range(start, stop, DETECT_CHUNK_BYTES):
+        detector.feed(raw_bytes[offset:min(offset + DETECT_CHUNK_BYTES, stop)])
+        if detector.done:
+            break
+    result = detector.close()
+    return result.get('encoding'), result.get('confidence') or 0.0
+
+
+def decode_member(
+    raw_bytes: bytes,
+    cache: Optional[EncodingCache] = None,
+    key: Optional[Tuple[str, str]] = None,
+) -> Tuple[str, Detection]:
+    """Decode with the cheapest detector that gives an answer."""
+    started = time.perf_counter()
+    text, detection = _decode_layered(raw_bytes, cache, key)
+    detection.seconds = time.perf_counter() - started
+    return text, detection
+
+
+def _decode_layered(
+    raw_bytes: bytes, cache: Optional[EncodingCache], key: Optional[Tuple[str, str]]
+) -> Tuple[str, Detection]:
+    if not raw_bytes:
+        return '', Detection('utf-8', 'empty')
+
+    bom_encoding = sniff_bom(raw_bytes)
+    if bom_encoding:
+        return raw_bytes.decode(bom_encoding, errors='replace'), Detection(bom_encoding, 'bom')
+
+    # UTF-8 first (most common); decoding stops at the first invalid byte
+    try:
+        return raw_bytes.decode('utf-8'), Detection('utf-8', 'utf-8')
+    except UnicodeDecodeError as exc:
+        first_invalid = exc.start
+
+    cached = cache.get(key) if cache is not None and key is not None else None
+    if cached:
+        try:
+            return raw_bytes.decode(cached), Detection(cached, 'cached')
+        except (UnicodeDecodeError, LookupError):
+            pass
+
+    # Use chardet if available, starting at the line that broke UTF-8
+    if CHARDET_AVAILABLE:
+        line_start = raw_bytes.rfind(b'\n', 0, first_invalid) + 1
+        encoding, confidence = _chardet_guess(raw_bytes, line_start)
+
+        if encoding and confidence >= DETECT_MIN_CONFIDENCE:
+            try:
+                text = raw_bytes.decode(encoding, errors='replace')
+            except LookupError:
+                pass
+            else:
+                if cache is not None and key is not None:
+                    cache[key] = encoding
+                return text, Detection(encoding, 'chardet')
+
+        # Low confidence, try common encodings
+        for enc in ['latin-1', 'cp1252', 'iso-8859-1']:
+            try:
+                return raw_bytes.decode(enc), Detection(enc, 'fallback')
+            except Exception:
+                continue
+
+    # Fallback to latin-1 (accepts all bytes)
+    return raw_bytes.decode('latin-1', errors='replace'), Detection('latin-1', 'fallback')
+
+
+def detect_and_decode(raw_bytes: bytes) -> Tuple[str, str]:
+    """Auto-detect encoding and decode safely."""
+    text, detection = decode_member(raw_bytes)
+    return text, detection.encoding
+
+
+@dataclass
+class MemberResult:
+    """Outcome for one archive member.
+
+    ``skipped`` is ``"unsafe path"``, ``"binary file"`` or the reason a
+    transform gave via ``MemberSkipped``; apart from unsafe paths, skipped
+    members keep their original bytes in ``data`` so they can be copied
+    through. Text members carry the re-encoded output in
+    ``data`` and, when requested, both texts for previews. ``rule_hits``
+    holds the transform's per-rule match counts and ``edits`` the match
+    spans, if the transform returned them. ``detection`` records how the
+    encoding was found.
+    """
+
+    info: zipfile.ZipInfo
+    skipped: Optional[str] = None
+    data: bytes = b""
+    encoding: str = "utf-8"
+    match_count: int = 0
+    rule_hits: Optional[List[int]] = None
+    detection: Optional[Detection] = None
+    edits: Optional[List[Tuple[int, int, str]]] = None
+    changed: bool = False
+    original_text: Optional[str] = None
+    new_text: Optional[str] = None
+
+    def entry(self) -> Optional[ZipEntry]:
+        """The output archive entry for this member (``None`` if dropped)."""
+
+        if self.skipped == "unsafe path":
+            return None
+        if self.skipped:
+            return self.info, self.data
+        return self.info.filename, self.data
+
+
+class _ArchiveEncodings:
+    """Encoding cache of one archive, answered as a serial run would answer it.
+
+    Each member gets a ``view(index)``. A lookup waits until the earlier
+    members with the same key are done and returns the encoding the latest of
+    them detected, so concurrent workers reuse detections in archive order.
+    Workers start members in archive order, so a wait never blocks on a
+    member that has not started.
+    """
+
+    def __init__(self, members: List[zipfile.ZipInfo]) -> None:
+        self._keys = [encoding_key(info.filename) for info in members]
+        self._by_key: Dict[Tuple[str, str], List[int]] = {}
+        for index, key in enumerate(self._keys):
+            self._by_key.setdefault(key, []).append(index)
+        self._done = [threading.Event() for _ in members]
+        self._found: Dict[int, str] = {}
+
+    def view(self, index: int) -> "_MemberEncodings":
+        return _MemberEncodings(self, index)
+
+    def finish(self, index: int) -> None:
+        self._done[index].set()
+
+    def lookup(self, index: int, key: Tuple[str, str]) -> Optional[str]:
+        indices = self._by_key.get(key, [])
+        earlier = indices[:bisect.bisect_left(indices, index)]
+        for other in earlier:
+            self._done[other].wait()
+        for other in reversed(earlier):
+            if other in self._found:
+                return self._found[other]
+        return None
+
+    def publish(self, index: int, key: Tuple[str, str], encoding: str) -> None:
+        if key != self._keys[index]:
+            raise KeyError(key)
+        self._found[index] = encoding
+
+    def keys(self) -> Iterable[Tuple[str, str]]:
+        return self._by_key.keys()
+
+
+class _MemberEncodings(MutableMapping[Tuple[str, str], str]):
+    """One member's window onto an ``_ArchiveEncodings``."""
+
+    def __init__(self, shared: _ArchiveEncodings, index: int) -> None:
+        self._shared = shared
+        self._index = index
+
+    def __getitem__(self, key: Tuple[str, str]) -> str:
+        encoding = self._shared.lookup(self._index, key)
+        if encoding is None:
+            raise KeyError(key)
+        return encoding
+
+    def __setitem__(self, key: Tuple[str, str], encoding: str) -> None:
+        self._shared.publish(self._index, key, encoding)
+
+    def __delitem__(self, key: Tuple[str, str]) -> None:
+        raise TypeError("archive encodings are append-only")
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        return (key for key in self._shared.keys() if key in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+def _process_in_order(
+    shared: _ArchiveEncodings, index: int, archive: zipfile.ZipFile, info: zipfile.ZipInfo,
+    transform: Transform, **options,
+) -> MemberResult:
+    try:
+        return process_member(archive, info, transform, encodings=shared.view(index), **options)
+    finally:
+        shared.finish(index)
+
+
+def process_member(
+    archive: zipfile.ZipFile,
+    info: zipfile.ZipInfo,
+    transform: Transform,
+    *,
+    keep_text: bool = False,
+    encode_output: bool = True,
+    encodings: Optional[EncodingCache] = None,
+) -> MemberResult:
+    """Decode, transform and re-encode one member (safe to run in a worker).
+
+    ``encodings`` is shared by the members of one archive so a detected
+    encoding can be reused.
+    """
+
+    if not is_safe_path(info.filename):
+        return MemberResult(info, skipped="unsafe path")
+
+    raw_data = archive.read(info)
+    _, ext = os.path.splitext(info.filename)
+    # UTF-16/32 text is full of NUL bytes; its BOM marks it as text
+    if ext.lower() not in ALLOWED_TEXT_EXTENSIONS or (
+        is_likely_binary(raw_data) and not sniff_bom(raw_data)
+    ):
+        return MemberResult(info, skipped="binary file", data=raw_data)
+
+    original_text, detection = decode_member(raw_data, encodings, encoding_key(info.filename))
+    encoding = detection.encoding
+    del raw_data  # free the input copy before the transformed text is built
+    try:
+        new_text, hits, *extra = transform(original_text)
+    except MemberSkipped as exc:
+        return MemberResult(
+            info, skipped=str(exc), data=archive.read(info), encoding=encoding, detection=detection
+        )
+    changed = new_text != original_text
+    return MemberResult(
+        info,
+        data=new_text.encode("utf-8") if encode_output else b"",
+        encoding=encoding,
+        match_count=sum(hits),
+        rule_hits=list(hits),
+        edits=extra[0] if extra else None,
+        detection=detection,
+        changed=changed,
+        original_text=original_text if keep_text else None,
+        new_text=new_text if keep_text and changed else None,
+    )
+
+
+def iter_member_results(
+    archive: zipfile.ZipFile,
+    transform: Transform,
+    *,
+    keep_text: bool = False,
+    encode_output: bool = True,
+    workers: Optional[int] = None,
+    window_bytes: Optional[int] = None,
+) -> Iterator[MemberResult]:
+    """Process every file member concurrently, yielding results in archive order.
+
+    Transform exceptions propagate from the member that raised them. Closing
+    the iterator early cancels members that have not started.
+    """
+
+    members = [info for info in archive.infolist() if not info.is_dir()]
+    workers = workers or WORKERS
+    window = window_bytes or WINDOW_BYTES
+    encodings: EncodingCache = {}
+
+    if workers <= 1:
+        for info in members:
+            yield process_member(
+                archive, info, transform,
+                keep_text=keep_text, encode_output=encode_output, encodings=encodings,
+            )
+        return
+
+    shared = _ArchiveEncodings(members)
+    pending: Deque[Tuple[Future, int]] = deque()
+    in_flight_bytes = 0
+    queue = iter(enumerate(members))
+    exhausted = False
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-replace")
+    try:
+        while True:
+            # Keep the window full, but always admit at least one member
+            while not exhausted and len(pending) < 2 * workers:
+                if pending and in_flight_bytes >= window:
+                    break
+                item = next(queue, None)
+                if item is None:
+                    exhausted = True
+                    break
+                index, info = item
+                future = executor.submit(
+                    _process_in_order, shared, index, archive, info, transform,
+                    keep_text=keep_text, encode_output=encode_output,
+                )
+                pending.append((future, info.file_size))
+                in_flight_bytes += info.file_size
+            if not pending:
+                return
+            future, size = pending.popleft()
+            result = future.result()
+            in_flight_bytes -= size
+            yield result
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+class _ChunkSink:
+    """Write-only, non-seekable target that ``zipfile`` streams into.
+
+    Without ``seek``/``tell`` zipfile writes data descriptors after each
+    member instead of patching local headers, so bytes can be handed out as
+    soon as they are written.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self.buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def iter_zip_chunks(entries: Iterable[ZipEntry]) -> Iterator[bytes]:
+    """Build a deflated ZIP from ``(name_or_info, data)`` pairs, yielding bytes as it grows."""
+
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as output_zip:  # type: ignore[arg-type]
+        for name_or_info, data in entries:
+            output_zip.writestr(name_or_info, data)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    tail = sink.drain()
+    if tail:
+        yield tail
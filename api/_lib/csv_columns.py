@@ -0,0 +1,119 @@
+"""Column-batch CSV helpers shared by the CSV Joiner and JSON tools.
+
+Rows are processed in batches and treated as columns (or one flat cell
+buffer when rows are ragged), so formula hardening and key extraction run as
+one operation per column instead of one Python function call per cell.
+
+When ``pyarrow`` is installed the hardening pass runs on Arrow string arrays
+with compute kernels; otherwise the same column lists go through a
+pure-Python path. Both backends produce identical cells, so output does not
+depend on what is installed. ``CSV_COLUMN_BACKEND=python`` forces the
+fallback.
+"""
+
+from __future__ import annotations
+
+import itertools
+import os
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pc = None
+
+CSV_DANGEROUS_PREFIXES = ("=", "+", "-", "@")
+BATCH_ROWS = 4096
+# Below this many cells converting to/from Arrow costs more than it saves
+ARROW_MIN_CELLS = 2048
+CSV_COLUMN_BACKEND = os.getenv("CSV_COLUMN_BACKEND", "auto").strip().lower()
+
+_DANGEROUS = frozenset(CSV_DANGEROUS_PREFIXES)
+# RE2 character class for CSV_DANGEROUS_PREFIXES ("-" last so it is literal)
+_DANGEROUS_RE = "^[=+@-]"
+
+Key = Tuple[str, ...]
+
+
+def backend() -> str:
+    """Return ``"arrow"`` or ``"python"`` depending on install and config."""
+
+    if pa is not None and CSV_COLUMN_BACKEND != "python":
+        return "arrow"
+    return "python"
+
+
+def batched(rows: Iterable[Any], size: int = BATCH_ROWS) -> Iterator[List[Any]]:
+    """Yield lists of up to ``size`` items from ``rows``."""
+
+    iterator = iter(rows)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def harden_column(values: Sequence[Any]) -> List[str]:
+    """Stringify a column and prefix formula-looking cells with a quote.
+
+    ``None`` becomes an empty string. Equivalent to applying the per-cell
+    hardening used across the repo to every value.
+    """
+
+    cells = [value if type(value) is str else ("" if value is None else str(value)) for value in values]
+    if len(cells) >= ARROW_MIN_CELLS and backend() == "arrow":
+        return _harden_arrow(cells)
+    return ["'" + cell if cell[:1] in _DANGEROUS else cell for cell in cells]
+
+
+def harden_rows(rows: Sequence[Sequence[Any]]) -> List[List[str]]:
+    """Harden a batch of (possibly ragged) rows in one column pass."""
+
+    if not rows:
+        return []
+    widths = [len(row) for row in rows]
+    cells = harden_column(list(itertools.chain.from_iterable(rows)))
+    width = widths[0]
+    if all(w == width for w in widths):
+        if width == 0:
+            return [[] for _ in rows]
+        return [cells[i : i + width] for i in range(0, len(cells), width)]
+    out: List[List[str]] = []
+    offset = 0
+    for w in widths:
+        out.append(cells[offset : offset + w])
+        offset += w
+    return out
+
+
+def harden_records(records: Sequence[dict], headers: Sequence[str]) -> Iterator[Tuple[str, ...]]:
+    """Yield hardened CSV rows for ``records`` projected onto ``headers``.
+
+    Each header becomes a column (missing keys → ``""``) that is hardened
+    as a whole before the columns are zipped back into rows.
+    """
+
+    if not headers:
+        return iter([()] * len(records))
+    columns = [harden_column([record.get(header, "") for record in records]) for header in headers]
+    return zip(*columns)
+
+
+def key_column(rows: Sequence[Sequence[str]], keys: Sequence[int]) -> List[Optional[Key]]:
+    """Extract stripped join keys for a batch; ``None`` for rows too short."""
+
+    if len(keys) == 1:
+        col = keys[0]
+        return [(row[col].strip(),) if len(row) > col else None for row in rows]
+    last = max(keys)
+    return [tuple(row[col].strip() for col in keys) if len(row) > last else None for row in rows]
+
+
+def _harden_arrow(cells: List[str]) -> List[str]:
+    array = pa.array(cells, type=pa.string())
+    mask = pc.match_substring_regex(array, pattern=_DANGEROUS_RE)
+    quoted = pc.binary_join_element_wise("'", array, "")
+    return pc.if_else(mask, quoted, array).to_pylist()
@@ -0,0 +1,551 @@
+"""Streaming hash join shared by the CSV Joiner endpoints.
+
+The smaller input (by byte size) becomes the build side and is loaded into a
+hash table; the other input is streamed row by row and joined output is
+yielded as encoded CSV chunks, so neither the decoded inputs nor the result
+are ever held in memory as a whole.
+
+If the build side outgrows ``memory_budget`` the join turns into a grace
+hash join: both inputs are hash-partitioned into temporary CSV files and each
+partition pair is joined on its own.
+
+Inputs already sorted on the join key can use a streaming merge join instead,
+which only holds one key group per side in memory. ``algorithm="auto"``
+picks it when both inputs are sorted; ``"merge"`` forces it and external-sorts
+(bounded-memory run files + k-way merge) any input that is not.
+
+Supports inner/left/right/full joins and multi-column keys. Output columns are
+always ``left + right`` and every cell is hardened against spreadsheet formula
+injection. Key extraction and hardening run on row batches through
+``csv_columns`` rather than per cell.
+"""
+
+from __future__ import annotations
+
+import csv
+import heapq
+import io
+import itertools
+import math
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from api._lib.csv_columns import batched, harden_column, harden_rows, key_column
+
+# Allow very large CSV fields (long text blobs)
+csv.field_size_limit(sys.maxsize)
+
+JOIN_TYPES = ("inner", "left", "right", "full")
+JOIN_ALGORITHMS = ("auto", "hash", "merge")
+# Rows per input inspected before a full sortedness check is attempted
+SORT_SAMPLE_ROWS = 1000
+MEMORY_BUDGET_BYTES = int(os.getenv("CSV_JOIN_MEMORY_BUDGET_BYTES", str(64 * 1024 * 1024)))
+OUTPUT_CHUNK_BYTES = 64 * 1024
+# Joined output kept in memory before spool_join moves it to disk
+SPOOL_MEMORY_BYTES = 4 * 1024 * 1024
+MAX_PARTITIONS = 256
+
+Key = Tuple[str, ...]
+Row = List[str]
+
+
+def harden_row(row: Iterable[Optional[str]]) -> List[str]:
+    """Prefix spreadsheet formula-looking cells with a single quote.
+
+    This mirrors the existing CSV hardening elsewhere in the repo so
+    opening the exported CSV in Excel/Sheets does not execute formulas.
+    """
+
+    return harden_column(list(row))
+
+
+def parse_key_columns(value: Optional[str]) -> List[int]:
+    """Parse ``"2"`` or ``"0,3"`` into column indices.
+
+    Raises ``ValueError`` for non-numeric or negative indices and when no
+    column is given.
+    """
+
+    parts = [part.strip() for part in (value or "").split(",") if part.strip()]
+    if not parts:
+        raise ValueError("Join columns not specified")
+    columns = [int(part) for part in parts]
+    if any(col < 0 for col in columns):
+        raise ValueError("Join columns not specified")
+    return columns
+
+
+def normalize_join_type(value: Optional[str]) -> str:
+    """Map user input onto one of ``JOIN_TYPES`` (unknown values → inner)."""
+
+    join_type = (value or "inner").strip().lower()
+    if join_type == "outer":
+        return "full"
+    return join_type if join_type in JOIN_TYPES else "inner"
+
+
+def normalize_join_algorithm(value: Optional[str]) -> str:
+    """Map user input onto one of ``JOIN_ALGORITHMS`` (unknown values → auto)."""
+
+    algorithm = (value or "auto").strip().lower()
+    return algorithm if algorithm in JOIN_ALGORITHMS else "auto"
+
+
+@dataclass
+class JoinStats:
+    """Counters filled in by ``stream_join`` once the output is exhausted."""
+
+    algorithm: str = ""
+    rows_left: int = 0
+    rows_right: int = 0
+    rows_out: int = 0
+    elapsed_ms: int = 0
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-Join-Algorithm": self.algorithm,
+            "X-Join-Rows-Left": str(self.rows_left),
+            "X-Join-Rows-Right": str(self.rows_right),
+            "X-Join-Rows-Out": str(self.rows_out),
+            "X-Join-Elapsed-Ms": str(self.elapsed_ms),
+        }
+
+
+@dataclass
+class JoinInput:
+    """One side of a join: a binary CSV stream plus its key columns."""
+
+    stream: BinaryIO
+    keys: Sequence[int]
+    delimiter: str = ","
+    size: Optional[int] = None
+
+
+def stream_join(
+    left: JoinInput,
+    right: JoinInput,
+    *,
+    join_type: str = "inner",
+    algorithm: str = "auto",
+    memory_budget: Optional[int] = None,
+    chunk_bytes: int = OUTPUT_CHUNK_BYTES,
+    stats: Optional[JoinStats] = None,
+) -> Iterator[bytes]:
+    """Join ``left`` and ``right`` and yield the hardened CSV as UTF-8 chunks.
+
+    ``stats`` (if given) reports the algorithm actually used, data rows read
+    from each side, rows written and elapsed time.
+    """
+
+    if len(left.keys) != len(right.keys):
+        raise ValueError("Both files need the same number of join columns")
+    join_type = normalize_join_type(join_type)
+    budget = MEMORY_BUDGET_BYTES if memory_budget is None else memory_budget
+    stats = stats if stats is not None else JoinStats()
+    started = time.time()
+
+    # Sortedness is probed (and the streams rewound) before any reader opens
+    algorithm, presorted = _choose_algorithm(normalize_join_algorithm(algorithm), left, right)
+    stats.algorithm = algorithm
+
+    left_rows = _read_rows(left)
+    right_rows = _read_rows(right)
+    header_left = next(left_rows, [])
+    header_right = next(right_rows, [])
+    left_rows = _counted(left_rows, stats, "rows_left")
+    right_rows = _counted(right_rows, stats, "rows_right")
+
+    if algorithm == "merge":
+        # Merge output is left + right with right as the "build" side
+        plan = _JoinPlan(join_type, False, len(header_left), len(header_right))
+        rows = _merge_join(plan, (left, left_rows), (right, right_rows), presorted, budget, stats)
+    else:
+        # Build from the smaller input; default to the right side like the
+        # original b_map join when sizes are unknown.
+        build_left = left.size is not None and right.size is not None and left.size < right.size
+        plan = _JoinPlan(join_type, build_left, len(header_left), len(header_right))
+        if build_left:
+            build, probe = (left, left_rows), (right, right_rows)
+        else:
+            build, probe = (right, right_rows), (left, left_rows)
+        rows = _joined_rows(plan, build, probe, budget, stats)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(harden_row(list(header_left) + list(header_right)))
+    try:
+        for batch in batched(rows):
+            writer.writerows(harden_rows(batch))
+            stats.rows_out += len(batch)
+            if buffer.tell() >= chunk_bytes:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+    finally:
+        stats.elapsed_ms = int((time.time() - started) * 1000)
+
+
+def spool_join(left: JoinInput, right: JoinInput, **options) -> Tuple[BinaryIO, JoinStats, int]:
+    """Run ``stream_join`` into a spooled temp file so stats can go in headers.
+
+    Returns ``(file, stats, size)`` with the file rewound; the caller closes it.
+    """
+
+    stats = JoinStats()
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    try:
+        for chunk in stream_join(left, right, stats=stats, **options):
+            out.write(chunk)
+        size = out.tell()
+        out.seek(0)
+    except BaseException:
+        out.close()
+        raise
+    return out, stats, size  # type: ignore[return-value]
+
+
+# --- Internals ----------------------------------------------------------------
+
+
+@dataclass
+class _JoinPlan:
+    join_type: str
+    build_left: bool
+    width_left: int
+    width_right: int
+
+    @property
+    def keep_unmatched_build(self) -> bool:
+        return self.join_type == "full" or self.join_type == ("left" if self.build_left else "right")
+
+    @property
+    def keep_unmatched_probe(self) -> bool:
+        return self.join_type == "full" or self.join_type == ("right" if self.build_left else "left")
+
+    def combine(self, build_row: Row, probe_row: Row) -> Row:
+        if self.build_left:
+            return build_row + probe_row
+        return probe_row + build_row
+
+    def build_only(self, build_row: Row) -> Row:
+        if self.build_left:
+            return build_row + [""] * self.width_right
+        return [""] * self.width_left + build_row
+
+    def probe_only(self, probe_row: Row) -> Row:
+        if self.build_left:
+            return [""] * self.width_left + probe_row
+        return probe_row + [""] * self.width_right
+
+
+def _read_rows(side: JoinInput) -> Iterator[Row]:
+    """Decode and parse a binary CSV stream lazily."""
+
+    text = io.TextIOWrapper(side.stream, encoding="utf-8", errors="replace", newline="")
+    try:
+        yield from csv.reader(text, delimiter=side.delimiter)
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+
+def _row_key(row: Row, keys: Sequence[int]) -> Optional[Key]:
+    if not row or len(row) <= max(keys):
+        return None
+    return tuple(row[col].strip() for col in keys)
+
+
+def _row_cost(row: Row) -> int:
+    """Rough in-memory footprint of a parsed row (list + str objects)."""
+
+    return 64 + 8 * len(row) + sum(49 + len(cell) for cell in row)
+
+
+def _batch_cost(rows: List[Row]) -> int:
+    """``_row_cost`` summed over a batch without a per-row call."""
+
+    cells = list(itertools.chain.from_iterable(rows))
+    return 64 * len(rows) + 57 * len(cells) + sum(map(len, cells))
+
+
+def _counted(rows: Iterator[Row], stats: JoinStats, field: str) -> Iterator[Row]:
+    for batch in batched(rows):
+        setattr(stats, field, getattr(stats, field) + len(batch))
+        yield from batch
+
+
+def _joined_rows(
+    plan: _JoinPlan,
+    build: Tuple[JoinInput, Iterator[Row]],
+    probe: Tuple[JoinInput, Iterator[Row]],
+    budget: int,
+    stats: JoinStats,
+) -> Iterator[Row]:
+    build_side, build_rows = build
+    probe_side, probe_rows = probe
+
+    table: Dict[Key, List[Row]] = {}
+    used = 0
+    for batch in batched(build_rows):
+        for row, key in zip(batch, key_column(batch, build_side.keys)):
+            if key is not None:
+                table.setdefault(key, []).append(row)
+        used += _batch_cost(batch)
+        if budget > 0 and used > budget:
+            stats.algorithm = "hash+grace"
+            yield from _grace_join(plan, table, build, probe, budget)
+            return
+
+    yield from _probe_table(plan, table, probe_rows, probe_side.keys)
+
+
+def _probe_table(
+    plan: _JoinPlan,
+    table: Dict[Key, List[Row]],
+    probe_rows: Iterable[Row],
+    probe_keys: Sequence[int],
+) -> Iterator[Row]:
+    matched: Set[Key] = set()
+    for batch in batched(probe_rows):
+        for row, key in zip(batch, key_column(batch, probe_keys)):
+            if key is None:
+                continue
+            matches = table.get(key)
+            if matches:
+                if plan.keep_unmatched_build:
+                    matched.add(key)
+                for build_row in matches:
+                    yield plan.combine(build_row, row)
+            elif plan.keep_unmatched_probe:
+                yield plan.probe_only(row)
+
+    if plan.keep_unmatched_build:
+        for key, rows in table.items():
+            if key not in matched:
+                for build_row in rows:
+                    yield plan.build_only(build_row)
+
+
+def _grace_join(
+    plan: _JoinPlan,
+    table: Dict[Key, List[Row]],
+    build: Tuple[JoinInput, Iterator[Row]],
+    probe: Tuple[JoinInput, Iterator[Row]],
+    budget: int,
+) -> Iterator[Row]:
+    """Spill both sides into hash partitions on disk and join pair by pair."""
+
+    build_side, build_rows = build
+    probe_side, probe_rows = probe
+    # Inputs expand roughly 3x once parsed into Python objects
+    size_hint = (build_side.size or 0) * 3
+    count = min(MAX_PARTITIONS, max(4, math.ceil(2 * size_hint / max(budget, 1))))
+
+    with tempfile.TemporaryDirectory(prefix="tinyutils-csvjoin-") as tmp:
+        build_parts = _Partitions(Path(tmp) / "build", count)
+        probe_parts = _Partitions(Path(tmp) / "probe", count)
+        try:
+            for key, rows in table.items():
+                for row in rows:
+                    build_parts.add(key, row)
+            table.clear()
+            for parts, side, rows in ((build_parts, build_side, build_rows), (probe_parts, probe_side, probe_rows)):
+                for batch in batched(rows):
+                    for row, key in zip(batch, key_column(batch, side.keys)):
+                        if key is not None:
+                            parts.add(key, row)
+        finally:
+            build_parts.close()
+            probe_parts.close()
+
+        for index in range(count):
+            part_table: Dict[Key, List[Row]] = {}
+            for batch in batched(build_parts.rows(index)):
+                for row, key in zip(batch, key_column(batch, build_side.keys)):
+                    if key is not None:
+                        part_table.setdefault(key, []).append(row)
+            yield from _probe_table(plan, part_table, probe_parts.rows(index), probe_side.keys)
+
+
+class _Partitions:
+    """``count`` temporary CSV files that rows are routed to by key hash."""
+
+    def __init__(self, root: Path, count: int) -> None:
+        root.mkdir(parents=True)
+        self.paths = [root / f"part-{index}.csv" for index in range(count)]
+        self._files = [path.open("w", encoding="utf-8", newline="") for path in self.paths]
+        self._writers = [csv.writer(fh) for fh in self._files]
+
+    def add(self, key: Key, row: Row) -> None:
+        self._writers[hash(key) % len(self._writers)].writerow(row)
+
+    def close(self) -> None:
+        for fh in self._files:
+            fh.close()
+
+    def rows(self, index: int) -> Iterator[Row]:
+        with self.paths[index].open("r", encoding="utf-8", newline="") as fh:
+            yield from csv.reader(fh)
+
+
+# --- Merge join -------------------------------------------------------------
+
+
+def _choose_algorithm(
+    requested: str, left: JoinInput, right: JoinInput
+) -> Tuple[str, Tuple[bool, bool]]:
+    """Return the algorithm plus whether each side is already key-sorted.
+
+    ``auto`` picks merge only when both inputs are sorted; a cheap sample
+    check rules most unsorted inputs out before the full O(1)-memory scan
+    that guarantees the merge never sees out-of-order rows mid-stream.
+    """
+
+    sides = (left, right)
+    if requested == "hash":
+        return "hash", (False, False)
+    if requested == "merge":
+        flags = tuple(side.stream.seekable() and _is_sorted(side) for side in sides)
+        return "merge", (flags[0], flags[1])
+    if not all(side.stream.seekable() for side in sides):
+        return "hash", (False, False)
+    if not all(_is_sorted(side, SORT_SAMPLE_ROWS) for side in sides):
+        return "hash", (False, False)
+    if all(_is_sorted(side) for side in sides):
+        return "merge", (True, True)
+    return "hash", (False, False)
+
+
+def _is_sorted(side: JoinInput, limit: Optional[int] = None) -> bool:
+    """Scan ``side`` (or its first ``limit`` rows) and rewind the stream."""
+
+    start = side.stream.tell()
+    try:
+        rows = _read_rows(side)
+        next(rows, None)  # header
+        previous: Optional[Key] = None
+        for count, row in enumerate(rows):
+            if limit is not None and count >= limit:
+                break
+            key = _row_key(row, side.keys)
+            if key is None:
+                continue
+            if previous is not None and key < previous:
+                return False
+            previous = key
+        return True
+    finally:
+        side.stream.seek(start)
+
+
+def _merge_join(
+    plan: _JoinPlan,
+    left: Tuple[JoinInput, Iterator[Row]],
+    right: Tuple[JoinInput, Iterator[Row]],
+    presorted: Tuple[bool, bool],
+    budget: int,
+    stats: JoinStats,
+) -> Iterator[Row]:
+    with tempfile.TemporaryDirectory(prefix="tinyutils-csvjoin-") as tmp:
+        groups = []
+        for name, (side, rows), is_sorted in (("left", left, presorted[0]), ("right", right, presorted[1])):
+            if not is_sorted:
+                stats.algorithm = "merge+external_sort"
+                rows = _external_sort(rows, side.keys, budget, Path(tmp) / name)
+            groups.append(_key_groups(rows, side.keys))
+        yield from _merge_groups(plan, groups[0], groups[1])
+
+
+def _key_groups(rows: Iterable[Row], keys: Sequence[int]) -> Iterator[Tuple[Key, List[Row]]]:
+    """Group consecutive rows sharing a key (rows too short for it are dropped)."""
+
+    keyed = ((_row_key(row, keys), row) for row in rows)
+    for key, group in itertools.groupby((item for item in keyed if item[0] is not None), key=lambda item: item[0]):
+        yield key, [row for _, row in group]  # type: ignore[misc]
+
+
+def _merge_groups(
+    plan: _JoinPlan,
+    left_groups: Iterator[Tuple[Key, List[Row]]],
+    right_groups: Iterator[Tuple[Key, List[Row]]],
+) -> Iterator[Row]:
+    left_group = next(left_groups, None)
+    right_group = next(right_groups, None)
+    while left_group is not None and right_group is not None:
+        left_key, left_batch = left_group
+        right_key, right_batch = right_group
+        if left_key < right_key:
+            if plan.keep_unmatched_probe:
+                for row in left_batch:
+                    yield plan.probe_only(row)
+            left_group = next(left_groups, None)
+        elif right_key < left_key:
+            if plan.keep_unmatched_build:
+                for row in right_batch:
+                    yield plan.build_only(row)
+            right_group = next(right_groups, None)
+        else:
+            for left_row in left_batch:
+                for right_row in right_batch:
+                    yield plan.combine(right_row, left_row)
+            left_group = next(left_groups, None)
+            right_group = next(right_groups, None)
+
+    while left_group is not None:
+        if plan.keep_unmatched_probe:
+            for row in left_group[1]:
+                yield plan.probe_only(row)
+        left_group = next(left_groups, None)
+    while right_group is not None:
+        if plan.keep_unmatched_build:
+            for row in right_group[1]:
+                yield plan.build_only(row)
+        right_group = next(right_groups, None)
+
+
+def _external_sort(rows: Iterable[Row], keys: Sequence[int], budget: int, root: Path) -> Iterator[Row]:
+    """Sort ``rows`` by key using sorted run files of ~``budget`` bytes each."""
+
+    def sort_key(row: Row) -> Key:
+        return _row_key(row, keys) or ()
+
+    root.mkdir(parents=True)
+    runs: List[Path] = []
+    batch: List[Row] = []
+    used = 0
+    for row in rows:
+        if _row_key(row, keys) is None:
+            continue
+        batch.append(row)
+        used += _row_cost(row)
+        if budget > 0 and used > budget:
+            runs.append(_write_run(root, len(runs), sorted(batch, key=sort_key)))
+            batch, used = [], 0
+
+    if not runs:
+        yield from sorted(batch, key=sort_key)
+        return
+    if batch:
+        runs.append(_write_run(root, len(runs), sorted(batch, key=sort_key)))
+        batch = []
+
+    handles = [path.open("r", encoding="utf-8", newline="") for path in runs]
+    try:
+        yield from heapq.merge(*(csv.reader(fh) for fh in handles), key=sort_key)
+    finally:
+        for fh in handles:
+            fh.close()
+
+
+def _write_run(root: Path, index: int, rows: List[Row]) -> Path:
+    path = root / f"run-{index}.csv"
+    with path.open("w", encoding="utf-8", newline="") as fh:
+        csv.writer(fh).writerows(rows)
+    return path
@@ -0,0 +1,303 @@
+"""Streaming JSON/NDJSON ↔ CSV helpers shared by the JSON tools endpoints.
+
+Records are parsed incrementally from a binary stream: a top-level JSON array
+is walked element by element and anything else is read as a sequence of JSON
+values (one object, NDJSON, or concatenated JSON). Conversion takes two passes
+over the same seekable stream: ``scan_records`` discovers the header union
+(bounded by ``max_columns``) and validates the whole document, then
+``iter_csv_chunks`` rewinds and streams hardened CSV rows. Only one batch of
+flattened records is in memory at a time.
+
+The other direction, ``iter_json_chunks``, reads CSV rows lazily and emits a
+JSON array (compact, or ``indent=2`` like the old output) or NDJSON as rows
+arrive, optionally inferring numbers and booleans per cell.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import math
+import os
+import re
+import sys
+import textwrap
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional
+
+from api._lib.csv_columns import batched, harden_column, harden_records
+
+MAX_COLUMNS = int(os.getenv("JSON_TOOLS_MAX_COLUMNS", "10000"))
+READ_CHUNK_CHARS = 64 * 1024
+OUTPUT_CHUNK_BYTES = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+_TRUNCATION_WINDOW = 16
+# Leading zeros ("007") stay strings so IDs and ZIP codes survive inference
+_INT_RE = re.compile(r"-?(?:0|[1-9][0-9]*)")
+_FLOAT_RE = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+(?:[eE][+-]?[0-9]+)?|[eE][+-]?[0-9]+)")
+_BOOLEANS = {"true": True, "false": False}
+
+# Allow very large CSV fields (long text blobs)
+csv.field_size_limit(sys.maxsize)
+
+
+class TooManyColumnsError(ValueError):
+    """Raised by ``scan_records`` when the header union exceeds the limit."""
+
+
+def flatten_json(obj: Any) -> Dict[str, Any]:
+    """Flatten a nested JSON object into a single-depth dict.
+
+    Example: {"a": {"b": 1}} -> {"a.b": 1}
+    Arrays are joined with a pipe (`|`) to keep rows 1:1.
+    """
+
+    out: Dict[str, Any] = {}
+
+    def _flatten(value: Any, prefix: str = "") -> None:
+        if isinstance(value, dict):
+            for key, child in value.items():
+                _flatten(child, f"{prefix}{key}.")
+        elif isinstance(value, list):
+            # Represent arrays as pipe-joined values; this avoids
+            # exploding rows or losing data while remaining CSV-friendly.
+            out[prefix[:-1]] = "|".join(str(item) for item in value)
+        else:
+            out[prefix[:-1]] = value
+
+    _flatten(obj)
+    return out
+
+
+def iter_json_records(stream: BinaryIO) -> Iterator[Any]:
+    """Yield records from a JSON array, a single value, or NDJSON.
+
+    Raises ``ValueError`` (``json.JSONDecodeError`` / ``UnicodeDecodeError``)
+    on malformed input. The caller's stream is left open.
+    """
+
+    reader = _ValueReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    try:
+        if reader.peek() == "[":
+            yield from reader.array_items()
+            if reader.peek():
+                reader.fail("Extra data after top-level array")
+        else:
+            while reader.peek():
+                yield reader.value()
+    finally:
+        reader.text.detach()
+
+
+@dataclass
+class RecordScan:
+    """Result of the first pass: sorted header union and record count."""
+
+    headers: List[str]
+    records: int
+
+
+def scan_records(stream: BinaryIO, *, max_columns: Optional[int] = None) -> RecordScan:
+    """First pass: validate the document and collect the flattened headers.
+
+    Raises ``ValueError`` on malformed JSON and ``TooManyColumnsError`` when
+    more than ``max_columns`` distinct columns are found (0 disables it).
+    """
+
+    limit = MAX_COLUMNS if max_columns is None else max_columns
+    headers: set = set()
+    count = 0
+    for record in iter_json_records(stream):
+        headers.update(flatten_json(record))
+        count += 1
+        if limit and len(headers) > limit:
+            raise TooManyColumnsError(f"Too many columns (more than {limit})")
+    return RecordScan(sorted(headers), count)
+
+
+def iter_csv_chunks(
+    stream: BinaryIO, headers: List[str], *, chunk_bytes: int = OUTPUT_CHUNK_BYTES
+) -> Iterator[bytes]:
+    """Second pass: rewind ``stream`` and yield the hardened CSV as UTF-8."""
+
+    stream.seek(0)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(harden_column(headers))
+    for batch in batched(iter_json_records(stream)):
+        writer.writerows(harden_records([flatten_json(record) for record in batch], headers))
+        if buffer.tell() >= chunk_bytes:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ValueReader:
+    """Pull complete JSON values out of a text stream read in chunks."""
+
+    def __init__(self, text: io.TextIOWrapper) -> None:
+        self.text = text
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        if self.eof:
+            return False
+        chunk = self.text.read(size or READ_CHUNK_CHARS)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at EOF)."""
+
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def value(self) -> Any:
+        # Each retry re-parses the value from its start, so reads grow
+        # geometrically to keep a huge value linear overall.
+        size = READ_CHUNK_CHARS
+        while True:
+            self.peek()
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as exc:
+                # Only an error at the end of the buffer can be a value split
+                # across chunks; anything earlier is malformed input.
+                if _may_be_truncated(exc, len(self.buf)) and self._fill(size):
+                    size *= 2
+                    continue
+                raise
+            # A number/literal touching the end of the buffer may be cut off
+            if end == len(self.buf) and self.buf[end - 1] not in '"]}' and self._fill(size):
+                size *= 2
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        self.pos += 1  # opening "["
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "]":
+                return
+            if separator != ",":
+                self.fail("Expecting ',' delimiter")
+
+    def fail(self, message: str) -> None:
+        raise json.JSONDecodeError(message, self.buf, self.pos)
+
+
+def _may_be_truncated(exc: json.JSONDecodeError, buffered: int) -> bool:
+    # Strings report where they started; other errors sit within the longest
+    # token that can be cut short (a literal or a \uXXXX\uXXXX escape).
+    return exc.msg.startswith("Unterminated string") or buffered - exc.pos <= _TRUNCATION_WINDOW
+
+
+def sniff_delimiter(sample: str) -> str:
+    """Guess the CSV delimiter from a text sample (falls back to comma)."""
+
+    try:
+        return csv.Sniffer().sniff(sample).delimiter
+    except Exception:
+        return ","
+
+
+def iter_json_chunks(
+    stream: BinaryIO,
+    *,
+    ndjson: bool = False,
+    pretty: bool = False,
+    infer_types: bool = False,
+    chunk_bytes: int = OUTPUT_CHUNK_BYTES,
+) -> Iterator[bytes]:
+    """Yield a CSV stream as a JSON array (or NDJSON) of objects, in UTF-8 chunks.
+
+    Rows are read with ``csv.DictReader`` semantics (first row is the header)
+    and the delimiter is sniffed from the first 4 KiB. Undecodable bytes are
+    replaced rather than failing mid-response.
+    """
+
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        reader = csv.DictReader(text, delimiter=sniff_delimiter(_peek_text(text)))
+        if ndjson:
+            opener, separator, closer = "", "\n", "\n"
+        elif pretty:
+            opener, separator, closer = "[\n", ",\n", "\n]"
+        else:
+            opener, separator, closer = "[", ",", "]"
+        dumps = json.JSONEncoder(
+            indent=2 if pretty and not ndjson else None,
+            separators=None if pretty and not ndjson else (",", ":"),
+        ).encode
+
+        parts: List[str] = []
+        size = 0
+        first = True
+        for row in reader:
+            if infer_types:
+                row = {key: _infer_value(value) for key, value in row.items()}
+            encoded = dumps(row)
+            if pretty and not ndjson:
+                encoded = textwrap.indent(encoded, "  ")
+            parts.append(opener if first else separator)
+            parts.append(encoded)
+            size += len(encoded)
+            first = False
+            if size >= chunk_bytes:
+                yield "".join(parts).encode("utf-8")
+                parts.clear()
+                size = 0
+        if first:
+            parts.append("" if ndjson else "[]")
+        else:
+            parts.append(closer)
+        yield "".join(parts).encode("utf-8")
+    finally:
+        text.detach()
+
+
+def _peek_text(text: io.TextIOWrapper, size: int = 4096) -> str:
+    """Return the first ``size`` characters of ``text`` and rewind it."""
+
+    sample = text.read(size)
+    text.seek(0)
+    return sample
+
+
+def _infer_value(value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    if _INT_RE.fullmatch(value):
+        try:
+            return int(value)
+        except ValueError:  # longer than the interpreter's int digit limit
+            return value
+    if _FLOAT_RE.fullmatch(value):
+        number = float(value)
+        # 1e999 overflows to inf, which JSON cannot represent
+        return number if math.isfinite(number) else value
+    return _BOOLEANS.get(value.lower(), value)
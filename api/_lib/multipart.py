@@ -3,17 +3,27 @@
 Python 3.13 removed the stdlib `cgi` module, but several TinyUtils Python
 endpoints rely on parsing multipart uploads (files + small form fields).
 
-This helper uses the stdlib `email` package to parse a multipart payload into
-`{field_name: [values...]}` where values are:
-  - `bytes` for file parts (when a filename is present)
-  - `str` for normal form fields
+The body is scanned incrementally for boundaries as it is read, so an upload
+is never held as one contiguous buffer. Two entry points:
+
+- `parse_multipart_uploads` returns `{field_name: [values...]}` where file
+  parts (a filename is present) are `UploadedFile` objects spooled to a
+  `SpooledTemporaryFile` (memory below `spool_bytes`, disk above) and normal
+  form fields are `str`. Per-file and per-field limits are enforced while
+  reading.
+- `parse_multipart_form` keeps the original shape: file parts as `bytes`.
+
+Content-Transfer-Encoding on parts is not decoded (RFC 7578 deprecates it
+and browsers never send it).
 """
 
 from __future__ import annotations
 
-from email.parser import BytesParser
+import tempfile
+from email.message import Message
+from email.parser import BytesHeaderParser
 from email.policy import default
-from typing import BinaryIO, Dict, List, Mapping, Union
+from typing import BinaryIO, Dict, List, Mapping, Optional, Union
 
 
 FormValue = Union[str, bytes]
@@ -27,20 +37,73 @@ class MultipartParseError(Exception):
 
 
 _READ_CHUNK_BYTES = 64 * 1024
+# File parts stay in memory up to this size before spilling to disk
+SPOOL_MAX_BYTES = 1024 * 1024
+MAX_FIELD_BYTES = 1024 * 1024
+_MAX_HEADER_BYTES = 16 * 1024
 
 
-def _read_exact(rfile: BinaryIO, nbytes: int) -> bytes:
-    """Read exactly `nbytes` from `rfile` unless EOF is reached early."""
+class UploadedFile:
+    """A file part spooled while the request body was read.
+
+    Behaves like a read-only binary file (``read``/``seek``/``tell``); the
+    underlying ``SpooledTemporaryFile`` is available as ``file`` for APIs
+    that need a real IO object (e.g. ``io.TextIOWrapper``).
+    """
+
+    def __init__(self, filename: str, content_type: str, spool_bytes: int) -> None:
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.file: BinaryIO = tempfile.SpooledTemporaryFile(max_size=spool_bytes)  # type: ignore[assignment]
+
+    def read(self, size: int = -1) -> bytes:
+        return self.file.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.file.tell()
+
+    def getvalue(self) -> bytes:
+        """Return the whole part as bytes and rewind."""
+
+        self.file.seek(0)
+        data = self.file.read()
+        self.file.seek(0)
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "UploadedFile":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+UploadValue = Union[str, UploadedFile]
 
-    buf = bytearray()
-    remaining = nbytes
-    while remaining > 0:
-        chunk = rfile.read(min(_READ_CHUNK_BYTES, remaining))
-        if not chunk:
-            break
-        buf.extend(chunk)
-        remaining -= len(chunk)
-    return bytes(buf)
+
+class UploadForm(Dict[str, List[UploadValue]]):
+    """Parsed form data; closing it closes every spooled file part."""
+
+    def files(self, name: str) -> List[UploadedFile]:
+        return [value for value in self.get(name) or [] if isinstance(value, UploadedFile)]
+
+    def close(self) -> None:
+        for values in self.values():
+            for value in values:
+                if isinstance(value, UploadedFile):
+                    value.close()
+
+    def __enter__(self) -> "UploadForm":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
 
 
 def parse_multipart_form(
@@ -57,6 +120,38 @@ def parse_multipart_form(
         max_body_bytes: Optional total request body cap.
     """
 
+    with parse_multipart_uploads(
+        headers, rfile, max_body_bytes=max_body_bytes, spool_bytes=max_body_bytes or SPOOL_MAX_BYTES
+    ) as form:
+        out: FormData = {}
+        for name, values in form.items():
+            out[name] = [value.getvalue() if isinstance(value, UploadedFile) else value for value in values]
+        return out
+
+
+def parse_multipart_uploads(
+    headers: Mapping[str, str],
+    rfile: BinaryIO,
+    *,
+    max_body_bytes: int | None = None,
+    max_file_bytes: int | None = None,
+    max_field_bytes: int = MAX_FIELD_BYTES,
+    spool_bytes: int = SPOOL_MAX_BYTES,
+) -> UploadForm:
+    """Stream multipart/form-data into spooled file parts and text fields.
+
+    Args:
+        headers: An object supporting `get(name)` for HTTP headers (e.g. `self.headers`).
+        rfile: A binary stream supporting `.read(n)`.
+        max_body_bytes: Optional total request body cap.
+        max_file_bytes: Optional cap per file part (413 once exceeded).
+        max_field_bytes: Cap per non-file field (413 once exceeded).
+        spool_bytes: File parts larger than this spill from memory to disk.
+
+    The caller owns the returned form and should ``close()`` it (or use it as
+    a context manager) once the uploaded files are no longer needed.
+    """
+
     content_type = headers.get("content-type")
     if not content_type:
         raise MultipartParseError("Missing Content-Type header", status=400)
@@ -65,7 +160,8 @@ def parse_multipart_form(
     if media_type != "multipart/form-data":
         raise MultipartParseError("Content-Type must be multipart/form-data", status=400)
 
-    if "boundary=" not in content_type.lower():
+    boundary = _boundary(content_type)
+    if not boundary:
         raise MultipartParseError("Missing multipart boundary", status=400)
 
     content_length_raw = headers.get("content-length")
@@ -80,40 +176,178 @@ def parse_multipart_form(
     if max_body_bytes is not None and content_length > max_body_bytes:
         raise MultipartParseError("Upload too large", status=413)
 
-    body = _read_exact(rfile, content_length)
-    if len(body) != content_length:
-        raise MultipartParseError("Incomplete request body", status=400)
-
-    # The email parser expects a full MIME message; prepend headers then body.
-    mime_bytes = (
-        f"Content-Type: {content_type}\r\nMIME-Version: 1.0\r\n\r\n".encode("utf-8")
-        + body
+    form = UploadForm()
+    parser = _StreamParser(
+        _BodyReader(rfile, content_length),
+        boundary.encode("latin-1"),
+        form,
+        max_file_bytes=max_file_bytes,
+        max_field_bytes=max_field_bytes,
+        spool_bytes=spool_bytes,
     )
     try:
-        msg = BytesParser(policy=default).parsebytes(mime_bytes)
-    except MemoryError:
+        parser.run()
+    except BaseException:
+        form.close()
         raise
-    except Exception as exc:
-        raise MultipartParseError("Invalid multipart/form-data payload", status=400) from exc
-    if not msg.is_multipart():
-        raise MultipartParseError("Invalid multipart/form-data payload", status=400)
-
-    out: FormData = {}
-    for part in msg.iter_parts():
-        name = part.get_param("name", header="content-disposition")
-        if not name:
-            continue
-
-        payload = part.get_payload(decode=True) or b""
-        if part.get_filename() is not None:
-            out.setdefault(name, []).append(payload)
-            continue
-
-        charset = part.get_content_charset() or "utf-8"
-        try:
-            text = payload.decode(charset, errors="replace")
-        except LookupError:
-            text = payload.decode("utf-8", errors="replace")
-        out.setdefault(name, []).append(text.rstrip("\r\n"))
-
-    return out
+    return form
+
+
+# --- Internals ----------------------------------------------------------------
+
+
+def _boundary(content_type: str) -> Optional[str]:
+    msg = Message()
+    msg["content-type"] = content_type
+    boundary = msg.get_param("boundary")
+    if not isinstance(boundary, str) or not boundary or len(boundary) > 200:
+        return None
+    return boundary
+
+
+class _BodyReader:
+    """Read at most ``remaining`` bytes from ``rfile``, tolerating short reads."""
+
+    def __init__(self, rfile: BinaryIO, content_length: int) -> None:
+        self.rfile = rfile
+        self.remaining = content_length
+
+    def read(self) -> bytes:
+        if self.remaining <= 0:
+            return b""
+        chunk = self.rfile.read(min(_READ_CHUNK_BYTES, self.remaining))
+        if not chunk:
+            raise MultipartParseError("Incomplete request body", status=400)
+        self.remaining -= len(chunk)
+        return chunk
+
+    def drain(self) -> None:
+        while self.read():
+            pass
+
+
+class _StreamParser:
+    def __init__(
+        self,
+        body: _BodyReader,
+        boundary: bytes,
+        form: UploadForm,
+        *,
+        max_file_bytes: Optional[int],
+        max_field_bytes: int,
+        spool_bytes: int,
+    ) -> None:
+        self.body = body
+        self.form = form
+        self.dash_boundary = b"--" + boundary
+        # Part content ends at CRLF + "--boundary"
+        self.delimiter = b"\r\n" + self.dash_boundary
+        self.max_file_bytes = max_file_bytes
+        self.max_field_bytes = max_field_bytes
+        self.spool_bytes = spool_bytes
+        self.buf = bytearray()
+
+    def _fill(self) -> bool:
+        chunk = self.body.read()
+        if not chunk:
+            return False
+        self.buf += chunk
+        return True
+
+    def _invalid(self) -> MultipartParseError:
+        return MultipartParseError("Invalid multipart/form-data payload", status=400)
+
+    def run(self) -> None:
+        # Skip the preamble up to the first "--boundary"
+        scanned = 0
+        while True:
+            index = self.buf.find(self.dash_boundary, scanned)
+            if index >= 0:
+                del self.buf[: index + len(self.dash_boundary)]
+                break
+            scanned = max(0, len(self.buf) - len(self.dash_boundary) + 1)
+            if not self._fill():
+                raise self._invalid()
+
+        while True:
+            # After a boundary: "--" closes the body, CRLF starts a part
+            while len(self.buf) < 2:
+                if not self._fill():
+                    raise self._invalid()
+            if self.buf[:2] == b"--":
+                self.body.drain()
+                return
+            line_end = self._find(b"\r\n", 0, _MAX_HEADER_BYTES)
+            if self.buf[:line_end].strip(b" \t"):
+                raise self._invalid()
+            del self.buf[: line_end + 2]
+            self._read_part()
+
+    def _find(self, needle: bytes, start: int, limit: int) -> int:
+        """Find ``needle`` in the buffer, reading more body as needed."""
+
+        scanned = start
+        while True:
+            index = self.buf.find(needle, scanned)
+            if index >= 0:
+                return index
+            if len(self.buf) > limit:
+                raise MultipartParseError("Multipart part headers too large", status=400)
+            scanned = max(start, len(self.buf) - len(needle) + 1)
+            if not self._fill():
+                raise self._invalid()
+
+    def _read_part(self) -> None:
+        header_end = self._find(b"\r\n\r\n", 0, _MAX_HEADER_BYTES)
+        part_headers = BytesHeaderParser(policy=default).parsebytes(bytes(self.buf[: header_end + 4]))
+        del self.buf[: header_end + 4]
+
+        name = part_headers.get_param("name", header="content-disposition")
+        filename = part_headers.get_filename()
+        upload: Optional[UploadedFile] = None
+        field = bytearray()
+        if filename is not None and name:
+            upload = UploadedFile(filename, part_headers.get_content_type(), self.spool_bytes)
+            self.form.setdefault(name, []).append(upload)
+
+        for chunk in self._part_chunks():
+            if upload is not None:
+                upload.size += len(chunk)
+                if self.max_file_bytes is not None and upload.size > self.max_file_bytes:
+                    limit_mb = self.max_file_bytes // (1024 * 1024)
+                    raise MultipartParseError(f"File too large (Max {limit_mb}MB)", status=413)
+                upload.file.write(chunk)
+            elif name:
+                field += chunk
+                if len(field) > self.max_field_bytes:
+                    raise MultipartParseError(f"Form field '{name}' too large", status=413)
+
+        if upload is not None:
+            upload.file.seek(0)
+        elif name:
+            charset = part_headers.get_content_charset() or "utf-8"
+            try:
+                text = field.decode(charset, errors="replace")
+            except LookupError:
+                text = field.decode("utf-8", errors="replace")
+            self.form.setdefault(name, []).append(text.rstrip("\r\n"))
+
+    def _part_chunks(self):
+        """Yield part content up to the next delimiter, consuming it."""
+
+        keep = len(self.delimiter) - 1
+        scanned = 0
+        while True:
+            index = self.buf.find(self.delimiter, scanned)
+            if index >= 0:
+                if index:
+                    yield bytes(self.buf[:index])
+                del self.buf[: index + len(self.delimiter)]
+                return
+            safe = len(self.buf) - keep
+            if safe > 0:
+                yield bytes(self.buf[:safe])
+                del self.buf[:safe]
+            scanned = 0
+            if not self._fill():
+                raise self._invalid()
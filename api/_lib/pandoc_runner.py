@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import lzma
 import logging
@@ -16,6 +16,8 @@ try:  # pragma: no cover - optional dependency
 except ImportError:  # pragma: no cover - optional dependency
     pypandoc = None
 
+from . import pandoc_server
+
 
 PANDOC_ENV_VAR = "PYPANDOC_PANDOC"
 VENDORED_PANDOC_PATH = Path(__file__).resolve().parents[1] / "_vendor" / "pandoc" / "pandoc"
@@ -94,16 +96,7 @@ def convert_to_markdown(
     """Convert *source* into GitHub-flavoured markdown at *destination*."""
 
     args: List[str] = [_markdown_heading_flag(), *BASE_ARGS]
-    if accept_tracked_changes:
-        args.append("--track-changes=accept")
-    if extract_media_dir:
-        args.append(f"--extract-media={extract_media_dir}")
-
-    # Apply HTML-specific filters for semantic element conversion
-    if from_format == "html":
-        html_filter_args = _lua_filter_args(HTML_FILTERS)
-        if html_filter_args:
-            args.extend(html_filter_args)
+    args.extend(_reader_args(from_format, accept_tracked_changes, extract_media_dir))
 
     # LaTeX specific: preserve TeX math delimiters even when input detected as latex
     # Note: tex_math_dollars extension is already included in DEFAULT_OUTPUT_FORMAT
@@ -114,7 +107,7 @@ def convert_to_markdown(
     if pypandoc is None:
         raise PandocError("pypandoc not installed")
     try:
-        pypandoc.convert_file(
+        convert_file(
             str(source),
             to=DEFAULT_OUTPUT_FORMAT,
             format=from_format,
@@ -125,6 +118,54 @@ def convert_to_markdown(
         raise PandocError(str(exc)) from exc
 
 
+def convert_to_filtered_markdown(
+    source: Path,
+    from_format: Optional[str],
+    accept_tracked_changes: bool = False,
+    extract_media_dir: Optional[Path] = None,
+) -> str:
+    """Convert *source* to markdown with the Lua filters applied in one pass.
+
+    Replaces :func:`convert_to_markdown` followed by :func:`apply_lua_filters`
+    when the unfiltered intermediate is not needed: one pandoc process, no
+    intermediate files. Writer options match the filter pass, whose output is
+    what the two-pass pipeline returns.
+    """
+
+    args = _reader_args(from_format, accept_tracked_changes, extract_media_dir)
+    args.extend(_lua_filter_args() or [])
+    if pypandoc is None:
+        raise PandocError("pypandoc not installed")
+    try:
+        return convert_file(
+            str(source),
+            to=DEFAULT_OUTPUT_FORMAT,
+            format=from_format,
+            extra_args=args,
+        )
+    except RuntimeError as exc:  # pragma: no cover - passthrough
+        raise PandocError(str(exc)) from exc
+
+
+def _reader_args(
+    from_format: Optional[str],
+    accept_tracked_changes: bool,
+    extract_media_dir: Optional[Path],
+) -> List[str]:
+    args: List[str] = []
+    if accept_tracked_changes:
+        args.append("--track-changes=accept")
+    if extract_media_dir:
+        args.append(f"--extract-media={extract_media_dir}")
+
+    # Apply HTML-specific filters for semantic element conversion
+    if from_format == "html":
+        html_filter_args = _lua_filter_args(HTML_FILTERS)
+        if html_filter_args:
+            args.extend(html_filter_args)
+    return args
+
+
 def apply_lua_filters(source: Path, destination: Path) -> None:
     """Run the second pass through Lua filters to normalise formatting."""
 
@@ -132,7 +173,7 @@ def apply_lua_filters(source: Path, destination: Path) -> None:
     if pypandoc is None:
         raise PandocError("pypandoc not installed")
     try:
-        pypandoc.convert_file(
+        convert_file(
             str(source),
             to=DEFAULT_OUTPUT_FORMAT,
             format="gfm",
@@ -143,6 +184,115 @@ def apply_lua_filters(source: Path, destination: Path) -> None:
         raise PandocError(str(exc)) from exc
 
 
+def convert_file(
+    source_file: str,
+    to: str,
+    format: Optional[str] = None,
+    extra_args: Optional[Iterable[str]] = None,
+    outputfile: Optional[str] = None,
+) -> str:
+    """Drop-in for ``pypandoc.convert_file`` that prefers a warm pandoc server.
+
+    Conversions the server cannot express (Lua filters, media extraction,
+    binary or self-contained output, unknown input format) and any server
+    failure use the subprocess path.
+    """
+
+    if format and _server_options(extra_args, to) is not None:
+        path = Path(source_file)
+        try:
+            if format.split("+")[0] in pandoc_server.BINARY_INPUT_FORMATS:
+                source: Union[str, bytes] = path.read_bytes()
+            else:
+                source = path.read_text("utf-8")
+        except (OSError, UnicodeDecodeError) as exc:
+            _LOGGER.debug("pandoc server skipped source=%s err=%s", source_file, exc)
+        else:
+            routed = _convert_via_server(source, to, format, extra_args, outputfile)
+            if routed is not None:
+                return routed
+    if pypandoc is None:
+        raise PandocError("pypandoc not installed")
+    return pypandoc.convert_file(
+        source_file,
+        to=to,
+        format=format,
+        extra_args=list(extra_args or ()),
+        outputfile=outputfile,
+    )
+
+
+def convert_text(
+    source: str,
+    to: str,
+    format: str,
+    extra_args: Optional[Iterable[str]] = None,
+    outputfile: Optional[str] = None,
+) -> str:
+    """Drop-in for ``pypandoc.convert_text`` that prefers a warm pandoc server."""
+
+    if _server_options(extra_args, to) is not None:
+        routed = _convert_via_server(source, to, format, extra_args, outputfile)
+        if routed is not None:
+            return routed
+    if pypandoc is None:
+        raise PandocError("pypandoc not installed")
+    return pypandoc.convert_text(
+        source,
+        to=to,
+        format=format,
+        extra_args=list(extra_args or ()),
+        outputfile=outputfile,
+    )
+
+
+def get_server_status() -> Dict[str, Any]:
+    """Return pandoc-server pool counters for health endpoints."""
+
+    if not pandoc_server.is_enabled():
+        return {"mode": "off"}
+    return pandoc_server.get_pool().status()
+
+
+def _server_options(extra_args: Optional[Iterable[str]], to: str) -> Optional[Dict[str, Any]]:
+    if not pandoc_server.is_enabled():
+        return None
+    # The server cannot read the local images these writers would embed
+    if to.split("+")[0] in pandoc_server.BINARY_OUTPUT_FORMATS:
+        return None
+    return pandoc_server.translate_args(extra_args)
+
+
+def _convert_via_server(
+    source: Union[str, bytes],
+    to: str,
+    from_format: str,
+    extra_args: Optional[Iterable[str]],
+    outputfile: Optional[str],
+) -> Optional[str]:
+    """Try a pooled pandoc server; ``None`` means use the subprocess path."""
+
+    options = _server_options(extra_args, to)
+    if options is None:
+        return None
+    try:
+        pool = pandoc_server.get_pool(_resolve_pandoc_path())
+        output = pool.convert(source, to=to, from_format=from_format, options=options)
+    except pandoc_server.PandocServerUnavailable as exc:
+        _LOGGER.debug("pandoc server fallback to=%s from=%s err=%s", to, from_format, exc)
+        return None
+    if outputfile:
+        if isinstance(output, bytes):
+            Path(outputfile).write_bytes(output)
+        else:
+            Path(outputfile).write_text(output, "utf-8")
+        return ""
+    if isinstance(output, bytes):
+        # Binary writers need an output file, mirroring pypandoc.
+        return None
+    return output
+
+
 _HEADING_FLAG: Optional[str] = None
 
 
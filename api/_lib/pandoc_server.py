@@ -0,0 +1,320 @@
+"""Warm pandoc-server pool used to avoid a pandoc process spawn per call.
+
+Pandoc 3 ships an HTTP server mode (``pandoc server``) that accepts the same
+options as a defaults file as JSON. Starting the ~140 MB binary dominates the
+latency of small conversions, so when ``PANDOC_SERVER_MODE`` is enabled the
+runner keeps one or more servers alive on localhost and sends eligible
+conversions to them over a keep-alive HTTP session.
+
+Server mode runs conversions in pandoc's pure monad: no Lua filters, no
+``--extract-media`` and no filesystem or network access. Writers that read
+the images a document references (binary formats, ``--embed-resources``)
+would silently swap them for alt text there. Callers therefore only route
+requests whose arguments translate cleanly (see :func:`translate_args`) to
+a text writer (see :data:`BINARY_OUTPUT_FORMATS`) and fall back to the
+subprocess path for everything else, and whenever a server is unreachable
+or rejects a conversion.
+
+Environment:
+
+* ``PANDOC_SERVER_MODE`` – ``off`` (default), ``local`` (spawn servers) or
+  ``remote`` (use ``PANDOC_SERVER_URLS`` only).
+* ``PANDOC_SERVER_URLS`` – comma-separated base URLs of existing servers.
+* ``PANDOC_SERVER_POOL_SIZE`` – number of local servers to spawn (default 1).
+* ``PANDOC_SERVER_TIMEOUT`` – per-conversion timeout in seconds (default 60).
+* ``PANDOC_SERVER_STARTUP_TIMEOUT`` – seconds to wait for a spawned server to
+  answer ``/version`` (default 5).
+"""
+from __future__ import annotations
+
+import atexit
+import base64
+import itertools
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+try:  # pragma: no cover - optional dependency
+    import requests  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    requests = None  # type: ignore
+
+
+SERVER_MODE = os.getenv("PANDOC_SERVER_MODE", "off").strip().lower()
+SERVER_URLS = [u.strip().rstrip("/") for u in os.getenv("PANDOC_SERVER_URLS", "").split(",") if u.strip()]
+POOL_SIZE = max(1, int(os.getenv("PANDOC_SERVER_POOL_SIZE", "1")))
+REQUEST_TIMEOUT = float(os.getenv("PANDOC_SERVER_TIMEOUT", "60"))
+STARTUP_TIMEOUT = float(os.getenv("PANDOC_SERVER_STARTUP_TIMEOUT", "5"))
+# A binary that cannot serve once (e.g. built without the threaded RTS) will
+# not recover, so stop spawning after the first failed start rather than
+# adding startup latency to every request.
+MAX_START_FAILURES = 1
+
+# Input formats pandoc-server expects as base64 in the ``text`` field.
+BINARY_INPUT_FORMATS = frozenset({"docx", "odt", "epub", "pptx", "xlsx", "docx+styles"})
+# Writers that embed referenced images; they always use the subprocess.
+BINARY_OUTPUT_FORMATS = frozenset({"docx", "odt", "epub", "epub2", "epub3", "pptx", "pdf"})
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PandocServerUnavailable(RuntimeError):
+    """Raised when no server can take a conversion; callers fall back."""
+
+
+def is_enabled() -> bool:
+    return SERVER_MODE in {"local", "remote"} and requests is not None
+
+
+def translate_args(extra_args: Optional[Iterable[str]]) -> Optional[Dict[str, Any]]:
+    """Map pandoc CLI flags onto pandoc-server JSON options.
+
+    Returns ``None`` when any flag has no pure-mode equivalent (Lua filters,
+    media extraction, embedded resources, unknown options), signalling a
+    subprocess fallback.
+    """
+
+    options: Dict[str, Any] = {}
+    for arg in extra_args or ():
+        arg = str(arg)
+        name, _, value = arg.partition("=")
+        if name == "--wrap" and value:
+            options["wrap"] = value
+        elif name == "--columns" and value.isdigit():
+            options["columns"] = int(value)
+        elif name in {"--standalone", "-s"}:
+            options["standalone"] = True
+        elif name == "--reference-links":
+            options["reference-links"] = True
+        elif name == "--markdown-headings" and value:
+            options["markdown-headings"] = value
+        elif name == "--atx-headers":
+            options["markdown-headings"] = "atx"
+        elif name == "--track-changes" and value:
+            options["track-changes"] = value
+        elif name == "--quiet":
+            continue
+        else:
+            return None
+    return options
+
+
+class PandocServerPool:
+    """Round-robin pool of pandoc-server endpoints with lazy (re)spawning."""
+
+    def __init__(self, pandoc_path: Optional[str] = None) -> None:
+        self._lock = threading.Lock()
+        # Held while spawning, so requests to running servers never wait on it
+        self._start_lock = threading.Lock()
+        self._pandoc_path = pandoc_path
+        self._urls: List[str] = list(SERVER_URLS)
+        self._procs: Dict[str, subprocess.Popen] = {}
+        self._cycle = itertools.cycle(self._urls) if self._urls else None
+        self._session: Any = None
+        self._session_pid = 0
+        self._owner_pid = os.getpid()
+        self._start_failures = 0
+        self.disabled_reason: Optional[str] = None
+        self.stats = {"requests": 0, "errors": 0, "restarts": 0}
+
+    # -- lifecycle -----------------------------------------------------
+    def set_pandoc_path(self, path: str) -> None:
+        self._pandoc_path = path
+
+    def _ensure_started(self) -> None:
+        if SERVER_MODE != "local" or SERVER_URLS:
+            return
+        with self._start_lock:
+            with self._lock:
+                if self._procs:
+                    return
+            if self._start_failures >= MAX_START_FAILURES:
+                raise PandocServerUnavailable(self.disabled_reason or "pandoc server disabled")
+            if not self._pandoc_path:
+                raise PandocServerUnavailable("pandoc binary not resolved")
+            procs: Dict[str, subprocess.Popen] = {}
+            for _ in range(POOL_SIZE):
+                spawned = self._spawn()
+                if spawned is not None:
+                    procs[spawned[0]] = spawned[1]
+            if not procs:
+                self._start_failures += 1
+                if self._start_failures >= MAX_START_FAILURES:
+                    self.disabled_reason = "pandoc server failed to start"
+                    _LOGGER.warning("pandoc server disabled after %d failed start(s)", self._start_failures)
+                raise PandocServerUnavailable("pandoc server failed to start")
+            self._start_failures = 0
+            with self._lock:
+                self._procs = procs
+                self._urls = list(procs)
+                self._cycle = itertools.cycle(self._urls)
+
+    def _spawn(self) -> Optional[Tuple[str, subprocess.Popen]]:
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        cmd = [
+            str(self._pandoc_path),
+            "server",
+            f"--port={port}",
+            f"--timeout={int(max(REQUEST_TIMEOUT, 1))}",
+        ]
+        try:
+            proc = subprocess.Popen(  # nosec - controlled binary invocation
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        except OSError as exc:
+            _LOGGER.warning("pandoc server spawn failed err=%s", exc)
+            return None
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                break
+            try:
+                resp = self._get_session().get(f"{url}/version", timeout=1)
+                if resp.ok:
+                    _LOGGER.info("pandoc server ready url=%s version=%s", url, resp.text.strip())
+                    return url, proc
+            except requests.RequestException:
+                pass
+            time.sleep(0.05)
+        _terminate(proc)
+        _LOGGER.warning("pandoc server did not become ready url=%s", url)
+        return None
+
+    def _drop(self, url: str) -> None:
+        proc = self._procs.pop(url, None)
+        if proc is None:
+            return
+        _terminate(proc)
+        self.stats["restarts"] += 1
+        # Remaining servers keep serving; an empty pool respawns lazily.
+        self._urls = list(self._procs)
+        self._cycle = itertools.cycle(self._urls) if self._urls else None
+
+    def shutdown(self) -> None:
+        if os.getpid() != self._owner_pid:
+            return
+        with self._lock:
+            for proc in self._procs.values():
+                _terminate(proc)
+            self._procs.clear()
+
+    # -- requests ------------------------------------------------------
+    def _get_session(self) -> Any:
+        # Sessions (and their sockets) must not be shared with forked workers.
+        if self._session is None or os.getpid() != self._session_pid:
+            self._session = requests.Session()
+            self._session_pid = os.getpid()
+        return self._session
+
+    def _next_url(self) -> str:
+        with self._lock:
+            if self._cycle is not None:
+                return next(self._cycle)
+        self._ensure_started()
+        with self._lock:
+            if self._cycle is None:
+                raise PandocServerUnavailable("no pandoc server configured")
+            return next(self._cycle)
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def convert(
+        self,
+        source: Union[str, bytes],
+        *,
+        to: str,
+        from_format: str,
+        options: Dict[str, Any],
+    ) -> Union[str, bytes]:
+        """Convert *source* on a pooled server; returns bytes for binary output."""
+
+        if isinstance(source, bytes):
+            text = base64.b64encode(source).decode("ascii")
+        else:
+            text = source
+        payload = dict(options, text=text, to=to)
+        payload["from"] = from_format
+
+        url = self._next_url()
+        self._count("requests")
+        try:
+            resp = self._get_session().post(
+                f"{url}/",
+                json=payload,
+                headers={"Accept": "application/json"},
+                timeout=REQUEST_TIMEOUT,
+            )
+        except requests.RequestException as exc:
+            with self._lock:
+                self.stats["errors"] += 1
+                self._drop(url)
+            raise PandocServerUnavailable(f"pandoc server request failed: {exc}") from exc
+        if resp.status_code != 200:
+            self._count("errors")
+            raise PandocServerUnavailable(f"pandoc server HTTP {resp.status_code}: {resp.text[:200]}")
+        try:
+            data = resp.json()
+        except ValueError as exc:
+            self._count("errors")
+            raise PandocServerUnavailable("pandoc server returned non-JSON payload") from exc
+        output = data.get("output")
+        if output is None:
+            self._count("errors")
+            raise PandocServerUnavailable(str(data.get("error") or "pandoc server returned no output"))
+        if data.get("base64"):
+            return base64.b64decode(output)
+        return output
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._procs:
+                alive = sum(1 for proc in self._procs.values() if proc.poll() is None)
+            else:
+                alive = len(self._urls)
+            return {
+                "mode": SERVER_MODE,
+                "servers": len(self._urls),
+                "alive": alive,
+                "disabledReason": self.disabled_reason,
+                **self.stats,
+            }
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _terminate(proc: subprocess.Popen) -> None:
+    if proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=2)
+    except subprocess.TimeoutExpired:  # pragma: no cover - stubborn process
+        proc.kill()
+
+
+_POOL: Optional[PandocServerPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(pandoc_path: Optional[str] = None) -> PandocServerPool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = PandocServerPool(pandoc_path)
+            atexit.register(_POOL.shutdown)
+        elif pandoc_path:
+            _POOL.set_pandoc_path(pandoc_path)
+        return _POOL
@@ -4,7 +4,7 @@ from __future__ import annotations
 import os
 from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Iterable, List, Sequence, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 import regex
 
@@ -14,6 +14,10 @@ DEFAULT_CONTEXT_LINES = int(os.getenv("PREVIEW_CONTEXT_LINES", "2"))
 DEFAULT_REGEX_TIMEOUT = float(os.getenv("REGEX_TIMEOUT_SECONDS", "1.5"))
 
 
+# (start, end, replacement) of one match in the original text
+Edit = Tuple[int, int, str]
+
+
 class RegexTimeoutError(RuntimeError):
     """Raised when regex evaluation times out."""
 
@@ -37,14 +41,18 @@ def compile_expression(
     multiline: bool,
     case_sensitive: bool,
     whole_word: bool,
+    dotall: Optional[bool] = None,
 ) -> regex.Pattern:
+    """Compile ``pattern``; ``dotall`` defaults to ``multiline``."""
     if mode == "literal":
         pattern = regex.escape(pattern)
     flags = regex.VERSION1
     if not case_sensitive:
         flags |= regex.IGNORECASE
     if multiline:
-        flags |= regex.MULTILINE | regex.DOTALL
+        flags |= regex.MULTILINE
+    if multiline if dotall is None else dotall:
+        flags |= regex.DOTALL
     if whole_word:
         pattern = rf"\b(?:{pattern})\b"
     try:
@@ -88,7 +96,7 @@ def scan_text(
                     context_after=after,
                 )
             )
-    except regex.TimeoutError as exc:  # pragma: no cover - depends on input
+    except TimeoutError as exc:  # pragma: no cover - depends on input
         raise RegexTimeoutError(str(exc)) from exc
 
     return match_count, samples
@@ -101,10 +109,17 @@ def apply_replacement(
     *,
     max_matches: int = DEFAULT_MAX_MATCHES,
     timeout: float = DEFAULT_REGEX_TIMEOUT,
+    concurrent: bool = False,
+    edits: Optional[List[Edit]] = None,
 ) -> Tuple[str, int]:
+    """Replace every match in one ``subn`` pass; ``concurrent`` releases the GIL.
+
+    When ``edits`` is given, every match is appended to it as an :data:`Edit`.
+    """
+    template = replacement if edits is None else _recording_template(replacement, edits)
     try:
-        result, count = compiled.subn(replacement, text, timeout=timeout)
-    except regex.TimeoutError as exc:  # pragma: no cover - depends on input
+        result, count = compiled.subn(template, text, timeout=timeout, concurrent=concurrent)
+    except TimeoutError as exc:  # pragma: no cover - depends on input
         raise RegexTimeoutError(str(exc)) from exc
     if count > max_matches:
         raise TooManyMatchesError(
@@ -113,6 +128,479 @@ def apply_replacement(
     return result, count
 
 
+def _recording_template(replacement: str, edits: List[Edit]) -> Callable[[regex.Match], str]:
+    """A ``sub`` callback that expands ``replacement`` and records each edit."""
+    if "\\" not in replacement:
+        def _constant(match: regex.Match) -> str:
+            edits.append((match.start(), match.end(), replacement))
+            return replacement
+
+        return _constant
+
+    def _expand(match: regex.Match) -> str:
+        expanded = match.expand(replacement)
+        edits.append((match.start(), match.end(), expanded))
+        return expanded
+
+    return _expand
+
+
+def validate_replacement(compiled: regex.Pattern, replacement: str) -> None:
+    """Raise ``ValueError`` if ``replacement`` is not a valid template.
+
+    ``regex`` only parses templates on the first match, so the check runs
+    against a copy of the pattern that always matches the empty string.
+    """
+    try:
+        probe = regex.compile(f"(?:{compiled.pattern}\n)|", compiled.flags)
+    except regex.error:  # pragma: no cover - exotic inline syntax; checked lazily
+        return
+    try:
+        probe.sub(replacement, "", count=1)
+    except (regex.error, IndexError) as exc:
+        raise ValueError(str(exc)) from exc
+
+
+@dataclass
+class Replacer:
+    """A find/replace rule compiled once and applied to many texts.
+
+    Case-sensitive literal rules bypass the regex engine entirely
+    (``str.count``/``str.replace``); everything else is a single
+    :func:`apply_replacement` pass.
+    """
+
+    replacement: str
+    compiled: Optional[regex.Pattern] = None
+    literal: Optional[str] = None
+
+    def apply(
+        self,
+        text: str,
+        *,
+        max_matches: int = DEFAULT_MAX_MATCHES,
+        timeout: float = DEFAULT_REGEX_TIMEOUT,
+        concurrent: bool = False,
+        edits: Optional[List[Edit]] = None,
+    ) -> Tuple[str, int]:
+        if self.literal is not None:
+            count = text.count(self.literal)
+            if count > max_matches:
+                raise TooManyMatchesError(
+                    f"Replacement count {count} exceeds limit {max_matches}"
+                )
+            if edits is not None:
+                position = text.find(self.literal)
+                while position >= 0:
+                    end = position + len(self.literal)
+                    edits.append((position, end, self.replacement))
+                    position = text.find(self.literal, end)
+            return (text.replace(self.literal, self.replacement) if count else text), count
+        return apply_replacement(
+            text,
+            self.compiled,
+            self.replacement,
+            max_matches=max_matches,
+            timeout=timeout,
+            concurrent=concurrent,
+            edits=edits,
+        )
+
+
+def compile_replacer(
+    pattern: str,
+    replacement: str,
+    *,
+    mode: str,
+    case_sensitive: bool,
+    multiline: bool = True,
+    dotall: Optional[bool] = None,
+    whole_word: bool = False,
+) -> Replacer:
+    """Compile a rule; literal replacements are inserted verbatim.
+
+    Raises ``ValueError`` for an empty or invalid pattern and for a regex
+    replacement template that references missing groups.
+    """
+    if not pattern:
+        raise ValueError("Search pattern cannot be empty")
+    if mode == "literal" and case_sensitive and not whole_word:
+        return Replacer(replacement, literal=pattern)
+    compiled = compile_expression(
+        pattern,
+        mode=mode,
+        multiline=multiline,
+        case_sensitive=case_sensitive,
+        whole_word=whole_word,
+        dotall=dotall,
+    )
+    if mode == "literal":
+        replacement = replacement.replace("\\", "\\\\")
+    else:
+        validate_replacement(compiled, replacement)
+    return Replacer(replacement, compiled=compiled)
+
+
+@dataclass
+class ReplaceRule:
+    """One entry of an ordered find/replace rule set."""
+
+    find: str
+    replace: str = ""
+    mode: str = "literal"
+    case_sensitive: bool = False
+
+
+@dataclass
+class _Branch:
+    """One alternative of a combined rule-set pattern.
+
+    Either a single regex rule or a run of adjacent literal rules matched
+    through one trie-shaped pattern; ``compiled`` is the branch on its own,
+    used to tell which branch produced a combined match.
+    """
+
+    compiled: regex.Pattern
+    rule: Optional[int] = None
+    template: Optional[str] = None
+    literals: Optional[Dict[str, int]] = None
+    case_sensitive: bool = True
+
+
+class RuleSet:
+    """Ordered find/replace rules applied in a single scan of each text.
+
+    All rules are compiled into one pattern: each regex rule is its own
+    alternative (a branch reset keeps its group numbers intact) and every run
+    of adjacent literal rules becomes a trie, so the cost of a scan barely
+    grows with the number of literals. Matching is left to right; where
+    several alternatives match at the same position the earliest wins, and
+    within a literal run the longest needle wins. Replaced text is never
+    rescanned, so rules can swap values (``a -> b``, ``b -> a``).
+
+    A single rule uses :class:`Replacer` directly (including its
+    ``str.replace`` fast path).
+    """
+
+    def __init__(
+        self,
+        rules: Sequence[ReplaceRule],
+        *,
+        multiline: bool = True,
+        dotall: Optional[bool] = None,
+    ) -> None:
+        if not rules:
+            raise ValueError("At least one rule is required")
+        self.rules = list(rules)
+        self._single: Optional[Replacer] = None
+        self._branches: List[_Branch] = []
+        flags = regex.VERSION1
+        if multiline:
+            flags |= regex.MULTILINE
+        if multiline if dotall is None else dotall:
+            flags |= regex.DOTALL
+
+        if len(self.rules) == 1:
+            rule = self.rules[0]
+            self._single = compile_replacer(
+                rule.find,
+                rule.replace,
+                mode=rule.mode,
+                case_sensitive=rule.case_sensitive,
+                multiline=multiline,
+                dotall=dotall,
+            )
+            return
+
+        fragments: List[str] = []
+        index = 0
+        while index < len(self.rules):
+            rule = self.rules[index]
+            if rule.mode == "literal":
+                # Adjacent literal rules with the same case handling share a trie
+                run: Dict[str, int] = {}
+                while (
+                    index < len(self.rules)
+                    and self.rules[index].mode == "literal"
+                    and self.rules[index].case_sensitive == rule.case_sensitive
+                ):
+                    needle = self.rules[index].find
+                    if not needle:
+                        raise ValueError(f"Rule {index + 1}: search pattern cannot be empty")
+                    run.setdefault(needle if rule.case_sensitive else needle.casefold(), index)
+                    index += 1
+                fragment = _scoped(_literal_trie(run), rule.case_sensitive)
+                branch = _Branch(regex.compile(fragment, flags), literals=run, case_sensitive=rule.case_sensitive)
+            else:
+                replacer = _compile_rule(rule, index, multiline=multiline, dotall=dotall)
+                fragment = _scoped(rule.find, rule.case_sensitive)
+                branch = _Branch(replacer.compiled, rule=index, template=replacer.replacement)
+                index += 1
+            fragments.append(f"(?:{fragment})")
+            self._branches.append(branch)
+        try:
+            self._combined = regex.compile("(?|" + "|".join(fragments) + ")", flags)
+        except regex.error as exc:  # pragma: no cover - rules compiled alone already
+            raise ValueError(str(exc)) from exc
+
+    def apply(
+        self,
+        text: str,
+        *,
+        max_matches: int = DEFAULT_MAX_MATCHES,
+        timeout: float = DEFAULT_REGEX_TIMEOUT,
+        concurrent: bool = False,
+        edits: Optional[List[Edit]] = None,
+    ) -> Tuple[str, List[int]]:
+        """Return the new text and the number of hits per rule.
+
+        When ``edits`` is given, every match is appended to it as an :data:`Edit`.
+        """
+        hits = [0] * len(self.rules)
+        if self._single is not None:
+            result, hits[0] = self._single.apply(
+                text, max_matches=max_matches, timeout=timeout, concurrent=concurrent, edits=edits
+            )
+            return result, hits
+
+        try:
+            result, count = self._combined.subn(
+                self._replacement_for(text, hits, edits), text, timeout=timeout, concurrent=concurrent
+            )
+        except TimeoutError as exc:  # pragma: no cover - depends on input
+            raise RegexTimeoutError(str(exc)) from exc
+        if count > max_matches:
+            raise TooManyMatchesError(
+                f"Replacement count {count} exceeds limit {max_matches}"
+            )
+        return result, hits
+
+    def _replacement_for(
+        self, text: str, hits: List[int], edits: Optional[List[Edit]]
+    ) -> Callable[[regex.Match], str]:
+        branches = self._branches
+
+        def _replace(match: regex.Match) -> str:
+            replacement = _choose(match)
+            if edits is not None:
+                edits.append((match.start(), match.end(), replacement))
+            return replacement
+
+        def _choose(match: regex.Match) -> str:
+            start = match.start()
+            for branch in branches:
+                own = branch.compiled.match(text, start)
+                if own is None:
+                    continue
+                if branch.literals is not None:
+                    found = own.group(0)
+                    rule = branch.literals.get(found if branch.case_sensitive else found.casefold())
+                    if rule is None:
+                        rule = self._literal_rule_for(found, branch)
+                    hits[rule] += 1
+                    return self.rules[rule].replace
+                hits[branch.rule] += 1
+                return own.expand(branch.template)
+            return match.group(0)  # pragma: no cover - some branch always matches
+
+        return _replace
+
+    def _literal_rule_for(self, found: str, branch: _Branch) -> int:
+        """Find the rule behind a case-insensitive match that does not casefold
+        back to its needle (e.g. ``i`` matching Turkish ``İ``)."""
+        candidates = sorted(set(branch.literals.values()))
+        for rule in candidates:
+            if regex.fullmatch(regex.escape(self.rules[rule].find), found, regex.VERSION1 | regex.IGNORECASE):
+                return rule
+        return candidates[0]  # pragma: no cover - the trie matched one of them
+
+
+@dataclass
+class _Block:
+    """Changed lines ``[start, stop)`` of the old text and what replaces them."""
+
+    start: int
+    stop: int
+    new_lines: List[str]
+
+
+class SpanDiff:
+    """Unified diff built from replacement edits instead of a full line diff.
+
+    Only the lines an edit touches are split and compared; everything else
+    is known to be unchanged, so the cost follows the number of matches
+    rather than the file size. Hunks are planned up front (cheap: line
+    numbers plus the changed lines) and rendered on demand with
+    :meth:`render`, which lets callers page through large diffs.
+    """
+
+    def __init__(self, text: str, edits: Sequence[Edit], *, context: int = DEFAULT_CONTEXT_LINES) -> None:
+        self.text = text
+        self.context = context
+        self._starts = _line_starts(text)
+        self._hunks = self._plan(self._blocks(edits))
+
+    def __len__(self) -> int:
+        return len(self._hunks)
+
+    def render(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Render hunks ``start:stop`` as ``@@`` headers followed by their lines."""
+        return [self._render(hunk) for hunk in self._hunks[start:stop]]
+
+    def _line_of(self, position: int) -> int:
+        return max(0, min(_line_for_offset(self._starts, position), len(self._starts) - 2))
+
+    def _lines(self, start: int, stop: int) -> List[str]:
+        return self.text[self._starts[start]:self._starts[stop]].splitlines()
+
+    def _rewrite(self, first: int, stop: int, edits: Sequence[Edit]) -> str:
+        """Text of lines ``first:stop`` with ``edits`` applied."""
+        pieces, cursor = [], self._starts[first]
+        for edit_start, edit_end, replacement in edits:
+            pieces.append(self.text[cursor:edit_start])
+            pieces.append(replacement)
+            cursor = edit_end
+        pieces.append(self.text[cursor:self._starts[stop]])
+        return "".join(pieces)
+
+    def _blocks(self, edits: Sequence[Edit]) -> List[_Block]:
+        starts = self._starts
+        line_count = len(starts) - 1
+        groups: List[list] = []  # [first line, stop line, edits]
+        for edit in edits:
+            group = groups[-1] if groups else None
+            # Edits are ordered, so most land inside the current group
+            if group is not None and edit[1] < starts[group[1]]:
+                group[2].append(edit)
+                continue
+            first = self._line_of(edit[0])
+            stop = min(self._line_of(edit[1]) + 1, line_count)
+            if group is not None and first <= group[1]:
+                group[1] = max(group[1], stop)
+                group[2].append(edit)
+            else:
+                groups.append([first, stop, [edit]])
+
+        blocks = []
+        index = 0
+        while index < len(groups):
+            first, last, group = groups[index]
+            index += 1
+            new_text = self._rewrite(first, last, group)
+            # An edit at the region boundary can fuse a lone "\r" and a "\n"
+            # into one line break; take the neighbour line along
+            if first > 0 and new_text.startswith("\n") and self.text[starts[first] - 1] == "\r":
+                first -= 1
+                new_text = self._rewrite(first, last, group)
+            while last < line_count and new_text.endswith("\r") and self.text[starts[last]] == "\n":
+                last += 1
+                while index < len(groups) and groups[index][0] < last:
+                    last = max(last, groups[index][1])
+                    group = group + groups[index][2]
+                    index += 1
+                new_text = self._rewrite(first, last, group)
+            old_lines = self._lines(first, last)
+            new_lines = new_text.splitlines()
+            # Trim lines an edit reached but did not change
+            head = 0
+            while head < min(len(old_lines), len(new_lines)) and old_lines[head] == new_lines[head]:
+                head += 1
+            tail = 0
+            while (
+                tail < min(len(old_lines), len(new_lines)) - head
+                and old_lines[-1 - tail] == new_lines[-1 - tail]
+            ):
+                tail += 1
+            if head + tail == len(old_lines) == len(new_lines):
+                continue
+            blocks.append(_Block(first + head, last - tail, new_lines[head:len(new_lines) - tail]))
+        return blocks
+
+    def _plan(self, blocks: List[_Block]) -> List[Tuple[int, int, int, List[_Block]]]:
+        """Group blocks into hunks of ``(old_start, old_stop, new_start, blocks)``."""
+        line_count = len(self._starts) - 1
+        hunks: List[Tuple[int, int, int, List[_Block]]] = []
+        delta = 0
+        for block in blocks:
+            if hunks and block.start - hunks[-1][3][-1].stop <= 2 * self.context:
+                old_start, _, new_start, grouped = hunks[-1]
+                grouped.append(block)
+                hunks[-1] = (old_start, min(block.stop + self.context, line_count), new_start, grouped)
+            else:
+                old_start = max(0, block.start - self.context)
+                hunks.append((old_start, min(block.stop + self.context, line_count), old_start + delta, [block]))
+            delta += len(block.new_lines) - (block.stop - block.start)
+        return hunks
+
+    def _render(self, hunk: Tuple[int, int, int, List[_Block]]) -> str:
+        old_start, old_stop, new_start, blocks = hunk
+        new_length = (old_stop - old_start) + sum(
+            len(block.new_lines) - (block.stop - block.start) for block in blocks
+        )
+        out = [
+            f"@@ -{_format_range(old_start, old_stop - old_start)} "
+            f"+{_format_range(new_start, new_length)} @@"
+        ]
+        cursor = old_start
+        for block in blocks:
+            out.extend(" " + line for line in self._lines(cursor, block.start))
+            out.extend("-" + line for line in self._lines(block.start, block.stop))
+            out.extend("+" + line for line in block.new_lines)
+            cursor = block.stop
+        out.extend(" " + line for line in self._lines(cursor, old_stop))
+        return "\n".join(out)
+
+
+def _format_range(start: int, length: int) -> str:
+    """Unified diff range, as ``difflib`` writes it."""
+    beginning = start + 1
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _compile_rule(rule: ReplaceRule, index: int, *, multiline: bool, dotall: Optional[bool]) -> Replacer:
+    try:
+        return compile_replacer(
+            rule.find,
+            rule.replace,
+            mode=rule.mode,
+            case_sensitive=rule.case_sensitive,
+            multiline=multiline,
+            dotall=dotall,
+        )
+    except ValueError as exc:
+        raise ValueError(f"Rule {index + 1}: {exc}") from exc
+
+
+def _scoped(pattern: str, case_sensitive: bool) -> str:
+    return f"(?-i:{pattern})" if case_sensitive else f"(?i:{pattern})"
+
+
+def _literal_trie(needles: Iterable[str]) -> str:
+    """Build a regex that matches any needle, preferring the longest."""
+    root: dict = {}
+    for needle in needles:
+        node = root
+        for char in needle:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def _pattern(node: dict) -> str:
+        branches = [regex.escape(char) + _pattern(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A needle ends here: try the longer ones first, then stop
+            return f"(?:{body})?"
+        return body
+
+    return _pattern(root)
+
+
 def _line_offsets(text: str) -> Tuple[List[int], Sequence[str]]:
     lines = text.splitlines()
     offsets: List[int] = []
@@ -123,6 +611,14 @@ def _line_offsets(text: str) -> Tuple[List[int], Sequence[str]]:
     return offsets, lines
 
 
+def _line_starts(text: str) -> List[int]:
+    """Start offset of every ``splitlines()`` line, plus ``len(text)``."""
+    starts = [0]
+    for line in text.splitlines(True):
+        starts.append(starts[-1] + len(line))
+    return starts
+
+
 def _line_for_offset(offsets: Sequence[int], position: int) -> int:
     idx = bisect_right(offsets, position) - 1
     return max(idx, 0)
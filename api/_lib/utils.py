@@ -9,13 +9,14 @@ import uuid
 from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterator, List, Optional
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 
 DEFAULT_MAX_FILE_MB = 100
 DEFAULT_MAX_BATCH_MB = 1024
 DEFAULT_PREVIEW_HEADINGS = 8
 DEFAULT_PREVIEW_SNIPPETS = 4
 DEFAULT_DIFF_TRUNCATE_KB = 256
+SPOOL_CHUNK_BYTES = 1024 * 1024
 
 MAX_FILE_MB = int(os.getenv("MAX_FILE_MB", str(DEFAULT_MAX_FILE_MB)))
 MAX_BATCH_MB = int(os.getenv("MAX_BATCH_MB", str(DEFAULT_MAX_BATCH_MB)))
@@ -322,5 +323,26 @@ def job_workspace(prefix: str = "tinyutils-job-") -> Iterator[Path]:
         yield Path(tmp)
 
 
+def spool_to_tempfile(source: BinaryIO, limit: int) -> Tuple[BinaryIO, int]:
+    """Copy ``source`` into a private temp file without reading it into memory.
+
+    Streaming responses outlive the request's upload object, so handlers
+    spool uploads first. Copying stops once ``limit`` is exceeded; the
+    returned size is then ``> limit``. The copy is rewound before returning.
+    """
+
+    spooled = tempfile.TemporaryFile()
+    source.seek(0)
+    size = 0
+    while size <= limit:
+        chunk = source.read(SPOOL_CHUNK_BYTES)
+        if not chunk:
+            break
+        spooled.write(chunk)
+        size += len(chunk)
+    spooled.seek(0)
+    return spooled, size
+
+
 def summarize_counts(counts: Dict[str, int]) -> str:
     return json.dumps(counts, sort_keys=True)
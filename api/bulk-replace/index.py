@@ -6,87 +6,182 @@ Security: Zip bomb protection, path traversal checks, ReDoS timeouts.
 """
 from fastapi import FastAPI, File, Form, UploadFile, Response
 from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import json
 import zipfile
-import io
-import re
-import difflib
 import os
 import time
 import uuid
 import traceback
-from typing import Optional
-
-try:
-    import chardet
-    CHARDET_AVAILABLE = True
-except ImportError:
-    CHARDET_AVAILABLE = False
+from typing import Iterator, List, Optional, Tuple
+
+from api._lib.bulk_replace_engine import (
+    CHARDET_AVAILABLE,
+    MemberResult,
+    MemberSkipped,
+    iter_member_results,
+    iter_zip_chunks,
+)
+from api._lib.regex_tools import (
+    RegexTimeoutError,
+    ReplaceRule,
+    RuleSet,
+    SpanDiff,
+    TooManyMatchesError,
+)
+from api._lib.utils import spool_to_tempfile
 
 # --- Configuration ---
 MAX_FILE_SIZE_BYTES = 50 * 1024 * 1024  # 50MB
 MAX_FILES_COUNT = 500
 MAX_COMPRESSION_RATIO = 10  # Zip bomb protection
-# Note: ReDoS timeouts removed for serverless compatibility
-
-ALLOWED_TEXT_EXTENSIONS = {
-    '.txt', '.md', '.markdown', '.html', '.htm', '.css', '.js', '.jsx',
-    '.ts', '.tsx', '.json', '.csv', '.xml', '.py', '.rb', '.php', '.java',
-    '.c', '.cpp', '.h', '.hpp', '.sql', '.yaml', '.yml', '.ini', '.env',
-    '.svelte', '.vue', '.toml', '.go', '.rs', '.rust', '.swift', '.kt',
-    '.sh', '.bash', '.zsh', '.fish', '.r', '.scala', '.clj', '.ex', '.exs'
-}
+# ReDoS: each file gets REGEX_TIMEOUT_SECONDS (regex module timeouts need no signals)
+MAX_MATCHES_PER_FILE = int(os.getenv("BULK_REPLACE_MAX_MATCHES", "1000000"))
+MAX_RULES = int(os.getenv("BULK_REPLACE_MAX_RULES", "500"))
+# Preview diffs are paged by hunk and capped in total size per request
+MAX_DIFF_BYTES = int(os.getenv("BULK_REPLACE_MAX_DIFF_BYTES", str(2 * 1024 * 1024)))
+DIFF_PAGE_SIZE = int(os.getenv("BULK_REPLACE_DIFF_PAGE_SIZE", "200"))
+MAX_DIFF_PAGE_SIZE = 1000
+DIFF_CONTEXT_LINES = 2
 
 app = FastAPI()
 
 # --- Helpers ---
 
-def is_likely_binary(data_bytes):
-    """Detect binary files by checking for null bytes."""
-    if not data_bytes:
-        return False
-    sample = data_bytes[:1024] if len(data_bytes) > 1024 else data_bytes
-    return b'\0' in sample
-
-def is_safe_path(path):
-    """Reject absolute paths and parent directory references."""
-    if os.path.isabs(path):
-        return False
-    parts = path.split(os.sep)
-    return '..' not in parts
-
-def detect_and_decode(raw_bytes):
-    """Auto-detect encoding and decode safely."""
-    if not raw_bytes:
-        return '', 'utf-8'
-
-    # Try UTF-8 first (most common)
+def parse_rules(raw: Optional[str], mode: str, find: str, replace: str, case_sensitive: bool) -> List[ReplaceRule]:
+    """Build the ordered rule list from the ``rules`` JSON field or the single find/replace fields.
+
+    Each rule is ``{"find", "replace", "mode", "caseSensitive"}``; missing
+    mode and case sensitivity fall back to the request-level fields.
+    Raises ``ValueError`` for malformed input.
+    """
+    if not raw:
+        return [ReplaceRule(find, replace, 'regex' if mode == 'regex' else 'literal', case_sensitive)]
+
     try:
-        return raw_bytes.decode('utf-8'), 'utf-8'
-    except UnicodeDecodeError:
-        pass
-
-    # Use chardet if available
-    if CHARDET_AVAILABLE:
-        detection = chardet.detect(raw_bytes)
-        encoding = detection.get('encoding', 'latin-1')
-        confidence = detection.get('confidence', 0)
-
-        if confidence < 0.7:
-            # Low confidence, try common encodings
-            for enc in ['latin-1', 'cp1252', 'iso-8859-1']:
-                try:
-                    return raw_bytes.decode(enc), enc
-                except:
-                    continue
+        items = json.loads(raw)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid rules JSON: {e.msg}")
+    if not isinstance(items, list) or not items:
+        raise ValueError("Rules must be a non-empty list")
+    if len(items) > MAX_RULES:
+        raise ValueError(f"Too many rules (max {MAX_RULES})")
+
+    rules = []
+    for number, item in enumerate(items, start=1):
+        if not isinstance(item, dict) or not isinstance(item.get('find'), str):
+            raise ValueError(f"Rule {number}: 'find' must be a string")
+        if not item['find']:
+            raise ValueError(f"Rule {number}: search pattern cannot be empty")
+        rule_replace = item.get('replace', '')
+        if not isinstance(rule_replace, str):
+            raise ValueError(f"Rule {number}: 'replace' must be a string")
+        rule_mode = item.get('mode', mode)
+        if rule_mode not in ('simple', 'literal', 'regex'):
+            raise ValueError(f"Rule {number}: unknown mode {rule_mode!r}")
+        rule_case = item.get('caseSensitive', item.get('case_sensitive', case_sensitive))
+        if isinstance(rule_case, str):
+            rule_case = rule_case == 'true'
+        rules.append(ReplaceRule(
+            item['find'],
+            rule_replace,
+            'regex' if rule_mode == 'regex' else 'literal',
+            bool(rule_case),
+        ))
+    return rules
+
+class DiffPager:
+    """Render preview hunks from a start cursor, within a byte budget.
+
+    Hunks are numbered across the whole archive in member order. A page
+    covers up to ``page_size`` hunks from ``start`` and stops early once
+    ``max_bytes`` of diff text is reached (but always renders at least one
+    hunk, so paging makes progress). ``next_hunk`` is where the following
+    page starts. Every modified file is still listed; files outside the
+    page get an empty diff.
+    """
 
-        try:
-            return raw_bytes.decode(encoding, errors='replace'), encoding
-        except:
-            pass
+    def __init__(self, start: int, page_size: int, max_bytes: int):
+        self.start = start
+        self.page_size = page_size
+        self.stop = start + page_size
+        self.max_bytes = max_bytes
+        self.total_hunks = 0
+        self.rendered_hunks = 0
+        self.used_bytes = 0
+        self.next_hunk: Optional[int] = None
+
+    def render(self, filename: str, diff: SpanDiff) -> str:
+        first = self.total_hunks
+        self.total_hunks += len(diff)
+        lo = max(self.start, first) - first
+        hi = min(self.stop, self.total_hunks) - first
+        if lo >= hi or self.next_hunk is not None:
+            return ''
+
+        parts = [f"--- {filename}", f"+++ {filename}"]
+        size = sum(len(part) + 1 for part in parts)
+        for index in range(lo, hi):
+            hunk = diff.render(index, index + 1)[0]
+            hunk_size = len(hunk.encode('utf-8')) + 1
+            if self.rendered_hunks and self.used_bytes + size + hunk_size > self.max_bytes:
+                self.next_hunk = first + index
+                break
+            parts.append(hunk)
+            size += hunk_size
+            self.rendered_hunks += 1
+        if len(parts) == 2:
+            return ''
+        self.used_bytes += size
+        return '\n'.join(parts)
+
+    def summary(self) -> dict:
+        truncated = self.next_hunk is not None
+        next_hunk = self.next_hunk
+        if next_hunk is None and self.stop < self.total_hunks:
+            next_hunk = self.stop
+        return {
+            "start": self.start,
+            "pageSize": self.page_size,
+            "totalHunks": self.total_hunks,
+            "renderedHunks": self.rendered_hunks,
+            "nextHunk": next_hunk,
+            "hasMore": next_hunk is not None,
+            "truncated": truncated
+        }
 
-    # Fallback to latin-1 (accepts all bytes)
-    return raw_bytes.decode('latin-1', errors='replace'), 'latin-1'
+def tally_results(results: Iterator[MemberResult], stats: dict) -> Iterator[MemberResult]:
+    """Update ``stats`` for each member and stop after MAX_FILES_COUNT text files."""
+    for result in results:
+        if result.skipped:
+            if result.skipped != "unsafe path":
+                yield result
+            stats["skippedFiles"].append(f"{result.info.filename}: {result.skipped}")
+            continue
+
+        if result.encoding != 'utf-8':
+            stats["encodingIssues"].append(f"{result.info.filename}: {result.encoding}")
+        if result.detection is not None:
+            detection_ms = result.detection.seconds * 1000
+            stats["detectionMs"] += detection_ms
+            stats["encodingDetection"].append({
+                "filename": result.info.filename,
+                "encoding": result.detection.encoding,
+                "method": result.detection.method,
+                "ms": round(detection_ms, 3)
+            })
+        stats["filesScanned"] += 1
+        if result.changed:
+            stats["filesModified"] += 1
+            stats["totalReplacements"] += result.match_count
+            for hits, rule_stats in zip(result.rule_hits, stats["ruleHits"]):
+                if hits:
+                    rule_stats["hits"] += hits
+                    rule_stats["files"] += 1
+        yield result
+
+        if stats["filesScanned"] >= MAX_FILES_COUNT:
+            break
 
 def send_error(code: int, message: str, request_id: str):
     """Send TinyUtils-standard error response."""
@@ -151,10 +246,13 @@ async def root_full_path():
 async def bulk_replace(
     file: UploadFile = File(...),
     mode: str = Form("simple"),
-    find: str = Form(...),
+    find: str = Form(""),
     replace: str = Form(""),
     action: str = Form("preview"),
-    case_sensitive: str = Form("false")
+    case_sensitive: str = Form("false"),
+    rules: Optional[str] = Form(None),
+    diff_start: int = Form(0),
+    diff_page_size: int = Form(DIFF_PAGE_SIZE)
 ):
     """
     Bulk find and replace in ZIP archive.
@@ -166,166 +264,173 @@ async def bulk_replace(
         replace: Replacement text
         action: 'preview' or 'download'
         case_sensitive: 'true' or 'false'
+        rules: Optional JSON list of {find, replace, mode, caseSensitive}
+            applied in order in one pass; replaces find/replace when given
+        diff_start: index of the first preview hunk to render (the previous
+            response's ``diffPage.nextHunk``)
+        diff_page_size: hunks per page (max MAX_DIFF_PAGE_SIZE)
     """
     request_id = str(uuid.uuid4())
     start_time = time.time()
+    source = None
 
     try:
-        # Read file
-        file_bytes = await file.read()
+        # Spool the upload to disk instead of reading it into memory
+        source, size = await run_in_threadpool(spool_to_tempfile, file.file, MAX_FILE_SIZE_BYTES)
 
         # Size validation
-        if len(file_bytes) > MAX_FILE_SIZE_BYTES:
+        if size > MAX_FILE_SIZE_BYTES:
             max_mb = MAX_FILE_SIZE_BYTES / 1024 / 1024
             return send_error(413, f"File too large (max {max_mb:.0f}MB)", request_id)
 
         # Open ZIP and check for zip bomb
         try:
-            input_zip = zipfile.ZipFile(io.BytesIO(file_bytes), 'r')
+            input_zip = zipfile.ZipFile(source, 'r')
         except zipfile.BadZipFile:
             return send_error(422, "Invalid ZIP file", request_id)
 
         total_uncompressed = sum(f.file_size for f in input_zip.infolist() if not f.is_dir())
-        if total_uncompressed > len(file_bytes) * MAX_COMPRESSION_RATIO:
+        if total_uncompressed > size * MAX_COMPRESSION_RATIO:
             return send_error(422, "Suspicious ZIP file (compression ratio too high)", request_id)
 
-        # Prepare regex logic
-        is_case_sensitive = case_sensitive == 'true'
-        regex_flags = re.MULTILINE
-        if not is_case_sensitive:
-            regex_flags |= re.IGNORECASE
-
-        if mode == 'regex':
-            find_pattern = find
-        else:
-            # Simple mode: escape special chars for literal matching
-            find_pattern = re.escape(find)
-
-        if not find_pattern:
+        if not find and not rules:
             return send_error(400, "Search pattern cannot be empty", request_id)
-
-        # Validate regex syntax
         try:
-            re.compile(find_pattern, regex_flags)
-        except re.error as e:
+            rule_list = parse_rules(rules, mode, find, replace, case_sensitive == 'true')
+        except ValueError as e:
+            return send_error(400, str(e), request_id)
+        if diff_start < 0 or diff_page_size < 1:
+            return send_error(400, "diff_start must be >= 0 and diff_page_size positive", request_id)
+
+        # All rules compile into one pattern; simple rules replace text
+        # verbatim. Replacement templates are validated up front: the
+        # download streams, so later errors can no longer become a 422.
+        try:
+            rule_set = RuleSet(rule_list, multiline=True, dotall=False)
+        except ValueError as e:
             return send_error(422, f"Invalid regex pattern: {str(e)}", request_id)
 
-        # Process ZIP
-        output_io = io.BytesIO()
-        output_zip = zipfile.ZipFile(output_io, 'w', zipfile.ZIP_DEFLATED)
+        # Previews keep the match spans so diffs need not compare whole files
+        record_edits = action == 'preview'
+
+        def transform(original_text: str) -> Tuple[str, List[int], Optional[list]]:
+            # Single scan yields the output and the hits for every rule
+            edits = [] if record_edits else None
+            try:
+                new_text, hits = rule_set.apply(
+                    original_text, max_matches=MAX_MATCHES_PER_FILE, concurrent=True, edits=edits
+                )
+                return new_text, hits, edits
+            except RegexTimeoutError:
+                raise MemberSkipped("regex timeout")
+            except TooManyMatchesError:
+                raise MemberSkipped("too many matches")
 
-        diff_results = []
         stats = {
             "filesScanned": 0,
             "filesModified": 0,
             "filesSkipped": 0,
             "totalReplacements": 0,
             "encodingIssues": [],
-            "skippedFiles": []
+            "encodingDetection": [],
+            "detectionMs": 0.0,
+            "skippedFiles": [],
+            "ruleHits": [
+                {"index": index, "find": rule.find, "mode": rule.mode, "hits": 0, "files": 0}
+                for index, rule in enumerate(rule_list)
+            ]
         }
 
-        for file_info in input_zip.infolist():
-            if file_info.is_dir():
-                continue
-
-            # Path traversal check
-            if not is_safe_path(file_info.filename):
-                stats["skippedFiles"].append(f"{file_info.filename}: unsafe path")
-                continue
-
-            raw_data = input_zip.read(file_info)
-            _, ext = os.path.splitext(file_info.filename)
-
-            # Binary safety check
-            if ext.lower() not in ALLOWED_TEXT_EXTENSIONS or is_likely_binary(raw_data):
-                output_zip.writestr(file_info, raw_data)
-                stats["skippedFiles"].append(f"{file_info.filename}: binary file")
-                continue
-
-            # Decode with encoding detection
-            original_text, detected_encoding = detect_and_decode(raw_data)
-            if detected_encoding != 'utf-8':
-                stats["encodingIssues"].append(f"{file_info.filename}: {detected_encoding}")
-
-            # Apply replacement (no timeout in serverless environment)
-            try:
-                # Count matches before replacement
-                matches = list(re.finditer(find_pattern, original_text, flags=regex_flags))
-                match_count = len(matches)
-
-                # Apply replacement
-                new_text = re.sub(find_pattern, replace, original_text, flags=regex_flags)
-            except re.error as e:
-                return send_error(422, f"Regex error: {str(e)}", request_id)
-
-            # Calculate changes
-            is_changed = new_text != original_text
-            stats["filesScanned"] += 1
-
-            if is_changed:
-                stats["filesModified"] += 1
-                stats["totalReplacements"] += match_count
-
-            if action == 'preview':
-                if is_changed:
-                    diff = difflib.unified_diff(
-                        original_text.splitlines(),
-                        new_text.splitlines(),
-                        fromfile=file_info.filename,
-                        tofile=file_info.filename,
-                        n=2,
-                        lineterm=''
-                    )
-                    diff_results.append({
-                        'filename': file_info.filename,
-                        'diff': '\n'.join(list(diff)),
-                        'matchCount': match_count
-                    })
-
-            elif action == 'download':
-                output_zip.writestr(file_info.filename, new_text.encode('utf-8'))
-
-            if stats["filesScanned"] >= MAX_FILES_COUNT:
-                break
+        if action == 'download':
+            response = _stream_download(source, input_zip, transform, stats, request_id)
+            source = None  # ownership passes to the streaming response
+            return response
 
-        output_zip.close()
-        input_zip.close()
+        diff_results = []
+        pager = DiffPager(diff_start, min(diff_page_size, MAX_DIFF_PAGE_SIZE), MAX_DIFF_BYTES)
+        try:
+            results = iter_member_results(
+                input_zip, transform, keep_text=record_edits, encode_output=False
+            )
+            for result in tally_results(results, stats):
+                if result.skipped or not result.changed or action != 'preview':
+                    continue
+                diff = SpanDiff(result.original_text, result.edits, context=DIFF_CONTEXT_LINES)
+                diff_results.append({
+                    'filename': result.info.filename,
+                    'firstHunk': pager.total_hunks,
+                    'hunkCount': len(diff),
+                    'diff': pager.render(result.info.filename, diff),
+                    'matchCount': result.match_count,
+                    'ruleHits': result.rule_hits
+                })
+        finally:
+            input_zip.close()
 
         # Response
+        stats["detectionMs"] = round(stats["detectionMs"], 3)
         processing_time_ms = int((time.time() - start_time) * 1000)
-
-        if action == 'download':
-            output_io.seek(0)
-            return StreamingResponse(
-                output_io,
-                media_type='application/zip',
-                headers={
-                    'Content-Disposition': 'attachment; filename="tinyutils_processed.zip"',
-                    'X-Request-ID': request_id
-                }
-            )
-        else:
-            return send_success({
-                "diffs": diff_results,
-                "stats": stats
-            }, request_id, processing_time_ms)
+        data = {
+            "diffs": diff_results,
+            "stats": stats
+        }
+        if action == 'preview':
+            data["diffPage"] = pager.summary()
+        return send_success(data, request_id, processing_time_ms)
 
     except Exception as e:
         traceback.print_exc()
         return send_error(500, f"Server error: {str(e)}", request_id)
+    finally:
+        if source is not None:
+            source.close()
+
+def _stream_download(source, input_zip, transform, stats, request_id):
+    """Stream the processed archive; members are written as they complete."""
+    entries = (
+        result.entry()
+        for result in tally_results(iter_member_results(input_zip, transform), stats)
+    )
+    chunks = iter_zip_chunks(entry for entry in entries if entry is not None)
+
+    def _body():
+        try:
+            yield from chunks
+        except Exception:
+            # Headers are already sent; log and cut the response short
+            traceback.print_exc()
+            raise
+        finally:
+            chunks.close()
+            input_zip.close()
+            source.close()
+
+    return StreamingResponse(
+        _body(),
+        media_type='application/zip',
+        headers={
+            'Content-Disposition': 'attachment; filename="tinyutils_processed.zip"',
+            'X-Request-ID': request_id
+        }
+    )
 
 # Vercel file-based routing: also register POST at full path
 @app.post("/api/bulk-replace", include_in_schema=False)
 async def bulk_replace_full_path(
     file: UploadFile = File(...),
     mode: str = Form("simple"),
-    find: str = Form(...),
+    find: str = Form(""),
     replace: str = Form(""),
     action: str = Form("preview"),
-    case_sensitive: str = Form("false")
+    case_sensitive: str = Form("false"),
+    rules: Optional[str] = Form(None),
+    diff_start: int = Form(0),
+    diff_page_size: int = Form(DIFF_PAGE_SIZE)
 ):
     """Bulk find/replace endpoint (full path variant for Vercel routing)."""
-    return await bulk_replace(file, mode, find, replace, action, case_sensitive)
+    return await bulk_replace(
+        file, mode, find, replace, action, case_sensitive, rules, diff_start, diff_page_size
+    )
 
 # Vercel expects 'app' export for FastAPI functions
 __all__ = ["app"]
@@ -1,10 +1,15 @@
 """CSV Joiner API
 
-Join two CSV/TSV files on a common column using a hash join.
+Join two CSV/TSV files on one or more common columns using a streaming
+hash join (see api/_lib/csv_join_engine.py).
 
 Actions
 - scan: inspect the first two uploaded files and return headers + detected delimiters
-- join: perform an inner or left join and return a hardened CSV download
+- join: perform an inner, left, right or full join and return a hardened CSV
+  download. ``col_a_idx``/``col_b_idx`` accept a single index or a
+  comma-separated list for multi-column keys. ``join_algorithm`` is
+  ``auto`` (default), ``hash`` or ``merge``; the algorithm used, row counts
+  and elapsed time come back in ``X-Join-*`` response headers.
 
 This endpoint is designed similarly to api/bulk-replace.py: simple
 multipart/form-data interface, size caps, and CSV hardening so opening
@@ -15,36 +20,20 @@ from http.server import BaseHTTPRequestHandler
 import csv
 import io
 import json
-import sys
 from typing import List
 
-from api._lib.multipart import MultipartParseError, parse_multipart_form
-
-# Allow very large CSV fields (long text blobs)
-csv.field_size_limit(sys.maxsize)
+from api._lib.csv_join_engine import (  # _harden_row kept for existing callers/tests
+    JoinInput,
+    harden_row as _harden_row,
+    normalize_join_algorithm,
+    normalize_join_type,
+    parse_key_columns,
+    spool_join,
+)
+from api._lib.multipart import MultipartParseError, UploadedFile, parse_multipart_uploads
 
 MAX_FILE_SIZE_BYTES = 50 * 1024 * 1024  # 50MB per file
-CSV_DANGEROUS_PREFIXES = ("=", "+", "-", "@")
-
-
-def _harden_row(row: List[str]) -> List[str]:
-    """Prefix spreadsheet formula-looking cells with a single quote.
-
-    This mirrors the existing CSV hardening elsewhere in the repo so
-    opening the exported CSV in Excel/Sheets does not execute formulas.
-    """
-
-    safe: List[str] = []
-    for cell in row:
-        if cell is None:
-            cell_str = ""
-        else:
-            cell_str = str(cell)
-
-        if cell_str and cell_str[0] in CSV_DANGEROUS_PREFIXES:
-            cell_str = "'" + cell_str
-        safe.append(cell_str)
-    return safe
+_OUTPUT_CHUNK_BYTES = 64 * 1024
 
 
 class handler(BaseHTTPRequestHandler):  # type: ignore[name-defined]
@@ -52,55 +41,50 @@ class handler(BaseHTTPRequestHandler):  # type: ignore[name-defined]
         try:
             try:
                 # Allow small overhead above file caps for multipart boundaries + form fields.
-                form = parse_multipart_form(
+                # Files are spooled (memory, then disk) as the body is read.
+                form = parse_multipart_uploads(
                     self.headers,
                     self.rfile,
                     max_body_bytes=(2 * MAX_FILE_SIZE_BYTES) + (10 * 1024 * 1024),
+                    max_file_bytes=MAX_FILE_SIZE_BYTES,
                 )
             except MultipartParseError as exc:
                 self._send_error(exc.status, str(exc))
                 return
 
-            action_value = (form.get("action") or ["scan"])[0]
-            action = action_value if isinstance(action_value, str) else "scan"
-            files = form.get("files") or []
-
-            if len(files) < 2:
-                self._send_error(400, "Please upload two files.")
-                return
+            with form:
+                action_value = (form.get("action") or ["scan"])[0]
+                action = action_value if isinstance(action_value, str) else "scan"
+                files = form.files("files")
 
-            # Enforce per-file size limit
-            for idx, f in enumerate(files[:2]):
-                if len(f) > MAX_FILE_SIZE_BYTES:
-                    self._send_error(
-                        413,
-                        f"File {idx + 1} is too large (max {MAX_FILE_SIZE_BYTES // (1024 * 1024)}MB)",
-                    )
+                if len(files) < 2:
+                    self._send_error(400, "Please upload two files.")
                     return
 
-            if action == "scan":
-                self._handle_scan(files)
-                return
+                if action == "scan":
+                    self._handle_scan(files)
+                    return
 
-            if action == "join":
-                self._handle_join(files, form)
-                return
+                if action == "join":
+                    self._handle_join(files, form)
+                    return
 
-            self._send_error(400, "Unknown action; expected 'scan' or 'join'")
+                self._send_error(400, "Unknown action; expected 'scan' or 'join'")
 
         except Exception as exc:  # pragma: no cover - defensive
             self._send_error(500, f"Server Error: {exc}")
 
     # --- Actions ---------------------------------------------------------
 
-    def _handle_scan(self, files: List[bytes]) -> None:
+    def _handle_scan(self, files: List[UploadedFile]) -> None:
         """Inspect the first two files and return headers + delimiters."""
 
         headers_data = []
-        for i, file_bytes in enumerate(files[:2]):
+        for i, upload in enumerate(files[:2]):
             try:
                 # Decode a small sample for delimiter + header detection
-                sample = file_bytes[:4096].decode("utf-8", errors="ignore")
+                sample = upload.read(4096).decode("utf-8", errors="ignore")
+                upload.seek(0)
                 sniffer = csv.Sniffer()
                 try:
                     dialect = sniffer.sniff(sample)
@@ -122,72 +106,46 @@ class handler(BaseHTTPRequestHandler):  # type: ignore[name-defined]
 
         self._send_json({"status": "success", "files": headers_data})
 
-    def _handle_join(self, files: List[bytes], form: dict) -> None:
-        """Perform hash join between file A and file B."""
+    def _handle_join(self, files: List[UploadedFile], form: dict) -> None:
+        """Join file A and file B and send the result with X-Join-* stats headers."""
 
         try:
-            col_a_idx = int(form.get("col_a_idx", ["-1"])[0])
-            col_b_idx = int(form.get("col_b_idx", ["-1"])[0])
-        except ValueError:
-            self._send_error(400, "Join columns must be numeric indices")
+            keys_a = parse_key_columns(form.get("col_a_idx", ["-1"])[0])
+            keys_b = parse_key_columns(form.get("col_b_idx", ["-1"])[0])
+        except ValueError as exc:
+            message = str(exc)
+            if not message.startswith("Join columns"):
+                message = "Join columns must be numeric indices"
+            self._send_error(400, message)
             return
 
-        if col_a_idx < 0 or col_b_idx < 0:
-            self._send_error(400, "Join columns not specified")
+        if len(keys_a) != len(keys_b):
+            self._send_error(400, "Both files need the same number of join columns")
             return
 
         delim_a = (form.get("delim_a", [","])[0] or ",")
         delim_b = (form.get("delim_b", [","])[0] or ",")
-        join_type = (form.get("join_type", ["inner"])[0] or "inner").lower()
-        if join_type not in {"inner", "left"}:
-            join_type = "inner"
-
-        # --- Build hash map from File B ---
-        file_b_str = files[1].decode("utf-8", errors="replace")
-        reader_b = csv.reader(io.StringIO(file_b_str), delimiter=delim_b)
-        header_b = next(reader_b, [])
-
-        b_map: dict[str, List[List[str]]] = {}
-        for row in reader_b:
-            if len(row) <= col_b_idx:
-                continue
-            key = row[col_b_idx].strip()
-            if key not in b_map:
-                b_map[key] = []
-            b_map[key].append(row)
-
-        # --- Stream File A and join ---
-        file_a_str = files[0].decode("utf-8", errors="replace")
-        reader_a = csv.reader(io.StringIO(file_a_str), delimiter=delim_a)
-        header_a = next(reader_a, [])
-
-        output_io = io.StringIO()
-        writer = csv.writer(output_io)
-
-        # Write hardened header
-        writer.writerow(_harden_row(list(header_a) + list(header_b)))
-
-        for row_a in reader_a:
-            if len(row_a) <= col_a_idx:
-                continue
-            key = row_a[col_a_idx].strip()
-            matches = b_map.get(key, [])
-
-            if matches:
-                for row_b in matches:
-                    writer.writerow(_harden_row(list(row_a) + list(row_b)))
-            elif join_type == "left":
-                writer.writerow(_harden_row(list(row_a) + [""] * len(header_b)))
-
-        output_io.seek(0)
-        payload = output_io.getvalue().encode("utf-8")
-
-        self.send_response(200)
-        self.send_header("Content-Type", "text/csv; charset=utf-8")
-        self.send_header("Content-Disposition", "attachment; filename=joined_result.csv")
-        self.send_header("Cache-Control", "no-store")
-        self.end_headers()
-        self.wfile.write(payload)
+        join_type = normalize_join_type(form.get("join_type", ["inner"])[0])
+        algorithm = normalize_join_algorithm(form.get("join_algorithm", ["auto"])[0])
+
+        output, stats, size = spool_join(
+            JoinInput(files[0].file, keys_a, delim_a, files[0].size),
+            JoinInput(files[1].file, keys_b, delim_b, files[1].size),
+            join_type=join_type,
+            algorithm=algorithm,
+        )
+
+        with output:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/csv; charset=utf-8")
+            self.send_header("Content-Disposition", "attachment; filename=joined_result.csv")
+            self.send_header("Content-Length", str(size))
+            self.send_header("Cache-Control", "no-store")
+            for name, value in stats.headers().items():
+                self.send_header(name, value)
+            self.end_headers()
+            for chunk in iter(lambda: output.read(_OUTPUT_CHUNK_BYTES), b""):
+                self.wfile.write(chunk)
 
     # --- Helpers ---------------------------------------------------------
 
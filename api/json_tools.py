@@ -3,56 +3,47 @@
 Modes
 - json_to_csv: upload JSON (array / object / JSON Lines) → flattened CSV
 - csv_to_json: upload CSV/TSV → JSON array of objects
+- csv_to_ndjson: upload CSV/TSV → one JSON object per line
+
+CSV → JSON options (form fields, "1"/"true" to enable)
+- pretty: indent the JSON array (compact by default)
+- infer_types: emit integers, floats and true/false instead of strings
 
 This endpoint deliberately focuses on data structure rather than
 general document conversion. It flattens nested objects and applies
 CSV hardening to keep spreadsheet formulas inert.
+
+Both directions stream. json_to_csv makes a first pass over the upload
+to collect the header union (capped by JSON_TOOLS_MAX_COLUMNS) and a
+second pass writes rows straight to the response; CSV → JSON emits
+objects as rows are read. See api/_lib/json_records.py.
 """
 
 from http.server import BaseHTTPRequestHandler
-import csv
-import io
 import json
-from typing import Any, Dict, List
-
-from api._lib.multipart import MultipartParseError, parse_multipart_form
-
-MAX_FILE_SIZE_BYTES = 50 * 1024 * 1024  # 50MB
-CSV_DANGEROUS_PREFIXES = ("=", "+", "-", "@")
+import os
+from typing import Any, Dict, Iterator, List
 
+from api._lib.csv_columns import harden_column
+from api._lib.json_records import (
+    TooManyColumnsError,
+    flatten_json,
+    iter_csv_chunks,
+    iter_json_chunks,
+    scan_records,
+)
+from api._lib.multipart import MultipartParseError, UploadedFile, parse_multipart_uploads
 
-def flatten_json(obj: Any) -> Dict[str, Any]:
-    """Flatten a nested JSON object into a single-depth dict.
+MAX_FILE_SIZE_BYTES = int(os.getenv("JSON_TOOLS_MAX_FILE_BYTES", str(50 * 1024 * 1024)))  # 50MB
 
-    Example: {"a": {"b": 1}} -> {"a.b": 1}
-    Arrays are joined with a pipe (`|`) to keep rows 1:1.
-    """
 
-    out: Dict[str, Any] = {}
-
-    def _flatten(value: Any, prefix: str = "") -> None:
-        if isinstance(value, dict):
-            for key, child in value.items():
-                _flatten(child, f"{prefix}{key}.")
-        elif isinstance(value, list):
-            # Represent arrays as pipe-joined values; this avoids
-            # exploding rows or losing data while remaining CSV-friendly.
-            out[prefix[:-1]] = "|".join(str(item) for item in value)
-        else:
-            out[prefix[:-1]] = value
+def _harden_cell(value: Any) -> str:
+    return harden_column([value])[0]
 
-    _flatten(obj)
-    return out
 
-
-def _harden_cell(value: Any) -> str:
-    if value is None:
-        s = ""
-    else:
-        s = str(value)
-    if s and s[0] in CSV_DANGEROUS_PREFIXES:
-        s = "'" + s
-    return s
+def _form_flag(form: Dict[str, List[Any]], name: str) -> bool:
+    value = (form.get(name) or [""])[0]
+    return isinstance(value, str) and value.strip().lower() in {"1", "true", "yes", "on"}
 
 
 class handler(BaseHTTPRequestHandler):  # type: ignore[name-defined]
@@ -60,114 +51,92 @@ class handler(BaseHTTPRequestHandler):  # type: ignore[name-defined]
         try:
             try:
                 # Allow small overhead above file cap for multipart boundaries + form fields.
-                form = parse_multipart_form(
+                form = parse_multipart_uploads(
                     self.headers,
                     self.rfile,
                     max_body_bytes=MAX_FILE_SIZE_BYTES + (5 * 1024 * 1024),
+                    max_file_bytes=MAX_FILE_SIZE_BYTES,
                 )
             except MultipartParseError as exc:
                 self._send_error(exc.status, str(exc))
                 return
 
-            mode_value = (form.get("mode") or ["json_to_csv"])[0]
-            mode = mode_value if isinstance(mode_value, str) else "json_to_csv"
-            files = form.get("file") or []
-            if not files:
-                self._send_error(400, "No file uploaded")
-                return
-
-            file_bytes = files[0]
-            if len(file_bytes) > MAX_FILE_SIZE_BYTES:
-                self._send_error(400, "File too large (Max 50MB)")
-                return
-
-            if mode == "json_to_csv":
-                self._handle_json_to_csv(file_bytes)
-            elif mode == "csv_to_json":
-                self._handle_csv_to_json(file_bytes)
-            else:
-                self._send_error(400, "Unknown mode; expected 'json_to_csv' or 'csv_to_json'")
+            with form:
+                mode_value = (form.get("mode") or ["json_to_csv"])[0]
+                mode = mode_value if isinstance(mode_value, str) else "json_to_csv"
+                files = form.files("file")
+                if not files:
+                    self._send_error(400, "No file uploaded")
+                    return
+
+                upload = files[0]
+                if mode == "json_to_csv":
+                    self._handle_json_to_csv(upload)
+                elif mode in ("csv_to_json", "csv_to_ndjson"):
+                    self._handle_csv_to_json(
+                        upload,
+                        ndjson=mode == "csv_to_ndjson",
+                        pretty=_form_flag(form, "pretty"),
+                        infer_types=_form_flag(form, "infer_types"),
+                    )
+                else:
+                    self._send_error(
+                        400, "Unknown mode; expected 'json_to_csv', 'csv_to_json' or 'csv_to_ndjson'"
+                    )
 
         except Exception as exc:  # pragma: no cover
             self._send_error(500, f"Server Error: {exc}")
 
     # --- Modes -----------------------------------------------------------
 
-    def _handle_json_to_csv(self, file_bytes: bytes) -> None:
+    def _handle_json_to_csv(self, upload: UploadedFile) -> None:
+        source = upload.file
         try:
-            text_data = file_bytes.decode("utf-8")
-
-            # Try JSON array / object first
-            try:
-                data = json.loads(text_data)
-                if not isinstance(data, list):
-                    data = [data]
-            except json.JSONDecodeError:
-                # Fallback: JSON Lines / NDJSON
-                data = []
-                for line in text_data.splitlines():
-                    if line.strip():
-                        data.append(json.loads(line))
-
-            if not data:
-                self._send_error(400, "Valid JSON not found")
-                return
-
-            flattened = [flatten_json(item) for item in data]
-
-            # Collect union of keys across all records
-            headers_set = set()
-            for item in flattened:
-                headers_set.update(item.keys())
-            headers: List[str] = sorted(headers_set)
-
-            out = io.StringIO()
-            writer = csv.writer(out)
-
-            # Hardened header row
-            writer.writerow([_harden_cell(h) for h in headers])
-
-            for item in flattened:
-                row = [_harden_cell(item.get(h, "")) for h in headers]
-                writer.writerow(row)
-
-            out.seek(0)
-            payload = out.getvalue().encode("utf-8")
-            self._send_file(payload, "converted.csv", "text/csv; charset=utf-8")
-
+            scan = scan_records(source)
+        except TooManyColumnsError as exc:
+            self._send_error(400, str(exc))
+            return
         except Exception as exc:
             self._send_error(400, f"JSON Parse Error: {exc}")
+            return
 
-    def _handle_csv_to_json(self, file_bytes: bytes) -> None:
-        try:
-            text_data = file_bytes.decode("utf-8")
-            f_io = io.StringIO(text_data)
-
-            # Auto-detect delimiter from sample
-            try:
-                dialect = csv.Sniffer().sniff(text_data[:4096])
-                delimiter = dialect.delimiter
-            except Exception:
-                delimiter = ","
-
-            reader = csv.DictReader(f_io, delimiter=delimiter)
-            data = list(reader)
+        if not scan.records:
+            self._send_error(400, "Valid JSON not found")
+            return
 
-            output_json = json.dumps(data, indent=2)
-            self._send_file(output_json.encode("utf-8"), "converted.json", "application/json; charset=utf-8")
+        # The first pass validated the whole document, so rows can be
+        # streamed without a late parse error after the 200 is sent.
+        self._send_stream(iter_csv_chunks(source, scan.headers), "converted.csv", "text/csv; charset=utf-8")
 
+    def _handle_csv_to_json(
+        self, upload: UploadedFile, *, ndjson: bool, pretty: bool, infer_types: bool
+    ) -> None:
+        chunks = iter_json_chunks(upload.file, ndjson=ndjson, pretty=pretty, infer_types=infer_types)
+        try:
+            # Pull the first chunk so early CSV errors still become a 400
+            first = next(chunks)
         except Exception as exc:
             self._send_error(400, f"CSV Parse Error: {exc}")
+            return
+
+        if ndjson:
+            self._send_stream(chunks, "converted.ndjson", "application/x-ndjson; charset=utf-8", first)
+        else:
+            self._send_stream(chunks, "converted.json", "application/json; charset=utf-8", first)
 
     # --- Helpers ---------------------------------------------------------
 
-    def _send_file(self, content: bytes, filename: str, content_type: str) -> None:
+    def _send_stream(
+        self, chunks: Iterator[bytes], filename: str, content_type: str, first: bytes = b""
+    ) -> None:
         self.send_response(200)
         self.send_header("Content-Type", content_type)
         self.send_header("Content-Disposition", f"attachment; filename={filename}")
         self.send_header("Cache-Control", "no-store")
         self.end_headers()
-        self.wfile.write(content)
+        self.wfile.write(first)
+        for chunk in chunks:
+            self.wfile.write(chunk)
 
     def _send_error(self, code: int, message: str) -> None:
         self.send_response(code)
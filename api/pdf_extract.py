@@ -15,11 +15,11 @@ import io
 import json
 import os
 import zipfile
-from typing import List
+from typing import List, Optional
 
 from pypdf import PdfReader
 
-from api._lib.multipart import MultipartParseError, parse_multipart_form
+from api._lib.multipart import MultipartParseError, UploadForm, UploadedFile, parse_multipart_uploads
 
 MAX_UPLOAD_SIZE_BYTES = 50 * 1024 * 1024  # 50MB upload cap
 MAX_FILES_LIMIT = 50  # Avoid runaway processing
@@ -27,30 +27,28 @@ MAX_FILES_LIMIT = 50  # Avoid runaway processing
 
 class handler(BaseHTTPRequestHandler):  # type: ignore[name-defined]
     def do_POST(self) -> None:  # noqa: N802
+        form: Optional[UploadForm] = None
         try:
             try:
                 # Allow small overhead above upload cap for multipart boundaries + form fields.
-                form = parse_multipart_form(
+                # The upload is spooled (memory, then disk) as the body is read.
+                form = parse_multipart_uploads(
                     self.headers,
                     self.rfile,
                     max_body_bytes=MAX_UPLOAD_SIZE_BYTES + (5 * 1024 * 1024),
+                    max_file_bytes=MAX_UPLOAD_SIZE_BYTES,
                 )
             except MultipartParseError as exc:
                 self._send_error(exc.status, str(exc))
                 return
 
-            uploaded_files: List[bytes] = form.get("file") or []
+            uploaded_files: List[UploadedFile] = form.files("file")
             if not uploaded_files:
                 self._send_error(400, "No file uploaded")
                 return
 
-            file_bytes = uploaded_files[0]
-            if len(file_bytes) > MAX_UPLOAD_SIZE_BYTES:
-                self._send_error(400, "Upload too large (Max 50MB)")
-                return
-
             # Decide whether this is a ZIP of PDFs or a single PDF.
-            file_like = io.BytesIO(file_bytes)
+            file_like = uploaded_files[0].file
 
             # Prepare output ZIP once we know the upload is syntactically valid.
             output_io = io.BytesIO()
@@ -112,7 +110,8 @@ class handler(BaseHTTPRequestHandler):  # type: ignore[name-defined]
                 # returning a 4xx JSON error for clearly bad inputs instead of a
                 # 200 ZIP.
                 # Note: Only check first 512 bytes to avoid expensive lstrip on large files
-                header = file_bytes[:512].lstrip(b" \t\n\r")[:5]
+                file_like.seek(0)
+                header = file_like.read(512).lstrip(b" \t\n\r")[:5]
                 if not header.startswith(b"%PDF"):
                     self._send_error(422, "Invalid ZIP or PDF file")
                     return
@@ -156,6 +155,9 @@ class handler(BaseHTTPRequestHandler):  # type: ignore[name-defined]
 
         except Exception as exc:  # pragma: no cover
             self._send_error(500, f"Server Error: {exc}")
+        finally:
+            if form is not None:
+                form.close()
 
     def _send_error(self, code: int, message: str) -> None:
         self.send_response(code)
@@ -1,31 +1,77 @@
 from __future__ import annotations
-import base64, os, requests, uuid
+import base64, gzip, json, os, requests, threading, uuid
 from typing import Tuple, Dict
 
 URL = os.getenv("PDF_RENDERER_URL","").strip().rstrip("/")
 SECRET = os.getenv("CONVERTER_SHARED_SECRET","").strip()
 TIMEOUT = float(os.getenv("REQUEST_TIMEOUT","25"))
+# Request bodies at least this large are gzip-compressed (0, the default,
+# disables). Opt in once every renderer accepts gzip request bodies.
+GZIP_MIN_BYTES = int(os.getenv("PDF_RENDERER_GZIP_MIN_BYTES","0"))
+# How a renderer without gzip request support rejects a compressed body
+_GZIP_REJECTED = {400, 415, 422}
+
+_SESSION = None
+_SESSION_PID = 0
+_SESSION_LOCK = threading.Lock()
 
 class RemotePdfError(Exception):
     def __init__(self, code: str, message: str):
         self.code, self.message = code, message
         super().__init__(f"{code}: {message}")
 
+def _get_session() -> requests.Session:
+    """Keep-alive session shared per process (never across forked workers)."""
+    global _SESSION, _SESSION_PID
+    with _SESSION_LOCK:
+        if _SESSION is None or _SESSION_PID != os.getpid():
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=8)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSION, _SESSION_PID = session, os.getpid()
+        return _SESSION
+
 def render_html_to_pdf_via_external(html: str, name: str, request_id: str) -> Tuple[bytes, Dict]:
     if not URL:
         raise RemotePdfError("external_unavailable", "PDF_RENDERER_URL not set")
     headers = {
         "content-type": "application/json",
+        # Renderers that support it answer with a raw PDF body; older ones
+        # ignore this and keep returning base64-in-JSON.
+        "accept": "application/pdf, application/json",
         "x-shared-secret": SECRET or "",
         "x-request-id": request_id or uuid.uuid4().hex,
     }
-    resp = requests.post(f"{URL}/convert", json={"html": html, "name": name, "requestId": request_id}, headers=headers, timeout=TIMEOUT)
+    body = json.dumps({"html": html, "name": name, "requestId": request_id}).encode("utf-8")
+    if GZIP_MIN_BYTES and len(body) >= GZIP_MIN_BYTES:
+        resp = _get_session().post(
+            f"{URL}/convert",
+            data=gzip.compress(body, compresslevel=5),
+            headers={**headers, "content-encoding": "gzip"},
+            timeout=TIMEOUT,
+        )
+        if resp.status_code in _GZIP_REJECTED:
+            # Older renderer: resend uncompressed
+            resp = _get_session().post(f"{URL}/convert", data=body, headers=headers, timeout=TIMEOUT)
+    else:
+        resp = _get_session().post(f"{URL}/convert", data=body, headers=headers, timeout=TIMEOUT)
     if resp.status_code >= 400:
         try:
             data = resp.json()
             raise RemotePdfError(data.get("detail","remote_error"), f"HTTP {resp.status_code}")
         except Exception:
             raise RemotePdfError("remote_http_error", f"HTTP {resp.status_code}")
+    if resp.headers.get("content-type","").split(";")[0].strip() == "application/pdf":
+        if not resp.content:
+            raise RemotePdfError("missing_payload", "empty pdf body")
+        meta = {
+            "requestId": resp.headers.get("x-request-id", request_id),
+            "pdfEngine": resp.headers.get("x-pdf-engine"),
+            "pdfEngineVersion": resp.headers.get("x-pdf-engine-version") or None,
+            "pdfExternalAvailable": True,
+        }
+        return resp.content, meta
     data = resp.json()
     if not data.get("ok"):
         raise RemotePdfError(data.get("code","remote_error"), data.get("message","unknown"))
@@ -3,13 +3,16 @@ from __future__ import annotations
 
 import logging
 import os
+import re
 import subprocess
 import sys
+import threading
 import time
 import traceback
 import zipfile
+from concurrent.futures import Future
 from pathlib import Path
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 import uuid
 
 def _ensure_pydantic_core() -> None:
@@ -93,7 +96,7 @@ _ensure_pydantic_core()
 from pydantic import BaseModel, Field, validator, model_validator
 
 from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse
 
 # API Key auth configuration
 CONVERT_API_KEY = os.getenv("CONVERT_API_KEY", "").strip()
@@ -167,7 +170,8 @@ if TYPE_CHECKING:  # pragma: no cover - type checking only
     from tinyutils.convert.types import BatchResult as _BatchResult
 
 from api._lib import blob
-from api._lib.utils import DownloadMetadata, ensure_within_limits, job_workspace
+from api._lib.utils import MAX_FILE_MB, DownloadMetadata, ensure_within_limits, job_workspace
+from convert_backend import artifact_store
 
 
 logging.basicConfig(level=os.getenv("TINYUTILS_LOG_LEVEL", "INFO"))
@@ -184,6 +188,19 @@ convert_batch = None
 BatchResult = None
 _pandoc_runner = None
 
+# Health probes serve a capability snapshot from memory. A background thread
+# re-checks pandoc every CONVERT_HEALTH_REFRESH_SECONDS (spawning
+# ``pandoc --version`` only when the binary changed); /health/deep probes
+# synchronously for operators.
+HEALTH_REFRESH_SECONDS = float(os.getenv("CONVERT_HEALTH_REFRESH_SECONDS", "60"))
+_capabilities: Optional[dict] = None
+# (path, mtime, size) of the pandoc binary -> its ``--version`` first line
+_pandoc_version_probe: Optional[Tuple[Tuple[str, float, int], str]] = None
+_capabilities_lock = threading.Lock()
+_capabilities_refreshing = False
+_refresher_started = False
+_last_conversion_ok: Optional[float] = None
+
 
 def _ensure_convert_imports() -> None:
     global ConverterOptions, InputPayload, convert_batch, BatchResult
@@ -286,6 +303,127 @@ async def _catch_all_exceptions(request: Request, exc: Exception):
     raise exc
 
 
+def _binary_fingerprint(path: str) -> Optional[Tuple[str, float, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return path, stat.st_mtime, stat.st_size
+
+
+def _probe_capabilities(force: bool = False) -> dict:
+    """Import pypandoc and check pandoc; the slow part of /health.
+
+    ``pandoc --version`` is reused while the binary is unchanged unless
+    ``force`` is set.
+    """
+    global _pandoc_version_probe
+
+    diagnostics: dict = {}
+    errors: List[str] = []
+
+    try:
+        import pypandoc  # type: ignore
+
+        diagnostics["pypandocVersion"] = getattr(pypandoc, "__version__", "unknown")
+    except Exception as exc:  # pragma: no cover - diagnostics only
+        diagnostics["pypandoc"] = "error"
+        diagnostics["pypandocError"] = str(exc)
+        errors.append("pypandoc")
+
+    runner = _get_pandoc_runner()
+    try:
+        pandoc_path = runner.ensure_pandoc()
+        fingerprint = _binary_fingerprint(pandoc_path)
+        cached = _pandoc_version_probe
+        diagnostics["pandocPath"] = pandoc_path
+        if not force and cached is not None and fingerprint is not None and cached[0] == fingerprint:
+            diagnostics["pandocExitCode"] = 0
+            diagnostics["pandocVersion"] = cached[1]
+        else:
+            completed = subprocess.run(
+                [pandoc_path, "--version"],
+                capture_output=True,
+                text=True,
+                timeout=5,
+                check=False,
+            )
+            first_line = (completed.stdout or completed.stderr or "").splitlines()
+            diagnostics["pandocExitCode"] = completed.returncode
+            diagnostics["pandocVersion"] = first_line[0] if first_line else None
+            if completed.returncode != 0:
+                errors.append("pandoc")
+            ok = completed.returncode == 0 and fingerprint is not None
+            _pandoc_version_probe = (fingerprint, diagnostics["pandocVersion"]) if ok else None
+    except Exception as exc:  # pragma: no cover - diagnostics only
+        diagnostics["pandocPath"] = None
+        diagnostics["pandocError"] = str(exc)
+        errors.append("pandoc")
+
+    return {"diagnostics": diagnostics, "errors": errors, "checkedAt": time.time()}
+
+
+def _refresh_capabilities(force: bool = False) -> dict:
+    global _capabilities, _capabilities_refreshing
+    try:
+        snapshot = _probe_capabilities(force)
+        with _capabilities_lock:
+            _capabilities = snapshot
+        return snapshot
+    finally:
+        with _capabilities_lock:
+            _capabilities_refreshing = False
+
+
+def _capabilities_snapshot() -> dict:
+    """Return the cached capability snapshot without blocking on a probe.
+
+    Only the very first call (before any refresh finished) probes inline. A
+    stale snapshot is still served while a refresh runs in the background,
+    which also covers runtimes where the refresher thread gets frozen.
+    """
+    global _capabilities_refreshing
+    with _capabilities_lock:
+        snapshot = _capabilities
+        stale = snapshot is None or time.time() - snapshot["checkedAt"] > HEALTH_REFRESH_SECONDS * 2
+        start_refresh = snapshot is not None and stale and not _capabilities_refreshing
+        if start_refresh:
+            _capabilities_refreshing = True
+    if snapshot is None:
+        return _refresh_capabilities()
+    if start_refresh:
+        threading.Thread(target=_refresh_capabilities, name="health-refresh", daemon=True).start()
+    return snapshot
+
+
+def _capability_refresher() -> None:
+    while True:
+        try:
+            _refresh_capabilities()
+        except Exception as exc:  # pragma: no cover - diagnostics only
+            logger.warning("health capability refresh failed err=%s", exc)
+        time.sleep(max(HEALTH_REFRESH_SECONDS, 1.0))
+
+
+def _start_capability_refresher() -> None:
+    global _refresher_started
+    with _capabilities_lock:
+        if _refresher_started or HEALTH_REFRESH_SECONDS <= 0:
+            return
+        _refresher_started = True
+    threading.Thread(target=_capability_refresher, name="health-refresher", daemon=True).start()
+
+
+def _record_conversion_ok() -> None:
+    global _last_conversion_ok
+    _last_conversion_ok = time.time()
+
+
+@app.on_event("startup")
+async def _start_health_refresher() -> None:
+    _start_capability_refresher()
+
+
 @app.on_event("startup")
 async def _log_pandoc_availability() -> None:
     runner = _get_pandoc_runner()
@@ -328,6 +466,8 @@ class Options(BaseModel):
     asciiPunctuation: bool = False
     mdDialect: Optional[str] = None
     aggressivePdfMode: bool = False
+    pdfPages: Optional[str] = None
+    pdfStartPage: Optional[int] = Field(default=None, ge=1)
     pdfMarginPreset: Optional[str] = None
     pdfPageSize: Optional[str] = None
 
@@ -340,6 +480,14 @@ class Options(BaseModel):
             raise ValueError(f"mdDialect must be one of: {', '.join(sorted(allowed))}")
         return value
 
+    @validator("pdfPages")
+    def _validate_pdf_pages(cls, value):
+        if value is None or not value.strip():
+            return None
+        if not re.fullmatch(r"\s*\d+\s*(-\s*\d*)?\s*(,\s*\d+\s*(-\s*\d*)?\s*)*", value):
+            raise ValueError("pdfPages must look like '10-50' or '1,3,7-'")
+        return value.strip()
+
 
 class ConvertRequest(BaseModel):
     model_config = {"populate_by_name": True}
@@ -359,75 +507,91 @@ class ConvertRequest(BaseModel):
 def health_check() -> dict:
     """Report pypandoc availability and vendored pandoc version."""
 
-    errors: List[str] = []
-    try:
-        import pypandoc  # type: ignore
-
-        _ = pypandoc.__version__
+    snapshot = _capabilities_snapshot()
+    diagnostics = snapshot["diagnostics"]
+    if "pypandoc" in snapshot["errors"]:
+        pypandoc_status = "error: import failed"
+    else:
         pypandoc_status = "ok"
-    except Exception as exc:  # pragma: no cover - diagnostics only
-        pypandoc_status = f"error: {exc.__class__.__name__}"
-        errors.append(str(exc))
-
-    runner = _get_pandoc_runner()
-    pandoc_path = runner.get_configured_pandoc_path()
-    pandoc_version = runner.get_pandoc_version()
 
     return {
         "pypandoc": pypandoc_status,
-        "pandoc_path": pandoc_path,
-        "pandoc_version": pandoc_version,
-        "errors": errors,
+        "pandoc_path": diagnostics.get("pandocPath"),
+        "pandoc_version": diagnostics.get("pandocVersion"),
+        "errors": [
+            diagnostics[key] for key in ("pypandocError", "pandocError") if diagnostics.get(key)
+        ],
     }
 
 
+def _health_payload(snapshot: dict) -> Tuple[dict, int]:
+    """Combine a capability snapshot with live in-memory pool/cache counters."""
+
+    diagnostics: dict = {"status": "ok", **snapshot["diagnostics"]}
+    errors: List[str] = list(snapshot["errors"])
+    diagnostics["checkedAt"] = int(snapshot["checkedAt"])
+    diagnostics["checkedAgeSeconds"] = round(time.time() - snapshot["checkedAt"], 1)
+    diagnostics["lastSuccessfulConversionAt"] = (
+        int(_last_conversion_ok) if _last_conversion_ok is not None else None
+    )
+
+    runner = _get_pandoc_runner()
+    server_status = getattr(runner, "get_server_status", None)
+    if callable(server_status):
+        diagnostics["pandocServer"] = server_status()
+
+    try:
+        from convert_backend.convert_service import get_cache_stats  # type: ignore
+
+        diagnostics["cache"] = get_cache_stats()
+    except Exception as exc:  # pragma: no cover - diagnostics only
+        diagnostics["cacheError"] = str(exc)
+
+    status_code = 200 if not errors else 503
+    if errors:
+        diagnostics["status"] = "degraded"
+    return diagnostics, status_code
+
+
 @app.get("/health", include_in_schema=False)
 def convert_health() -> JSONResponse:
-    """Check pypandoc import and vendored pandoc availability."""
+    """Serve the cached pypandoc/pandoc capability snapshot."""
 
     try:
-        diagnostics: dict = {"status": "ok"}
-        errors: List[str] = []
+        content, status_code = _health_payload(_capabilities_snapshot())
+        return JSONResponse(status_code=status_code, content=content)
+    except Exception as exc:  # pragma: no cover - diagnostics only
+        _log_unexpected_trace("health", exc)
+        raise HTTPException(status_code=500, detail="Health probe failed") from exc
 
-        try:
-            import pypandoc  # type: ignore
 
-            diagnostics["pypandocVersion"] = getattr(pypandoc, "__version__", "unknown")
-        except Exception as exc:  # pragma: no cover - diagnostics only
-            diagnostics["pypandoc"] = "error"
-            diagnostics["pypandocError"] = str(exc)
-            errors.append("pypandoc")
+@app.get("/health/deep", include_in_schema=False)
+def convert_health_deep(_: None = Depends(_verify_api_access)) -> JSONResponse:
+    """Re-probe pandoc now and run a tiny Markdown→HTML conversion."""
 
+    try:
+        content, status_code = _health_payload(_refresh_capabilities(force=True))
         runner = _get_pandoc_runner()
+        started = time.time()
+        deep: dict = {}
         try:
-            pandoc_path = runner.ensure_pandoc()
-            completed = subprocess.run(
-                [pandoc_path, "--version"],
-                capture_output=True,
-                text=True,
-                timeout=5,
-                check=False,
-            )
-            first_line = (completed.stdout or completed.stderr or "").splitlines()
-            diagnostics["pandocPath"] = pandoc_path
-            diagnostics["pandocExitCode"] = completed.returncode
-            diagnostics["pandocVersion"] = first_line[0] if first_line else None
-            if completed.returncode != 0:
-                errors.append("pandoc")
-        except Exception as exc:  # pragma: no cover - diagnostics only
-            diagnostics["pandocPath"] = None
-            diagnostics["pandocError"] = str(exc)
-            errors.append("pandoc")
-
-        status_code = 200 if not errors else 503
-        if errors:
-            diagnostics["status"] = "degraded"
-        return JSONResponse(status_code=status_code, content=diagnostics)
+            html_out = runner.convert_text("# ok", "html", format="markdown")
+            deep["conversion"] = "ok" if "ok" in (html_out or "") else "unexpected_output"
+        except Exception as exc:
+            deep["conversion"] = "error"
+            deep["conversionError"] = f"{exc.__class__.__name__}: {exc}"
+        deep["conversionMs"] = int((time.time() - started) * 1000)
+
+        content["deep"] = deep
+        if deep["conversion"] != "ok":
+            content["status"] = "degraded"
+            status_code = 503
+        return JSONResponse(status_code=status_code, content=content)
+    except HTTPException:
+        raise
     except Exception as exc:  # pragma: no cover - diagnostics only
         _log_unexpected_trace("health", exc)
         raise HTTPException(status_code=500, detail="Health probe failed") from exc
-    
-    
 
 
 @app.get("/", include_in_schema=False)
@@ -436,12 +600,39 @@ def convert_root(request: Request) -> JSONResponse:
         return convert_health()
     raise HTTPException(status_code=405, detail="Method not allowed")
 
+@app.get("/api/convert/artifacts/{artifact_id}", include_in_schema=False)
+def convert_artifact(artifact_id: str) -> FileResponse:
+    """Serve an artifact kept locally because it was too large to inline."""
+
+    stored = artifact_store.get(artifact_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Artifact not found or expired")
+    return FileResponse(
+        stored.path,
+        media_type=stored.content_type,
+        filename=stored.name,
+        headers={"Cache-Control": "private, max-age=300"},
+    )
+
+
+@app.get("/artifacts/{artifact_id}", include_in_schema=False)
+def convert_artifact_short(artifact_id: str) -> FileResponse:  # pragma: no cover - simple delegate
+    return convert_artifact(artifact_id)
+
+
 # --- Aliases so the app also matches the full Vercel path (/api/convert) ---
 @app.get("/api/convert/health", include_in_schema=False)
 def convert_health_alias() -> JSONResponse:  # pragma: no cover - simple delegate
     return convert_health()
 
 
+@app.get("/api/convert/health/deep", include_in_schema=False)
+def convert_health_deep_alias(
+    _: None = Depends(_verify_api_access),
+) -> JSONResponse:  # pragma: no cover - simple delegate
+    return convert_health_deep(None)
+
+
 @app.post("/api/convert", include_in_schema=False)
 def convert_alias(
     request: ConvertRequest,
@@ -520,9 +711,20 @@ def convert(
         for header_name, header_value in _response_headers(resolved_request_id).items():
             response.headers[header_name] = header_value
 
+        payload_stream: Optional[Iterator[InputPayload]] = None
         try:
-            with job_workspace() as workdir:
-                payloads = download_payloads_fn(request.inputs, workdir)
+            if (
+                len(request.inputs) > 1
+                and download_payloads_fn is _download_payloads
+                and convert_batch_fn is convert_batch
+            ):
+                # Downloads run concurrently and conversion starts on the
+                # first input while later ones are still arriving
+                payload_stream = _stream_payloads(request.inputs)
+                payloads = payload_stream
+            else:
+                with job_workspace() as workdir:
+                    payloads = download_payloads_fn(request.inputs, workdir)
         except blob.DownloadError as exc:
             _log_failure(resolved_request_id, "download_error", str(exc), start_time)
             raise HTTPException(
@@ -551,6 +753,8 @@ def convert(
                 "ascii_punctuation": request.options.asciiPunctuation,
                 "md_dialect": request.options.mdDialect,
                 "aggressive_pdf_mode": request.options.aggressivePdfMode, # New option
+                "pdf_pages": request.options.pdfPages,
+                "pdf_start_page": request.options.pdfStartPage,
                 "pdf_margin_preset": request.options.pdfMarginPreset,
                 "pdf_page_size": request.options.pdfPageSize,
             }
@@ -588,6 +792,13 @@ def convert(
                 batch_kwargs["preview"] = request.preview
 
             batch = convert_batch_fn(**batch_kwargs)
+        except blob.DownloadError as exc:
+            _log_failure(resolved_request_id, "download_error", str(exc), start_time)
+            raise HTTPException(
+                status_code=400,
+                detail=str(exc),
+                headers=_response_headers(resolved_request_id),
+            ) from exc
         except ValueError as exc:
             logger.error(
                 "convert validation failed request_id=%s detail=%s",
@@ -620,8 +831,12 @@ def convert(
                 detail=message,
                 headers=_response_headers(resolved_request_id),
             ) from exc
+        finally:
+            if payload_stream is not None:
+                # Cancels downloads a failed batch never reached
+                payload_stream.close()
 
-        outputs = _serialize_outputs(batch)
+        outputs = _serialize_outputs(batch, _public_base_url(http_request))
         preview = _select_preview(batch)
         errors = _serialize_errors(batch)
 
@@ -671,6 +886,8 @@ def convert(
                 len(errors),
             )
         logger.info("convert job_id=%s outputs=%d errors=%d", batch.job_id, len(outputs), len(errors))
+        if outputs:
+            _record_conversion_ok()
         return response_payload
     except HTTPException:
         raise
@@ -772,34 +989,68 @@ def _extract_zip_payloads(zip_path: Path, job_dir: Path, batch_index: int) -> Li
 
 
 def _download_payloads(inputs: List[InputItem], job_dir: Path) -> List[InputPayload]:
-    _ensure_convert_imports()
-    payloads: List[InputPayload] = []
-    for index, item in enumerate(inputs, start=1):
-        metadata = _download_input(item, job_dir)
+    return list(_iter_download_payloads(inputs, job_dir))
 
-        # Check if this is a ZIP file
-        is_zip = (
-            metadata.content_type == "application/zip" or
-            metadata.path.suffix.lower() == ".zip"
-        )
 
-        if is_zip:
-            # Extract ZIP and create payloads for each supported file
-            extracted = _extract_zip_payloads(metadata.path, job_dir, index)
-            payloads.extend(extracted)
-        else:
-            # Single file payload
-            data = metadata.path.read_bytes()
-            name = (item.name or metadata.original_name or f"document-{index}").strip() or f"document-{index}"
-            payloads.append(InputPayload(name=name, data=data, source_format=None))
-    return payloads
+def _stream_payloads(inputs: List[InputItem]) -> Iterator[InputPayload]:
+    """Like ``_download_payloads`` but lazy, in a workspace it owns.
 
+    Conversion can start on the first payload while later inputs are still
+    downloading; closing the generator cancels pending downloads and removes
+    the workspace.
+    """
+
+    with job_workspace() as workdir:
+        yield from _iter_download_payloads(inputs, workdir)
+
+
+def _iter_download_payloads(inputs: List[InputItem], job_dir: Path) -> Iterator[InputPayload]:
+    _ensure_convert_imports()
+    with blob.DownloadManager(max_bytes=MAX_FILE_MB * 1024 * 1024) as downloads:
+        # Start every URL download up front; payloads are yielded in input order
+        pending = [
+            downloads.submit(item.blobUrl, _input_target(item, job_dir, index))
+            if item.text is None
+            else None
+            for index, item in enumerate(inputs, start=1)
+        ]
+        for index, (item, download) in enumerate(zip(inputs, pending), start=1):
+            metadata = _download_input(item, job_dir, index, download)
+
+            # Check if this is a ZIP file
+            is_zip = (
+                metadata.content_type == "application/zip" or
+                metadata.path.suffix.lower() == ".zip"
+            )
 
-def _download_input(item: InputItem, job_dir: Path) -> DownloadMetadata:
+            if is_zip:
+                # Extract ZIP and create payloads for each supported file
+                yield from _extract_zip_payloads(metadata.path, job_dir, index)
+            else:
+                # Single file payload
+                data = metadata.path.read_bytes()
+                name = (item.name or metadata.original_name or f"document-{index}").strip() or f"document-{index}"
+                yield InputPayload(name=name, data=data, source_format=None)
+
+
+def _input_target(item: InputItem, job_dir: Path, index: int) -> Path:
+    # One directory per input so concurrent downloads of same-named inputs
+    # cannot overwrite each other
+    input_dir = job_dir / f"input_{index}"
+    input_dir.mkdir(exist_ok=True)
+    return input_dir / (item.name or "input")
+
+
+def _download_input(
+    item: InputItem,
+    job_dir: Path,
+    index: int = 1,
+    download: Optional[Future[Tuple[int, Optional[str]]]] = None,
+) -> DownloadMetadata:
     # Handle direct text input (for markdown → PDF via Cloud Run)
     if item.text is not None:
         name = item.name or "input.md"
-        target = job_dir / name
+        target = _input_target(item, job_dir, index).with_name(name)
         text_bytes = item.text.encode('utf-8')
         target.write_bytes(text_bytes)
         size = len(text_bytes)
@@ -814,8 +1065,13 @@ def _download_input(item: InputItem, job_dir: Path) -> DownloadMetadata:
         )
 
     # Handle blob URL input (existing flow)
-    target = job_dir / (item.name or "input")
-    size, content_type = blob.download_to_path(item.blobUrl, target)
+    target = _input_target(item, job_dir, index)
+    if download is not None:
+        size, content_type = download.result()
+    else:
+        size, content_type = blob.download_to_path(
+            item.blobUrl, target, max_bytes=MAX_FILE_MB * 1024 * 1024
+        )
     ensure_within_limits(size)
     mime_type = content_type
 
@@ -829,28 +1085,52 @@ def _download_input(item: InputItem, job_dir: Path) -> DownloadMetadata:
     )
 
 
-def _serialize_outputs(batch) -> List[dict]:
+def _public_base_url(http_request: Optional[Request]) -> str:
+    """Origin clients used to reach us, or ``""`` for relative artifact URLs.
+
+    Host headers are client-controlled, so they only pick the origin when the
+    peer is a configured trusted proxy; otherwise the configured
+    ``CONVERT_ARTIFACT_BASE_URL`` (applied by the store) or a relative URL
+    is used.
+    """
+
+    try:
+        peer = http_request.client.host if http_request.client else None  # type: ignore[union-attr]
+        if not artifact_store.is_trusted_proxy(peer):
+            return ""
+        headers = http_request.headers  # type: ignore[union-attr]
+        host = (headers.get("x-forwarded-host") or "").split(",")[0].strip()
+        proto = (headers.get("x-forwarded-proto") or http_request.url.scheme).split(",")[0].strip()  # type: ignore[union-attr]
+    except Exception:
+        return ""
+    if proto not in ("http", "https") or not re.fullmatch(r"[A-Za-z0-9.-]+(:\d{1,5})?", host):
+        return ""
+    return f"{proto}://{host}"
+
+
+def _serialize_outputs(batch, base_url: str = "") -> List[dict]:
+    """Upload every artifact and media zip concurrently and describe them.
+
+    Without blob storage, artifacts above ``BLOB_INLINE_MAX_BYTES`` are kept
+    in the local artifact store instead of being inlined as data URLs.
+    """
+
+    def _store_locally(name: str, data: bytes, content_type: str) -> str:
+        return artifact_store.put(name, data, content_type, base_url=base_url)
+
     entries: List[dict] = []
+    uploads: List[blob.UploadItem] = []
     for result in batch.results:
         for artifact in result.outputs:
-            blob_url = blob.upload_bytes(artifact.name, artifact.data, artifact.content_type)
-            entry = {
-                "name": artifact.name,
-                "size": artifact.size,
-                "blobUrl": blob_url,
-                "target": artifact.target,
-            }
-            entries.append(entry)
+            entries.append({"name": artifact.name, "size": artifact.size, "target": artifact.target})
+            uploads.append((artifact.name, artifact.data, artifact.content_type))
         if result.media:
-            blob_url = blob.upload_bytes(result.media.name, result.media.data, result.media.content_type)
-            entries.append(
-                {
-                    "name": result.media.name,
-                    "size": result.media.size,
-                    "blobUrl": blob_url,
-                    "target": "media",
-                }
-            )
+            entries.append({"name": result.media.name, "size": result.media.size, "target": "media"})
+            uploads.append((result.media.name, result.media.data, result.media.content_type))
+
+    urls = blob.upload_many(uploads, overflow=_store_locally)
+    for entry, blob_url in zip(entries, urls):
+        entry["blobUrl"] = blob_url
     return entries
 
 
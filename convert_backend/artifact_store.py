@@ -0,0 +1,182 @@
+"""Local store for conversion artifacts too large to inline as data URLs.
+
+When blob storage is not configured, ``_serialize_outputs`` used to base64
+every artifact into the JSON response. Artifacts above
+``BLOB_INLINE_MAX_BYTES`` are now written here instead and served by
+``GET /api/convert/artifacts/{id}``. IDs are random and unguessable, entries
+expire after ``CONVERT_ARTIFACT_TTL_SECONDS`` and the directory is kept under
+``CONVERT_ARTIFACT_MAX_BYTES`` (oldest first). Pruning scans the metadata
+files, so ``put`` only runs it every ``CONVERT_ARTIFACT_PRUNE_INTERVAL_SECONDS``
+or as soon as the running byte total says the budget is exceeded.
+
+The store is per instance, so the download must reach the instance that
+produced it (Cloud Run with session affinity, a single container, or a
+shared ``CONVERT_ARTIFACT_DIR`` volume).
+
+Environment:
+
+* ``CONVERT_ARTIFACT_DIR`` – storage directory (default: temp dir).
+* ``CONVERT_ARTIFACT_TTL_SECONDS`` – lifetime of an artifact (default 1h).
+* ``CONVERT_ARTIFACT_MAX_BYTES`` – total budget (default 1 GiB).
+* ``CONVERT_ARTIFACT_PRUNE_INTERVAL_SECONDS`` – minimum time between
+  prunes triggered by ``put`` (default 60).
+* ``CONVERT_ARTIFACT_BASE_URL`` – prefix for returned URLs. Without it URLs
+  are relative, unless the request came through a proxy listed in
+  ``CONVERT_ARTIFACT_TRUSTED_PROXIES``.
+* ``CONVERT_ARTIFACT_TRUSTED_PROXIES`` – comma-separated peer IPs/CIDRs whose
+  ``X-Forwarded-Host``/``X-Forwarded-Proto`` headers are believed.
+"""
+from __future__ import annotations
+
+import ipaddress
+import json
+import logging
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+_LOGGER = logging.getLogger(__name__)
+
+ARTIFACT_DIR = Path(
+    os.getenv("CONVERT_ARTIFACT_DIR", str(Path(tempfile.gettempdir()) / "tinyutils-convert-artifacts"))
+)
+TTL_SECONDS = float(os.getenv("CONVERT_ARTIFACT_TTL_SECONDS", "3600"))
+MAX_BYTES = int(os.getenv("CONVERT_ARTIFACT_MAX_BYTES", str(1024 * 1024 * 1024)))
+PRUNE_INTERVAL_SECONDS = float(os.getenv("CONVERT_ARTIFACT_PRUNE_INTERVAL_SECONDS", "60"))
+BASE_URL = os.getenv("CONVERT_ARTIFACT_BASE_URL", "").strip().rstrip("/")
+
+
+def _parse_networks(raw: str) -> List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]]:
+    networks = []
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(item, strict=False))
+        except ValueError:
+            _LOGGER.warning("ignoring invalid trusted proxy %r", item)
+    return networks
+
+
+TRUSTED_PROXIES = _parse_networks(os.getenv("CONVERT_ARTIFACT_TRUSTED_PROXIES", ""))
+
+_ID_RE = re.compile(r"[A-Za-z0-9_-]{22,64}")
+_lock = threading.Lock()
+# Bytes on disk as of the last prune plus everything put since
+_approx_bytes = 0
+_last_prune = 0.0
+
+
+@dataclass(slots=True)
+class StoredArtifact:
+    path: Path
+    name: str
+    content_type: str
+    size: int
+
+
+def put(name: str, data: bytes, content_type: str, *, base_url: str = "") -> str:
+    """Store *data* and return its URL (``<base>/api/convert/artifacts/<id>``)."""
+
+    global _approx_bytes
+    artifact_id = secrets.token_urlsafe(24)
+    ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+    data_path, meta_path = _paths(artifact_id)
+    tmp_path = data_path.with_suffix(".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, data_path)
+    meta = {"name": name, "content_type": content_type, "size": len(data), "created": time.time()}
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    with _lock:
+        _approx_bytes += len(data)
+        due = _approx_bytes > MAX_BYTES or time.time() - _last_prune >= PRUNE_INTERVAL_SECONDS
+    if due:
+        prune()
+    return url_for(artifact_id, base_url)
+
+
+def get(artifact_id: str) -> Optional[StoredArtifact]:
+    """Return the stored artifact, or ``None`` if unknown or expired."""
+
+    if not _ID_RE.fullmatch(artifact_id or ""):
+        return None
+    data_path, meta_path = _paths(artifact_id)
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if _expired(meta.get("created", 0), time.time()) or not data_path.exists():
+        return None
+    return StoredArtifact(
+        data_path,
+        str(meta.get("name") or "artifact"),
+        str(meta.get("content_type") or "application/octet-stream"),
+        int(meta.get("size") or 0),
+    )
+
+
+def url_for(artifact_id: str, base_url: str = "") -> str:
+    base = BASE_URL or base_url.rstrip("/")
+    return f"{base}/api/convert/artifacts/{artifact_id}"
+
+
+def is_trusted_proxy(peer: Optional[str]) -> bool:
+    """Whether forwarded headers from *peer* may pick the public origin."""
+
+    if not peer or not TRUSTED_PROXIES:
+        return False
+    try:
+        address = ipaddress.ip_address(peer)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def prune(now: Optional[float] = None) -> None:
+    """Delete expired artifacts, then the oldest ones while over budget."""
+
+    global _approx_bytes, _last_prune
+    now = time.time() if now is None else now
+    with _lock:
+        _last_prune = now
+        try:
+            metas = list(ARTIFACT_DIR.glob("*.json"))
+        except OSError:  # pragma: no cover - directory vanished
+            return
+        entries = []
+        for meta_path in metas:
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                meta = {}
+            entries.append((float(meta.get("created", 0)), int(meta.get("size") or 0), meta_path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        _approx_bytes = total
+        for created, size, meta_path in entries:
+            if not _expired(created, now) and total <= MAX_BYTES:
+                continue
+            total -= size
+            _approx_bytes = total
+            for path in (meta_path.with_suffix(".bin"), meta_path):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as exc:  # pragma: no cover - best effort
+                    _LOGGER.debug("artifact prune failed for %s: %s", path, exc)
+
+
+def _paths(artifact_id: str) -> Tuple[Path, Path]:
+    return ARTIFACT_DIR / f"{artifact_id}.bin", ARTIFACT_DIR / f"{artifact_id}.json"
+
+
+def _expired(created: float, now: float) -> bool:
+    return TTL_SECONDS > 0 and now - created > TTL_SECONDS
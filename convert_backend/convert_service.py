@@ -4,15 +4,26 @@ from __future__ import annotations
 import hashlib
 import re
 import html
+import io
+import itertools
 import json
 import logging
 import os
 import threading
 import time
 import zipfile
-from collections import OrderedDict
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 # pdfminer is optional (breaks on Vercel due to cffi symlink issues with uv)
 try:  # pragma: no cover — optional dependency at runtime
@@ -28,7 +39,7 @@ except Exception:  # pragma: no cover
     pdfplumber = None  # type: ignore
 
 # Use absolute imports so the module works both locally and inside Vercel lambdas
-from api._lib import pandoc_runner
+from api._lib import pandoc_runner, pandoc_server
 from api._lib.html_utils import sanitize_html_for_pandoc, sanitize_html_for_preview
 from api._lib.manifests import build_snippets, collect_headings, media_manifest
 from api._lib.text_clean import normalise_markdown
@@ -54,6 +65,7 @@ from .convert_types import (
     TargetArtifact,
 )
 from . import page_break_marker
+from . import result_cache
 from . import comments_extractor
 
 # LibreOffice integration (optional)
@@ -101,11 +113,25 @@ TARGET_CONTENT_TYPES = {
 }
 
 
-_PYPANDOC: Optional[Any] = None
+# Bump when the cached result layout or pipeline semantics change; filter
+# script contents are folded into the key separately (_cache_key_version).
+_CACHE_SCHEMA_VERSION = "2"
+_RESULT_CACHE = result_cache.ResultCache(store=result_cache.build_store())
+
+# Batch fan-out. 0 workers means "one per CPU, capped"; 0 seconds disables
+# the per-input deadline. Threads are the default executor; "process" opts
+# into a process pool (see _create_batch_executor).
+_BATCH_DEFAULT_WORKER_CAP = 8
+_BATCH_MAX_WORKERS = int(os.getenv("CONVERT_BATCH_MAX_WORKERS", "0"))
+_BATCH_TIMEOUT_SECONDS = float(os.getenv("CONVERT_BATCH_TIMEOUT_SECONDS", "0"))
+_BATCH_EXECUTOR_KIND = os.getenv("CONVERT_BATCH_EXECUTOR", "thread").strip().lower()
 
-_CACHE_MAX_ENTRIES = int(os.getenv("CONVERT_CACHE_MAX_ENTRIES", "32"))
-_CACHE_LOCK = threading.Lock()
-_CACHE: "OrderedDict[str, ConversionResult]" = OrderedDict()
+# Opt-in: apply Lua filters in the initial pandoc pass unless a preview needs
+# the unfiltered markdown. The filters were written against the gfm-reparsed
+# AST and can act differently on the source reader's (e.g. strip_empty_spans
+# drops DOCX bookmark anchors), so this stays off unless
+# CONVERT_SINGLE_PASS_FILTERS=1.
+_SINGLE_PASS_FILTERS = os.getenv("CONVERT_SINGLE_PASS_FILTERS", "0") == "1"
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -175,6 +201,11 @@ HEADING_SIZE_THRESHOLDS: Tuple[Tuple[float, int], ...] = (
 )
 MAX_HEADING_BLOCK_LENGTH = 120
 
+# Budgets for layout-aware PDF extraction. When either runs out the pages
+# extracted so far are returned as a partial result with a resume cursor.
+PDF_EXTRACT_TIME_BUDGET_SECONDS = float(os.getenv("PDF_EXTRACT_TIME_BUDGET_SECONDS", "80"))
+PDF_EXTRACT_MAX_CHARS = int(os.getenv("PDF_EXTRACT_MAX_CHARS", "5000000"))
+
 # Blank output detection thresholds for ODT→DOCX conversions
 # If input is > BLANK_OUTPUT_INPUT_THRESHOLD_BYTES but output is < BLANK_OUTPUT_OUTPUT_THRESHOLD_BYTES,
 # the conversion may have failed to preserve content (suspected blank output)
@@ -278,60 +309,159 @@ def _format_list_marker(text: str) -> Optional[str]:
     return None
 
 
-def _extract_markdown_from_pdf(
-    pdf_path: Path,
-    workspace: Path,
-    *,
-    mode: str = "default",
-    extract_media: bool = False,
-    media_dir: Optional[Path] = None,
-) -> Tuple[Path, dict]:
-    """Extract Markdown from PDF using pdfminer.six with light heuristics.
+@contextmanager
+def _open_table_detector(pdf_path: Path) -> Iterator[Optional[Any]]:
+    """Open *pdf_path* once with pdfplumber for per-page table detection.
 
-    Returns a tuple of (markdown_path, meta dict). The caller decides whether
-    to accept or fall back based on the meta/degraded flags.
+    Yields ``None`` when pdfplumber is unavailable or cannot parse the file so
+    the caller can keep extracting text without tables.
     """
-    high, layout = _try_import_pdfminer()
-    if high is None or layout is None:
-        raise RuntimeError("pdfminer_unavailable")
-
-    laparams = layout.LAParams(
-        char_margin=2.0,
-        word_margin=0.1,
-        line_margin=0.5 if mode != "aggressive" else 0.2,
-        boxes_flow=0.5 if mode != "aggressive" else -0.5,
-    )
+    if pdfplumber is None:
+        yield None
+        return
+    try:
+        doc = pdfplumber.open(str(pdf_path))  # type: ignore
+    except Exception as exc:
+        _LOGGER.debug("pdfplumber_open_error err=%s", exc)
+        yield None
+        return
+    try:
+        yield doc
+    finally:
+        doc.close()
 
-    headings = 0
-    lists = 0
-    tables_md = 0
-    tables_csv = 0
-    images = 0
-    pages = 0
-    t0 = time.time()
-    mem_chars = 0
-    timed_out = False
-    rtl_detected = False
 
-    lines_out: List[str] = []
-    list_indent_stack: List[float] = []
+def _detect_page_tables(doc: Optional[Any], page_index: int) -> List[List[Any]]:
+    """Return extracted table rows for one page of an open pdfplumber doc.
 
+    The page's cached layout objects are released afterwards so memory stays
+    flat while walking long documents.
+    """
+    if doc is None or not 0 <= page_index < len(doc.pages):
+        return []
+    page = doc.pages[page_index]
     try:
-        for page_layout in high.extract_pages(str(pdf_path), laparams=laparams):
-            pages += 1
+        return [tbl.extract() or [] for tbl in page.find_tables()]
+    finally:
+        page.close()
+
+
+class _PageSelection:
+    """1-based page window parsed from specs like ``"10-50"`` or ``"1,3,7-"``.
+
+    Membership is tested with 0-based page indexes so an instance can be
+    handed to pdfminer as ``page_numbers``; unselected pages are then skipped
+    before layout analysis. ``start`` is the resume cursor from a previous
+    partial extraction.
+    """
+
+    __slots__ = ("ranges", "start")
+
+    def __init__(self, ranges: Sequence[Tuple[int, Optional[int]]] = (), start: int = 1) -> None:
+        self.ranges = tuple(ranges)
+        self.start = max(int(start), 1)
+
+    def __contains__(self, index: object) -> bool:
+        if not isinstance(index, int):
+            return False
+        page = index + 1
+        if page < self.start:
+            return False
+        if not self.ranges:
+            return True
+        return any(lo <= page and (hi is None or page <= hi) for lo, hi in self.ranges)
+
+    @property
+    def last_page(self) -> Optional[int]:
+        """Highest selected page, or ``None`` when the window is open-ended."""
+        if not self.ranges or any(hi is None for _, hi in self.ranges):
+            return None
+        return max(hi for _, hi in self.ranges if hi is not None)
+
+    def next_after(self, page: int) -> int:
+        """Return the first selected page after 1-based *page*."""
+        candidate = page + 1
+        while (candidate - 1) not in self:
+            candidate += 1
+        return candidate
+
+
+def _parse_page_selection(
+    spec: Optional[str], start_page: Optional[int] = None
+) -> Optional[_PageSelection]:
+    """Parse a ``pages`` spec (``"10-50"``, ``"1,3,5-"``) and resume cursor.
+
+    Returns ``None`` when neither narrows the document. Raises ``ValueError``
+    for malformed specs so callers can reject the request up front.
+    """
+    spec = (spec or "").strip()
+    if not spec and not start_page:
+        return None
+    if start_page is not None and int(start_page) < 1:
+        raise ValueError(f"invalid pdf start page: {start_page}")
+    ranges: List[Tuple[int, Optional[int]]] = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        match = re.fullmatch(r"(\d+)\s*(?:(-)\s*(\d*))?", part)
+        if not match:
+            raise ValueError(f"invalid pdf page range: {part!r}")
+        lo = int(match.group(1))
+        if match.group(2) is None:
+            hi: Optional[int] = lo
+        else:
+            hi = int(match.group(3)) if match.group(3) else None
+        if lo < 1 or (hi is not None and hi < lo):
+            raise ValueError(f"invalid pdf page range: {part!r}")
+        ranges.append((lo, hi))
+    return _PageSelection(ranges, start_page or 1)
+
+
+def _iter_pdf_markdown_pages(
+    high: Any,
+    pdf_path: Path,
+    laparams: Any,
+    stats: Dict[str, Any],
+    *,
+    selection: Optional[_PageSelection] = None,
+    extract_media: bool = False,
+    media_dir: Optional[Path] = None,
+    deadline: Optional[float] = None,
+    max_chars: int = 0,
+) -> Iterator[Tuple[int, str]]:
+    """Yield ``(page_number, markdown)`` for each selected PDF page in order.
+
+    Only one page's layout is held at a time. Counters accumulate in *stats*.
+    When *deadline* passes or *max_chars* have been yielded the generator
+    stops before processing the next page and records it as
+    ``stats["next_page"]`` so extraction can resume from there.
+    """
+    list_indent_stack: List[float] = []
+    emitted_chars = 0
+    page_no = 0
+    maxpages = (selection.last_page or 0) if selection is not None else 0
+
+    with _open_table_detector(pdf_path) as table_doc:
+        for page_layout in high.extract_pages(
+            str(pdf_path), page_numbers=selection, maxpages=maxpages, laparams=laparams
+        ):
+            page_no = selection.next_after(page_no) if selection is not None else page_no + 1
+            if deadline is not None and time.time() > deadline:
+                stats["stopped_reason"] = "time_budget"
+                stats["next_page"] = page_no
+                return
+            if max_chars and emitted_chars >= max_chars:
+                stats["stopped_reason"] = "size_budget"
+                stats["next_page"] = page_no
+                return
+            page_started = time.time()
             page_blocks: List[str] = []
-            # Early timeout guard (~80s)
-            if (time.time() - t0) * 1000.0 > 80_000:
-                timed_out = True
-                break
             for element in page_layout:
                 name = element.__class__.__name__
                 # Text boxes → lines
                 if hasattr(element, "get_text"):
                     raw = element.get_text()
                     block = _merge_lines_and_fix_hyphen(raw.splitlines())
-                    if not rtl_detected and re.search(r"[\u0590-\u08FF]", block):
-                        rtl_detected = True
+                    if not stats["rtl_detected"] and re.search(r"[\u0590-\u08FF]", block):
+                        stats["rtl_detected"] = True
                     # Heading inference from LTChar sizes if available
                     sizes: List[float] = []
                     try:
@@ -344,11 +474,11 @@ def _extract_markdown_from_pdf(
                     level = _classify_heading(sizes)
                     marker = _format_list_marker(block)
                     if level is not None and len(block) < MAX_HEADING_BLOCK_LENGTH:
-                        headings += 1
+                        stats["headings"] += 1
                         page_blocks.append("#" * level + " " + block)
                         list_indent_stack.clear()
                     elif marker is not None:
-                        lists += 1
+                        stats["lists"] += 1
                         indent = getattr(element, "x0", 0.0)
                         level = _indent_level(list_indent_stack, indent)
                         indent_prefix = "  " * max(level - 1, 0)
@@ -365,7 +495,8 @@ def _extract_markdown_from_pdf(
                     else:
                         imgs = [obj for obj in getattr(element, "_objs", []) if obj.__class__.__name__ == "LTImage"]
                     for img in imgs:
-                        images += 1
+                        stats["images"] += 1
+                        images = stats["images"]
                         filename: Optional[str] = None
                         if extract_media and media_dir is not None:
                             stream = getattr(img, "stream", None)
@@ -389,66 +520,137 @@ def _extract_markdown_from_pdf(
                             page_blocks.append(f"[IMAGE {images}]")
                 else:
                     continue
-            # Attempt table detection via pdfplumber lazily
+            # Table detection reuses the single pdfplumber handle opened above
+            table_started = time.time()
             try:
-                if pdfplumber is not None:
-                    with pdfplumber.open(str(pdf_path)) as pl:  # type: ignore
-                        if 0 <= (pages - 1) < len(pl.pages):
-                            tbls = pl.pages[pages - 1].find_tables()
-                        for idx, tbl in enumerate(tbls, start=1):
-                            data = tbl.extract() or []
-                            # Regular grid → Markdown table, else CSV fallback
-                            col_counts = {len(row) for row in data if isinstance(row, list)}
-                            if len(col_counts) == 1 and list(col_counts)[0] > 1:
-                                # Markdown table
-                                tables_md += 1
-                                cols = list(col_counts)[0]
-                                header = " | ".join([f"Col{i+1}" for i in range(cols)])
-                                sep = " | ".join(["---"] * cols)
-                                md_rows = [f"| {header} |", f"| {sep} |"]
-                                for r in data:
-                                    row = [str(c or "").replace("|", "\\|") for c in r]
-                                    md_rows.append("| " + " | ".join(row) + " |")
-                                page_blocks.append("\n" + "\n".join(md_rows) + "\n")
-                            else:
-                                tables_csv += 1
-                                csv_lines: List[str] = []
-                                for r in data:
-                                    row = []
-                                    for c in (r or []):
-                                        cell = str(c or "")
-                                        if cell[:1] in ("=", "+", "-", "@"):
-                                            cell = "'" + cell
-                                        row.append('"' + cell.replace('"', '""') + '"')
-                                    csv_lines.append(",".join(row))
-                                csv_text = "\n".join(csv_lines)
-                                csv_filename: Optional[str] = None
-                                if extract_media and media_dir is not None:
-                                    csv_filename = f"table-{tables_csv}.csv"
-                                    (media_dir / csv_filename).write_text(csv_text, "utf-8")
-                                note = f"> Table {tables_csv} (low confidence; CSV fallback)"
-                                if csv_filename:
-                                    note += f" — see [{csv_filename}]({csv_filename})"
-                                page_blocks.append(note)
-                                page_blocks.append("```csv\n" + csv_text + "\n```\n")
+                for data in _detect_page_tables(table_doc, page_no - 1):
+                    # Regular grid → Markdown table, else CSV fallback
+                    col_counts = {len(row) for row in data if isinstance(row, list)}
+                    if len(col_counts) == 1 and list(col_counts)[0] > 1:
+                        # Markdown table
+                        stats["tables_md"] += 1
+                        cols = list(col_counts)[0]
+                        header = " | ".join([f"Col{i+1}" for i in range(cols)])
+                        sep = " | ".join(["---"] * cols)
+                        md_rows = [f"| {header} |", f"| {sep} |"]
+                        for r in data:
+                            row = [str(c or "").replace("|", "\\|") for c in r]
+                            md_rows.append("| " + " | ".join(row) + " |")
+                        page_blocks.append("\n" + "\n".join(md_rows) + "\n")
+                    else:
+                        stats["tables_csv"] += 1
+                        tables_csv = stats["tables_csv"]
+                        csv_lines: List[str] = []
+                        for r in data:
+                            row = []
+                            for c in (r or []):
+                                cell = str(c or "")
+                                if cell[:1] in ("=", "+", "-", "@"):
+                                    cell = "'" + cell
+                                row.append('"' + cell.replace('"', '""') + '"')
+                            csv_lines.append(",".join(row))
+                        csv_text = "\n".join(csv_lines)
+                        csv_filename: Optional[str] = None
+                        if extract_media and media_dir is not None:
+                            csv_filename = f"table-{tables_csv}.csv"
+                            (media_dir / csv_filename).write_text(csv_text, "utf-8")
+                        note = f"> Table {tables_csv} (low confidence; CSV fallback)"
+                        if csv_filename:
+                            note += f" — see [{csv_filename}]({csv_filename})"
+                        page_blocks.append(note)
+                        page_blocks.append("```csv\n" + csv_text + "\n```\n")
             except Exception as exc:
-                # If pdfplumber not available or errors, ignore silently
-                # Log at debug level since this is an optional optimization
+                # Table detection is an optional enrichment; never fail the page
                 _LOGGER.debug("pdfplumber_extraction_error err=%s", exc)
+            stats["tables_ms"] += (time.time() - table_started) * 1000.0
+
+            # Release pdfminer layout objects for this page before moving on
+            del page_layout
+            stats["page_timings"].append(int((time.time() - page_started) * 1000))
 
             # Separate pages by thematic break
-            if page_blocks:
-                lines_out.extend(page_blocks)
-                lines_out.append("\n---\n")
-                # Memory guard (approximate)
-                mem_chars += sum(len(x) for x in page_blocks)
-                if mem_chars > 5_000_000:  # ~5 MB of plain text
-                    timed_out = True
-                    break
+            markdown = "\n".join(page_blocks + ["\n---\n"]) if page_blocks else ""
+            emitted_chars += len(markdown)
+            yield page_no, markdown
+
+
+def _extract_markdown_from_pdf(
+    pdf_path: Path,
+    workspace: Path,
+    *,
+    mode: str = "default",
+    extract_media: bool = False,
+    media_dir: Optional[Path] = None,
+    pages: Optional[str] = None,
+    start_page: Optional[int] = None,
+) -> Tuple[Path, dict]:
+    """Extract Markdown from PDF using pdfminer.six with light heuristics.
+
+    Pages are streamed into the workspace file one at a time. *pages*
+    restricts extraction to a 1-based range spec and *start_page* resumes
+    from a cursor. When the time or size budget runs out the pages written so
+    far are kept: ``meta["partial"]`` is set and ``meta["next_page"]`` holds
+    the cursor to continue from.
 
-        text = "\n".join(lines_out).strip()
-        md_path = workspace / f"{pdf_path.stem}_extracted.md"
-        md_path.write_text(text or "", "utf-8")
+    Returns a tuple of (markdown_path, meta dict). The caller decides whether
+    to accept or fall back based on the meta/degraded flags.
+    """
+    high, layout = _try_import_pdfminer()
+    if high is None or layout is None:
+        raise RuntimeError("pdfminer_unavailable")
+
+    selection = _parse_page_selection(pages, start_page)
+    laparams = layout.LAParams(
+        char_margin=2.0,
+        word_margin=0.1,
+        line_margin=0.5 if mode != "aggressive" else 0.2,
+        boxes_flow=0.5 if mode != "aggressive" else -0.5,
+    )
+
+    t0 = time.time()
+    stats: Dict[str, Any] = {
+        "headings": 0,
+        "lists": 0,
+        "tables_md": 0,
+        "tables_csv": 0,
+        "images": 0,
+        "rtl_detected": False,
+        "tables_ms": 0.0,
+        "page_timings": [],
+        "stopped_reason": None,
+        "next_page": None,
+    }
+    page_count = 0
+    written_chars = 0
+    multi_line = False
+    md_path = workspace / f"{pdf_path.stem}_extracted.md"
+
+    try:
+        with md_path.open("w", encoding="utf-8") as out:
+            for _, markdown in _iter_pdf_markdown_pages(
+                high,
+                pdf_path,
+                laparams,
+                stats,
+                selection=selection,
+                extract_media=extract_media,
+                media_dir=media_dir,
+                deadline=t0 + PDF_EXTRACT_TIME_BUDGET_SECONDS if PDF_EXTRACT_TIME_BUDGET_SECONDS > 0 else None,
+                max_chars=PDF_EXTRACT_MAX_CHARS,
+            ):
+                page_count += 1
+                if not markdown:
+                    continue
+                if written_chars:
+                    out.write("\n")
+                    written_chars += 1
+                else:
+                    markdown = markdown.lstrip()
+                out.write(markdown)
+                written_chars += len(markdown)
+                multi_line = multi_line or "\n" in markdown
+
+        partial = stats["next_page"] is not None
         meta = {
             "engine": "pdfminer_six",
             "mode_used": mode,
@@ -458,20 +660,31 @@ def _extract_markdown_from_pdf(
                 "line_margin": laparams.line_margin,
                 "boxes_flow": laparams.boxes_flow,
             },
-            "pages_count": pages,
-            "headings_detected": headings,
-            "lists_detected": lists,
-            "tables_detected": {"markdown": tables_md, "csv_fallback": tables_csv},
-            "images_placeholders_count": images,
-            "rtl_detected": rtl_detected,
-            "timings_ms": {"total": int((time.time() - t0) * 1000)},
+            "pages_count": page_count,
+            "pages_requested": pages or None,
+            "start_page": selection.start if selection is not None else 1,
+            "partial": partial,
+            "next_page": stats["next_page"],
+            "headings_detected": stats["headings"],
+            "lists_detected": stats["lists"],
+            "tables_detected": {"markdown": stats["tables_md"], "csv_fallback": stats["tables_csv"]},
+            "images_placeholders_count": stats["images"],
+            "rtl_detected": stats["rtl_detected"],
+            "timings_ms": {
+                "total": int((time.time() - t0) * 1000),
+                "tables": int(stats["tables_ms"]),
+                "pages": stats["page_timings"],
+            },
         }
+        if partial:
+            meta["stopped_reason"] = stats["stopped_reason"]
 
-        # Degradation guardrails
-        degraded = timed_out or (len(text) < 64) or ("\n" not in text and len(text) > 0)
+        # Degradation guardrails: a partial run that produced usable text is
+        # returned as-is; only near-empty output falls back.
+        degraded = written_chars < 64 or not multi_line
         if degraded:
             meta["degraded_reason"] = (
-                "timeout" if timed_out else "too_short_or_single_line"
+                (stats["stopped_reason"] or "timeout") if partial else "too_short_or_single_line"
             )
             meta["fallback_used"] = True
         return md_path, meta
@@ -487,8 +700,14 @@ def convert_one(
     targets: Optional[Sequence[str]] = None,
     from_format: Optional[str] = None,
     options: Optional[ConversionOptions] = None,
+    preview: bool = True,
 ) -> ConversionResult:
-    """Convert a single payload into the requested textual outputs."""
+    """Convert a single payload into the requested textual outputs.
+
+    With ``preview=False`` the markdown pipeline applies the Lua filters in
+    the initial pandoc pass, and preview snippets compare the filtered
+    markdown with its cleaned form instead of the raw pandoc output.
+    """
 
 
     opts = options or ConversionOptions()
@@ -568,6 +787,7 @@ def convert_one(
         options=opts,
         pandoc_version=pandoc_version,
         from_format=adjusted_from,
+        preview=preview,
     )
 
     cached = _cache_get(cache_key)
@@ -614,6 +834,8 @@ def convert_one(
     except Exception as exc:  # pragma: no cover - telemetry only
         _LOGGER.debug("preview_format_mismatch_telemetry_failed name=%s err=%s", name, exc)
     result_meta: Dict[str, Any] = {}
+    # A PDF extraction cut short must never be cached as the full document
+    pdf_partial = False
 
     try:
         pandoc_runner.ensure_pandoc()
@@ -773,6 +995,12 @@ def convert_one(
                 if sel_mode not in ("default", "aggressive", "legacy"):
                     sel_mode = "default"
                 logs.append(f"pdf_layout_mode={sel_mode}")
+                # Validate the page window up front so a bad spec is reported
+                # instead of silently triggering the legacy fallback.
+                page_selection = _parse_page_selection(opts.pdf_pages, opts.pdf_start_page)
+                if page_selection is not None:
+                    logs.append(f"pdf_pages={opts.pdf_pages or ''}")
+                    logs.append(f"pdf_start_page={page_selection.start}")
                 try:
                     md_path, meta = _extract_markdown_from_pdf(
                         input_path,
@@ -780,6 +1008,8 @@ def convert_one(
                         mode=sel_mode,
                         extract_media=bool(extract_dir),
                         media_dir=extract_dir,
+                        pages=opts.pdf_pages,
+                        start_page=opts.pdf_start_page,
                     )
                     logs.append("pdf_engine=pdfminer_six")
                     logs.append(f"pdf_mode={meta.get('mode_used')}")
@@ -795,6 +1025,11 @@ def convert_one(
                     if meta.get('degraded_reason'):
                         logs.append(f"pdf_degraded={meta['degraded_reason']}")
                         raise RuntimeError("degraded_output")
+                    if meta.get('partial'):
+                        pdf_partial = True
+                        logs.append("pdf_partial=1")
+                        logs.append(f"pdf_stopped={meta.get('stopped_reason')}")
+                        logs.append(f"pdf_next_page={meta.get('next_page')}")
                     source_for_pandoc = md_path
                     from_format = "markdown"
                     logs.append("pdf_extraction_strategy=layout_aware")
@@ -805,7 +1040,9 @@ def convert_one(
                         "mode_requested": sel_mode,
                         "fallback_used": True,
                     }
-                    source_for_pandoc = _extract_text_from_pdf_legacy(input_path, workspace)
+                    source_for_pandoc = _extract_text_from_pdf_legacy(
+                        input_path, workspace, selection=page_selection
+                    )
                     from_format = "markdown"
 
             # Check if we can do direct conversion without markdown intermediate
@@ -833,7 +1070,7 @@ def convert_one(
                 html_text = source_for_pandoc.read_text("utf-8", errors="replace")
                 safe_html = sanitize_html_for_preview(html_text) if html_text else None
                 primary_format = normalized_targets[0] if normalized_targets else 'html'
-                preview = PreviewData(
+                preview_data = PreviewData(
                     headings=[],
                     snippets=[html_text[:500]] if html_text else [],
                     images=[],
@@ -874,7 +1111,7 @@ def convert_one(
                 ]
 
                 # Minimal preview for direct MD→PDF path
-                preview = PreviewData(
+                preview_data = PreviewData(
                     headings=collect_headings(source_text),
                     snippets=[source_text[:280]],
                     images=[],
@@ -908,83 +1145,43 @@ def convert_one(
                         html_text = sanitize_html_for_pandoc(html_text)
                         source_for_pandoc.write_text(html_text, "utf-8")
 
-                pandoc_runner.convert_to_markdown(
-                    source=source_for_pandoc,
-                    destination=raw_md,
-                    from_format=from_format,
-                    accept_tracked_changes=opts.accept_tracked_changes,
-                    extract_media_dir=extract_dir,
-                )
-                pandoc_runner.apply_lua_filters(raw_md, filtered_md)
-
-                before_text = raw_md.read_text("utf-8")
-                filtered_text = filtered_md.read_text("utf-8")
-                cleaned_text, stats = normalise_markdown(
-                    filtered_text,
-                    remove_zero_width=opts.remove_zero_width,
+                ingest_key = _stage_cache_key(
+                    "ingest",
+                    hashlib.sha256(input_bytes).hexdigest(),
+                    Path(safe_name).suffix.lower(),
+                    from_format or "",
+                    pandoc_version,
+                    _ingest_options_fingerprint(opts, preview),
                 )
-
-                # Phase 5 backend polish: page-break markers and comments extraction
-                # Both are DOCX-only opt-in features controlled by ConversionOptions
-                if from_format == "docx":
-                    # Insert page-break markers if requested
-                    if opts.insert_page_break_markers:
-                        try:
-                            pb_indices = page_break_marker.find_page_break_paragraph_indices(input_path)
-                            if pb_indices:
-                                # Simple heuristic: map paragraph index to markdown line
-                                # This assumes rough 1:1 mapping; more sophisticated mapping
-                                # would require AST analysis which is out of scope
-                                line_indices = pb_indices  # Direct mapping heuristic
-                                cleaned_text = page_break_marker.add_page_break_markers(
-                                    cleaned_text, line_indices
-                                )
-                                logs.append(f"page_breaks_inserted={len(pb_indices)}")
-                        except Exception as exc:
-                            logs.append(f"page_break_marker_error={exc.__class__.__name__}")
-
-                    # Extract and append comments if requested
-                    if opts.extract_comments:
-                        try:
-                            cleaned_text = comments_extractor.append_comments_to_markdown(
-                                cleaned_text, input_path
-                            )
-                            logs.append("comments_extracted=1")
-                        except Exception as exc:
-                            logs.append(f"comments_extraction_error={exc.__class__.__name__}")
-
+                cached_ingest = None if pdf_partial else _ingest_cache_get(ingest_key, extract_dir)
+                if cached_ingest is not None:
+                    before_text, cleaned_text, stage_logs = cached_ingest
+                    logs.extend(stage_logs)
+                    logs.append("ingest_cache=hit")
+                else:
+                    stage_start = len(logs)
+                    before_text, cleaned_text = _markdown_from_source(
+                        source_for_pandoc=source_for_pandoc,
+                        input_path=input_path,
+                        from_format=from_format,
+                        opts=opts,
+                        preview=preview,
+                        extract_dir=extract_dir,
+                        raw_md=raw_md,
+                        filtered_md=filtered_md,
+                        approx_bytes=approx_bytes,
+                        logs=logs,
+                    )
+                    if not pdf_partial:
+                        _ingest_cache_store(
+                            ingest_key,
+                            before_text=before_text,
+                            cleaned_text=cleaned_text,
+                            stage_logs=logs[stage_start:],
+                            extract_dir=extract_dir,
+                        )
                 cleaned_md.write_text(cleaned_text, "utf-8")
-                logs.append(f"cleanup_stats={json.dumps(stats.__dict__, sort_keys=True)}")
-
-                # Stage size telemetry for markdown-based pipeline.
-                try:
-                    raw_md_bytes = len(before_text.encode("utf-8"))
-                    filtered_md_bytes = len(filtered_text.encode("utf-8"))
-                    cleaned_md_bytes = len(cleaned_text.encode("utf-8"))
-
-                    logs.append(f"stage_raw_md_bytes={raw_md_bytes}")
-                    logs.append(f"stage_filtered_md_bytes={filtered_md_bytes}")
-                    logs.append(f"stage_cleaned_md_bytes={cleaned_md_bytes}")
-
-                    # Passive content-loss guard for markdown outputs produced
-                    # from rich document sources. If the cleaned markdown is
-                    # implausibly small compared to the original input size,
-                    # emit a suspected_blank_output tag for diagnostics only.
-                    if (
-                        from_format in {"odt", "docx", "rtf", "html"}
-                        and approx_bytes
-                        and approx_bytes > BLANK_OUTPUT_INPUT_THRESHOLD_BYTES
-                        # Treat markdown as suspicious only when it is both
-                        # absolutely tiny and less than ~5% of the original
-                        # input size. This keeps the guard sensitive for
-                        # truly blank/near-blank outputs while avoiding
-                        # false positives for compact but valid documents.
-                        and cleaned_md_bytes < max(512, int(approx_bytes * 0.05))
-                    ):
-                        logs.append("suspected_blank_output=md")
-                except Exception:
-                    # Best-effort only; never interfere with conversions.
-                    pass
+                markdown_digest = _markdown_digest(cleaned_text, extract_dir)
 
                 outputs = _build_target_artifacts(
                     targets=normalized_targets,
@@ -996,6 +1193,7 @@ def convert_one(
                     options=opts,
                     original_path=input_path,
                     original_from_format=from_format,
+                    markdown_digest=markdown_digest,
                 )
 
                 # DOCX stage size + suspected-blank guard for ODT/DOCX/HTML
@@ -1035,8 +1233,7 @@ def convert_one(
                 # Build a simple HTML preview from cleaned markdown (standalone off)
                 preview_html = None
                 try:
-                    pypandoc = _get_pypandoc()
-                    preview_html = pypandoc.convert_text(
+                    preview_html = pandoc_runner.convert_text(
                         cleaned_text,
                         to="html5",
                         format="gfm",
@@ -1051,7 +1248,7 @@ def convert_one(
                 # Determine primary format for preview
                 primary_format = normalized_targets[0] if normalized_targets else 'md'
 
-                preview = PreviewData(
+                preview_data = PreviewData(
                     headings=collect_headings(cleaned_text),
                     snippets=build_snippets(before_text, cleaned_text),
                     images=media_manifest(extract_dir),
@@ -1073,11 +1270,12 @@ def convert_one(
             result = ConversionResult(
                 name=name,
                 outputs=outputs,
-                preview=preview,
+                preview=preview_data,
                 media=media_artifact,
                 logs=logs,
             )
-            _cache_store(cache_key, result)
+            if not pdf_partial:
+                _cache_store(cache_key, result)
             return result
     except pandoc_runner.PandocError as exc:  # pragma: no cover - fallback to passthrough
         logs.append(f"pandoc_error={exc}")
@@ -1125,41 +1323,279 @@ def convert_one(
 
 def convert_batch(
     *,
-    inputs: Sequence[InputPayload],
+    inputs: Iterable[InputPayload],
     targets: Optional[Sequence[str]] = None,
     from_format: Optional[str] = None,
     options: Optional[ConversionOptions] = None,
+    max_workers: Optional[int] = None,
+    timeout_s: Optional[float] = None,
+    preview: bool = True,
 ) -> BatchResult:
-    """Convert multiple payloads, capturing per-input errors."""
+    """Convert multiple payloads, capturing per-input errors.
+
+    Inputs are fanned out across a bounded worker pool when more than one
+    worker is available (``max_workers`` / ``CONVERT_BATCH_MAX_WORKERS``).
+    ``timeout_s`` (``CONVERT_BATCH_TIMEOUT_SECONDS``) caps each input; an
+    input that overruns is reported as a ``TimeoutError`` result while the
+    rest of the batch continues. Results always follow input order.
+    ``preview`` is forwarded to :func:`convert_one`.
+
+    ``inputs`` may be a lazy iterable (e.g. payloads still downloading); each
+    input is pulled only when a worker is free, so early inputs convert while
+    later ones arrive. Exceptions raised by the iterable propagate.
+    """
 
-    if not inputs:
-        raise ValueError("inputs must contain at least one payload")
+    received: List[InputPayload] = []
+    if isinstance(inputs, Sequence):
+        if not inputs:
+            raise ValueError("inputs must contain at least one payload")
+        received.extend(inputs)
+        source: Iterable[InputPayload] = received
+        expected = len(received)
+    else:
+        source = _record_arrivals(iter(inputs), received)
+        first = next(source, None)
+        if first is None:
+            raise ValueError("inputs must contain at least one payload")
+        source = itertools.chain([first], source)
+        # Unknown length: size the pool for the configured cap
+        expected = _BATCH_DEFAULT_WORKER_CAP
 
     opts = options or ConversionOptions()
     normalized_targets = _normalize_targets(targets)
     job_id = generate_job_id()
     batch_logs = [
         f"job_id={job_id}",
-        f"inputs={len(inputs)}",
         f"targets={','.join(normalized_targets)}",
     ]
 
-    results: List[ConversionResult] = []
-    for payload in inputs:
-        result = convert_one(
-            input_bytes=payload.data,
-            name=payload.name,
-            targets=normalized_targets,
-            from_format=payload.source_format or from_format,
-            options=opts,
+    workers = _resolve_batch_workers(max_workers, expected)
+    deadline_s = _BATCH_TIMEOUT_SECONDS if timeout_s is None else timeout_s
+    deadline_s = deadline_s if deadline_s and deadline_s > 0 else None
+
+    if workers <= 1 and deadline_s is None:
+        batch_logs.append("batch_executor=sequential")
+        results = [
+            _convert_payload(payload, normalized_targets, from_format, opts, preview)
+            for payload in source
+        ]
+    else:
+        results = _convert_payloads_in_pool(
+            source,
+            normalized_targets,
+            from_format,
+            opts,
+            preview=preview,
+            workers=workers,
+            timeout_s=deadline_s,
+            batch_logs=batch_logs,
         )
+    batch_logs.insert(1, f"inputs={len(received)}")
+
+    for payload, result in zip(received, results):
         for entry in result.logs:
             batch_logs.append(f"{payload.name}:{entry}")
-        results.append(result)
 
     return BatchResult(job_id=job_id, results=results, logs=batch_logs)
 
 
+def _record_arrivals(
+    inputs: Iterator[InputPayload], received: List[InputPayload]
+) -> Iterator[InputPayload]:
+    for payload in inputs:
+        received.append(payload)
+        yield payload
+
+
+def _convert_payload(
+    payload: InputPayload,
+    targets: Sequence[str],
+    from_format: Optional[str],
+    options: ConversionOptions,
+    preview: bool = True,
+) -> ConversionResult:
+    """Worker entry point for a single batch input (must stay picklable)."""
+
+    return convert_one(
+        input_bytes=payload.data,
+        name=payload.name,
+        targets=targets,
+        from_format=payload.source_format or from_format,
+        options=options,
+        preview=preview,
+    )
+
+
+def _resolve_batch_workers(requested: Optional[int], input_count: int) -> int:
+    workers = requested if requested is not None else _BATCH_MAX_WORKERS
+    if workers <= 0:
+        workers = min(os.cpu_count() or 1, _BATCH_DEFAULT_WORKER_CAP)
+    return max(1, min(workers, input_count))
+
+
+def _init_batch_worker() -> None:
+    """Process-pool initializer: convert without warm helper servers.
+
+    Pool workers die without running atexit hooks, and the soffice and
+    pandoc-server listeners run in their own sessions, so any a worker
+    started would outlive it. Workers run one-shot subprocesses instead.
+    """
+
+    if libreoffice_converter is not None:
+        libreoffice_converter._POOL_SIZE = 0
+    if pandoc_server.SERVER_MODE == "local":
+        pandoc_server.SERVER_MODE = "off"
+
+
+def _create_batch_executor(workers: int, batch_logs: List[str]) -> Executor:
+    """Build the batch pool: threads, or processes when configured.
+
+    Pandoc/LibreOffice run as subprocesses, so threads keep most of the
+    parallelism and share the warm helper pools. ``CONVERT_BATCH_EXECUTOR=
+    process`` isolates inputs in worker processes, which can be terminated
+    on timeout; it falls back to threads where a process pool cannot start
+    (serverless sandboxes without ``/dev/shm`` reject its semaphores).
+    """
+
+    if _BATCH_EXECUTOR_KIND == "process":
+        try:
+            executor: Executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_batch_worker
+            )
+            batch_logs.append(f"batch_executor=process workers={workers}")
+            return executor
+        except (OSError, NotImplementedError, ImportError) as exc:
+            _LOGGER.warning("batch process pool unavailable err=%s; using threads", exc)
+    batch_logs.append(f"batch_executor=thread workers={workers}")
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="convert-batch")
+
+
+def _convert_payloads_in_pool(
+    inputs: Iterable[InputPayload],
+    targets: Sequence[str],
+    from_format: Optional[str],
+    options: ConversionOptions,
+    *,
+    preview: bool,
+    workers: int,
+    timeout_s: Optional[float],
+    batch_logs: List[str],
+) -> List[ConversionResult]:
+    """Run inputs through a bounded pool and return results in input order.
+
+    An input is only submitted while a worker is free, so its deadline
+    starts when it can actually run. A process pool is torn down when an
+    input times out: its workers are terminated and the other in-flight
+    inputs start over in a fresh pool. Threads cannot be interrupted, so a
+    timed-out input on a thread pool is abandoned but keeps its worker busy,
+    and that slot is not refilled until the abandoned job finishes. If every
+    thread is held by an abandoned job, the pool is replaced so the batch
+    keeps moving.
+    """
+
+    names: List[str] = []
+    results: Dict[int, ConversionResult] = {}
+    pending = iter(inputs)
+    exhausted = False
+    in_flight: Dict[Future, Tuple[int, Optional[float], InputPayload]] = {}
+    abandoned: Set[Future] = set()
+    timed_out = 0
+
+    def _submit(index: int, payload: InputPayload) -> None:
+        future = executor.submit(_convert_payload, payload, targets, from_format, options, preview)
+        deadline = time.monotonic() + timeout_s if timeout_s else None
+        in_flight[future] = (index, deadline, payload)
+
+    executor = _create_batch_executor(workers, batch_logs)
+    try:
+        while not exhausted or in_flight:
+            abandoned = {future for future in abandoned if not future.done()}
+            if not exhausted and len(abandoned) >= workers:
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = _create_batch_executor(workers, batch_logs)
+                abandoned.clear()
+                batch_logs.append("batch_executor_recycled=1")
+            while not exhausted and len(in_flight) + len(abandoned) < workers:
+                payload = next(pending, None)
+                if payload is None:
+                    exhausted = True
+                    break
+                names.append(payload.name)
+                _submit(len(names) - 1, payload)
+            if not in_flight and not abandoned:
+                continue
+
+            deadlines = [d for _, d, _ in in_flight.values() if d is not None]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            # Abandoned jobs are waited on too: their finishing frees a slot
+            done, _ = wait(set(in_flight) | abandoned, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future not in in_flight:
+                    continue
+                index, _, _ = in_flight.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception as exc:  # e.g. a broken pool or an unpicklable result
+                    results[index] = _batch_error_result(names[index], exc)
+
+            now = time.monotonic()
+            expired = False
+            for future, (index, deadline, _) in list(in_flight.items()):
+                if deadline is not None and now >= deadline:
+                    in_flight.pop(future)
+                    expired = True
+                    if not future.cancel():
+                        abandoned.add(future)
+                    timed_out += 1
+                    results[index] = _batch_error_result(
+                        names[index],
+                        TimeoutError(f"conversion exceeded {timeout_s:g}s"),
+                    )
+            if expired and isinstance(executor, ProcessPoolExecutor):
+                restart = [(index, payload) for index, _, payload in in_flight.values()]
+                _terminate_batch_executor(executor)
+                executor = _create_batch_executor(workers, batch_logs)
+                in_flight.clear()
+                abandoned.clear()
+                batch_logs.append("batch_executor_recycled=1")
+                for index, payload in restart:
+                    _submit(index, payload)
+    finally:
+        if isinstance(executor, ProcessPoolExecutor) and (in_flight or abandoned):
+            _terminate_batch_executor(executor)
+        else:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    if timed_out:
+        batch_logs.append(f"batch_timeouts={timed_out}")
+    return [results[index] for index in range(len(names)) if index in results]
+
+
+def _terminate_batch_executor(executor: ProcessPoolExecutor) -> None:
+    """Kill a process pool's workers, including any stuck on a timed-out input."""
+
+    # ProcessPoolExecutor has no public way to stop a running call.
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join(timeout=2)
+        if process.is_alive():  # pragma: no cover - ignored SIGTERM
+            process.kill()
+
+
+def _batch_error_result(name: str, exc: BaseException) -> ConversionResult:
+    kind = exc.__class__.__name__
+    return ConversionResult(
+        name=name,
+        logs=[f"batch_error={kind}"],
+        error=ConversionError(message=str(exc) or kind, kind=kind),
+    )
+
+
 def _normalize_targets(targets: Optional[Sequence[str]]) -> List[str]:
     if not targets:
         return ["md"]
@@ -1193,13 +1629,12 @@ def _build_direct_html_artifacts(
     This fixes HTML→Plain Text truncation and HTML→HTML stray code blocks.
     Only used when from_format=="html" and all targets are txt/html.
     """
-    pypandoc = _get_pypandoc()
     artifacts: List[TargetArtifact] = []
 
     for target in targets:
         if target == "html":
             # HTML→HTML: Clean via pandoc to normalize structure
-            rendered = pypandoc.convert_file(
+            rendered = pandoc_runner.convert_file(
                 str(source_path),
                 to="html",
                 format="html",
@@ -1210,7 +1645,7 @@ def _build_direct_html_artifacts(
                 logs.append(f"direct_html_to_html_bytes={len(data)}")
         elif target == "txt":
             # HTML→Plain Text: Direct conversion with wide columns to prevent truncation
-            rendered = pypandoc.convert_file(
+            rendered = pandoc_runner.convert_file(
                 str(source_path),
                 to="plain",
                 format="html",
@@ -1236,6 +1671,114 @@ def _build_direct_html_artifacts(
     return artifacts
 
 
+def _markdown_from_source(
+    *,
+    source_for_pandoc: Path,
+    input_path: Path,
+    from_format: Optional[str],
+    opts: ConversionOptions,
+    preview: bool,
+    extract_dir: Optional[Path],
+    raw_md: Path,
+    filtered_md: Path,
+    approx_bytes: Optional[int],
+    logs: List[str],
+) -> Tuple[str, str]:
+    """Run the source→cleaned markdown stage; returns ``(before, cleaned)``."""
+
+    if preview or not _SINGLE_PASS_FILTERS:
+        # Preview snippets diff the unfiltered markdown against the
+        # cleaned output, so keep the intermediate file around.
+        pandoc_runner.convert_to_markdown(
+            source=source_for_pandoc,
+            destination=raw_md,
+            from_format=from_format,
+            accept_tracked_changes=opts.accept_tracked_changes,
+            extract_media_dir=extract_dir,
+        )
+        pandoc_runner.apply_lua_filters(raw_md, filtered_md)
+
+        before_text = raw_md.read_text("utf-8")
+        filtered_text = filtered_md.read_text("utf-8")
+        logs.append("pandoc_passes=2")
+    else:
+        filtered_text = pandoc_runner.convert_to_filtered_markdown(
+            source=source_for_pandoc,
+            from_format=from_format,
+            accept_tracked_changes=opts.accept_tracked_changes,
+            extract_media_dir=extract_dir,
+        )
+        before_text = filtered_text
+        logs.append("pandoc_passes=1")
+    cleaned_text, stats = normalise_markdown(
+        filtered_text,
+        remove_zero_width=opts.remove_zero_width,
+    )
+
+    # Phase 5 backend polish: page-break markers and comments extraction
+    # Both are DOCX-only opt-in features controlled by ConversionOptions
+    if from_format == "docx":
+        # Insert page-break markers if requested
+        if opts.insert_page_break_markers:
+            try:
+                pb_indices = page_break_marker.find_page_break_paragraph_indices(input_path)
+                if pb_indices:
+                    # Simple heuristic: map paragraph index to markdown line
+                    # This assumes rough 1:1 mapping; more sophisticated mapping
+                    # would require AST analysis which is out of scope
+                    line_indices = pb_indices  # Direct mapping heuristic
+                    cleaned_text = page_break_marker.add_page_break_markers(
+                        cleaned_text, line_indices
+                    )
+                    logs.append(f"page_breaks_inserted={len(pb_indices)}")
+            except Exception as exc:
+                logs.append(f"page_break_marker_error={exc.__class__.__name__}")
+
+        # Extract and append comments if requested
+        if opts.extract_comments:
+            try:
+                cleaned_text = comments_extractor.append_comments_to_markdown(
+                    cleaned_text, input_path
+                )
+                logs.append("comments_extracted=1")
+            except Exception as exc:
+                logs.append(f"comments_extraction_error={exc.__class__.__name__}")
+
+    logs.append(f"cleanup_stats={json.dumps(stats.__dict__, sort_keys=True)}")
+
+    # Stage size telemetry for markdown-based pipeline.
+    try:
+        filtered_md_bytes = len(filtered_text.encode("utf-8"))
+        cleaned_md_bytes = len(cleaned_text.encode("utf-8"))
+
+        if before_text is not filtered_text:
+            logs.append(f"stage_raw_md_bytes={len(before_text.encode('utf-8'))}")
+        logs.append(f"stage_filtered_md_bytes={filtered_md_bytes}")
+        logs.append(f"stage_cleaned_md_bytes={cleaned_md_bytes}")
+
+        # Passive content-loss guard for markdown outputs produced
+        # from rich document sources. If the cleaned markdown is
+        # implausibly small compared to the original input size,
+        # emit a suspected_blank_output tag for diagnostics only.
+        if (
+            from_format in {"odt", "docx", "rtf", "html"}
+            and approx_bytes
+            and approx_bytes > BLANK_OUTPUT_INPUT_THRESHOLD_BYTES
+            # Treat markdown as suspicious only when it is both
+            # absolutely tiny and less than ~5% of the original
+            # input size. This keeps the guard sensitive for
+            # truly blank/near-blank outputs while avoiding
+            # false positives for compact but valid documents.
+            and cleaned_md_bytes < max(512, int(approx_bytes * 0.05))
+        ):
+            logs.append("suspected_blank_output=md")
+    except Exception:
+        # Best-effort only; never interfere with conversions.
+        pass
+
+    return before_text, cleaned_text
+
+
 def _build_target_artifacts(
     *,
     targets: Iterable[str],
@@ -1247,64 +1790,60 @@ def _build_target_artifacts(
     options: Optional[ConversionOptions] = None,
     original_path: Optional[Path] = None,
     original_from_format: Optional[str] = None,
+    markdown_digest: Optional[str] = None,
 ) -> List[TargetArtifact]:
+    """Render every requested target from the cleaned markdown.
+
+    When ``markdown_digest`` is given, each rendered target is cached under the
+    digest plus its render options, so re-requesting extra formats for the same
+    document only renders the new ones.
+    """
+
     artifacts: List[TargetArtifact] = []
     for target in targets:
-        if target == "md":
-            # Use DEFAULT_OUTPUT_FORMAT as default dialect
-            default_dialect = pandoc_runner.DEFAULT_OUTPUT_FORMAT.split('+')[0]  # Extract base format (gfm)
-            dialect = (md_dialect or default_dialect).strip().lower()
-            # If dialect matches our default cleaned markdown, use cached text directly
-            if dialect in (default_dialect, "markdown", "md", pandoc_runner.DEFAULT_OUTPUT_FORMAT):
-                data = cleaned_text.encode("utf-8")
-            else:
-                pypandoc = _get_pypandoc()
-                try:
-                    rendered = pypandoc.convert_file(
-                        str(cleaned_path),
-                        to=dialect,
-                        format="gfm",
-                        extra_args=["--wrap=none"],
-                    )
-                    data = rendered.encode("utf-8")
-                    if logs is not None:
-                        logs.append(f"md_dialect={dialect}")
-                except Exception as exc:
-                    if logs is not None:
-                        logs.append(f"md_dialect_error={exc.__class__.__name__}")
-                    data = cleaned_text.encode("utf-8")
+        cache_key = None
+        if markdown_digest is not None:
+            cache_key = _target_cache_key(
+                target,
+                markdown_digest=markdown_digest,
+                md_dialect=md_dialect,
+                options=options,
+                original_path=original_path,
+                original_from_format=original_from_format,
+            )
+        cached = _cache_get(cache_key) if cache_key else None
+        if cached is not None:
+            data = cached.outputs[0].data
+            if logs is not None:
+                logs.extend(cached.logs)
+                logs.append(f"artifact_cache=hit:{target}")
         else:
-            # Prefer direct conversion from rich sources for higher fidelity.
-            direct_rich_sources = {"odt", "docx", "rtf", "epub", "html"}
-            if (
-                target in {"docx", "odt"}
-                and original_path is not None
-                and original_from_format in direct_rich_sources
-            ):
-                try:
-                    pypandoc = _get_pypandoc()
-                    output_path = cleaned_path.parent / f"{base_name}.{TARGET_EXTENSIONS[target]}"
-                    pypandoc.convert_file(
-                        str(original_path),
-                        to=target,
-                        format=original_from_format,
-                        outputfile=str(output_path),
-                        extra_args=["--wrap=none"],
-                    )
-                    data = output_path.read_bytes()
-                    if logs is not None:
-                        logs.append(f"{target}_strategy=direct_from_source")
-                except Exception as exc:  # pragma: no cover - fall back
-                    if logs is not None:
-                        logs.append(f"{target}_direct_error={exc.__class__.__name__}")
-                    data = _render_markdown_target(
-                        cleaned_path,
-                        target,
-                        logs=logs,
-                        options=options,
-                    )
-            else:
-                data = _render_markdown_target(cleaned_path, target, logs=logs, options=options)
+            render_logs: List[str] = []
+            try:
+                data = _render_target_data(
+                    target,
+                    cleaned_path=cleaned_path,
+                    cleaned_text=cleaned_text,
+                    base_name=base_name,
+                    md_dialect=md_dialect,
+                    logs=render_logs,
+                    options=options,
+                    original_path=original_path,
+                    original_from_format=original_from_format,
+                )
+            finally:
+                if logs is not None:
+                    logs.extend(render_logs)
+            # Degraded renders (fallbacks after an error) are not cached.
+            if cache_key and not any("error" in entry for entry in render_logs):
+                _cache_store(
+                    cache_key,
+                    ConversionResult(
+                        name=target,
+                        outputs=[TargetArtifact(target=target, name=target, content_type="", data=data)],
+                        logs=render_logs,
+                    ),
+                )
         artifacts.append(
             TargetArtifact(
                 target=target,
@@ -1316,6 +1855,74 @@ def _build_target_artifacts(
     return artifacts
 
 
+def _render_target_data(
+    target: str,
+    *,
+    cleaned_path: Path,
+    cleaned_text: str,
+    base_name: str,
+    md_dialect: Optional[str] = None,
+    logs: Optional[List[str]] = None,
+    options: Optional[ConversionOptions] = None,
+    original_path: Optional[Path] = None,
+    original_from_format: Optional[str] = None,
+) -> bytes:
+    if target == "md":
+        # Use DEFAULT_OUTPUT_FORMAT as default dialect
+        default_dialect = pandoc_runner.DEFAULT_OUTPUT_FORMAT.split('+')[0]  # Extract base format (gfm)
+        dialect = (md_dialect or default_dialect).strip().lower()
+        # If dialect matches our default cleaned markdown, use cached text directly
+        if dialect in (default_dialect, "markdown", "md", pandoc_runner.DEFAULT_OUTPUT_FORMAT):
+            data = cleaned_text.encode("utf-8")
+        else:
+            try:
+                rendered = pandoc_runner.convert_file(
+                    str(cleaned_path),
+                    to=dialect,
+                    format="gfm",
+                    extra_args=["--wrap=none"],
+                )
+                data = rendered.encode("utf-8")
+                if logs is not None:
+                    logs.append(f"md_dialect={dialect}")
+            except Exception as exc:
+                if logs is not None:
+                    logs.append(f"md_dialect_error={exc.__class__.__name__}")
+                data = cleaned_text.encode("utf-8")
+    else:
+        # Prefer direct conversion from rich sources for higher fidelity.
+        direct_rich_sources = {"odt", "docx", "rtf", "epub", "html"}
+        if (
+            target in {"docx", "odt"}
+            and original_path is not None
+            and original_from_format in direct_rich_sources
+        ):
+            try:
+                output_path = cleaned_path.parent / f"{base_name}.{TARGET_EXTENSIONS[target]}"
+                pandoc_runner.convert_file(
+                    str(original_path),
+                    to=target,
+                    format=original_from_format,
+                    outputfile=str(output_path),
+                    extra_args=["--wrap=none"],
+                )
+                data = output_path.read_bytes()
+                if logs is not None:
+                    logs.append(f"{target}_strategy=direct_from_source")
+            except Exception as exc:  # pragma: no cover - fall back
+                if logs is not None:
+                    logs.append(f"{target}_direct_error={exc.__class__.__name__}")
+                data = _render_markdown_target(
+                    cleaned_path,
+                    target,
+                    logs=logs,
+                    options=options,
+                )
+        else:
+            data = _render_markdown_target(cleaned_path, target, logs=logs, options=options)
+    return data
+
+
 def _fallback_conversion(
     *,
     name: str,
@@ -1378,15 +1985,13 @@ def _render_markdown_target(
     logs: Optional[List[str]] = None,
     options: Optional[ConversionOptions] = None,
 ) -> bytes:
-    pypandoc = _get_pypandoc()
-
     if target == "pdf":
         # PDF requires special handling - prefer external renderer when configured.
         return _render_pdf_via_reportlab(cleaned_path, logs=logs, options=options)
     elif target == "docx":
         # DOCX output via pandoc (native support)
         output_path = cleaned_path.parent / f"{cleaned_path.stem}.docx"
-        pypandoc.convert_file(
+        pandoc_runner.convert_file(
             str(cleaned_path),
             to="docx",
             format="gfm",
@@ -1397,7 +2002,7 @@ def _render_markdown_target(
     elif target == "odt":
         # ODT output via pandoc
         output_path = cleaned_path.parent / f"{cleaned_path.stem}.odt"
-        pypandoc.convert_file(
+        pandoc_runner.convert_file(
             str(cleaned_path),
             to="odt",
             format="gfm",
@@ -1408,7 +2013,7 @@ def _render_markdown_target(
     elif target == "epub":
         # EPUB output via pandoc (binary zip)
         output_path = cleaned_path.parent / f"{cleaned_path.stem}.epub"
-        pypandoc.convert_file(
+        pandoc_runner.convert_file(
             str(cleaned_path),
             to="epub",
             format="gfm",
@@ -1427,7 +2032,7 @@ def _render_markdown_target(
         if target == "rtf":
             extra_args.append("--standalone")
 
-        rendered = pypandoc.convert_file(
+        rendered = pandoc_runner.convert_file(
             str(cleaned_path),
             to=pandoc_target,
             format="gfm",
@@ -1450,8 +2055,7 @@ def _render_pdf_via_reportlab(
     """
     try:
         # First, convert markdown to HTML using pandoc (which we know works)
-        pypandoc = _get_pypandoc()
-        html_content = pypandoc.convert_file(
+        html_content = pandoc_runner.convert_file(
             str(markdown_path),
             to="html5",
             format="gfm",
@@ -1460,7 +2064,7 @@ def _render_pdf_via_reportlab(
 
         # Also produce a plain-text rendering we can use in the local fallback so we
         # never return raw Markdown markup in the PDF if the external renderer fails.
-        plain_text = pypandoc.convert_file(
+        plain_text = pandoc_runner.convert_file(
             str(markdown_path),
             to="plain",
             format="gfm",
@@ -2087,13 +2691,20 @@ def _render_pdf_via_reportlab(
 
 
 
-def _extract_text_from_pdf_legacy(pdf_path: Path, workspace: Path) -> Path:
+def _extract_text_from_pdf_legacy(
+    pdf_path: Path,
+    workspace: Path,
+    *,
+    selection: Optional[_PageSelection] = None,
+) -> Path:
     """Extract simple text from PDF using pypdf and return as markdown file."""
     from pypdf import PdfReader
     reader = PdfReader(pdf_path)
     lines: List[str] = []
     multi = len(reader.pages) > 1
     for page_num, page in enumerate(reader.pages, start=1):
+        if selection is not None and (page_num - 1) not in selection:
+            continue
         text = page.extract_text() or ""
         if text.strip():
             if multi:
@@ -2104,15 +2715,6 @@ def _extract_text_from_pdf_legacy(pdf_path: Path, workspace: Path) -> Path:
     return md_path
 
 
-def _get_pypandoc():
-    global _PYPANDOC
-    if _PYPANDOC is None:
-        import pypandoc  # type: ignore
-
-        _PYPANDOC = pypandoc
-    return _PYPANDOC
-
-
 def _build_media_artifact(media_dir: Optional[Path], base_name: str) -> Optional[MediaArtifact]:
     if not media_dir or not media_dir.exists():
         return None
@@ -2146,8 +2748,10 @@ def _build_cache_key(
     options: ConversionOptions,
     pandoc_version: str,
     from_format: Optional[str],
+    preview: bool = True,
 ) -> str:
     hasher = hashlib.sha256()
+    hasher.update(_cache_key_version().encode("ascii"))
     hasher.update(input_bytes)
     hasher.update(name.encode("utf-8", "ignore"))
     for target in targets:
@@ -2167,75 +2771,179 @@ def _build_cache_key(
     # Phase 5 backend polish: page-break markers and comments
     hasher.update(str(options.insert_page_break_markers).encode("ascii"))
     hasher.update(str(options.extract_comments).encode("ascii"))
+    # PDF page window and resume cursor
+    hasher.update((options.pdf_pages or "").encode("utf-8", "ignore"))
+    hasher.update(str(options.pdf_start_page or 1).encode("ascii"))
+    hasher.update((options.pdf_layout_mode or "").encode("utf-8", "ignore"))
+    hasher.update(str(options.aggressive_pdf_mode).encode("ascii"))
+    # Single-pass (non-preview) results carry different preview snippets
+    hasher.update(str(preview).encode("ascii"))
     return hasher.hexdigest()
 
 
 def _cache_get(key: str) -> Optional[ConversionResult]:
-    with _CACHE_LOCK:
-        cached = _CACHE.get(key)
-        if cached is None:
-            return None
-        _CACHE.move_to_end(key)
-        return _clone_result(cached)
+    return _RESULT_CACHE.get(key)
 
 
 def _cache_store(key: str, result: ConversionResult) -> None:
     if result.error or not result.outputs:
         return
-    copy = _clone_result(result)
-    with _CACHE_LOCK:
-        _CACHE[key] = copy
-        _CACHE.move_to_end(key)
-        while len(_CACHE) > max(_CACHE_MAX_ENTRIES, 1):
-            _CACHE.popitem(last=False)
-
-
-def _clone_result(result: ConversionResult) -> ConversionResult:
-    outputs = [
-        TargetArtifact(
-            target=artifact.target,
-            name=artifact.name,
-            content_type=artifact.content_type,
-            data=artifact.data,
-        )
-        for artifact in result.outputs
-    ]
-    preview = None
-    if result.preview:
-        preview = PreviewData(
-            headings=list(result.preview.headings),
-            snippets=list(result.preview.snippets),
-            images=list(result.preview.images),
-            html=result.preview.html,
-            content=result.preview.content,
-            format=result.preview.format,
-            approxBytes=result.preview.approxBytes,
-            row_count=result.preview.row_count,
-            col_count=result.preview.col_count,
-            jsonNodeCount=result.preview.jsonNodeCount,
-            truncated=result.preview.truncated,
-            tooBigForPreview=result.preview.tooBigForPreview,
-            hasMoreRows=result.preview.hasMoreRows,
-            hasMoreNodes=result.preview.hasMoreNodes,
-        )
-    media = None
-    if result.media:
-        media = MediaArtifact(
-            name=result.media.name,
-            content_type=result.media.content_type,
-            data=result.media.data,
-        )
-    error = None
-    if result.error:
-        error = ConversionError(
-            message=result.error.message,
-            kind=result.error.kind,
-        )
-    return ConversionResult(
-        name=result.name,
-        outputs=outputs,
-        preview=preview,
-        media=media,
-        logs=list(result.logs),
-        error=error,
+    _RESULT_CACHE.put(key, result)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Hit/miss/eviction counters for the result cache (health endpoint)."""
+
+    return _RESULT_CACHE.status()
+
+
+@lru_cache(maxsize=1)
+def _cache_key_version() -> str:
+    """Schema version plus a digest of every Lua filter the pipeline loads."""
+
+    hasher = hashlib.sha256(_CACHE_SCHEMA_VERSION.encode("ascii"))
+    for path in sorted(pandoc_runner.FILTER_DIR.glob("*.lua")):
+        hasher.update(path.name.encode("utf-8"))
+        try:
+            hasher.update(path.read_bytes())
+        except OSError:
+            continue
+    return hasher.hexdigest()
+
+
+# Stage caches (see convert_one): source→cleaned markdown is keyed by the
+# input bytes plus ingest options, and each markdown→target render by the
+# markdown digest plus render options.
+_MEDIA_DIR_TOKEN = "\x00media-dir\x00"
+
+
+def _stage_cache_key(stage: str, *parts: str) -> str:
+    hasher = hashlib.sha256()
+    hasher.update(_cache_key_version().encode("ascii"))
+    hasher.update(stage.encode("ascii"))
+    for part in parts:
+        hasher.update(b"\x00")
+        hasher.update(part.encode("utf-8", "ignore"))
+    return hasher.hexdigest()
+
+
+def _ingest_options_fingerprint(options: ConversionOptions, preview: bool) -> str:
+    fields = (
+        options.accept_tracked_changes,
+        options.extract_media,
+        options.remove_zero_width,
+        options.use_libreoffice,
+        options.preserve_colors,
+        options.preserve_alignment,
+        options.insert_page_break_markers,
+        options.extract_comments,
+        # PDF page window, resume cursor and layout mode
+        options.pdf_pages or "",
+        options.pdf_start_page or 1,
+        options.pdf_layout_mode or "",
+        options.aggressive_pdf_mode,
+        # Previews keep the unfiltered markdown as the "before" text.
+        preview or not _SINGLE_PASS_FILTERS,
     )
+    return ",".join(str(value) for value in fields)
+
+
+def _markdown_digest(cleaned_text: str, extract_dir: Optional[Path]) -> str:
+    """Digest of the cleaned markdown and the media it references.
+
+    The per-job media path is swapped for a token, and every extracted file
+    is folded in by relative path and content: pandoc names images
+    ``media/image1.png`` whatever they contain, so the text alone cannot
+    tell two uploads with different images apart.
+    """
+
+    if extract_dir is not None:
+        cleaned_text = cleaned_text.replace(str(extract_dir), _MEDIA_DIR_TOKEN)
+    hasher = hashlib.sha256(cleaned_text.encode("utf-8"))
+    if extract_dir is not None and extract_dir.is_dir():
+        for path in sorted(p for p in extract_dir.rglob("*") if p.is_file()):
+            hasher.update(b"\0" + path.relative_to(extract_dir).as_posix().encode("utf-8") + b"\0")
+            hasher.update(hashlib.sha256(path.read_bytes()).digest())
+    return hasher.hexdigest()
+
+
+def _target_cache_key(
+    target: str,
+    *,
+    markdown_digest: str,
+    md_dialect: Optional[str],
+    options: Optional[ConversionOptions],
+    original_path: Optional[Path],
+    original_from_format: Optional[str],
+) -> Optional[str]:
+    if target == "md" and not md_dialect:
+        # Default markdown is the cleaned text itself; nothing to render.
+        return None
+    source_digest = ""
+    if target in {"docx", "odt"} and original_path is not None and original_from_format:
+        # Rich sources render docx/odt straight from the original file.
+        try:
+            source_digest = hashlib.sha256(original_path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+    return _stage_cache_key(
+        "target",
+        target,
+        markdown_digest,
+        (md_dialect or "") if target == "md" else "",
+        source_digest,
+        original_from_format or "",
+        getattr(options, "pdf_margin_preset", None) or "",
+        getattr(options, "pdf_page_size", None) or "",
+        "external" if os.getenv("PDF_RENDERER_URL") else "local",
+    )
+
+
+def _ingest_cache_get(key: str, extract_dir: Optional[Path]) -> Optional[Tuple[str, str, List[str]]]:
+    """Return ``(before, cleaned, stage_logs)`` and restore extracted media."""
+
+    cached = _cache_get(key)
+    if cached is None:
+        return None
+    if cached.media is not None:
+        if extract_dir is None:
+            return None
+        with zipfile.ZipFile(io.BytesIO(cached.media.data)) as bundle:
+            bundle.extractall(extract_dir)
+    media_path = str(extract_dir) if extract_dir is not None else ""
+    texts = {
+        artifact.target: artifact.data.decode("utf-8").replace(_MEDIA_DIR_TOKEN, media_path)
+        for artifact in cached.outputs
+    }
+    cleaned_text = texts["cleaned"]
+    return texts.get("before", cleaned_text), cleaned_text, list(cached.logs)
+
+
+def _ingest_cache_store(
+    key: str,
+    *,
+    before_text: str,
+    cleaned_text: str,
+    stage_logs: List[str],
+    extract_dir: Optional[Path],
+) -> None:
+    if any("error" in entry for entry in stage_logs):
+        return
+
+    def _portable(text: str) -> bytes:
+        if extract_dir is not None:
+            text = text.replace(str(extract_dir), _MEDIA_DIR_TOKEN)
+        return text.encode("utf-8")
+
+    outputs = [TargetArtifact(target="cleaned", name="cleaned.md", content_type="", data=_portable(cleaned_text))]
+    if before_text != cleaned_text:
+        outputs.append(TargetArtifact(target="before", name="before.md", content_type="", data=_portable(before_text)))
+    media = None
+    files = sorted(path for path in extract_dir.rglob("*") if path.is_file()) if extract_dir else []
+    if files:
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            for file_path in files:
+                bundle.write(file_path, file_path.relative_to(extract_dir))
+        media = MediaArtifact(name="media.zip", content_type="application/zip", data=buffer.getvalue())
+    _cache_store(key, ConversionResult(name="ingest", outputs=outputs, media=media, logs=list(stage_logs)))
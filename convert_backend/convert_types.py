@@ -21,6 +21,11 @@ class ConversionOptions:
     # PDF extractor mode: 'default' (layout-aware), 'aggressive' (denser joins), 'legacy' (text-only)
     pdf_layout_mode: str | None = None
     aggressive_pdf_mode: bool = False
+    # PDF extraction window: 1-based page spec such as '10-50' or '1,3,7-'.
+    pdf_pages: str | None = None
+    # Resume PDF extraction at this 1-based page (the next_page cursor
+    # reported by a previous partial extraction).
+    pdf_start_page: int | None = None
     # Optional PDF layout hints for the ReportLab fallback renderer.
     # pdf_margin_preset: e.g. 'standard' (default), 'compact', 'wide'.
     pdf_margin_preset: str | None = None
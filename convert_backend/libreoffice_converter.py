@@ -16,16 +16,31 @@ path when LibreOffice is absent or fails.
 """
 from __future__ import annotations
 
+import atexit
 import os
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
+
+from .soffice_pool import SofficePool
 
 
 _SOFFICE_BIN = os.getenv("SOFFICE_BIN", "soffice")
 _TIMEOUT_SECONDS = int(os.getenv("LIBREOFFICE_TIMEOUT_SECONDS", "60"))
+# Warm listener pool (opt-in); size 0 runs one cold soffice process per document.
+_POOL_SIZE = int(os.getenv("LIBREOFFICE_POOL_SIZE", "0"))
+_POOL_MAX_JOBS = int(os.getenv("LIBREOFFICE_MAX_JOBS_PER_INSTANCE", "50"))
+# The availability probe starts the office runtime, so cache its answer.
+_PROBE_TTL_SECONDS = float(os.getenv("LIBREOFFICE_PROBE_TTL_SECONDS", "300"))
+
+_PROBE_LOCK = threading.Lock()
+_PROBE: Optional[Tuple[bool, float]] = None
+_POOL: Optional[SofficePool] = None
+_POOL_LOCK = threading.Lock()
 
 
 def is_libreoffice_available() -> bool:
@@ -33,9 +48,20 @@ def is_libreoffice_available() -> bool:
 
     This performs a lightweight check using :func:`shutil.which` and a
     very short ``--version`` probe to avoid hanging on misconfigured
-    systems. Any failure is treated as "not available".
+    systems. Any failure is treated as "not available". The answer is
+    cached for ``LIBREOFFICE_PROBE_TTL_SECONDS``.
     """
 
+    global _PROBE
+    with _PROBE_LOCK:
+        if _PROBE is not None and time.monotonic() - _PROBE[1] < _PROBE_TTL_SECONDS:
+            return _PROBE[0]
+        available = _probe_libreoffice()
+        _PROBE = (available, time.monotonic())
+        return available
+
+
+def _probe_libreoffice() -> bool:
     if shutil.which(_SOFFICE_BIN) is None:
         return False
     try:
@@ -51,6 +77,24 @@ def is_libreoffice_available() -> bool:
     return True
 
 
+def get_pool() -> Optional[SofficePool]:
+    """Return the process-wide listener pool, or None when pooling is off."""
+
+    global _POOL
+    if _POOL_SIZE <= 0:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None or _POOL._owner_pid != os.getpid():
+            _POOL = SofficePool(
+                _SOFFICE_BIN,
+                size=_POOL_SIZE,
+                max_jobs=_POOL_MAX_JOBS,
+                timeout_s=_TIMEOUT_SECONDS,
+            )
+            atexit.register(_POOL.shutdown)
+        return _POOL
+
+
 def _run_soffice_to_html(input_path: Path, outdir: Path) -> Path:
     """Run LibreOffice in headless mode to produce an HTML file.
 
@@ -62,6 +106,10 @@ def _run_soffice_to_html(input_path: Path, outdir: Path) -> Path:
         Directory where LibreOffice should write its output.
     """
 
+    pool = get_pool()
+    if pool is not None:
+        return pool.convert(input_path, outdir, "html")
+
     outdir.mkdir(parents=True, exist_ok=True)
     cmd = [
         _SOFFICE_BIN,
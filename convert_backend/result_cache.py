@@ -0,0 +1,522 @@
+"""Two-tier content-addressed cache for conversion results.
+
+Results are serialised to a compact byte string and kept in a byte-budgeted
+in-memory LRU. An optional second tier survives process restarts and is
+shared between batch worker processes (and, with Redis, between instances):
+
+* ``memory`` – in-process LRU only (default).
+* ``disk`` – sharded directory of blobs under ``CONVERT_CACHE_DIR``.
+* ``sqlite`` – single SQLite file under ``CONVERT_CACHE_DIR``.
+* ``redis`` – any Redis-compatible server at ``CONVERT_CACHE_REDIS_URL``
+  (requires the optional ``redis`` package).
+
+Environment:
+
+* ``CONVERT_CACHE_BACKEND`` – one of the backends above.
+* ``CONVERT_CACHE_MAX_BYTES`` – memory tier budget (default 64 MiB).
+* ``CONVERT_CACHE_MAX_ENTRIES`` – memory tier entry cap (default 256).
+* ``CONVERT_CACHE_DIR`` – root for the disk/sqlite stores.
+* ``CONVERT_CACHE_DISK_MAX_BYTES`` – disk/sqlite budget (default 512 MiB).
+* ``CONVERT_CACHE_TTL_SECONDS`` – entry lifetime; 0 disables expiry.
+* ``CONVERT_CACHE_REDIS_URL`` – Redis URL for the shared backend.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sqlite3
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from .convert_types import (
+    ConversionError,
+    ConversionResult,
+    MediaArtifact,
+    PreviewData,
+    TargetArtifact,
+)
+
+try:  # pragma: no cover - optional dependency
+    import redis  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None  # type: ignore
+
+
+CACHE_BACKEND = os.getenv("CONVERT_CACHE_BACKEND", "memory").strip().lower()
+MEMORY_MAX_BYTES = int(os.getenv("CONVERT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+MEMORY_MAX_ENTRIES = int(os.getenv("CONVERT_CACHE_MAX_ENTRIES", "256"))
+CACHE_DIR = Path(os.getenv("CONVERT_CACHE_DIR", str(Path(tempfile.gettempdir()) / "tinyutils-convert-cache")))
+STORE_MAX_BYTES = int(os.getenv("CONVERT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+TTL_SECONDS = float(os.getenv("CONVERT_CACHE_TTL_SECONDS", "0"))
+REDIS_URL = os.getenv("CONVERT_CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+
+_MAGIC = b"TUCR1"
+_HEADER_LEN = struct.Struct(">I")
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# -- serialisation -------------------------------------------------------
+def encode_result(result: ConversionResult) -> bytes:
+    """Serialise *result* as a JSON header followed by the raw artifact bytes."""
+
+    blobs = [artifact.data for artifact in result.outputs]
+    header: Dict[str, Any] = {
+        "name": result.name,
+        "logs": list(result.logs),
+        "outputs": [
+            {"target": a.target, "name": a.name, "content_type": a.content_type, "size": len(a.data)}
+            for a in result.outputs
+        ],
+        "preview": asdict(result.preview) if result.preview else None,
+        "media": None,
+        "error": {"message": result.error.message, "kind": result.error.kind} if result.error else None,
+    }
+    if result.media:
+        header["media"] = {
+            "name": result.media.name,
+            "content_type": result.media.content_type,
+            "size": len(result.media.data),
+        }
+        blobs.append(result.media.data)
+    raw_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return b"".join([_MAGIC, _HEADER_LEN.pack(len(raw_header)), raw_header, *blobs])
+
+
+def decode_result(blob: bytes) -> ConversionResult:
+    """Inverse of :func:`encode_result`; raises ValueError on corrupt input."""
+
+    if not blob.startswith(_MAGIC):
+        raise ValueError("not a cached conversion result")
+    offset = len(_MAGIC)
+    (header_len,) = _HEADER_LEN.unpack_from(blob, offset)
+    offset += _HEADER_LEN.size
+    header = json.loads(blob[offset : offset + header_len].decode("utf-8"))
+    offset += header_len
+
+    def _take(size: int) -> bytes:
+        nonlocal offset
+        chunk = blob[offset : offset + size]
+        if len(chunk) != size:
+            raise ValueError("truncated cached conversion result")
+        offset += size
+        return chunk
+
+    outputs = [
+        TargetArtifact(
+            target=item["target"],
+            name=item["name"],
+            content_type=item["content_type"],
+            data=_take(item["size"]),
+        )
+        for item in header["outputs"]
+    ]
+    media = None
+    if header.get("media"):
+        item = header["media"]
+        media = MediaArtifact(name=item["name"], content_type=item["content_type"], data=_take(item["size"]))
+    preview = PreviewData(**header["preview"]) if header.get("preview") else None
+    error = ConversionError(**header["error"]) if header.get("error") else None
+    return ConversionResult(
+        name=header["name"],
+        outputs=outputs,
+        preview=preview,
+        media=media,
+        logs=list(header.get("logs") or []),
+        error=error,
+    )
+
+
+# -- tiers ---------------------------------------------------------------
+class MemoryTier:
+    """Byte-budgeted LRU of encoded results."""
+
+    def __init__(self, max_bytes: int, max_entries: int) -> None:
+        self.max_bytes = max(max_bytes, 0)
+        self.max_entries = max(max_entries, 1)
+        self.bytes = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, now: float) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        blob, expires_at = entry
+        if expires_at and expires_at <= now:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return blob
+
+    def put(self, key: str, blob: bytes, expires_at: float) -> int:
+        """Store *blob*; returns the number of entries evicted to make room."""
+
+        self._remove(key)
+        if len(blob) > self.max_bytes:
+            return 0
+        self._entries[key] = (blob, expires_at)
+        self.bytes += len(blob)
+        evicted = 0
+        while self.bytes > self.max_bytes or len(self._entries) > self.max_entries:
+            old_key, (old_blob, _) = self._entries.popitem(last=False)
+            self.bytes -= len(old_blob)
+            evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[0])
+
+
+class DiskStore:
+    """Content-addressed blobs sharded by the first two key characters.
+
+    A blob's mtime is its creation time (TTL) and its atime, set explicitly
+    on every hit, is the recency used for pruning.
+    """
+
+    name = "disk"
+
+    def __init__(self, root: Path, max_bytes: int, ttl_s: float) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._approx_bytes: Optional[int] = None
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return ``(blob, expires_at)``; ``expires_at`` is 0 without a TTL."""
+
+        path = self._path(key)
+        now = time.time()
+        try:
+            created = path.stat().st_mtime
+            if self.ttl_s and created + self.ttl_s <= now:
+                path.unlink(missing_ok=True)
+                return None
+            blob = path.read_bytes()
+            os.utime(path, (now, created))
+        except FileNotFoundError:
+            return None
+        return blob, (created + self.ttl_s if self.ttl_s else 0.0)
+
+    def put(self, key: str, blob: bytes) -> int:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(blob)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        if self._approx_bytes is None:
+            self._approx_bytes = self._scan_bytes()
+        else:
+            self._approx_bytes += len(blob) - replaced
+        if self._approx_bytes > self.max_bytes:
+            return self._prune()
+        return 0
+
+    def _files(self):
+        return [path for path in self.root.glob("*/*") if not path.name.startswith(".tmp-")]
+
+    def _scan_bytes(self) -> int:
+        total = 0
+        for path in self._files():
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                continue
+        return total
+
+    def _prune(self) -> int:
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        # Prune to 90% of the budget so a full store does not prune on every put.
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        self._approx_bytes = total
+        return evicted
+
+
+class SqliteStore:
+    """Blobs in a single SQLite database; one locked connection per process."""
+
+    name = "sqlite"
+
+    def __init__(self, path: Path, max_bytes: int, ttl_s: float) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid = 0
+        self._lock = threading.Lock()
+        # Running total so puts do not SUM the table; refreshed when pruning
+        self._approx_bytes: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, "
+                "stored REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn = conn
+            self._conn_pid = os.getpid()
+            self._approx_bytes = None
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return ``(blob, expires_at)``; ``expires_at`` is 0 without a TTL."""
+
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT data, stored FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            if self.ttl_s and row[1] + self.ttl_s <= now:
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+            return bytes(row[0]), (row[1] + self.ttl_s if self.ttl_s else 0.0)
+
+    def put(self, key: str, blob: bytes) -> int:
+        with self._lock:
+            conn = self._connect()
+            if self._approx_bytes is None:
+                (self._approx_bytes,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+            row = conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, data, size, stored, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, sqlite3.Binary(blob), len(blob), now, now),
+            )
+            self._approx_bytes += len(blob) - (row[0] if row else 0)
+            if self._approx_bytes <= self.max_bytes:
+                return 0
+            return self._prune(conn)
+
+    def _prune(self, conn: sqlite3.Connection) -> int:
+        # Other processes write the same file, so start from the real total.
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        evicted = 0
+        target = int(self.max_bytes * 0.9)
+        if total > self.max_bytes:
+            for old_key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed").fetchall():
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                total -= size
+                evicted += 1
+        self._approx_bytes = total
+        return evicted
+
+
+class RedisStore:
+    """Shared store on a Redis-compatible server; TTL handled server-side."""
+
+    name = "redis"
+
+    def __init__(self, url: str, ttl_s: float) -> None:
+        if redis is None:
+            raise RuntimeError("redis package is not installed")
+        self.url = url
+        self.ttl_s = ttl_s
+        self._client: Any = None
+        self._client_pid = 0
+
+    def _get_client(self) -> Any:
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = redis.Redis.from_url(self.url, socket_timeout=2, socket_connect_timeout=2)
+            self._client_pid = os.getpid()
+        return self._client
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._get_client().get(f"convert:{key}")
+
+    def get_entry(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Return ``(blob, expires_at)``; ``expires_at`` is 0 without a TTL."""
+
+        pipe = self._get_client().pipeline()
+        pipe.get(f"convert:{key}")
+        pipe.pttl(f"convert:{key}")
+        blob, ttl_ms = pipe.execute()
+        if blob is None:
+            return None
+        return blob, (time.time() + ttl_ms / 1000 if ttl_ms and ttl_ms > 0 else 0.0)
+
+    def put(self, key: str, blob: bytes) -> int:
+        # Redis rejects ex=0, so sub-second TTLs round up to one second
+        ttl = max(1, int(self.ttl_s)) if self.ttl_s else None
+        self._get_client().set(f"convert:{key}", blob, ex=ttl)
+        return 0
+
+
+# -- facade --------------------------------------------------------------
+class ResultCache:
+    """Memory LRU in front of an optional persistent/shared store."""
+
+    def __init__(
+        self,
+        *,
+        memory_max_bytes: int = MEMORY_MAX_BYTES,
+        memory_max_entries: int = MEMORY_MAX_ENTRIES,
+        store: Any = None,
+        ttl_s: float = TTL_SECONDS,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._memory = MemoryTier(memory_max_bytes, memory_max_entries)
+        self._store = store
+        self.ttl_s = ttl_s
+        self.stats = {
+            "memoryHits": 0,
+            "storeHits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "storeEvictions": 0,
+            "errors": 0,
+        }
+
+    def get(self, key: str) -> Optional[ConversionResult]:
+        blob = self.get_blob(key)
+        if blob is None:
+            return None
+        try:
+            return decode_result(blob)
+        except (ValueError, KeyError, TypeError) as exc:
+            self._record_error("decode", exc)
+            return None
+
+    def put(self, key: str, result: ConversionResult) -> None:
+        self.put_blob(key, encode_result(result))
+
+    def get_blob(self, key: str) -> Optional[bytes]:
+        """Raw lookup used for stage artifacts that are already bytes."""
+
+        now = time.time()
+        with self._lock:
+            blob = self._memory.get(key, now)
+            if blob is not None:
+                self.stats["memoryHits"] += 1
+                return blob
+        if self._store is not None:
+            try:
+                entry = self._store.get_entry(key)
+            except Exception as exc:
+                self._record_error("get", exc)
+                entry = None
+            if entry is not None:
+                blob, store_expiry = entry
+                # Never keep the promoted copy past the store entry's lifetime
+                expires_at = min(filter(None, (store_expiry, self._expiry(now))), default=0.0)
+                with self._lock:
+                    self.stats["storeHits"] += 1
+                    self.stats["evictions"] += self._memory.put(key, blob, expires_at)
+                return blob
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put_blob(self, key: str, blob: bytes) -> None:
+        with self._lock:
+            self.stats["stores"] += 1
+            self.stats["evictions"] += self._memory.put(key, blob, self._expiry(time.time()))
+        if self._store is not None:
+            try:
+                evicted = self._store.put(key, blob)
+            except Exception as exc:
+                self._record_error("put", exc)
+                return
+            if evicted:
+                with self._lock:
+                    self.stats["storeEvictions"] += evicted
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": getattr(self._store, "name", "memory"),
+                "memoryEntries": len(self._memory),
+                "memoryBytes": self._memory.bytes,
+                "memoryMaxBytes": self._memory.max_bytes,
+                "ttlSeconds": self.ttl_s or None,
+                **self.stats,
+            }
+
+    def _expiry(self, now: float) -> float:
+        return now + self.ttl_s if self.ttl_s else 0.0
+
+    def _record_error(self, op: str, exc: Exception) -> None:
+        with self._lock:
+            self.stats["errors"] += 1
+        _LOGGER.warning("convert cache %s failed backend=%s err=%s", op, getattr(self._store, "name", "memory"), exc)
+
+
+def build_store(backend: str = CACHE_BACKEND) -> Any:
+    """Instantiate the configured second tier, or None for memory-only."""
+
+    try:
+        if backend == "disk":
+            return DiskStore(CACHE_DIR / "blobs", STORE_MAX_BYTES, TTL_SECONDS)
+        if backend == "sqlite":
+            return SqliteStore(CACHE_DIR / "results.sqlite3", STORE_MAX_BYTES, TTL_SECONDS)
+        if backend == "redis":
+            return RedisStore(REDIS_URL, TTL_SECONDS)
+    except Exception as exc:
+        _LOGGER.warning("convert cache backend unavailable backend=%s err=%s; using memory", backend, exc)
+        return None
+    if backend not in {"", "memory"}:
+        _LOGGER.warning("unknown CONVERT_CACHE_BACKEND=%s; using memory", backend)
+    return None
@@ -0,0 +1,307 @@
+"""Pool of long-lived headless LibreOffice listeners.
+
+A cold ``soffice --convert-to`` spends most of its time starting the office
+process and initialising the user profile. The pool keeps ``size`` headless
+instances running, each with its own profile directory (so concurrent jobs
+never contend on one profile lock) and a UNO socket that doubles as a health
+check. A job runs ``soffice --convert-to`` against the same profile: that
+client hands the conversion to the already-running instance through
+LibreOffice's single-instance IPC and exits when it is done, so only the
+warm instance does the work. That handoff is checked with a probe
+conversion when the first listener comes up; if the probe fails (e.g. a
+build without working IPC, where the client fights the listener for the
+profile), the pool stops its listeners and runs cold conversions instead.
+
+Instances are restarted after ``max_jobs`` conversions, after a failed or
+timed-out job, and whenever the health check fails. Jobs queue for a free
+instance; if listeners cannot be started the pool degrades to cold
+per-profile conversions.
+
+This module is stdlib-only so the standalone Cloud Run image can use it as
+is: ``gcloud/libreoffice/deploy.sh`` copies it into that build context.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import signal
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+STARTUP_TIMEOUT_SECONDS = float(os.getenv("LIBREOFFICE_STARTUP_TIMEOUT_SECONDS", "30"))
+
+
+class SofficePoolError(RuntimeError):
+    """Raised when a pooled conversion fails or no instance frees up in time."""
+
+
+class _Instance:
+    def __init__(self, index: int, profile_dir: Path) -> None:
+        self.index = index
+        self.profile_dir = profile_dir
+        self.port = 0
+        self.proc: Optional[subprocess.Popen] = None
+        self.jobs = 0
+        self.restarts = 0
+
+    @property
+    def profile_uri(self) -> str:
+        return self.profile_dir.resolve().as_uri()
+
+
+class SofficePool:
+    """Queue conversions onto ``size`` warm soffice instances."""
+
+    def __init__(
+        self,
+        binary: str,
+        *,
+        size: int = 1,
+        max_jobs: int = 50,
+        timeout_s: float = 120.0,
+        profile_root: Optional[Path] = None,
+    ) -> None:
+        self.binary = binary
+        self.size = max(1, size)
+        self.max_jobs = max_jobs
+        self.timeout_s = timeout_s
+        root = profile_root or Path(tempfile.gettempdir()) / f"tinyutils-soffice-{os.getpid()}"
+        self._idle: "queue.Queue[_Instance]" = queue.Queue()
+        self._instances: List[_Instance] = []
+        for index in range(self.size):
+            instance = _Instance(index, root / f"profile-{index}")
+            self._instances.append(instance)
+            self._idle.put(instance)
+        self._lock = threading.Lock()
+        self._owner_pid = os.getpid()
+        self._listeners_disabled: Optional[str] = None
+        self._handoff_verified = False
+        self._waits_ms: Deque[float] = deque(maxlen=200)
+        self.waiting = 0
+        self.stats = {"jobs": 0, "failures": 0, "restarts": 0, "coldJobs": 0, "queueTimeouts": 0}
+
+    # -- public API ------------------------------------------------------
+    def convert(self, input_path: Path, output_dir: Path, target_format: str) -> Path:
+        """Convert *input_path* into *output_dir*; returns the produced file."""
+
+        queued = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            instance = self._idle.get(timeout=self.timeout_s)
+        except queue.Empty as exc:
+            with self._lock:
+                self.stats["queueTimeouts"] += 1
+            raise SofficePoolError("timed out waiting for a LibreOffice instance") from exc
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        wait_ms = (time.monotonic() - queued) * 1000
+        ok = False
+        try:
+            self._waits_ms.append(wait_ms)
+            listening = self._ensure_listening(instance)
+            output_path = self._run_job(instance, input_path, output_dir, target_format)
+            ok = True
+            with self._lock:
+                self.stats["jobs"] += 1
+                if not listening:
+                    self.stats["coldJobs"] += 1
+            return output_path
+        finally:
+            instance.jobs += 1
+            if not ok:
+                with self._lock:
+                    self.stats["failures"] += 1
+            if not ok or (self.max_jobs and instance.jobs >= self.max_jobs):
+                # Restart lazily: the next job on this slot starts a fresh one.
+                self._stop(instance)
+            self._idle.put(instance)
+
+    def warm(self) -> None:
+        """Start every idle listener now instead of on its first job."""
+
+        for _ in range(self.size):
+            try:
+                instance = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._ensure_listening(instance)
+            finally:
+                self._idle.put(instance)
+
+    def status(self) -> Dict[str, Any]:
+        waits = sorted(self._waits_ms)
+        with self._lock:
+            return {
+                "size": self.size,
+                "waiting": self.waiting,
+                "idle": self._idle.qsize(),
+                "maxJobsPerInstance": self.max_jobs,
+                "listenersDisabled": self._listeners_disabled,
+                "queueWaitMsP95": round(waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+                "instances": [
+                    {
+                        "index": inst.index,
+                        "running": inst.proc is not None and inst.proc.poll() is None,
+                        "jobs": inst.jobs,
+                        "restarts": inst.restarts,
+                    }
+                    for inst in self._instances
+                ],
+                **self.stats,
+            }
+
+    def shutdown(self) -> None:
+        if os.getpid() != self._owner_pid:
+            return
+        for instance in self._instances:
+            self._stop(instance)
+
+    # -- internals -------------------------------------------------------
+    def _ensure_listening(self, instance: _Instance) -> bool:
+        if self._listeners_disabled:
+            return False
+        if instance.proc is not None and instance.proc.poll() is None and _port_open(instance.port):
+            return True
+        if instance.proc is not None:
+            self._stop(instance)
+        instance.profile_dir.mkdir(parents=True, exist_ok=True)
+        instance.port = _free_port()
+        cmd = [
+            self.binary,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--norestore",
+            "--nodefault",
+            "--nolockcheck",
+            f"--accept=socket,host=127.0.0.1,port={instance.port};urp;StarOffice.ComponentContext",
+            f"-env:UserInstallation={instance.profile_uri}",
+        ]
+        try:
+            instance.proc = subprocess.Popen(  # nosec - controlled binary invocation
+                cmd,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        except OSError as exc:
+            self._disable_listeners(f"spawn failed: {exc}")
+            return False
+        deadline = time.monotonic() + STARTUP_TIMEOUT_SECONDS
+        while time.monotonic() < deadline:
+            if instance.proc.poll() is not None:
+                break
+            if _port_open(instance.port):
+                instance.jobs = 0
+                _LOGGER.info("soffice listener ready index=%d port=%d", instance.index, instance.port)
+                return self._verify_handoff(instance)
+            time.sleep(0.1)
+        self._stop(instance)
+        self._disable_listeners("listener did not become ready")
+        return False
+
+    def _verify_handoff(self, instance: _Instance) -> bool:
+        """Check once that a client conversion is served by the listener."""
+
+        if self._handoff_verified:
+            return True
+        with tempfile.TemporaryDirectory(prefix="soffice-probe-") as tmp:
+            probe = Path(tmp) / "probe.txt"
+            probe.write_text("probe\n", "utf-8")
+            try:
+                self._run_job(instance, probe, Path(tmp) / "out", "html")
+            except SofficePoolError as exc:
+                reason = f"convert handoff failed: {exc}"
+            else:
+                if instance.proc is not None and instance.proc.poll() is None:
+                    self._handoff_verified = True
+                    return True
+                reason = "listener exited during the handoff probe"
+        self._stop(instance)
+        self._disable_listeners(reason)
+        return False
+
+    def _run_job(self, instance: _Instance, input_path: Path, output_dir: Path, target_format: str) -> Path:
+        output_dir = output_dir.resolve()
+        output_dir.mkdir(parents=True, exist_ok=True)
+        # Absolute paths: the warm instance does not share this process' cwd.
+        cmd = [
+            self.binary,
+            "--headless",
+            "--norestore",
+            f"-env:UserInstallation={instance.profile_uri}",
+            "--convert-to",
+            target_format,
+            "--outdir",
+            str(output_dir),
+            str(input_path.resolve()),
+        ]
+        instance.profile_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            proc = subprocess.run(  # nosec - controlled binary invocation
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=self.timeout_s,
+                check=False,
+            )
+        except subprocess.TimeoutExpired as exc:
+            raise SofficePoolError(f"LibreOffice conversion timed out after {self.timeout_s:.0f}s") from exc
+        if proc.returncode != 0:
+            raise SofficePoolError(f"LibreOffice conversion failed: {proc.stderr.strip()}")
+        extension = target_format.split(":", 1)[0]
+        output_path = output_dir / f"{input_path.stem}.{extension}"
+        if not output_path.exists():
+            # Never guess from other files: the directory may hold stale output
+            raise SofficePoolError(f"LibreOffice did not produce output at {output_path!s}")
+        return output_path
+
+    def _stop(self, instance: _Instance) -> None:
+        proc, instance.proc = instance.proc, None
+        if proc is None:
+            return
+        instance.restarts += 1
+        with self._lock:
+            self.stats["restarts"] += 1
+        if proc.poll() is None:
+            try:
+                os.killpg(proc.pid, signal.SIGTERM)
+                proc.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                try:
+                    os.killpg(proc.pid, signal.SIGKILL)
+                except OSError:
+                    pass
+
+    def _disable_listeners(self, reason: str) -> None:
+        self._listeners_disabled = reason
+        _LOGGER.warning("soffice listeners disabled reason=%s; using cold per-profile conversions", reason)
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _port_open(port: int) -> bool:
+    if not port:
+        return False
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+            return True
+    except OSError:
+        return False
@@ -1,7 +1,8 @@
 from __future__ import annotations
-import base64, os, time, uuid
+import base64, os, time, uuid, zlib
+from collections import deque
 from typing import Optional
-from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from pydantic import BaseModel, Field
 from pypdf import PdfReader
 from playwright.async_api import async_playwright
@@ -12,8 +13,72 @@ PDF_MAX_PAGES=int(os.getenv("PDF_MAX_PAGES","50"))
 PDF_MAX_BYTES=int(os.getenv("PDF_MAX_BYTES","5242880"))  # 5 MiB
 REQUEST_TIMEOUT=float(os.getenv("REQUEST_TIMEOUT","25"))
 RATE_LIMIT_PER_MIN=int(os.getenv("RATE_LIMIT_PER_MIN","60"))
+# Warm browser pool: long-lived Chromium processes, one fresh context per render.
+BROWSER_POOL_SIZE=max(1, int(os.getenv("BROWSER_POOL_SIZE","2")))
+RENDER_CONCURRENCY=max(1, int(os.getenv("RENDER_CONCURRENCY", str(BROWSER_POOL_SIZE*2))))
+RENDER_QUEUE_MAX=int(os.getenv("RENDER_QUEUE_MAX","32"))
+BROWSER_MAX_RENDERS=int(os.getenv("BROWSER_MAX_RENDERS","200"))
+BROWSER_MAX_RSS_MB=int(os.getenv("BROWSER_MAX_RSS_MB","0"))  # 0 disables the memory check
+MAX_REQUEST_BYTES=int(os.getenv("MAX_REQUEST_BYTES","3000000"))  # decoded body cap (gzip bodies)
+
+class GzipRequestMiddleware:
+    """Inflate ``Content-Encoding: gzip`` request bodies before FastAPI parses them.
+
+    The body is inflated chunk by chunk as it arrives, never producing more
+    than MAX_REQUEST_BYTES of output, so a gzip bomb is answered with 413
+    after at most that much memory instead of being expanded in full.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"content-encoding", b"").lower() != b"gzip":
+            return await self.app(scope, receive, send)
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        out, size, more = [], 0, True
+        while more:
+            message = await receive()
+            more = message.get("more_body", False)
+            data = message.get("body", b"")
+            while data and not inflater.eof:
+                try:
+                    chunk = inflater.decompress(data, MAX_REQUEST_BYTES + 1 - size)
+                except zlib.error:
+                    return await _plain_error(send, 400, b"bad_gzip")
+                size += len(chunk)
+                if size > MAX_REQUEST_BYTES:
+                    return await _plain_error(send, 413, b"input_too_large")
+                out.append(chunk)
+                data = inflater.unconsumed_tail
+        if not inflater.eof:
+            return await _plain_error(send, 400, b"bad_gzip")
+        body = b"".join(out)
+        scope = dict(scope)
+        scope["headers"] = [
+            (k, v) for k, v in scope["headers"] if k not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode("ascii"))]
+        sent = False
+        async def replay():
+            nonlocal sent
+            if sent:
+                return await receive()
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await self.app(scope, replay, send)
+
+async def _plain_error(send, status: int, detail: bytes):
+    payload = b'{"detail":"' + detail + b'"}'
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(payload)).encode("ascii"))]})
+    await send({"type": "http.response.body", "body": payload})
 
 app = FastAPI()
+app.add_middleware(GzipRequestMiddleware)
 _rate = {}  # naive in-mem token bucket: ip -> (tokens, ts)
 ENGINE="playwright-chromium"
 ENGINE_VERSION=None
@@ -46,24 +111,207 @@ def _rate_check(ip: str):
         raise HTTPException(status_code=429, detail="rate_limited")
     _rate[ip]=(tokens-1, ts)
 
+def _chromium_rss_mb() -> float:
+    """Total RSS of Chromium processes in this container (Linux /proc only)."""
+    total_kb = 0
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as fh:
+                cmd = fh.read(512)
+            if b"chrom" not in cmd and b"headless_shell" not in cmd:
+                continue
+            with open(f"/proc/{pid}/status") as fh:
+                for line in fh:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
+
+class _PooledBrowser:
+    __slots__ = ("id", "browser", "renders", "active", "retiring")
+
+    def __init__(self, browser, idx: int):
+        self.id = idx
+        self.browser = browser
+        self.renders = 0
+        self.active = 0
+        self.retiring = False
+
+class BrowserPool:
+    """Keeps BROWSER_POOL_SIZE Chromium instances warm and recycles them.
+
+    Each render gets a fresh context (isolated cookies/storage/routes) on the
+    least-busy browser. A browser is retired after BROWSER_MAX_RENDERS renders,
+    when it disconnects, or when Chromium RSS exceeds BROWSER_MAX_RSS_MB; a
+    replacement is launched straight away and the old one closes once drained.
+    """
+
+    def __init__(self):
+        self._pw = None
+        self._browsers: list[_PooledBrowser] = []
+        self._sem = asyncio.Semaphore(RENDER_CONCURRENCY)
+        self._lock = asyncio.Lock()
+        self._next_id = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self._waits_ms = deque(maxlen=200)
+        self.stats = {"renders": 0, "failures": 0, "rejected": 0, "recycled": 0, "launched": 0}
+
+    async def start(self):
+        self._pw = await async_playwright().start()
+        for _ in range(BROWSER_POOL_SIZE):
+            self._browsers.append(await self._launch())
+        return self._browsers[0].browser.version
+
+    async def stop(self):
+        for pooled in self._browsers:
+            try:
+                await pooled.browser.close()
+            except Exception:
+                pass
+        self._browsers.clear()
+        if self._pw is not None:
+            await self._pw.stop()
+            self._pw = None
+
+    async def _launch(self) -> _PooledBrowser:
+        browser = await self._pw.chromium.launch()
+        pooled = _PooledBrowser(browser, self._next_id)
+        self._next_id += 1
+        self.stats["launched"] += 1
+        browser.on("disconnected", lambda _b, p=pooled: setattr(p, "retiring", True))
+        return pooled
+
+    async def _checkout(self) -> _PooledBrowser:
+        async with self._lock:
+            for stale in [b for b in self._browsers if b.retiring and b.active == 0]:
+                await self._retire(stale)
+            live = [b for b in self._browsers if not b.retiring and b.browser.is_connected()]
+            while len(live) < BROWSER_POOL_SIZE:
+                fresh = await self._launch()
+                self._browsers.append(fresh)
+                live.append(fresh)
+            pooled = min(live, key=lambda b: b.active)
+            pooled.active += 1
+            return pooled
+
+    async def _checkin(self, pooled: _PooledBrowser, ok: bool):
+        async with self._lock:
+            pooled.active -= 1
+            pooled.renders += 1
+            if not ok and not pooled.browser.is_connected():
+                pooled.retiring = True
+            if BROWSER_MAX_RENDERS and pooled.renders >= BROWSER_MAX_RENDERS:
+                pooled.retiring = True
+            if BROWSER_MAX_RSS_MB and not pooled.retiring and _chromium_rss_mb() > BROWSER_MAX_RSS_MB:
+                pooled.retiring = True
+            if pooled.retiring and pooled.active == 0:
+                await self._retire(pooled)
+
+    async def _retire(self, pooled: _PooledBrowser):
+        self._browsers.remove(pooled)
+        self.stats["recycled"] += 1
+        try:
+            await pooled.browser.close()
+        except Exception:
+            pass
+
+    async def render(self, html: str) -> bytes:
+        # Only count as queued when no render slot is free right now
+        if RENDER_QUEUE_MAX and self._sem.locked() and self.waiting >= RENDER_QUEUE_MAX:
+            self.stats["rejected"] += 1
+            raise HTTPException(status_code=503, detail="queue_full", headers={"Retry-After": "2"})
+        queued = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._sem.acquire(), timeout=REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise HTTPException(status_code=503, detail="queue_timeout", headers={"Retry-After": "5"})
+        finally:
+            self.waiting -= 1
+        self._waits_ms.append((time.monotonic() - queued) * 1000)
+        self.in_flight += 1
+        pooled = None
+        ok = False
+        try:
+            pooled = await self._checkout()
+            context = await pooled.browser.new_context()
+            try:
+                page = await context.new_page()
+                # SSRF guard: block all external fetches
+                async def gate(route):
+                    url = route.request.url
+                    if url.startswith("data:") or url.startswith("about:"):
+                        await route.continue_()
+                    else:
+                        await route.abort()
+                await page.route("**/*", gate)
+                await page.set_content(html, wait_until="load", timeout=REQUEST_TIMEOUT*1000)
+                pdf_bytes = await page.pdf(format="A4", print_background=True)
+            finally:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            ok = True
+            self.stats["renders"] += 1
+            return pdf_bytes
+        except HTTPException:
+            raise
+        except Exception:
+            self.stats["failures"] += 1
+            raise HTTPException(status_code=400, detail="render_failed")
+        finally:
+            self.in_flight -= 1
+            if pooled is not None:
+                await self._checkin(pooled, ok)
+            self._sem.release()
+
+    def snapshot(self) -> dict:
+        waits = sorted(self._waits_ms)
+        def pct(q):
+            return round(waits[min(len(waits) - 1, int(q * len(waits)))], 1) if waits else 0.0
+        return {
+            "size": BROWSER_POOL_SIZE,
+            "concurrency": RENDER_CONCURRENCY,
+            "inFlight": self.in_flight,
+            "waiting": self.waiting,
+            "utilisation": round(self.in_flight / RENDER_CONCURRENCY, 3),
+            "queueWaitMs": {"p50": pct(0.5), "p95": pct(0.95), "max": round(waits[-1], 1) if waits else 0.0},
+            "browsers": [
+                {"id": b.id, "renders": b.renders, "active": b.active, "retiring": b.retiring}
+                for b in self._browsers
+            ],
+            **self.stats,
+        }
+
+POOL = BrowserPool()
+
 @app.get("/healthz")
 @app.get("/health")  # Alternative endpoint (Cloud Run intercepts /healthz)
 async def healthz():
-    return {"ok": True, "engine": ENGINE, "version": ENGINE_VERSION}
+    return {"ok": True, "engine": ENGINE, "version": ENGINE_VERSION, "pool": POOL.snapshot()}
 
 @app.on_event("startup")
 async def init():
     global ENGINE_VERSION
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        ENGINE_VERSION = browser.version
-        await browser.close()
+    ENGINE_VERSION = await POOL.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await POOL.stop()
 
 @app.post("/convert", response_model=ConvertOut)
 async def convert(req: Request, payload: ConvertIn,
                   shared: Optional[str]=Header(default=None, alias="x-shared-secret"),
                   xff: Optional[str]=Header(default=None, alias="x-forwarded-for"),
-                  rid: Optional[str]=Header(default=None, alias="x-request-id")):
+                  rid: Optional[str]=Header(default=None, alias="x-request-id"),
+                  accept: Optional[str]=Header(default=None)):
     if not SHARED or shared != SHARED:
         raise HTTPException(status_code=401, detail="unauthorized")
     client_ip = (xff.split(",")[0].strip() if xff else req.client.host)
@@ -72,26 +320,10 @@ async def convert(req: Request, payload: ConvertIn,
     html = payload.html or ""
     if len(html.encode("utf-8")) > 2_000_000:
         raise HTTPException(status_code=413, detail="input_too_large")
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-        # SSRF guard: block all external fetches
-        async def gate(route):
-            url = route.request.url
-            if url.startswith("data:") or url.startswith("about:"):
-                await route.continue_()
-            else:
-                await route.abort()
-        await page.route("**/*", gate)
-        try:
-            await page.set_content(html, wait_until="load", timeout=REQUEST_TIMEOUT*1000)
-            pdf_bytes = await page.pdf(format="A4", print_background=True)
-        except Exception:
-            await browser.close()
-            raise HTTPException(status_code=400, detail="render_failed")
-        await browser.close()
+    pdf_bytes = await POOL.render(html)
     if len(pdf_bytes) > PDF_MAX_BYTES:
         raise HTTPException(status_code=413, detail="pdf_too_large")
+    n_pages = None
     try:
         n_pages = len(PdfReader(stream=pdf_bytes).pages)
         if n_pages > PDF_MAX_PAGES:
@@ -100,6 +332,13 @@ async def convert(req: Request, payload: ConvertIn,
         raise
     except Exception:
         pass
+    # Binary mode: raw PDF body with metadata in headers (no base64/JSON copy).
+    if accept and "application/pdf" in accept:
+        headers = {"x-request-id": request_id, "x-pdf-engine": ENGINE,
+                   "x-pdf-engine-version": str(ENGINE_VERSION or "")}
+        if n_pages is not None:
+            headers["x-pdf-pages"] = str(n_pages)
+        return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
     b64 = base64.b64encode(pdf_bytes).decode("ascii")
     meta = {"requestId": request_id, "pdfEngine": ENGINE,
             "pdfEngineVersion": ENGINE_VERSION, "pdfExternalAvailable": True}
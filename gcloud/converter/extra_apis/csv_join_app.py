@@ -1,40 +1,33 @@
 """FastAPI wrapper for CSV Join API.
 
 Wraps the Vercel-style BaseHTTPRequestHandler as a FastAPI app for Cloud Run.
+Joins run on the shared streaming engine in api/_lib/csv_join_engine.py;
+``join_algorithm`` selects auto/hash/merge.
 """
 import csv
 import io
-import sys
-from typing import List, Optional
+from typing import BinaryIO, Iterator, List, Optional, Tuple
 
 from fastapi import FastAPI, File, Form, UploadFile
 from fastapi.responses import JSONResponse, StreamingResponse
 
-# Allow very large CSV fields
-csv.field_size_limit(sys.maxsize)
+from api._lib.csv_join_engine import (
+    JoinInput,
+    normalize_join_algorithm,
+    normalize_join_type,
+    parse_key_columns,
+    spool_join,
+)
+from api._lib.utils import spool_to_tempfile
 
 MAX_FILE_SIZE_BYTES = 50 * 1024 * 1024  # 50MB per file
-CSV_DANGEROUS_PREFIXES = ("=", "+", "-", "@")
+_COPY_CHUNK_BYTES = 1024 * 1024
 
 app = FastAPI(title="CSV Join API")
 
 
-def _harden_row(row: List[str]) -> List[str]:
-    """Prefix spreadsheet formula-looking cells with a single quote."""
-    safe: List[str] = []
-    for cell in row:
-        if cell is None:
-            cell_str = ""
-        else:
-            cell_str = str(cell)
-        if cell_str and cell_str[0] in CSV_DANGEROUS_PREFIXES:
-            cell_str = "'" + cell_str
-        safe.append(cell_str)
-    return safe
-
-
 @app.post("/")
-async def csv_join(
+def csv_join(
     files: List[UploadFile] = File(...),
     action: str = Form("scan"),
     col_a_idx: Optional[str] = Form(None),
@@ -42,44 +35,60 @@ async def csv_join(
     delim_a: str = Form(","),
     delim_b: str = Form(","),
     join_type: str = Form("inner"),
+    join_algorithm: str = Form("auto"),
 ):
     """Handle CSV join requests."""
     if len(files) < 2:
         return JSONResponse({"error": "Please upload two files."}, status_code=400)
 
-    # Read file contents
-    file_contents = []
-    for idx, f in enumerate(files[:2]):
-        content = await f.read()
-        if len(content) > MAX_FILE_SIZE_BYTES:
-            return JSONResponse(
-                {"error": f"File {idx + 1} is too large (max {MAX_FILE_SIZE_BYTES // (1024 * 1024)}MB)"},
-                status_code=413,
+    spooled: List[Tuple[BinaryIO, int]] = []
+    try:
+        for idx, f in enumerate(files[:2]):
+            stream, size = spool_to_tempfile(f.file, MAX_FILE_SIZE_BYTES)
+            spooled.append((stream, size))
+            if size > MAX_FILE_SIZE_BYTES:
+                return JSONResponse(
+                    {"error": f"File {idx + 1} is too large (max {MAX_FILE_SIZE_BYTES // (1024 * 1024)}MB)"},
+                    status_code=413,
+                )
+
+        if action == "scan":
+            return _handle_scan([stream.read(4096) for stream, _ in spooled])
+
+        if action == "join":
+            try:
+                keys_a = parse_key_columns(col_a_idx)
+                keys_b = parse_key_columns(col_b_idx)
+            except ValueError as exc:
+                message = str(exc)
+                if not message.startswith("Join columns"):
+                    message = "Join columns must be numeric indices"
+                return JSONResponse({"error": message}, status_code=400)
+
+            if len(keys_a) != len(keys_b):
+                return JSONResponse(
+                    {"error": "Both files need the same number of join columns"}, status_code=400
+                )
+
+            (stream_a, size_a), (stream_b, size_b) = spooled
+            spooled = []  # ownership passes to the streaming response
+            return _handle_join(
+                JoinInput(stream_a, keys_a, delim_a or ",", size_a),
+                JoinInput(stream_b, keys_b, delim_b or ",", size_b),
+                join_type,
+                join_algorithm,
             )
-        file_contents.append(content)
-
-    if action == "scan":
-        return _handle_scan(file_contents)
-
-    if action == "join":
-        try:
-            col_a = int(col_a_idx) if col_a_idx else -1
-            col_b = int(col_b_idx) if col_b_idx else -1
-        except ValueError:
-            return JSONResponse({"error": "Join columns must be numeric indices"}, status_code=400)
-
-        if col_a < 0 or col_b < 0:
-            return JSONResponse({"error": "Join columns not specified"}, status_code=400)
-
-        return _handle_join(file_contents, col_a, col_b, delim_a, delim_b, join_type)
 
-    return JSONResponse({"error": "Unknown action; expected 'scan' or 'join'"}, status_code=400)
+        return JSONResponse({"error": "Unknown action; expected 'scan' or 'join'"}, status_code=400)
+    finally:
+        for stream, _ in spooled:
+            stream.close()
 
 
-def _handle_scan(files: List[bytes]) -> JSONResponse:
+def _handle_scan(samples: List[bytes]) -> JSONResponse:
     """Inspect the first two files and return headers + delimiters."""
     headers_data = []
-    for i, file_bytes in enumerate(files[:2]):
+    for i, file_bytes in enumerate(samples[:2]):
         try:
             sample = file_bytes[:4096].decode("utf-8", errors="ignore")
             sniffer = csv.Sniffer()
@@ -105,58 +114,31 @@ def _handle_scan(files: List[bytes]) -> JSONResponse:
 
 
 def _handle_join(
-    files: List[bytes],
-    col_a_idx: int,
-    col_b_idx: int,
-    delim_a: str,
-    delim_b: str,
-    join_type: str,
+    left: JoinInput, right: JoinInput, join_type: str, join_algorithm: str
 ) -> StreamingResponse:
-    """Perform hash join between file A and file B."""
-    if join_type not in {"inner", "left"}:
-        join_type = "inner"
-
-    # Build hash map from File B
-    file_b_str = files[1].decode("utf-8", errors="replace")
-    reader_b = csv.reader(io.StringIO(file_b_str), delimiter=delim_b)
-    header_b = next(reader_b, [])
-
-    b_map: dict[str, List[List[str]]] = {}
-    for row in reader_b:
-        if len(row) <= col_b_idx:
-            continue
-        key = row[col_b_idx].strip()
-        if key not in b_map:
-            b_map[key] = []
-        b_map[key].append(row)
-
-    # Stream File A and join
-    file_a_str = files[0].decode("utf-8", errors="replace")
-    reader_a = csv.reader(io.StringIO(file_a_str), delimiter=delim_a)
-    header_a = next(reader_a, [])
-
-    output_io = io.StringIO()
-    writer = csv.writer(output_io)
-
-    # Write hardened header
-    writer.writerow(_harden_row(list(header_a) + list(header_b)))
-
-    for row_a in reader_a:
-        if len(row_a) <= col_a_idx:
-            continue
-        key = row_a[col_a_idx].strip()
-        matches = b_map.get(key, [])
-
-        if matches:
-            for row_b in matches:
-                writer.writerow(_harden_row(list(row_a) + list(row_b)))
-        elif join_type == "left":
-            writer.writerow(_harden_row(list(row_a) + [""] * len(header_b)))
-
-    output_io.seek(0)
+    """Join file A and file B and return the result with X-Join-* stats headers."""
+
+    try:
+        output, stats, size = spool_join(
+            left,
+            right,
+            join_type=normalize_join_type(join_type),
+            algorithm=normalize_join_algorithm(join_algorithm),
+        )
+    finally:
+        left.stream.close()
+        right.stream.close()
+
+    def _chunks() -> Iterator[bytes]:
+        with output:
+            yield from iter(lambda: output.read(_COPY_CHUNK_BYTES), b"")
 
     return StreamingResponse(
-        iter([output_io.getvalue()]),
+        _chunks(),
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=joined_result.csv"},
+        headers={
+            "Content-Disposition": "attachment; filename=joined_result.csv",
+            "Content-Length": str(size),
+            **stats.headers(),
+        },
     )
@@ -26,6 +26,9 @@ fi
 
 # Build and push container (no-op until invoked explicitly).
 gcloud config set project "${PROJECT}"
+# The soffice pool lives in convert_backend/; vendor it into the build context
+cp convert_backend/soffice_pool.py gcloud/libreoffice/soffice_pool.py
+trap 'rm -f gcloud/libreoffice/soffice_pool.py' EXIT
 gcloud builds submit --tag "${IMAGE}" gcloud/libreoffice
 
 # Deploy to Cloud Run (keeps service private by default).
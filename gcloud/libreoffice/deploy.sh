@@ -117,6 +117,10 @@ log_info "(This may take 3-5 minutes for the first build)"
 
 cd "${SCRIPT_DIR}"
 
+# The soffice pool lives in convert_backend/; vendor it into the build context
+cp "${SCRIPT_DIR}/../../convert_backend/soffice_pool.py" "${SCRIPT_DIR}/soffice_pool.py"
+trap 'rm -f "${SCRIPT_DIR}/soffice_pool.py"' EXIT
+
 gcloud builds submit \
     --tag "${IMAGE}" \
     --timeout=600s \
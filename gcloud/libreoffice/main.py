@@ -5,34 +5,69 @@ alignment, advanced formatting). It integrates with Google Cloud Storage for
 file I/O and can convert to multiple output formats.
 
 Endpoints:
-- GET /health: Health check with LibreOffice version info
-- POST /convert: Convert document via GCS URIs
+- GET /health: Cached capability snapshot (LibreOffice version, pool, queue)
+- GET /health/deep: Re-probe LibreOffice and run a tiny test conversion
+- POST /convert: Convert document via GCS URIs (``"async": true`` returns a
+  job id immediately instead of waiting for the result)
+- GET /jobs/{id}: Poll an async conversion job
 - POST /convert-direct: Convert document via direct file upload (for testing)
+
+Requests are served concurrently. Conversions run on a bounded worker queue
+sized to the soffice pool; when it is full /convert answers 429 with a
+Retry-After estimate.
 """
 from __future__ import annotations
 
 import html
 import json
 import logging
+import math
 import os
 import re
 import shutil
+import atexit
 import subprocess
+import sys
 import tempfile
+import threading
 import time
 import uuid
-from dataclasses import dataclass
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 from urllib.parse import parse_qs
 
+try:
+    # Copied next to this file by deploy.sh; see convert_backend/soffice_pool.py
+    from soffice_pool import SofficePool
+except ImportError:  # running from a repository checkout
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+    from convert_backend.soffice_pool import SofficePool
+
 # Configuration
 PORT = int(os.getenv("PORT", "8080"))
 SOFFICE_BIN = os.getenv("SOFFICE_BIN", "libreoffice")
 TIMEOUT_SECONDS = int(os.getenv("LIBREOFFICE_TIMEOUT_SECONDS", "120"))
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
 GCS_PROJECT = os.getenv("GCS_PROJECT")
+# Warm soffice listeners, opt-in (0 = one cold soffice process per request)
+POOL_SIZE = int(os.getenv("LIBREOFFICE_POOL_SIZE", "0"))
+POOL_MAX_JOBS = int(os.getenv("LIBREOFFICE_MAX_JOBS_PER_INSTANCE", "50"))
+PROBE_TTL_SECONDS = float(os.getenv("LIBREOFFICE_PROBE_TTL_SECONDS", "300"))
+# Conversion workers (defaults to one per pooled listener) and how many more
+# jobs may wait for a worker before /convert answers 429.
+WORKERS = int(os.getenv("LIBREOFFICE_WORKERS", str(max(POOL_SIZE, 1))))
+QUEUE_DEPTH = int(os.getenv("LIBREOFFICE_QUEUE_DEPTH", str(2 * max(WORKERS, 1))))
+# Finished async jobs are kept this long (and at most MAX_TRACKED_JOBS of them)
+JOB_TTL_SECONDS = float(os.getenv("LIBREOFFICE_JOB_TTL_SECONDS", "3600"))
+MAX_TRACKED_JOBS = int(os.getenv("LIBREOFFICE_MAX_TRACKED_JOBS", "256"))
+ALLOWED_FORMATS = {"html", "pdf", "docx", "odt", "txt", "rtf", "epub"}
+STAGES = ("download", "convert", "style_extract", "upload")
+# /health serves a capability snapshot refreshed in the background this often
+HEALTH_REFRESH_SECONDS = float(os.getenv("LIBREOFFICE_HEALTH_REFRESH_SECONDS", "60"))
 
 # Logging
 logging.basicConfig(
@@ -125,8 +160,41 @@ def upload_to_gcs(src: Path, uri: str, content_type: Optional[str] = None) -> st
 # LibreOffice Conversion Logic
 # =============================================================================
 
+_version_lock = threading.Lock()
+_version_cache: Optional[Tuple[Optional[str], float]] = None
+_pool: Optional[SofficePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[SofficePool]:
+    """Return the shared listener pool (created on first use)."""
+    global _pool
+    if POOL_SIZE <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = SofficePool(
+                SOFFICE_BIN,
+                size=POOL_SIZE,
+                max_jobs=POOL_MAX_JOBS,
+                timeout_s=TIMEOUT_SECONDS,
+            )
+            atexit.register(_pool.shutdown)
+    return _pool
+
+
 def get_libreoffice_version() -> Optional[str]:
-    """Get LibreOffice version string."""
+    """Get LibreOffice version string (cached for PROBE_TTL_SECONDS)."""
+    global _version_cache
+    with _version_lock:
+        if _version_cache is not None and time.monotonic() - _version_cache[1] < PROBE_TTL_SECONDS:
+            return _version_cache[0]
+        version = _probe_libreoffice_version()
+        _version_cache = (version, time.monotonic())
+        return version
+
+
+def _probe_libreoffice_version() -> Optional[str]:
     try:
         result = subprocess.run(
             [SOFFICE_BIN, "--version"],
@@ -148,6 +216,67 @@ def is_libreoffice_available() -> bool:
     return get_libreoffice_version() is not None
 
 
+_capabilities: Optional[Dict[str, Any]] = None
+_capabilities_lock = threading.Lock()
+# (binary path, mtime, size) -> version; the binary only changes on redeploy
+_version_probe: Optional[Tuple[Tuple[str, float, int], str]] = None
+
+
+def _binary_fingerprint(binary_path: str) -> Optional[Tuple[str, float, int]]:
+    try:
+        stat = os.stat(binary_path)
+    except OSError:
+        return None
+    return binary_path, stat.st_mtime, stat.st_size
+
+
+def refresh_capabilities(force: bool = False) -> Dict[str, Any]:
+    """Re-check the soffice binary and store a fresh snapshot.
+
+    ``soffice --version`` only runs when the binary changed since the last
+    successful probe, the last probe failed, or ``force`` is set.
+    """
+    global _capabilities, _version_cache, _version_probe
+    binary_path = shutil.which(SOFFICE_BIN)
+    fingerprint = _binary_fingerprint(binary_path) if binary_path else None
+    probe = _version_probe
+    if not binary_path:
+        version = None
+    elif not force and probe is not None and fingerprint is not None and probe[0] == fingerprint:
+        version = probe[1]
+    else:
+        version = _probe_libreoffice_version()
+        _version_probe = (fingerprint, version) if fingerprint is not None and version else None
+    snapshot = {
+        "available": version is not None,
+        "version": version,
+        "binary": SOFFICE_BIN,
+        "binary_path": binary_path,
+        "checked_at": time.time(),
+    }
+    with _version_lock:
+        _version_cache = (version, time.monotonic())
+    with _capabilities_lock:
+        _capabilities = snapshot
+    return snapshot
+
+
+def get_capabilities() -> Dict[str, Any]:
+    """Return the last capability snapshot, probing only if none exists yet."""
+    with _capabilities_lock:
+        snapshot = _capabilities
+    return snapshot if snapshot is not None else refresh_capabilities()
+
+
+def _capability_refresher() -> None:
+    while True:
+        time.sleep(max(HEALTH_REFRESH_SECONDS, 1.0))
+        try:
+            refresh_capabilities()
+        except Exception as e:
+            logger.warning(f"Capability refresh failed: {e}")
+
+
 def convert_document(
     input_path: Path,
     output_dir: Path,
@@ -163,6 +292,16 @@ def convert_document(
     Returns:
         Path to converted file
     """
+    pool = get_pool()
+    if pool is not None:
+        start_time = time.time()
+        output_path = pool.convert(input_path, output_dir, target_format)
+        logger.info(
+            f"LibreOffice (pooled) completed in {time.time() - start_time:.2f}s: "
+            f"{output_path} ({output_path.stat().st_size} bytes)"
+        )
+        return output_path
+
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # Build LibreOffice command
@@ -248,6 +387,302 @@ def extract_style_metadata(html_path: Path) -> Dict[str, Any]:
         return {"error": html.escape(str(e))}
 
 
+# =============================================================================
+# Conversion Jobs
+# =============================================================================
+
+@dataclass
+class ConversionRequest:
+    """Validated /convert payload."""
+
+    input_gcs_uri: str
+    output_gcs_uri: str
+    target_format: str = "html"
+    extract_styles: bool = False
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> "ConversionRequest":
+        """Validate a decoded JSON body, raising ValueError on bad input."""
+        input_gcs_uri = payload.get("input_gcs_uri")
+        output_gcs_uri = payload.get("output_gcs_uri")
+        target_format = payload.get("target_format", "html")
+        if not input_gcs_uri:
+            raise ValueError("Missing required field: input_gcs_uri")
+        if not output_gcs_uri:
+            raise ValueError("Missing required field: output_gcs_uri")
+        if target_format not in ALLOWED_FORMATS:
+            raise ValueError(f"Unsupported target format: {target_format}")
+        # Reject malformed URIs before the job takes a queue slot
+        parse_gs_uri(input_gcs_uri)
+        parse_gs_uri(output_gcs_uri)
+        return cls(
+            input_gcs_uri=input_gcs_uri,
+            output_gcs_uri=output_gcs_uri,
+            target_format=target_format,
+            extract_styles=bool(payload.get("extract_styles", False)),
+        )
+
+
+def run_conversion(request: ConversionRequest, request_id: str) -> Dict[str, Any]:
+    """Download, convert, optionally extract styles, and upload one document.
+
+    Returns the /convert response body, including per-stage timings.
+    """
+    timings: Dict[str, int] = {}
+    start_time = time.time()
+    logger.info(f"[{request_id}] Starting conversion: {request.input_gcs_uri} -> {request.target_format}")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir_path = Path(tmpdir)
+
+        # Extract and validate filename from GCS URI
+        # Security: validate_filename prevents path traversal attacks
+        _, blob_name = parse_gs_uri(request.input_gcs_uri)
+        input_filename = validate_filename(Path(blob_name).name)
+        input_path = tmpdir_path / input_filename
+
+        # Download input file
+        logger.info(f"[{request_id}] Downloading from GCS...")
+        stage_start = time.time()
+        download_from_gcs(request.input_gcs_uri, input_path)
+        timings["download"] = int((time.time() - stage_start) * 1000)
+
+        # Convert document
+        logger.info(f"[{request_id}] Converting with LibreOffice...")
+        stage_start = time.time()
+        output_dir = tmpdir_path / "output"
+        output_path = convert_document(input_path, output_dir, request.target_format)
+        timings["convert"] = int((time.time() - stage_start) * 1000)
+
+        # Extract style metadata if requested
+        style_meta = {}
+        if request.extract_styles and request.target_format == "html":
+            logger.info(f"[{request_id}] Extracting style metadata...")
+            stage_start = time.time()
+            style_meta = extract_style_metadata(output_path)
+            timings["style_extract"] = int((time.time() - stage_start) * 1000)
+
+        # Upload output to GCS
+        logger.info(f"[{request_id}] Uploading to GCS...")
+        stage_start = time.time()
+        upload_to_gcs(output_path, request.output_gcs_uri)
+        timings["upload"] = int((time.time() - stage_start) * 1000)
+
+        elapsed = time.time() - start_time
+        logger.info(f"[{request_id}] Conversion complete in {elapsed:.2f}s {timings}")
+
+        return {
+            "ok": True,
+            "request_id": request_id,
+            "input_gcs_uri": request.input_gcs_uri,
+            "output_gcs_uri": request.output_gcs_uri,
+            "target_format": request.target_format,
+            "output_size_bytes": output_path.stat().st_size,
+            "processing_time_seconds": round(elapsed, 2),
+            "timings_ms": timings,
+            "style_metadata": style_meta if style_meta else None
+        }
+
+
+class QueueFullError(RuntimeError):
+    """Raised when every worker is busy and the wait queue is full."""
+
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Conversion queue is full")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    """One queued conversion, shared by the sync and async /convert modes."""
+
+    id: str
+    request: ConversionRequest
+    created: float = field(default_factory=time.time)
+    status: str = "queued"  # queued | running | done | error
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    error_status: int = 500
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "ok": self.status != "error",
+            "job_id": self.id,
+            "status": self.status,
+            "target_format": self.request.target_format,
+            "queue_wait_ms": (
+                int((self.started - self.created) * 1000) if self.started is not None else None
+            ),
+        }
+        if self.result is not None:
+            data["result"] = self.result
+        if self.error is not None:
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """Run conversions on ``workers`` threads with ``depth`` waiting slots.
+
+    Admission is decided up front with a semaphore so a full queue is
+    rejected immediately instead of piling requests onto the instance.
+    """
+
+    def __init__(self, workers: int, depth: int) -> None:
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, depth)
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="lo-job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._last_success: Optional[float] = None
+        self._job_seconds_total = 0.0
+        self._stage_ms_total: Dict[str, int] = {stage: 0 for stage in STAGES}
+
+    def submit(self, request: ConversionRequest) -> Job:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(self.retry_after())
+        job = Job(id=uuid.uuid4().hex[:16], request=request)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self._queued += 1
+        try:
+            self._executor.submit(self._run, job)
+        except RuntimeError:
+            # Executor shut down during process exit
+            with self._lock:
+                self._queued -= 1
+                self._jobs.pop(job.id, None)
+            self._slots.release()
+            raise
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, from the average job time."""
+        with self._lock:
+            finished = self._completed + self._failed
+            average = self._job_seconds_total / finished if finished else float(TIMEOUT_SECONDS) / 4
+            ahead = self._queued + 1
+        return max(1, math.ceil(average * ahead / self.workers))
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "last_success_at": int(self._last_success) if self._last_success else None,
+                "tracked_jobs": len(self._jobs),
+                "avg_job_ms": int(self._job_seconds_total * 1000 / finished) if finished else None,
+                "avg_stage_ms": {
+                    stage: int(total / self._completed) if self._completed else None
+                    for stage, total in self._stage_ms_total.items()
+                },
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        job.started = time.time()
+        job.status = "running"
+        try:
+            job.result = run_conversion(job.request, job.id[:8])
+            job.status = "done"
+        except ValueError as e:
+            logger.error(f"[{job.id[:8]}] Validation error: {e}")
+            job.error, job.error_status, job.status = str(e), 400, "error"
+        except RuntimeError as e:
+            logger.error(f"[{job.id[:8]}] Conversion error: {e}")
+            job.error, job.error_status, job.status = str(e), 500, "error"
+        except Exception as e:
+            logger.exception(f"[{job.id[:8]}] Unexpected error")
+            job.error, job.error_status, job.status = f"Internal error: {type(e).__name__}", 500, "error"
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._running -= 1
+                self._job_seconds_total += job.finished - job.started
+                if job.status == "done":
+                    self._completed += 1
+                    self._last_success = job.finished
+                    for stage, ms in (job.result or {}).get("timings_ms", {}).items():
+                        if stage in self._stage_ms_total:
+                            self._stage_ms_total[stage] += ms
+                else:
+                    self._failed += 1
+            self._slots.release()
+            job.done.set()
+
+    def _prune(self) -> None:
+        """Forget expired or excess finished jobs, oldest first; caller holds the lock."""
+        cutoff = time.time() - JOB_TTL_SECONDS
+        excess = len(self._jobs) - MAX_TRACKED_JOBS
+        for job_id, job in list(self._jobs.items()):
+            if job.finished is None:
+                continue
+            if job.finished < cutoff or excess > 0:
+                del self._jobs[job_id]
+                excess -= 1
+
+
+def deep_check() -> Dict[str, Any]:
+    """Convert a one-line text file to HTML to prove soffice actually works."""
+    start_time = time.time()
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            input_path = tmpdir_path / "health.txt"
+            input_path.write_text("ok\n", "utf-8")
+            output_path = convert_document(input_path, tmpdir_path / "output", "html")
+            result = "ok" if output_path.stat().st_size > 0 else "empty_output"
+            return {"conversion": result, "conversion_ms": int((time.time() - start_time) * 1000)}
+    except Exception as e:
+        return {
+            "conversion": "error",
+            "error": html.escape(f"{type(e).__name__}: {e}"),
+            "conversion_ms": int((time.time() - start_time) * 1000),
+        }
+
+
+_job_queue: Optional[JobQueue] = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the shared conversion queue (created on first use)."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(WORKERS, QUEUE_DEPTH)
+            atexit.register(_job_queue.shutdown)
+        return _job_queue
+
+
 # =============================================================================
 # HTTP Handler
 # =============================================================================
@@ -261,16 +696,26 @@ class LibreOfficeHandler(BaseHTTPRequestHandler):
         """Use structured logging instead of default."""
         logger.info(f"{self.client_address[0]} - {format % args}")
 
-    def _json_response(self, data: dict, status: int = 200) -> None:
+    def _json_response(
+        self, data: dict, status: int = 200, headers: Optional[Dict[str, str]] = None
+    ) -> None:
         """Send JSON response."""
         body = json.dumps(data, indent=2).encode("utf-8")
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         self.end_headers()
         self.wfile.write(body)
 
-    def _error_response(self, message: str, status: int = 400, details: Any = None) -> None:
+    def _error_response(
+        self,
+        message: str,
+        status: int = 400,
+        details: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
         """Send error JSON response."""
         data = {
             "ok": False,
@@ -279,30 +724,48 @@ class LibreOfficeHandler(BaseHTTPRequestHandler):
         }
         if details:
             data["details"] = details
-        self._json_response(data, status)
+        self._json_response(data, status, headers)
+
+    def _health(self, capabilities: Dict[str, Any]) -> Dict[str, Any]:
+        """Health body from a capability snapshot plus live pool/queue state."""
+        return {
+            "ok": True,
+            "status": "healthy" if capabilities["available"] else "degraded",
+            "service": "tinyutils-libreoffice",
+            "version": "1.0.0",
+            "libreoffice": {
+                **capabilities,
+                "checked_age_seconds": round(time.time() - capabilities["checked_at"], 1),
+            },
+            "pool": get_pool().status() if POOL_SIZE > 0 else None,
+            "queue": get_job_queue().status(),
+            "config": {
+                "timeout_seconds": TIMEOUT_SECONDS,
+                "max_file_size_mb": MAX_FILE_SIZE_MB,
+                "port": PORT
+            }
+        }
 
     def do_GET(self) -> None:
         """Handle GET requests (health check)."""
         if self.path == "/health" or self.path == "/":
-            lo_available = is_libreoffice_available()
-            lo_version = get_libreoffice_version() if lo_available else None
-
-            self._json_response({
-                "ok": True,
-                "status": "healthy" if lo_available else "degraded",
-                "service": "tinyutils-libreoffice",
-                "version": "1.0.0",
-                "libreoffice": {
-                    "available": lo_available,
-                    "version": lo_version,
-                    "binary": SOFFICE_BIN
-                },
-                "config": {
-                    "timeout_seconds": TIMEOUT_SECONDS,
-                    "max_file_size_mb": MAX_FILE_SIZE_MB,
-                    "port": PORT
-                }
-            })
+            self._json_response(self._health(get_capabilities()))
+            return
+
+        if self.path == "/health/deep":
+            health = self._health(refresh_capabilities(force=True))
+            health["deep"] = deep_check() if health["libreoffice"]["available"] else None
+            if not health["deep"] or health["deep"]["conversion"] != "ok":
+                health["status"] = "degraded"
+            self._json_response(health, 200 if health["status"] == "healthy" else 503)
+            return
+
+        if self.path.startswith("/jobs/"):
+            job = get_job_queue().get(self.path[len("/jobs/"):])
+            if job is None:
+                self._error_response("Job not found or expired", 404)
+                return
+            self._json_response(job.to_dict())
             return
 
         self._error_response("Not found", 404)
@@ -330,87 +793,42 @@ class LibreOfficeHandler(BaseHTTPRequestHandler):
             self._error_response(f"Invalid JSON: {e}", 400)
             return
 
-        # Validate required fields
-        input_gcs_uri = payload.get("input_gcs_uri")
-        output_gcs_uri = payload.get("output_gcs_uri")
-        target_format = payload.get("target_format", "html")
-        extract_styles = payload.get("extract_styles", False)
-
-        if not input_gcs_uri:
-            self._error_response("Missing required field: input_gcs_uri", 400)
+        if not isinstance(payload, dict):
+            self._error_response("Request body must be a JSON object", 400)
             return
 
-        if not output_gcs_uri:
-            self._error_response("Missing required field: output_gcs_uri", 400)
+        try:
+            request = ConversionRequest.from_payload(payload)
+        except ValueError as e:
+            details = None
+            if str(e).startswith("Unsupported target format"):
+                details = {"allowed_formats": sorted(ALLOWED_FORMATS)}
+            self._error_response(str(e), 400, details)
             return
 
-        # Validate target format
-        allowed_formats = {"html", "pdf", "docx", "odt", "txt", "rtf", "epub"}
-        if target_format not in allowed_formats:
+        try:
+            job = get_job_queue().submit(request)
+        except QueueFullError as e:
+            logger.warning(f"Queue full, rejecting {request.input_gcs_uri} (retry in {e.retry_after}s)")
             self._error_response(
-                f"Unsupported target format: {target_format}",
-                400,
-                {"allowed_formats": list(allowed_formats)}
+                str(e), 429, get_job_queue().status(), {"Retry-After": str(e.retry_after)}
             )
             return
 
-        # Process conversion
-        request_id = str(uuid.uuid4())[:8]
-        start_time = time.time()
-        logger.info(f"[{request_id}] Starting conversion: {input_gcs_uri} -> {target_format}")
-
-        try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                tmpdir_path = Path(tmpdir)
-
-                # Extract and validate filename from GCS URI
-                # Security: validate_filename prevents path traversal attacks
-                _, blob_name = parse_gs_uri(input_gcs_uri)
-                input_filename = validate_filename(Path(blob_name).name)
-                input_path = tmpdir_path / input_filename
-
-                # Download input file
-                logger.info(f"[{request_id}] Downloading from GCS...")
-                download_from_gcs(input_gcs_uri, input_path)
-
-                # Convert document
-                logger.info(f"[{request_id}] Converting with LibreOffice...")
-                output_dir = tmpdir_path / "output"
-                output_path = convert_document(input_path, output_dir, target_format)
-
-                # Extract style metadata if requested
-                style_meta = {}
-                if extract_styles and target_format == "html":
-                    logger.info(f"[{request_id}] Extracting style metadata...")
-                    style_meta = extract_style_metadata(output_path)
-
-                # Upload output to GCS
-                logger.info(f"[{request_id}] Uploading to GCS...")
-                upload_to_gcs(output_path, output_gcs_uri)
-
-                elapsed = time.time() - start_time
-                logger.info(f"[{request_id}] Conversion complete in {elapsed:.2f}s")
-
-                self._json_response({
-                    "ok": True,
-                    "request_id": request_id,
-                    "input_gcs_uri": input_gcs_uri,
-                    "output_gcs_uri": output_gcs_uri,
-                    "target_format": target_format,
-                    "output_size_bytes": output_path.stat().st_size,
-                    "processing_time_seconds": round(elapsed, 2),
-                    "style_metadata": style_meta if style_meta else None
-                })
+        if payload.get("async"):
+            status_url = f"/jobs/{job.id}"
+            self._json_response(
+                {"ok": True, "job_id": job.id, "status": job.status, "status_url": status_url},
+                202,
+                {"Location": status_url},
+            )
+            return
 
-        except ValueError as e:
-            logger.error(f"[{request_id}] Validation error: {e}")
-            self._error_response(str(e), 400)
-        except RuntimeError as e:
-            logger.error(f"[{request_id}] Conversion error: {e}")
-            self._error_response(str(e), 500)
-        except Exception as e:
-            logger.exception(f"[{request_id}] Unexpected error")
-            self._error_response(f"Internal error: {type(e).__name__}", 500, str(e))
+        job.done.wait()
+        if job.status == "done" and job.result is not None:
+            self._json_response({**job.result, "queue_wait_ms": job.to_dict()["queue_wait_ms"]})
+        else:
+            self._error_response(job.error or "Conversion failed", job.error_status)
 
 
 # =============================================================================
@@ -427,18 +845,26 @@ def main() -> None:
     logger.info(f"LibreOffice binary: {SOFFICE_BIN}")
     logger.info(f"Timeout: {TIMEOUT_SECONDS}s")
     logger.info(f"Max file size: {MAX_FILE_SIZE_MB}MB")
-
-    # Check LibreOffice availability
-    if is_libreoffice_available():
-        version = get_libreoffice_version()
-        logger.info(f"LibreOffice: {version}")
+    logger.info(f"Workers: {WORKERS} (+{QUEUE_DEPTH} queued)")
+
+    # Check LibreOffice availability; /health serves this snapshot from now on
+    capabilities = refresh_capabilities()
+    if HEALTH_REFRESH_SECONDS > 0:
+        threading.Thread(target=_capability_refresher, name="capability-refresh", daemon=True).start()
+    if capabilities["available"]:
+        logger.info(f"LibreOffice: {capabilities['version']}")
+        pool = get_pool()
+        if pool is not None:
+            # Start listeners in the background so the port opens immediately.
+            threading.Thread(target=pool.warm, name="soffice-warm", daemon=True).start()
+            logger.info(f"LibreOffice pool: {POOL_SIZE} instance(s), restart after {POOL_MAX_JOBS} jobs")
     else:
         logger.warning("LibreOffice not found! Service will be degraded.")
 
     logger.info("=" * 60)
 
     # Start server
-    server = HTTPServer(("", PORT), LibreOfficeHandler)
+    server = ThreadingHTTPServer(("", PORT), LibreOfficeHandler)
     logger.info(f"Server listening on port {PORT}")
 
     try:
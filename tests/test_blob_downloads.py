@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api._lib import blob
+
+_PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+
+
+class _FileServer(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+    ranges: list = []
+    # Paths whose next full (non-Range) response is cut off halfway
+    truncate_once: set = set()
+    honour_range = True
+
+    def do_GET(self) -> None:  # noqa: N802
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        try:
+            self._serve(cls)
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def _serve(self, cls) -> None:
+        if self.path == "/huge":
+            self.send_response(200)
+            self.send_header("Content-Length", str(10 * 1024 * 1024 * 1024))
+            self.end_headers()
+            self.close_connection = True
+            return
+
+        range_header = self.headers.get("Range")
+        match = re.fullmatch(r"bytes=(\d+)-", range_header or "")
+        cls.ranges.append(range_header)
+        if match and cls.honour_range:
+            start = int(match.group(1))
+            body = _PAYLOAD[start:]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(_PAYLOAD) - 1}/{len(_PAYLOAD)}")
+        else:
+            body = _PAYLOAD
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.path in cls.truncate_once:
+            cls.truncate_once.discard(self.path)
+            self.wfile.write(body[: len(body) // 2])
+            self.close_connection = True
+            return
+        time.sleep(0.05)
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def file_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FileServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _FileServer.peak = _FileServer.in_flight = 0
+    _FileServer.ranges, _FileServer.truncate_once = [], set()
+    _FileServer.honour_range = True
+    monkeypatch.setattr(blob, "DOWNLOAD_RETRY_BACKOFF_SECONDS", 0.0)
+    yield _FileServer, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("honour_range", [True, False])
+def test_download_resumes_after_truncated_body(file_server, tmp_path, honour_range) -> None:
+    server, base = file_server
+    server.truncate_once = {"/doc.bin"}
+    server.honour_range = honour_range
+    target = tmp_path / "doc.bin"
+
+    size, content_type = blob.download_to_path(f"{base}/doc.bin", target)
+
+    assert size == len(_PAYLOAD)
+    assert target.read_bytes() == _PAYLOAD
+    assert content_type == "application/octet-stream"
+    assert server.ranges[0] is None
+    assert server.ranges[1] == f"bytes={len(_PAYLOAD) // 2}-"
+
+
+def test_download_aborts_on_announced_size(file_server, tmp_path) -> None:
+    _, base = file_server
+    with pytest.raises(blob.DownloadTooLargeError):
+        blob.download_to_path(f"{base}/huge", tmp_path / "huge", max_bytes=1024 * 1024)
+    with pytest.raises(blob.DownloadTooLargeError):
+        blob.download_to_path("data:text/plain,abcdef", tmp_path / "small", max_bytes=3)
+
+
+def test_download_manager_respects_byte_budget(file_server, tmp_path) -> None:
+    server, base = file_server
+    reserved = []
+
+    with blob.DownloadManager(max_workers=4, budget_bytes=2 * len(_PAYLOAD)) as downloads:
+        budget = downloads.budget
+        acquire = budget.acquire
+
+        def _tracking_acquire(size, abort=None):
+            amount = acquire(size, abort)
+            reserved.append(budget.capacity - budget._available)
+            return amount
+
+        budget.acquire = _tracking_acquire
+        futures = [downloads.submit(f"{base}/f{i}", tmp_path / f"f{i}") for i in range(6)]
+        results = [future.result() for future in futures]
+
+    assert [size for size, _ in results] == [len(_PAYLOAD)] * 6
+    assert all((tmp_path / f"f{i}").read_bytes() == _PAYLOAD for i in range(6))
+    assert len(reserved) == 6 and max(reserved) <= 2 * len(_PAYLOAD)
+    assert server.peak > 1
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from api._lib import blob
+from api._lib.multipart import parse_multipart_form
+from convert_backend import artifact_store
+
+
+class _BlobServer(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+    failures_left: dict = {}
+    received: dict = {}
+
+    def do_POST(self) -> None:  # noqa: N802
+        cls = type(self)
+        form = parse_multipart_form(self.headers, self.rfile)
+        upload = form["file"][0]
+        with cls.lock:
+            cls.in_flight += 1
+            cls.peak = max(cls.peak, cls.in_flight)
+        time.sleep(0.05)
+        with cls.lock:
+            cls.in_flight -= 1
+            fail = cls.failures_left.get(len(upload), 0)
+            if fail:
+                cls.failures_left[len(upload)] = fail - 1
+            else:
+                cls.received[len(upload)] = upload
+        if fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps({"url": f"https://blob.test/{len(upload)}"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture()
+def blob_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BlobServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _BlobServer.peak = _BlobServer.in_flight = 0
+    _BlobServer.failures_left, _BlobServer.received = {}, {}
+    monkeypatch.setenv("BLOB_READ_WRITE_TOKEN", "test-token\n")
+    monkeypatch.setattr(blob, "BLOB_UPLOAD_URL", f"http://127.0.0.1:{server.server_port}/")
+    monkeypatch.setattr(blob, "UPLOAD_RETRY_BACKOFF_SECONDS", 0.0)
+    yield _BlobServer
+    server.shutdown()
+
+
+def test_upload_many_runs_concurrently_and_retries(blob_server, monkeypatch) -> None:
+    monkeypatch.setattr(blob, "UPLOAD_CONCURRENCY", 3)
+    items = [(f"f{i}.bin", bytes([i]) * (i + 1), "application/octet-stream") for i in range(6)]
+    blob_server.failures_left = {3: 2}  # third item fails twice with 503
+
+    urls = blob.upload_many(items)
+
+    assert urls == [f"https://blob.test/{i + 1}" for i in range(6)]
+    assert blob_server.received == {len(data): data for _, data, _ in items}
+    assert 1 < blob_server.peak <= 3
+
+
+def test_fallbacks_without_token(monkeypatch) -> None:
+    monkeypatch.delenv("BLOB_READ_WRITE_TOKEN", raising=False)
+    monkeypatch.setattr(blob, "INLINE_MAX_BYTES", 4)
+    stored = []
+
+    def overflow(name: str, data: bytes, content_type: str) -> str:
+        stored.append(name)
+        return f"/api/convert/artifacts/{name}"
+
+    urls = blob.upload_many([("a.txt", b"abc", "text/plain"), ("b.txt", b"abcdef", "text/plain")], overflow=overflow)
+    assert urls == ["data:text/plain;base64,YWJj", "/api/convert/artifacts/b.txt"]
+    assert stored == ["b.txt"]
+    # Without an overflow store large artifacts are still inlined
+    assert blob.upload_bytes("b.txt", b"abcdef", "text/plain").startswith("data:text/plain;base64,")
+
+
+def test_artifact_store_round_trip_and_prune(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(artifact_store, "ARTIFACT_DIR", tmp_path)
+    monkeypatch.setattr(artifact_store, "MAX_BYTES", 10)
+
+    first = artifact_store.put("a.pdf", b"123456", "application/pdf")
+    artifact_id = first.rsplit("/", 1)[1]
+    stored = artifact_store.get(artifact_id)
+    assert first.startswith("/api/convert/artifacts/")
+    assert stored is not None and stored.path.read_bytes() == b"123456"
+    assert (stored.name, stored.content_type, stored.size) == ("a.pdf", "application/pdf", 6)
+    assert artifact_store.get("../etc/passwd") is None
+
+    # Exceeding the byte budget evicts the oldest artifact
+    second = artifact_store.put("b.pdf", b"abcdef", "application/pdf")
+    assert artifact_store.get(artifact_id) is None
+    assert artifact_store.get(second.rsplit("/", 1)[1]) is not None
+
+    artifact_store.prune(now=time.time() + artifact_store.TTL_SECONDS + 1)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_artifact_store_prunes_on_an_interval_or_over_budget(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(artifact_store, "ARTIFACT_DIR", tmp_path)
+    monkeypatch.setattr(artifact_store, "MAX_BYTES", 100)
+    monkeypatch.setattr(artifact_store, "PRUNE_INTERVAL_SECONDS", 3600)
+    monkeypatch.setattr(artifact_store, "_approx_bytes", 0)
+    monkeypatch.setattr(artifact_store, "_last_prune", time.time())
+    prunes = []
+    real_prune = artifact_store.prune
+    monkeypatch.setattr(artifact_store, "prune", lambda now=None: prunes.append(now) or real_prune(now))
+
+    for idx in range(5):
+        artifact_store.put(f"{idx}.txt", b"x" * 10, "text/plain")
+    assert prunes == []  # under budget and inside the interval: no directory scans
+
+    artifact_store.put("big.txt", b"x" * 60, "text/plain")
+    assert len(prunes) == 1
+    assert artifact_store._approx_bytes <= 100
+
+    monkeypatch.setattr(artifact_store, "_last_prune", time.time() - 3600)
+    artifact_store.put("late.txt", b"x", "text/plain")
+    assert len(prunes) == 2
+
+
+def test_trusted_proxies_are_matched_by_address(monkeypatch) -> None:
+    monkeypatch.setattr(artifact_store, "TRUSTED_PROXIES", artifact_store._parse_networks("10.0.0.0/8, ::1, bogus"))
+
+    assert artifact_store.is_trusted_proxy("10.1.2.3")
+    assert artifact_store.is_trusted_proxy("::1")
+    assert not artifact_store.is_trusted_proxy("192.168.1.1")
+    assert not artifact_store.is_trusted_proxy("testclient")
+    assert not artifact_store.is_trusted_proxy(None)
+
+
+def test_public_base_url_ignores_forwarded_host_from_untrusted_peers(monkeypatch) -> None:
+    app_module = pytest.importorskip("convert_backend.app")
+    from starlette.requests import Request
+
+    def _request(peer, headers):
+        return Request({
+            "type": "http",
+            "scheme": "http",
+            "server": ("internal", 8080),
+            "client": (peer, 1234),
+            "path": "/",
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+        })
+
+    forwarded = {"host": "internal:8080", "x-forwarded-host": "evil.example", "x-forwarded-proto": "https"}
+    monkeypatch.setattr(artifact_store, "TRUSTED_PROXIES", artifact_store._parse_networks("10.0.0.1"))
+
+    assert app_module._public_base_url(_request("203.0.113.9", forwarded)) == ""
+    assert app_module._public_base_url(_request("10.0.0.1", forwarded)) == "https://evil.example"
+    bad = {**forwarded, "x-forwarded-host": "a.example/@evil"}
+    assert app_module._public_base_url(_request("10.0.0.1", bad)) == ""
+    assert app_module._public_base_url(None) == ""
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import io
+import re
+import threading
+import zipfile
+
+import pytest
+
+from api._lib.bulk_replace_engine import (
+    CHARDET_AVAILABLE,
+    MemberSkipped,
+    decode_member,
+    encoding_key,
+    iter_member_results,
+    iter_zip_chunks,
+)
+
+
+def _archive(members: dict) -> zipfile.ZipFile:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return zipfile.ZipFile(buffer)
+
+
+def _replace_foo(text: str):
+    text, count = re.subn("foo", "bar", text)
+    return text, [count]
+
+
+MEMBERS = {
+    **{f"src/file{i:03d}.txt": f"foo {i}\nfoo again\n".encode() for i in range(40)},
+    "img/logo.png": b"\x89PNG\x00\x01",
+    "../evil.txt": b"foo",
+    "docs/latin.txt": "café foo".encode("latin-1"),
+}
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_results_follow_archive_order(workers) -> None:
+    archive = _archive(MEMBERS)
+    results = list(iter_member_results(archive, _replace_foo, keep_text=True, workers=workers, window_bytes=64))
+
+    assert [r.info.filename for r in results] == list(MEMBERS)
+    by_name = {r.info.filename: r for r in results}
+    first = by_name["src/file000.txt"]
+    assert (first.changed, first.match_count, first.data) == (True, 2, b"bar 0\nbar again\n")
+    assert first.rule_hits == [2]
+    assert first.original_text == "foo 0\nfoo again\n"
+    assert by_name["img/logo.png"].skipped == "binary file"
+    assert by_name["img/logo.png"].data == MEMBERS["img/logo.png"]
+    assert by_name["../evil.txt"].skipped == "unsafe path"
+    assert by_name["../evil.txt"].entry() is None
+    assert by_name["docs/latin.txt"].encoding != "utf-8"
+
+
+def test_window_bounds_members_in_flight() -> None:
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+    gate = threading.Event()
+
+    def transform(text: str):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        gate.wait(0.01)
+        with lock:
+            state["active"] -= 1
+        return text, [0]
+
+    archive = _archive({f"f{i}.txt": b"x" * 1000 for i in range(20)})
+    # A window of 2 KB admits two 1 KB members at a time despite 4 workers
+    results = list(iter_member_results(archive, transform, workers=4, window_bytes=2000))
+    assert len(results) == 20
+    assert state["peak"] <= 2
+
+
+def test_transform_errors_propagate() -> None:
+    def transform(text: str):
+        raise re.error("boom")
+
+    with pytest.raises(re.error):
+        list(iter_member_results(_archive({"a.txt": b"a", "b.txt": b"b"}), transform, workers=2))
+
+
+def test_zip_chunks_stream_a_valid_archive() -> None:
+    entries = [(f"out/{i}.txt", f"line {i}\n".encode() * 200) for i in range(5)]
+    chunks = iter_zip_chunks(iter(entries))
+
+    first = next(chunks)
+    assert first.startswith(b"PK\x03\x04")  # first member is out before the rest are built
+    data = first + b"".join(chunks)
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        assert [(name, archive.read(name)) for name in archive.namelist()] == entries
+
+
+def test_member_skipped_keeps_original_bytes() -> None:
+    def transform(text: str):
+        if "slow" in text:
+            raise MemberSkipped("regex timeout")
+        return text.upper(), [1]
+
+    archive = _archive({"a.txt": b"slow text", "b.txt": b"fast"})
+    results = list(iter_member_results(archive, transform, workers=2))
+
+    assert results[0].skipped == "regex timeout"
+    assert results[0].entry() == (results[0].info, b"slow text")
+    assert results[1].entry() == ("b.txt", b"FAST")
+
+
+def test_edits_from_the_transform_are_kept() -> None:
+    def transform(text: str):
+        return "X" + text[1:], [1], [(0, 1, "X")]
+
+    (result,) = iter_member_results(_archive({"a.txt": b"abc"}), transform, workers=1)
+    assert (result.data, result.edits) == (b"Xbc", [(0, 1, "X")])
+
+
+def test_decode_member_uses_the_cheapest_layer() -> None:
+    assert decode_member(b"")[1].method == "empty"
+    text, detection = decode_member("caf\u00e9".encode("utf-8"))
+    assert (text, detection.encoding, detection.method) == ("caf\u00e9", "utf-8", "utf-8")
+    text, detection = decode_member("h\u00e9llo".encode("utf-16"))
+    assert (text, detection.encoding, detection.method) == ("h\u00e9llo", "utf-16", "bom")
+    assert detection.seconds >= 0
+
+
+@pytest.mark.skipif(not CHARDET_AVAILABLE, reason="chardet not installed")
+def test_detected_encoding_is_reused_within_a_folder() -> None:
+    raw = ("Ceci est un caf\u00e9 tr\u00e8s \u00e9l\u00e9gant. " * 200).encode("latin-1")
+    cache: dict = {}
+
+    names = ("docs/a.txt", "docs/b.txt", "src/c.txt")
+    methods = [decode_member(raw, cache, encoding_key(name))[1].method for name in names]
+    assert methods == ["chardet", "cached", "chardet"]
+
+
+@pytest.mark.skipif(not CHARDET_AVAILABLE, reason="chardet not installed")
+def test_encoding_reuse_follows_archive_order_on_the_pool() -> None:
+    # The first member is slow to detect; later ones must still reuse its encoding
+    members = {"docs/big.txt": ("Ceci est un caf\u00e9 tr\u00e8s \u00e9l\u00e9gant. " * 4000).encode("latin-1")}
+    members.update({f"docs/small{i}.txt": "na\u00efve \u00e0 foo".encode("latin-1") for i in range(6)})
+    archive = _archive(members)
+
+    serial = [(r.encoding, r.detection.method) for r in iter_member_results(archive, _replace_foo, workers=1)]
+    pooled = [(r.encoding, r.detection.method) for r in iter_member_results(archive, _replace_foo, workers=4)]
+
+    assert pooled == serial
+    assert [method for _, method in pooled] == ["chardet"] + ["cached"] * 6
+
+
+def test_utf16_members_with_bom_are_text() -> None:
+    archive = _archive({"notes.txt": "foo bar".encode("utf-16")})
+    (result,) = iter_member_results(archive, _replace_foo, workers=1)
+
+    assert result.skipped is None
+    assert (result.data, result.detection.method) == (b"bar bar", "bom")
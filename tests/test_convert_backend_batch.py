@@ -0,0 +1,179 @@
+"""Tests for convert_batch fan-out, ordering and per-input deadlines."""
+from __future__ import annotations
+
+import os
+import time
+
+import pytest
+
+from convert_backend import convert_service as conv_service
+from convert_backend.convert_service import convert_batch
+from convert_backend.convert_types import ConversionResult, InputPayload
+
+
+def _payloads(count: int) -> list[InputPayload]:
+    return [
+        InputPayload(name=f"doc-{idx}.md", data=f"# Heading {idx}\n\nBody {idx}\n".encode("utf-8"))
+        for idx in range(count)
+    ]
+
+
+def _hanging_convert(payload, targets, from_format, options, preview=True):
+    # Module level so a process pool can pickle it; records the worker pid
+    if payload.name == "hang.md":
+        with open(payload.data, "w", encoding="utf-8") as handle:
+            handle.write(str(os.getpid()))
+        time.sleep(60)
+    return ConversionResult(name=payload.name, logs=["fake=1"])
+
+
+def test_batch_results_follow_input_order_in_pool() -> None:
+    inputs = _payloads(4)
+    batch = convert_batch(inputs=inputs, targets=["md"], from_format="markdown", max_workers=3)
+
+    assert [result.name for result in batch.results] == [p.name for p in inputs]
+    for idx, result in enumerate(batch.results):
+        assert result.error is None
+        assert f"Heading {idx}" in result.outputs[0].data.decode("utf-8")
+
+    executor_logs = [entry for entry in batch.logs if entry.startswith("batch_executor=")]
+    assert executor_logs and "workers=3" in executor_logs[0]
+    # Per-input logs are merged with the payload name prefix, in input order.
+    first_seen = [
+        next(i for i, entry in enumerate(batch.logs) if entry.startswith(f"{p.name}:"))
+        for p in inputs
+    ]
+    assert first_seen == sorted(first_seen)
+
+
+def test_batch_single_worker_runs_sequentially() -> None:
+    batch = convert_batch(inputs=_payloads(2), targets=["md"], from_format="markdown", max_workers=1)
+
+    assert "batch_executor=sequential" in batch.logs
+    assert all(result.error is None for result in batch.results)
+
+
+def test_batch_timeout_is_isolated_per_input(monkeypatch) -> None:
+    def _fake_convert(payload, targets, from_format, options, preview=True):
+        if payload.name == "slow.md":
+            time.sleep(2)
+        return ConversionResult(name=payload.name, logs=["fake=1"])
+
+    monkeypatch.setattr(conv_service, "_BATCH_EXECUTOR_KIND", "thread")
+    monkeypatch.setattr(conv_service, "_convert_payload", _fake_convert)
+
+    inputs = [
+        InputPayload(name="fast-a.md", data=b"a"),
+        InputPayload(name="slow.md", data=b"b"),
+        InputPayload(name="fast-b.md", data=b"c"),
+    ]
+    batch = convert_batch(inputs=inputs, targets=["md"], max_workers=3, timeout_s=0.3)
+
+    assert [result.name for result in batch.results] == ["fast-a.md", "slow.md", "fast-b.md"]
+    assert batch.results[0].error is None
+    assert batch.results[2].error is None
+    assert batch.results[1].error is not None
+    assert batch.results[1].error.kind == "TimeoutError"
+    assert "batch_timeouts=1" in batch.logs
+
+
+def test_abandoned_input_does_not_eat_the_next_deadline(monkeypatch) -> None:
+    def _fake_convert(payload, targets, from_format, options, preview=True):
+        time.sleep(1.0 if payload.name == "slow.md" else 0.05)
+        return ConversionResult(name=payload.name, logs=["fake=1"])
+
+    monkeypatch.setattr(conv_service, "_BATCH_EXECUTOR_KIND", "thread")
+    monkeypatch.setattr(conv_service, "_convert_payload", _fake_convert)
+
+    inputs = [
+        InputPayload(name="slow.md", data=b"a"),
+        InputPayload(name="fast-a.md", data=b"b"),
+        InputPayload(name="fast-b.md", data=b"c"),
+    ]
+    logs: list[str] = []
+    results = conv_service._convert_payloads_in_pool(
+        inputs, ["md"], None, conv_service.ConversionOptions(),
+        preview=True, workers=1, timeout_s=0.3, batch_logs=logs,
+    )
+
+    assert [result.error.kind if result.error else None for result in results] == ["TimeoutError", None, None]
+    assert "batch_executor_recycled=1" in logs
+
+
+def test_batch_accepts_lazily_arriving_inputs(monkeypatch) -> None:
+    pulled = []
+
+    def _fake_convert(payload, targets, from_format, options, preview=True):
+        return ConversionResult(name=payload.name, logs=[f"pulled_before={len(pulled)}"])
+
+    def _arrivals():
+        for payload in _payloads(3):
+            pulled.append(payload.name)
+            yield payload
+
+    monkeypatch.setattr(conv_service, "_BATCH_EXECUTOR_KIND", "thread")
+    monkeypatch.setattr(conv_service, "_convert_payload", _fake_convert)
+
+    batch = convert_batch(inputs=_arrivals(), targets=["md"], max_workers=1, timeout_s=5)
+
+    assert [result.name for result in batch.results] == ["doc-0.md", "doc-1.md", "doc-2.md"]
+    assert "inputs=3" in batch.logs
+    # With one worker the first input converts before the third is pulled
+    assert batch.results[0].logs == ["pulled_before=1"]
+
+
+def test_failed_future_becomes_a_per_input_error(monkeypatch) -> None:
+    def _fake_convert(payload, targets, from_format, options, preview=True):
+        if payload.name == "doc-1.md":
+            raise RuntimeError("cannot pickle result")
+        return ConversionResult(name=payload.name, logs=["fake=1"])
+
+    monkeypatch.setattr(conv_service, "_BATCH_EXECUTOR_KIND", "thread")
+    monkeypatch.setattr(conv_service, "_convert_payload", _fake_convert)
+
+    batch = convert_batch(inputs=_payloads(3), targets=["md"], max_workers=2)
+
+    assert [result.error.kind if result.error else None for result in batch.results] == [
+        None,
+        "RuntimeError",
+        None,
+    ]
+
+
+def test_process_pool_terminates_timed_out_workers(monkeypatch, tmp_path) -> None:
+    pid_file = tmp_path / "worker.pid"
+    monkeypatch.setattr(conv_service, "_BATCH_EXECUTOR_KIND", "process")
+    monkeypatch.setattr(conv_service, "_convert_payload", _hanging_convert)
+
+    inputs = [
+        InputPayload(name="hang.md", data=str(pid_file).encode("utf-8")),
+        InputPayload(name="fast-a.md", data=b"a"),
+        InputPayload(name="fast-b.md", data=b"b"),
+    ]
+    logs: list[str] = []
+    started = time.monotonic()
+    results = conv_service._convert_payloads_in_pool(
+        inputs, ["md"], None, conv_service.ConversionOptions(),
+        preview=True, workers=2, timeout_s=1.0, batch_logs=logs,
+    )
+
+    if not any(entry.startswith("batch_executor=process") for entry in logs):
+        pytest.skip("process pools are unavailable here")
+    assert time.monotonic() - started < 10
+    assert [result.error.kind if result.error else None for result in results] == ["TimeoutError", None, None]
+    assert "batch_executor_recycled=1" in logs
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
+
+
+def test_process_pool_workers_skip_warm_helper_pools(monkeypatch) -> None:
+    from api._lib import pandoc_server
+    from convert_backend import libreoffice_converter
+
+    monkeypatch.setattr(libreoffice_converter, "_POOL_SIZE", 1)
+    monkeypatch.setattr(pandoc_server, "SERVER_MODE", "local")
+
+    conv_service._init_batch_worker()
+
+    assert libreoffice_converter.get_pool() is None
+    assert pandoc_server.SERVER_MODE == "off"
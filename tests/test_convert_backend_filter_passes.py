@@ -0,0 +1,43 @@
+"""Tests for fusing the Lua filter pass into the initial pandoc conversion."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from api._lib import pandoc_runner
+from convert_backend import convert_service as conv_service
+from convert_backend.convert_service import convert_one
+
+
+FIXTURE_DIR = Path(__file__).resolve().parents[1] / "tests" / "fixtures" / "converter"
+LISTS_FIXTURE = FIXTURE_DIR / "lists_sample.docx"
+
+pytestmark = pytest.mark.skipif(not pandoc_runner.is_pandoc_available(), reason="pandoc not installed")
+
+
+def _markdown(result) -> str:
+    return next(art for art in result.outputs if art.target == "md").data.decode("utf-8")
+
+
+def test_filters_run_in_a_second_pass_by_default() -> None:
+    data = LISTS_FIXTURE.read_bytes()
+
+    result = convert_one(input_bytes=data, name=LISTS_FIXTURE.name, targets=["md"], preview=False)
+
+    assert result.error is None
+    assert "pandoc_passes=2" in result.logs
+
+
+def test_non_preview_conversion_uses_single_pandoc_pass(monkeypatch) -> None:
+    monkeypatch.setattr(conv_service, "_SINGLE_PASS_FILTERS", True)
+    data = LISTS_FIXTURE.read_bytes()
+
+    fused = convert_one(input_bytes=data, name=LISTS_FIXTURE.name, targets=["md"], preview=False)
+    two_pass = convert_one(input_bytes=data, name=LISTS_FIXTURE.name, targets=["md"], preview=True)
+
+    assert fused.error is None and two_pass.error is None
+    assert "pandoc_passes=1" in fused.logs
+    assert not any(entry.startswith("stage_raw_md_bytes=") for entry in fused.logs)
+    assert "pandoc_passes=2" in two_pass.logs
+    assert _markdown(fused) == _markdown(two_pass)
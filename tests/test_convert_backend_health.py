@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import subprocess
+import time
+
+import pytest
+
+app_module = pytest.importorskip("convert_backend.app")
+
+
+class _FakeRunner:
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def ensure_pandoc(self) -> str:
+        return self.path
+
+
+@pytest.fixture
+def pandoc(tmp_path, monkeypatch):
+    """A fake pandoc binary whose ``--version`` calls are counted."""
+
+    binary = tmp_path / "pandoc"
+    binary.write_text("#!/bin/sh\n")
+    calls = []
+
+    def _run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 0, stdout="pandoc 3.1.11\nFeatures: +server\n", stderr="")
+
+    monkeypatch.setattr(app_module, "_get_pandoc_runner", lambda: _FakeRunner(str(binary)))
+    monkeypatch.setattr(app_module.subprocess, "run", _run)
+    monkeypatch.setattr(app_module, "_pandoc_version_probe", None)
+    monkeypatch.setattr(app_module, "_capabilities", None)
+    monkeypatch.setattr(app_module, "_capabilities_refreshing", False)
+    return binary, calls
+
+
+def test_snapshot_shape(pandoc) -> None:
+    binary, _ = pandoc
+    snapshot = app_module._refresh_capabilities()
+
+    assert set(snapshot) == {"diagnostics", "errors", "checkedAt"}
+    assert "pandoc" not in snapshot["errors"]
+    diagnostics = snapshot["diagnostics"]
+    assert diagnostics["pandocPath"] == str(binary)
+    assert (diagnostics["pandocExitCode"], diagnostics["pandocVersion"]) == (0, "pandoc 3.1.11")
+
+    payload, status = app_module._health_payload(snapshot)
+    assert (status, payload["status"]) == ((200, "ok") if not snapshot["errors"] else (503, "degraded"))
+    assert {"checkedAt", "checkedAgeSeconds", "lastSuccessfulConversionAt"} <= set(payload)
+
+
+def test_refresh_reuses_the_version_until_the_binary_changes(pandoc) -> None:
+    binary, calls = pandoc
+    app_module._refresh_capabilities()
+    again = app_module._refresh_capabilities()
+    assert len(calls) == 1
+    assert again["diagnostics"]["pandocVersion"] == "pandoc 3.1.11"
+
+    app_module._refresh_capabilities(force=True)
+    assert len(calls) == 2
+
+    binary.write_text("#!/bin/sh\n# upgraded\n")
+    app_module._refresh_capabilities()
+    assert len(calls) == 3
+
+
+def test_stale_snapshot_is_served_while_refreshing_in_background(pandoc, monkeypatch) -> None:
+    stale = {"diagnostics": {"pandocVersion": "old"}, "errors": [], "checkedAt": time.time() - 3600}
+    monkeypatch.setattr(app_module, "_capabilities", stale)
+    refreshed = []
+    monkeypatch.setattr(app_module, "_refresh_capabilities", lambda force=False: refreshed.append(force))
+
+    assert app_module._capabilities_snapshot() is stale
+    deadline = time.monotonic() + 5
+    while not refreshed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert refreshed == [False]
+
+    # A refresh is already in flight, so a second stale read does not start another
+    assert app_module._capabilities_snapshot() is stale
+    time.sleep(0.05)
+    assert refreshed == [False]
+
+    payload, _ = app_module._health_payload(stale)
+    assert payload["checkedAgeSeconds"] >= 3600
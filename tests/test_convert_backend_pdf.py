@@ -317,6 +317,55 @@ def test_pdf_to_html_quality() -> None:
     assert "<" in html_text and ">" in html_text, "should have HTML tags"
 
 
+@pytest.mark.skipif(conv_service.pdfplumber is None, reason="pdfplumber not installed")
+def test_pdf_table_detection_opens_document_once(tmp_path, monkeypatch) -> None:
+    """Table detection should reuse one pdfplumber handle for every page."""
+    opened = []
+    real_open = conv_service.pdfplumber.open
+
+    def _counting_open(*args, **kwargs):
+        opened.append(args)
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(conv_service.pdfplumber, "open", _counting_open)
+    _, meta = conv_service._extract_markdown_from_pdf(PDF_FIXTURE, tmp_path)
+
+    assert len(opened) == 1
+    timings = meta["timings_ms"]
+    assert len(timings["pages"]) == meta["pages_count"]
+    assert timings["tables"] <= timings["total"]
+
+
+def test_pdf_page_selection_parsing() -> None:
+    """Page specs map to 0-based membership and reject malformed ranges."""
+    selection = conv_service._parse_page_selection("2-3, 7-", start_page=3)
+    assert [i for i in range(10) if i in selection] == [2, 6, 7, 8, 9]
+    assert selection.last_page is None
+    assert conv_service._parse_page_selection("1,4-5").last_page == 5
+    assert conv_service._parse_page_selection(None) is None
+    for bad in ("0-2", "5-3", "two", "1-2-3"):
+        with pytest.raises(ValueError):
+            conv_service._parse_page_selection(bad)
+
+
+@pytest.mark.skipif(not PDF_FIXTURE.exists(), reason="PDF fixture missing")
+def test_pdf_extraction_size_budget_returns_partial(tmp_path, monkeypatch) -> None:
+    """Hitting the size budget keeps written pages and reports a resume cursor."""
+    pytest.importorskip("pdfminer")
+    monkeypatch.setattr(conv_service, "PDF_EXTRACT_MAX_CHARS", 1)
+    md_path, meta = conv_service._extract_markdown_from_pdf(PDF_FIXTURE, tmp_path)
+
+    assert meta["pages_count"] >= 1
+    if meta["partial"]:
+        assert meta["stopped_reason"] == "size_budget"
+        assert meta["next_page"] == meta["pages_count"] + 1
+        _, rest = conv_service._extract_markdown_from_pdf(
+            PDF_FIXTURE, tmp_path, start_page=meta["next_page"]
+        )
+        assert rest["start_page"] == meta["next_page"]
+    assert md_path.read_text("utf-8")
+
+
 
 
 def test_docx_to_html_basic_structure() -> None:
@@ -0,0 +1,295 @@
+"""Tests for the two-tier conversion result cache."""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from convert_backend import convert_service as conv_service
+from convert_backend import result_cache
+from convert_backend.convert_types import (
+    ConversionResult,
+    MediaArtifact,
+    PreviewData,
+    TargetArtifact,
+)
+
+
+def _result(name: str = "doc.md", payload: bytes = b"# Hi\n") -> ConversionResult:
+    return ConversionResult(
+        name=name,
+        outputs=[
+            TargetArtifact(target="md", name="doc.md", content_type="text/markdown", data=payload),
+            TargetArtifact(target="html", name="doc.html", content_type="text/html", data=b"<h1>Hi</h1>"),
+        ],
+        preview=PreviewData(headings=["Hi"], snippets=[{"before": "a", "after": "b"}], approxBytes=5),
+        media=MediaArtifact(name="media.zip", content_type="application/zip", data=b"PK\x03\x04"),
+        logs=["pandoc_passes=1"],
+    )
+
+
+def test_encode_decode_round_trip() -> None:
+    original = _result()
+    decoded = result_cache.decode_result(result_cache.encode_result(original))
+
+    assert decoded == original
+    assert decoded.outputs[0] is not original.outputs[0]
+
+
+def test_decode_rejects_truncated_blob() -> None:
+    blob = result_cache.encode_result(_result())
+    with pytest.raises(ValueError):
+        result_cache.decode_result(blob[:-2])
+
+
+def test_memory_tier_is_byte_budgeted() -> None:
+    blob_size = len(result_cache.encode_result(_result(payload=b"x" * 1000)))
+    cache = result_cache.ResultCache(memory_max_bytes=blob_size * 2 + 10, memory_max_entries=100, ttl_s=0)
+
+    for idx in range(3):
+        cache.put(f"k{idx}", _result(payload=b"x" * 1000))
+
+    status = cache.status()
+    assert status["memoryEntries"] == 2
+    assert status["memoryBytes"] <= status["memoryMaxBytes"]
+    assert status["evictions"] == 1
+    assert cache.get("k0") is None
+    assert cache.get("k2") is not None
+    assert cache.status()["misses"] == 1
+
+
+def test_memory_tier_expires_entries() -> None:
+    cache = result_cache.ResultCache(memory_max_bytes=1 << 20, ttl_s=0.05)
+    cache.put("k", _result())
+    time.sleep(0.1)
+
+    assert cache.get("k") is None
+
+
+@pytest.mark.parametrize("backend", ["disk", "sqlite"])
+def test_persistent_store_backs_memory_tier(tmp_path, backend) -> None:
+    if backend == "disk":
+        store = result_cache.DiskStore(tmp_path / "blobs", max_bytes=1 << 20, ttl_s=0)
+    else:
+        store = result_cache.SqliteStore(tmp_path / "cache.sqlite3", max_bytes=1 << 20, ttl_s=0)
+    cache = result_cache.ResultCache(memory_max_bytes=1 << 20, store=store, ttl_s=0)
+    key = "ab" + "0" * 62
+
+    cache.put(key, _result())
+    cache.clear_memory()
+    restored = cache.get(key)
+
+    assert restored == _result()
+    assert cache.status()["storeHits"] == 1
+    # Promoted back into memory on the store hit.
+    assert cache.get(key) is not None
+    assert cache.status()["memoryHits"] == 1
+    if backend == "disk":
+        assert (tmp_path / "blobs" / "ab" / key).exists()
+
+
+def test_disk_store_prunes_least_recent_over_budget(tmp_path) -> None:
+    blob = b"x" * 400
+    store = result_cache.DiskStore(tmp_path, max_bytes=1000, ttl_s=0)
+    store.put("aa1", blob)
+    store.put("bb2", blob)
+    old = time.time() - 60
+    os.utime(tmp_path / "aa" / "aa1", (old, old))
+
+    evicted = store.put("cc3", blob)
+
+    assert evicted == 1
+    assert store.get("aa1") is None
+    assert store.get("cc3") == blob
+
+
+@pytest.mark.parametrize("backend", ["disk", "sqlite"])
+def test_store_hits_do_not_extend_the_ttl(tmp_path, backend) -> None:
+    if backend == "disk":
+        store = result_cache.DiskStore(tmp_path / "blobs", max_bytes=1 << 20, ttl_s=0.4)
+    else:
+        store = result_cache.SqliteStore(tmp_path / "cache.sqlite3", max_bytes=1 << 20, ttl_s=0.4)
+    cache = result_cache.ResultCache(memory_max_bytes=1 << 20, store=store, ttl_s=60)
+    key = "ab" + "0" * 62
+
+    cache.put(key, _result())
+    time.sleep(0.25)
+    cache.clear_memory()
+    assert cache.get(key) is not None
+    assert store.get(key) is not None
+    time.sleep(0.25)
+
+    # Neither the store hit nor the copy promoted into memory outlives the TTL
+    assert store.get(key) is None
+    assert cache.get(key) is None
+
+
+@pytest.mark.parametrize("backend", ["disk", "sqlite"])
+def test_overwrites_are_not_double_counted(tmp_path, backend) -> None:
+    if backend == "disk":
+        store = result_cache.DiskStore(tmp_path / "blobs", max_bytes=1000, ttl_s=0)
+    else:
+        store = result_cache.SqliteStore(tmp_path / "cache.sqlite3", max_bytes=1000, ttl_s=0)
+
+    evicted = sum(store.put("aa1", b"x" * 400) for _ in range(4))
+
+    assert evicted == 0
+    assert store._approx_bytes == 400
+
+
+def test_sqlite_store_is_safe_across_threads(tmp_path) -> None:
+    store = result_cache.SqliteStore(tmp_path / "cache.sqlite3", max_bytes=1 << 20, ttl_s=0)
+    errors = []
+
+    def _work(worker: int) -> None:
+        try:
+            for idx in range(50):
+                store.put(f"k{worker}-{idx}", b"x" * 100)
+                assert store.get(f"k{worker}-{idx}") == b"x" * 100
+        except Exception as exc:  # pragma: no cover - reported below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=_work, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert store._approx_bytes == 8 * 50 * 100
+
+
+def test_redis_store_rounds_sub_second_ttls_up(monkeypatch) -> None:
+    class _Client:
+        def __init__(self) -> None:
+            self.calls = []
+
+        def set(self, key, value, ex=None):
+            self.calls.append(ex)
+
+    monkeypatch.setattr(result_cache, "redis", object())
+    store = result_cache.RedisStore("redis://localhost/0", ttl_s=0.5)
+    client = _Client()
+    monkeypatch.setattr(store, "_get_client", lambda: client)
+
+    store.put("k", b"blob")
+
+    assert client.calls == [1]
+
+
+def test_cache_key_includes_filter_version(monkeypatch) -> None:
+    kwargs = dict(
+        input_bytes=b"# Hi",
+        name="doc.md",
+        targets=["md"],
+        options=conv_service.ConversionOptions(),
+        pandoc_version="3.1",
+        from_format="markdown",
+    )
+    first = conv_service._build_cache_key(**kwargs)
+    monkeypatch.setattr(conv_service, "_cache_key_version", lambda: "changed-filters")
+
+    assert conv_service._build_cache_key(**kwargs) != first
+
+
+def test_convert_one_reports_cache_hits(monkeypatch) -> None:
+    monkeypatch.setattr(conv_service, "_RESULT_CACHE", result_cache.ResultCache(memory_max_bytes=1 << 20))
+    data = b"# Cached heading\n\nBody\n"
+
+    first = conv_service.convert_one(input_bytes=data, name="cached.md", targets=["md"], from_format="markdown")
+    second = conv_service.convert_one(input_bytes=data, name="cached.md", targets=["md"], from_format="markdown")
+
+    assert "cache=hit" not in first.logs
+    assert "cache=hit" in second.logs
+    assert second.outputs[0].data == first.outputs[0].data
+    stats = conv_service.get_cache_stats()
+    assert stats["memoryHits"] == 1 and stats["stores"] >= 1
+
+
+def test_additional_targets_reuse_cached_stages(monkeypatch) -> None:
+    monkeypatch.setattr(conv_service, "_RESULT_CACHE", result_cache.ResultCache(memory_max_bytes=1 << 22))
+    data = b"# Staged heading\n\nBody text\n"
+
+    def _convert(targets):
+        return conv_service.convert_one(input_bytes=data, name="staged.md", targets=targets, from_format="markdown")
+
+    first = _convert(["md"])
+    second = _convert(["md", "html"])
+    third = _convert(["html", "txt"])
+
+    assert "ingest_cache=hit" not in first.logs
+    assert "ingest_cache=hit" in second.logs
+    assert "artifact_cache=hit:html" not in second.logs
+    assert "ingest_cache=hit" in third.logs
+    assert "artifact_cache=hit:html" in third.logs
+    assert "artifact_cache=hit:txt" not in third.logs
+    assert third.outputs[0].data == second.outputs[1].data
+
+
+def test_ingest_cache_restores_extracted_media(monkeypatch) -> None:
+    fixture = Path(__file__).resolve().parent / "fixtures" / "converter" / "images.docx"
+    monkeypatch.setattr(conv_service, "_RESULT_CACHE", result_cache.ResultCache(memory_max_bytes=1 << 24))
+    data = fixture.read_bytes()
+
+    first = conv_service.convert_one(input_bytes=data, name=fixture.name, targets=["md"], from_format="docx")
+    second = conv_service.convert_one(input_bytes=data, name=fixture.name, targets=["md", "html"], from_format="docx")
+
+    assert "ingest_cache=hit" in second.logs
+    assert first.media is not None and second.media is not None
+    assert second.media.data == first.media.data
+    assert second.preview.images == first.preview.images
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"pdf_pages": "2"},
+        {"pdf_start_page": 3},
+        {"pdf_layout_mode": "legacy"},
+        {"aggressive_pdf_mode": True},
+    ],
+)
+def test_ingest_fingerprint_includes_pdf_options(change) -> None:
+    base = conv_service._ingest_options_fingerprint(conv_service.ConversionOptions(pdf_pages="1"), True)
+    options = conv_service.ConversionOptions(**{"pdf_pages": "1", **change})
+
+    assert conv_service._ingest_options_fingerprint(options, True) != base
+
+
+def test_pdf_page_windows_are_cached_separately(monkeypatch) -> None:
+    fixture = Path(__file__).resolve().parent / "fixtures" / "converter" / "report_2025_annual.pdf"
+    monkeypatch.setattr(conv_service, "_RESULT_CACHE", result_cache.ResultCache(memory_max_bytes=1 << 24))
+    data = fixture.read_bytes()
+
+    def _convert(pages):
+        return conv_service.convert_one(
+            input_bytes=data,
+            name=fixture.name,
+            targets=["md"],
+            from_format="pdf",
+            options=conv_service.ConversionOptions(pdf_pages=pages),
+        )
+
+    first = _convert("1")
+    second = _convert("2")
+
+    assert "ingest_cache=hit" not in second.logs
+    assert second.outputs[0].data != first.outputs[0].data
+
+
+def test_markdown_digest_covers_extracted_media(tmp_path) -> None:
+    first_dir, second_dir = tmp_path / "a", tmp_path / "b"
+    for folder, pixel in ((first_dir, b"red"), (second_dir, b"blue")):
+        (folder / "media").mkdir(parents=True)
+        (folder / "media" / "image1.png").write_bytes(pixel)
+    text = "![x]({}/media/image1.png)"
+
+    first = conv_service._markdown_digest(text.format(first_dir), first_dir)
+    second = conv_service._markdown_digest(text.format(second_dir), second_dir)
+    assert first != second
+
+    (second_dir / "media" / "image1.png").write_bytes(b"red")
+    assert conv_service._markdown_digest(text.format(second_dir), second_dir) == first
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+
+from api._lib import csv_columns
+from api._lib.csv_columns import batched, harden_column, harden_records, harden_rows, key_column
+
+
+def _harden_cell(value) -> str:
+    # Reference per-cell implementation the column helpers replace
+    s = "" if value is None else str(value)
+    return "'" + s if s and s[0] in ("=", "+", "-", "@") else s
+
+
+VALUES = ["=1+1", "+x", "-3", "@sum", "", None, 7, -2.5, True, "plain", " =lead"]
+
+
+def test_harden_column_matches_per_cell_hardening() -> None:
+    assert harden_column(VALUES) == [_harden_cell(v) for v in VALUES]
+
+
+@pytest.mark.skipif(csv_columns.pa is None, reason="pyarrow not installed")
+def test_arrow_backend_matches_python(monkeypatch) -> None:
+    values = VALUES * 500
+    arrow = harden_column(values)
+    monkeypatch.setattr(csv_columns, "CSV_COLUMN_BACKEND", "python")
+    assert harden_column(values) == arrow
+
+
+def test_harden_rows_keeps_ragged_shapes() -> None:
+    rows = [["=a", "b"], [], ["-1"], ["x", "+y", "z"]]
+    assert harden_rows(rows) == [[_harden_cell(c) for c in row] for row in rows]
+    assert harden_rows([["=a", "b"], ["c", "@d"]]) == [["'=a", "b"], ["c", "'@d"]]
+
+
+def test_harden_records_projects_onto_headers() -> None:
+    records = [{"a": "=x", "b": 1}, {"b": None}]
+    assert list(harden_records(records, ["a", "b"])) == [("'=x", "1"), ("", "")]
+    assert list(harden_records(records, [])) == [(), ()]
+
+
+def test_key_column_and_batched() -> None:
+    rows = [[" 1 ", "eu"], ["2"], []]
+    assert key_column(rows, [0]) == [("1",), ("2",), None]
+    assert key_column(rows, [0, 1]) == [("1", "eu"), None, None]
+    assert [len(b) for b in batched(range(5), 2)] == [2, 2, 1]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import csv
+import io
+from typing import List, Optional
+
+import pytest
+
+from api._lib import csv_join_engine
+from api._lib.csv_join_engine import JoinInput, JoinStats, parse_key_columns, stream_join
+
+LEFT = "id,region,name\n1,eu,Ann\n2,us,Bob\n3,eu,Cy\n3,us,Dee\n"
+RIGHT = "id;region;score\n3;eu;=9\n1;eu;5\n1;eu;6\n4;us;7\n"
+
+
+def _join(
+    join_type: str,
+    *,
+    keys: List[int] = [0],
+    left: str = LEFT,
+    right: str = RIGHT,
+    left_size: Optional[int] = None,
+    right_size: Optional[int] = None,
+    memory_budget: Optional[int] = None,
+    algorithm: str = "auto",
+    stats: Optional[JoinStats] = None,
+) -> List[List[str]]:
+    chunks = stream_join(
+        JoinInput(io.BytesIO(left.encode()), keys, ",", left_size),
+        JoinInput(io.BytesIO(right.encode()), keys, ";", right_size),
+        join_type=join_type,
+        algorithm=algorithm,
+        memory_budget=memory_budget,
+        chunk_bytes=16,
+        stats=stats,
+    )
+    return list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+
+
+def test_inner_join_matches_and_hardens_cells() -> None:
+    rows = _join("inner")
+    assert rows[0] == ["id", "region", "name", "id", "region", "score"]
+    assert sorted(rows[1:]) == [
+        ["1", "eu", "Ann", "1", "eu", "5"],
+        ["1", "eu", "Ann", "1", "eu", "6"],
+        ["3", "eu", "Cy", "3", "eu", "'=9"],
+        ["3", "us", "Dee", "3", "eu", "'=9"],
+    ]
+
+
+@pytest.mark.parametrize(
+    "join_type, extra",
+    [
+        ("left", [["2", "us", "Bob", "", "", ""]]),
+        ("right", [["", "", "", "4", "us", "7"]]),
+        ("full", [["2", "us", "Bob", "", "", ""], ["", "", "", "4", "us", "7"]]),
+    ],
+)
+def test_outer_joins_keep_unmatched_rows(join_type: str, extra: List[List[str]]) -> None:
+    rows = _join(join_type)
+    assert sorted(rows[1:]) == sorted(_join("inner")[1:] + extra)
+
+
+def test_multi_column_key() -> None:
+    rows = _join("inner", keys=[0, 1])
+    assert sorted(rows[1:]) == [
+        ["1", "eu", "Ann", "1", "eu", "5"],
+        ["1", "eu", "Ann", "1", "eu", "6"],
+        ["3", "eu", "Cy", "3", "eu", "'=9"],
+    ]
+
+
+@pytest.mark.parametrize("join_type", ["inner", "left", "right", "full"])
+def test_build_side_and_spill_do_not_change_results(join_type: str) -> None:
+    expected = sorted(_join(join_type)[1:])
+    build_left = _join(join_type, left_size=1, right_size=2)
+    spilled = _join(join_type, memory_budget=1)
+    assert build_left[0] == spilled[0] == _join(join_type)[0]
+    assert sorted(build_left[1:]) == expected
+    assert sorted(spilled[1:]) == expected
+
+
+def test_grace_join_uses_disk_partitions(monkeypatch) -> None:
+    created = []
+    real_init = csv_join_engine._Partitions.__init__
+
+    def _tracking_init(self, root, count):
+        created.append(count)
+        real_init(self, root, count)
+
+    monkeypatch.setattr(csv_join_engine._Partitions, "__init__", _tracking_init)
+    _join("inner", memory_budget=1)
+    assert created and all(count >= 4 for count in created)
+
+
+@pytest.mark.parametrize("join_type", ["inner", "left", "right", "full"])
+@pytest.mark.parametrize("memory_budget", [None, 1])
+def test_merge_join_matches_hash_join(join_type: str, memory_budget: Optional[int]) -> None:
+    stats = JoinStats()
+    merged = _join(join_type, algorithm="merge", memory_budget=memory_budget, stats=stats)
+    hashed = _join(join_type, algorithm="hash")
+    assert merged[0] == hashed[0]
+    assert sorted(merged[1:]) == sorted(hashed[1:])
+    # RIGHT is not sorted on id, so it has to go through the external sort
+    assert stats.algorithm == "merge+external_sort"
+
+
+def test_auto_picks_merge_for_sorted_inputs_and_reports_stats() -> None:
+    left = "id,name\n1,a\n2,b\n2,c\n5,d\n"
+    right = "id;v\n2;x\n3;y\n5;z\n"
+    stats = JoinStats()
+    rows = _join("full", left=left, right=right, stats=stats)
+    assert stats.algorithm == "merge"
+    assert rows[1:] == [
+        ["1", "a", "", ""],
+        ["2", "b", "2", "x"],
+        ["2", "c", "2", "x"],
+        ["", "", "3", "y"],
+        ["5", "d", "5", "z"],
+    ]
+    assert (stats.rows_left, stats.rows_right, stats.rows_out) == (4, 3, 5)
+    assert stats.headers()["X-Join-Algorithm"] == "merge"
+
+
+def test_auto_falls_back_to_hash_for_unsorted_inputs() -> None:
+    stats = JoinStats()
+    _join("inner", stats=stats)
+    assert stats.algorithm == "hash"
+
+
+def test_parse_key_columns() -> None:
+    assert parse_key_columns("2") == [2]
+    assert parse_key_columns(" 0, 3 ") == [0, 3]
+    for bad in (None, "", "-1", "a"):
+        with pytest.raises(ValueError):
+            parse_key_columns(bad)
+
+
+def test_spool_join_returns_rewound_output_with_stats() -> None:
+    output, stats, size = csv_join_engine.spool_join(
+        JoinInput(io.BytesIO(LEFT.encode()), [0], ",", None),
+        JoinInput(io.BytesIO(RIGHT.encode()), [0], ";", None),
+        join_type="inner",
+    )
+    with output:
+        body = output.read()
+    assert len(body) == size
+    assert stats.rows_out == 4
+    assert stats.headers()["X-Join-Rows-Out"] == "4"
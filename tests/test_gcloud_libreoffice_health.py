@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import sys
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_service():
+    spec = importlib.util.spec_from_file_location(
+        "gcloud_libreoffice_health_main", ROOT / "gcloud" / "libreoffice" / "main.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # dataclasses resolve annotations through it
+    spec.loader.exec_module(module)
+    return module
+
+
+service = _load_service()
+
+
+@pytest.fixture
+def soffice(tmp_path, monkeypatch):
+    """A fake soffice on PATH whose ``--version`` calls are counted."""
+
+    binary = tmp_path / "soffice"
+    binary.write_text("#!/bin/sh\n")
+    calls = []
+
+    def _probe():
+        calls.append(1)
+        return "LibreOffice 7.6.4.1"
+
+    monkeypatch.setattr(service.shutil, "which", lambda name: str(binary))
+    monkeypatch.setattr(service, "_probe_libreoffice_version", _probe)
+    monkeypatch.setattr(service, "_version_probe", None)
+    monkeypatch.setattr(service, "_version_cache", None)
+    monkeypatch.setattr(service, "_capabilities", None)
+    return binary, calls
+
+
+def test_snapshot_shape(soffice) -> None:
+    binary, _ = soffice
+    before = time.time()
+    snapshot = service.refresh_capabilities()
+
+    assert set(snapshot) == {"available", "version", "binary", "binary_path", "checked_at"}
+    assert snapshot["available"] is True
+    assert snapshot["version"] == "LibreOffice 7.6.4.1"
+    assert snapshot["binary_path"] == str(binary)
+    assert before <= snapshot["checked_at"] <= time.time()
+    assert service.get_capabilities() is snapshot
+
+
+def test_refresh_reuses_the_version_until_the_binary_changes(soffice) -> None:
+    binary, calls = soffice
+    first = service.refresh_capabilities()
+    second = service.refresh_capabilities()
+    assert len(calls) == 1
+    assert second["version"] == first["version"]
+    assert second["checked_at"] >= first["checked_at"]
+
+    service.refresh_capabilities(force=True)
+    assert len(calls) == 2
+
+    binary.write_text("#!/bin/sh\n# redeployed\n")
+    service.refresh_capabilities()
+    assert len(calls) == 3
+
+
+def test_failed_version_probe_is_retried(soffice, monkeypatch) -> None:
+    _, calls = soffice
+    monkeypatch.setattr(service, "_probe_libreoffice_version", lambda: calls.append(1) and None)
+
+    assert service.refresh_capabilities()["available"] is False
+    assert service.refresh_capabilities()["available"] is False
+    assert len(calls) == 2
+
+
+def test_missing_binary_is_unavailable_without_probing(soffice, monkeypatch) -> None:
+    _, calls = soffice
+    monkeypatch.setattr(service.shutil, "which", lambda name: None)
+
+    snapshot = service.refresh_capabilities()
+    assert (snapshot["available"], snapshot["version"], snapshot["binary_path"]) == (False, None, None)
+    assert calls == []
+
+
+def test_health_serves_the_snapshot_with_its_age(soffice, monkeypatch) -> None:
+    _, calls = soffice
+    job_queue = service.JobQueue(workers=1, depth=0)
+    monkeypatch.setattr(service, "_job_queue", job_queue)
+    stale = {
+        "available": True,
+        "version": "LibreOffice 7.6.4.1",
+        "binary": "soffice",
+        "binary_path": "/usr/bin/soffice",
+        "checked_at": time.time() - 120,
+    }
+    monkeypatch.setattr(service, "_capabilities", stale)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), service.LibreOfficeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/health", timeout=10) as resp:
+            body = json.loads(resp.read())
+    finally:
+        server.shutdown()
+        server.server_close()
+        job_queue.shutdown()
+
+    assert body["status"] == "healthy"
+    assert body["libreoffice"]["version"] == "LibreOffice 7.6.4.1"
+    assert body["libreoffice"]["checked_age_seconds"] >= 120
+    assert body["queue"]["capacity"] == 1
+    assert calls == []  # /health never probes once a snapshot exists
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import importlib.util
+import json
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_service():
+    spec = importlib.util.spec_from_file_location(
+        "gcloud_libreoffice_main", ROOT / "gcloud" / "libreoffice" / "main.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # dataclasses resolve annotations through it
+    spec.loader.exec_module(module)
+    return module
+
+
+service = _load_service()
+
+REQUEST = {"input_gcs_uri": "gs://bucket/in/doc.docx", "output_gcs_uri": "gs://bucket/out/doc.html"}
+
+
+def _fake_result(request, request_id):
+    return {"ok": True, "request_id": request_id, "timings_ms": {"convert": 5}}
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    job_queue = service.JobQueue(workers=1, depth=0)
+    monkeypatch.setattr(service, "_job_queue", job_queue)
+    monkeypatch.setattr(service, "run_conversion", _fake_result)
+    yield job_queue
+    job_queue.shutdown()
+
+
+@pytest.fixture
+def base_url(queue):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), service.LibreOfficeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _request(url, payload=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, dict(resp.headers), json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, dict(exc.headers), json.loads(exc.read())
+
+
+def _request_obj(**overrides):
+    return service.ConversionRequest.from_payload({**REQUEST, **overrides})
+
+
+def test_full_queue_answers_429_with_retry_after(base_url, queue, monkeypatch) -> None:
+    release = threading.Event()
+    monkeypatch.setattr(service, "run_conversion", lambda request, request_id: release.wait(10) and {})
+    try:
+        status, _, body = _request(f"{base_url}/convert", {**REQUEST, "async": True})
+        assert status == 202 and body["status"] in ("queued", "running")
+
+        status, headers, body = _request(f"{base_url}/convert", REQUEST)
+        assert status == 429
+        assert int(headers["Retry-After"]) >= 1
+        assert body["details"]["rejected"] == 1
+    finally:
+        release.set()
+
+
+def test_async_job_status_round_trip(base_url) -> None:
+    status, headers, body = _request(f"{base_url}/convert", {**REQUEST, "async": True})
+    assert status == 202
+    assert headers["Location"] == body["status_url"] == f"/jobs/{body['job_id']}"
+
+    deadline = time.monotonic() + 10
+    while True:
+        status, _, job = _request(base_url + body["status_url"])
+        if job["status"] in ("done", "error") or time.monotonic() > deadline:
+            break
+        time.sleep(0.02)
+    assert status == 200
+    assert job["status"] == "done" and job["ok"]
+    assert job["result"]["timings_ms"] == {"convert": 5}
+    assert job["queue_wait_ms"] is not None
+
+    status, _, missing = _request(f"{base_url}/jobs/unknown")
+    assert status == 404 and not missing["ok"]
+
+
+def test_failed_job_releases_its_slot(queue, monkeypatch) -> None:
+    def _boom(request, request_id):
+        raise RuntimeError("soffice crashed")
+
+    monkeypatch.setattr(service, "run_conversion", _boom)
+    job = queue.submit(_request_obj())
+    assert job.done.wait(10)
+    assert (job.status, job.error, job.error_status) == ("error", "soffice crashed", 500)
+
+    monkeypatch.setattr(service, "run_conversion", _fake_result)
+    retry = queue.submit(_request_obj())  # would raise QueueFullError if the slot leaked
+    assert retry.done.wait(10) and retry.status == "done"
+    status = queue.status()
+    assert (status["failed"], status["completed"], status["running"], status["queued"]) == (1, 1, 0, 0)
+
+
+def test_finished_jobs_are_pruned_by_count_and_age(queue, monkeypatch) -> None:
+    monkeypatch.setattr(service, "MAX_TRACKED_JOBS", 2)
+    jobs = []
+    for _ in range(3):
+        job = queue.submit(_request_obj())
+        assert job.done.wait(10)
+        jobs.append(job)
+
+    assert queue.get(jobs[0].id) is None
+    assert queue.get(jobs[1].id) is jobs[1] and queue.get(jobs[2].id) is jobs[2]
+
+    monkeypatch.setattr(service, "JOB_TTL_SECONDS", 60)
+    jobs[1].finished = time.time() - 120
+    assert queue.get(jobs[1].id) is None
+    assert queue.get(jobs[2].id) is jobs[2]
+    assert queue.status()["tracked_jobs"] == 1
+
+
+def test_unfinished_jobs_are_never_pruned(queue, monkeypatch) -> None:
+    monkeypatch.setattr(service, "MAX_TRACKED_JOBS", 0)
+    release = threading.Event()
+    monkeypatch.setattr(service, "run_conversion", lambda request, request_id: release.wait(10) and {})
+    try:
+        job = queue.submit(_request_obj())
+        assert queue.get(job.id) is job
+    finally:
+        release.set()
+    assert job.done.wait(10)
+    assert queue.get(job.id) is None
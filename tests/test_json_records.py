@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+
+import pytest
+
+from api._lib import json_records
+from api._lib.json_records import (
+    TooManyColumnsError,
+    iter_csv_chunks,
+    iter_json_chunks,
+    iter_json_records,
+    scan_records,
+)
+
+RECORDS = [{"a": {"b": "=x"}, "c": [1, 2]}, {"d": None, "a": {"b": 3}}, {"n": 12345678901234}]
+
+
+def _records(text: str):
+    return list(iter_json_records(io.BytesIO(text.encode("utf-8"))))
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 64 * 1024])
+def test_iter_json_records_formats(monkeypatch, chunk: int) -> None:
+    # Tiny read chunks split values, numbers and literals across buffer refills
+    monkeypatch.setattr(json_records, "READ_CHUNK_CHARS", chunk)
+    assert _records(json.dumps(RECORDS, indent=2)) == RECORDS
+    assert _records("\n".join(json.dumps(r) for r in RECORDS) + "\n") == RECORDS
+    assert _records('﻿{"a": true}') == [{"a": True}]
+    assert _records(" 42 ") == [42]
+    assert _records("[]") == []
+    assert _records("") == []
+
+
+@pytest.mark.parametrize("text", ['[{"a": 1} {"b": 2}]', '[{"a": 1}] x', '{"a": ', "[1, 2"])
+def test_iter_json_records_rejects_malformed_input(text: str) -> None:
+    with pytest.raises(ValueError):
+        _records(text)
+
+
+def test_large_single_value_is_parsed_in_few_passes(monkeypatch) -> None:
+    monkeypatch.setattr(json_records, "READ_CHUNK_CHARS", 1024)
+    calls = []
+    decode = json_records._decoder.raw_decode
+    monkeypatch.setattr(json_records._decoder, "raw_decode", lambda *args: calls.append(1) or decode(*args))
+    record = {f"key{i}": "v" * 50 for i in range(20000)}  # ~1.3 MB, one top-level object
+
+    assert _records(json.dumps(record)) == [record]
+    assert len(calls) < 20
+
+
+def test_malformed_input_fails_without_reading_the_rest(monkeypatch) -> None:
+    monkeypatch.setattr(json_records, "READ_CHUNK_CHARS", 1024)
+    stream = io.BytesIO(b'[{"a": 1}, {"b": oops}, ' + b'{"c": 2}, ' * 100000 + b"]")
+
+    with pytest.raises(ValueError):
+        list(iter_json_records(stream))
+    assert stream.tell() < 64 * 1024
+
+
+def test_two_pass_csv_matches_expected_output() -> None:
+    source = io.BytesIO(json.dumps(RECORDS).encode("utf-8"))
+    scan = scan_records(source)
+    assert scan.headers == ["a.b", "c", "d", "n"] and scan.records == 3
+    body = b"".join(iter_csv_chunks(source, scan.headers, chunk_bytes=8)).decode("utf-8")
+    assert body.splitlines() == ["a.b,c,d,n", "'=x,1|2,,", "3,,,", ",,,12345678901234"]
+
+
+def test_scan_records_enforces_max_columns() -> None:
+    source = io.BytesIO(b'{"a": 1, "b": 2}\n{"c": 3}\n')
+    with pytest.raises(TooManyColumnsError):
+        scan_records(source, max_columns=2)
+    source.seek(0)
+    assert scan_records(source, max_columns=3).headers == ["a", "b", "c"]
+
+
+CSV_TEXT = "a;b;c\n1;=2;007\n2.5;TRUE;\n-3;x;1e3\n"
+
+
+def _json_out(text: str = CSV_TEXT, **options) -> str:
+    return b"".join(iter_json_chunks(io.BytesIO(text.encode("utf-8")), chunk_bytes=8, **options)).decode("utf-8")
+
+
+def test_csv_to_json_compact_and_pretty() -> None:
+    rows = list(csv.DictReader(io.StringIO(CSV_TEXT), delimiter=";"))
+    assert _json_out() == json.dumps(rows, separators=(",", ":"))
+    # pretty reproduces the previous json.dumps(..., indent=2) output exactly
+    assert _json_out(pretty=True) == json.dumps(rows, indent=2)
+    assert _json_out("a,b\n") == "[]"
+
+
+def test_csv_to_ndjson_with_type_inference() -> None:
+    lines = _json_out(ndjson=True, infer_types=True).splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"a": 1, "b": "=2", "c": "007"},
+        {"a": 2.5, "b": True, "c": ""},
+        {"a": -3, "b": "x", "c": 1000.0},
+    ]
+
+
+def test_type_inference_keeps_numbers_json_cannot_hold() -> None:
+    huge = "9" * 5000
+    lines = _json_out(f"a,b,c\n1e999,-1E400,{huge}\n", ndjson=True, infer_types=True).splitlines()
+    assert [json.loads(line) for line in lines] == [{"a": "1e999", "b": "-1E400", "c": huge}]
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from api._lib import multipart
+from api._lib.multipart import MultipartParseError, UploadedFile, parse_multipart_uploads
+
+BOUNDARY = "tinyutils-boundary"
+# Looks like a delimiter but is not one, and contains bare CR/LF pairs
+TRICKY = b"a\r\n--tinyutils-boundar\r\n-- tinyutils-boundary\r\nz" * 50
+
+
+class _ChunkyStream(io.BytesIO):
+    def read(self, n: int = -1) -> bytes:  # type: ignore[override]
+        return super().read(min(n, 5) if n and n > 0 else n)
+
+
+def _body(*parts: bytes) -> bytes:
+    return b"preamble\r\n" + b"".join(parts) + f"--{BOUNDARY}--\r\nepilogue".encode()
+
+
+def _field(name: str, value: str) -> bytes:
+    return f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+
+
+def _file(name: str, filename: str, data: bytes) -> bytes:
+    head = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+    return head.encode() + b"Content-Type: text/csv\r\n\r\n" + data + b"\r\n"
+
+
+def _parse(body: bytes, stream=io.BytesIO, **options):
+    headers = {
+        "content-type": f'multipart/form-data; boundary="{BOUNDARY}"',
+        "content-length": str(len(body)),
+    }
+    return parse_multipart_uploads(headers, stream(body), **options)
+
+
+def test_file_parts_are_spooled_file_objects() -> None:
+    body = _body(_field("mode", "join"), _file("files", "a.csv", TRICKY), _file("files", "b.csv", b""))
+    with _parse(body, _ChunkyStream, spool_bytes=64) as form:
+        assert form["mode"] == ["join"]
+        first, second = form.files("files")
+        assert isinstance(first, UploadedFile)
+        assert (first.filename, first.content_type, first.size) == ("a.csv", "text/csv", len(TRICKY))
+        assert first.read() == TRICKY
+        assert first.file._rolled  # spilled to disk above spool_bytes
+        assert second.getvalue() == b""
+    assert first.file.closed
+
+
+def test_per_file_and_field_limits_raise_413() -> None:
+    with pytest.raises(MultipartParseError) as excinfo:
+        _parse(_body(_file("file", "a.csv", b"x" * 100)), max_file_bytes=99)
+    assert excinfo.value.status == 413
+
+    with pytest.raises(MultipartParseError) as excinfo:
+        _parse(_body(_field("mode", "y" * 100)), max_field_bytes=10)
+    assert excinfo.value.status == 413
+
+
+def test_unterminated_body_is_rejected() -> None:
+    body = _file("file", "a.csv", b"data")
+    with pytest.raises(MultipartParseError) as excinfo:
+        _parse(body)
+    assert excinfo.value.status == 400
+
+
+def test_parse_multipart_form_still_returns_bytes(monkeypatch) -> None:
+    monkeypatch.setattr(multipart, "_READ_CHUNK_BYTES", 3)
+    body = _body(_field("mode", "csv_to_json"), _file("file", "a.csv", TRICKY))
+    headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}", "content-length": str(len(body))}
+    form = multipart.parse_multipart_form(headers, io.BytesIO(body))
+    assert form == {"mode": ["csv_to_json"], "file": [TRICKY]}
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from api._lib import pandoc_runner, pandoc_server
+
+
+class _FakePandocServer(BaseHTTPRequestHandler):
+    """Echo server speaking the pandoc-server JSON protocol."""
+
+    requests: list[dict] = []
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).requests.append(body)
+        if body["to"] == "docx":
+            payload = {"output": base64.b64encode(b"PK-fake").decode("ascii"), "base64": True}
+        else:
+            payload = {"output": f"server:{body['text']}", "base64": False}
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        return
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), _FakePandocServer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _FakePandocServer.requests = []
+    monkeypatch.setattr(pandoc_server, "SERVER_MODE", "remote")
+    monkeypatch.setattr(pandoc_server, "SERVER_URLS", [f"http://127.0.0.1:{server.server_port}"])
+    monkeypatch.setattr(pandoc_server, "_POOL", None)
+    yield _FakePandocServer
+    server.shutdown()
+    monkeypatch.setattr(pandoc_server, "_POOL", None)
+
+
+def test_translate_args_maps_supported_flags() -> None:
+    options = pandoc_server.translate_args(
+        ["--wrap=none", "--columns=1000", "--standalone", "--markdown-headings=atx", "--quiet"]
+    )
+    assert options == {
+        "wrap": "none",
+        "columns": 1000,
+        "standalone": True,
+        "markdown-headings": "atx",
+    }
+
+
+def test_translate_args_rejects_filters_and_media() -> None:
+    assert pandoc_server.translate_args(["--lua-filter=x.lua"]) is None
+    assert pandoc_server.translate_args(["--extract-media=/tmp/m"]) is None
+
+
+def test_convert_text_routes_through_server(fake_server) -> None:
+    out = pandoc_runner.convert_text("# hi", to="html5", format="gfm", extra_args=["--wrap=none"])
+
+    assert out == "server:# hi"
+    assert fake_server.requests[0]["from"] == "gfm"
+    assert fake_server.requests[0]["wrap"] == "none"
+
+
+def test_binary_and_self_contained_writers_skip_the_server(fake_server) -> None:
+    # Pure mode cannot read local images, so these writers would lose them
+    assert pandoc_runner._server_options(["--wrap=none"], "docx") is None
+    assert pandoc_runner._server_options([], "epub3") is None
+    assert pandoc_runner._server_options(["--embed-resources"], "html5") is None
+    assert pandoc_runner._server_options(["--self-contained"], "html5") is None
+    assert pandoc_runner._server_options(["--wrap=none"], "html5") == {"wrap": "none"}
+
+
+def test_servers_spawn_outside_the_pool_lock(monkeypatch) -> None:
+    class _Proc:
+        def poll(self):
+            return None
+
+    monkeypatch.setattr(pandoc_server, "SERVER_MODE", "local")
+    monkeypatch.setattr(pandoc_server, "SERVER_URLS", [])
+    pool = pandoc_server.PandocServerPool("pandoc")
+    lock_held = []
+
+    def _spawn():
+        lock_held.append(pool._lock.locked())
+        return f"http://127.0.0.1:{len(lock_held)}", _Proc()
+
+    monkeypatch.setattr(pool, "_spawn", _spawn)
+
+    assert pool._next_url() == "http://127.0.0.1:1"
+    assert pool._next_url() == "http://127.0.0.1:1"
+    assert lock_held == [False]
+    assert pool.status()["alive"] == 1
+
+
+@pytest.mark.skipif(not pandoc_runner.is_pandoc_available(), reason="pandoc not installed")
+def test_filtered_conversions_use_subprocess(fake_server) -> None:
+    filter_arg = f"--lua-filter={pandoc_runner.FILTER_DIR / 'softbreak_to_space.lua'}"
+    out = pandoc_runner.convert_text("# hi", to="gfm", format="gfm", extra_args=[filter_arg])
+
+    assert out.strip() == "# hi"
+    assert fake_server.requests == []
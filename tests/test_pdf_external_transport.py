@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from convert_backend import _pdf_external
+
+
+class _FakeRenderer(BaseHTTPRequestHandler):
+    """Minimal /convert endpoint; binary replies unless ``binary`` is off."""
+
+    binary = True
+    gzip_requests = True
+    seen: list[dict] = []
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        raw = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            if not type(self).gzip_requests:
+                # What FastAPI answers when the JSON body does not parse
+                type(self).seen.append({"encoding": "gzip", "body": None})
+                self.send_response(422)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            raw = gzip.decompress(raw)
+        type(self).seen.append(
+            {"encoding": self.headers.get("Content-Encoding"), "body": json.loads(raw)}
+        )
+        pdf = b"%PDF-1.4 fake"
+        if type(self).binary and "application/pdf" in (self.headers.get("Accept") or ""):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("x-pdf-engine", "fake-chromium")
+            self.send_header("x-pdf-engine-version", "1.0")
+            self.send_header("x-request-id", "rid-1")
+            data = pdf
+        else:
+            payload = {
+                "ok": True,
+                "meta": {"pdfEngine": "fake-chromium"},
+                "outputs": [{"name": "x.pdf", "size": len(pdf), "dataBase64": base64.b64encode(pdf).decode()}],
+            }
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        return
+
+
+@pytest.fixture
+def renderer(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), _FakeRenderer)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    _FakeRenderer.binary = True
+    _FakeRenderer.gzip_requests = True
+    _FakeRenderer.seen = []
+    monkeypatch.setattr(_pdf_external, "URL", f"http://127.0.0.1:{server.server_port}")
+    yield _FakeRenderer
+    server.shutdown()
+
+
+def test_binary_response_carries_metadata_in_headers(renderer) -> None:
+    pdf, meta = _pdf_external.render_html_to_pdf_via_external("<p>hi</p>", "x.pdf", "rid-1")
+
+    assert pdf == b"%PDF-1.4 fake"
+    assert meta["pdfEngine"] == "fake-chromium"
+    assert meta["pdfEngineVersion"] == "1.0"
+    assert meta["requestId"] == "rid-1"
+    assert renderer.seen[0]["encoding"] is None
+
+
+def test_large_bodies_are_gzipped(renderer, monkeypatch) -> None:
+    monkeypatch.setattr(_pdf_external, "GZIP_MIN_BYTES", 1024)
+    html = "<p>" + "x" * 4096 + "</p>"
+
+    _pdf_external.render_html_to_pdf_via_external(html, "x.pdf", "rid-2")
+
+    assert renderer.seen[0]["encoding"] == "gzip"
+    assert renderer.seen[0]["body"]["html"] == html
+
+
+def test_bodies_are_not_gzipped_by_default(renderer) -> None:
+    _pdf_external.render_html_to_pdf_via_external("<p>" + "x" * 200_000 + "</p>", "x.pdf", "rid-4")
+
+    assert renderer.seen[0]["encoding"] is None
+
+
+def test_gzip_rejection_is_retried_uncompressed(renderer, monkeypatch) -> None:
+    monkeypatch.setattr(_pdf_external, "GZIP_MIN_BYTES", 1024)
+    renderer.gzip_requests = False
+    html = "<p>" + "x" * 4096 + "</p>"
+
+    pdf, _ = _pdf_external.render_html_to_pdf_via_external(html, "x.pdf", "rid-5")
+
+    assert pdf == b"%PDF-1.4 fake"
+    assert [entry["encoding"] for entry in renderer.seen] == ["gzip", None]
+    assert renderer.seen[1]["body"]["html"] == html
+
+
+def test_json_base64_responses_still_supported(renderer) -> None:
+    renderer.binary = False
+
+    pdf, meta = _pdf_external.render_html_to_pdf_via_external("<p>hi</p>", "x.pdf", "rid-3")
+
+    assert pdf == b"%PDF-1.4 fake"
+    assert meta == {"pdfEngine": "fake-chromium"}
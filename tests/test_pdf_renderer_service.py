@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pypdf")
+pytest.importorskip("playwright.async_api")
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _load_service():
+    spec = importlib.util.spec_from_file_location(
+        "pdf_renderer_main", ROOT / "docker" / "pdf-renderer" / "service" / "main.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+service = _load_service()
+
+
+# --- gzip request bodies ---------------------------------------------------
+
+async def _echo(scope, receive, send):
+    message = await receive()
+    body = json.dumps({
+        "body": len(message["body"]),
+        "headers": {k.decode(): v.decode() for k, v in scope["headers"]},
+    }).encode()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _post(body: bytes, *, gzipped: bool = True, chunk: int = 1 << 16):
+    parts = [body[i:i + chunk] for i in range(0, len(body), chunk)] or [b""]
+    messages = [
+        {"type": "http.request", "body": part, "more_body": i < len(parts) - 1}
+        for i, part in enumerate(parts)
+    ]
+    headers = [(b"content-length", str(len(body)).encode())]
+    if gzipped:
+        headers.append((b"content-encoding", b"gzip"))
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/convert", "headers": headers}
+    asyncio.run(service.GzipRequestMiddleware(_echo)(scope, receive, send))
+    status = sent[0]["status"]
+    return status, json.loads(b"".join(m.get("body", b"") for m in sent[1:]))
+
+
+def test_gzip_bodies_are_inflated_for_the_app() -> None:
+    raw = json.dumps({"html": "<p>hi</p>" * 1000}).encode()
+    status, echoed = _post(gzip.compress(raw), chunk=100)
+
+    assert status == 200
+    assert echoed["body"] == len(raw)
+    assert echoed["headers"]["content-length"] == str(len(raw))
+    assert "content-encoding" not in echoed["headers"]
+
+
+def test_gzip_bomb_is_rejected_with_413(monkeypatch) -> None:
+    monkeypatch.setattr(service, "MAX_REQUEST_BYTES", 1 << 20)
+    bomb = gzip.compress(b"\0" * (64 << 20))
+    assert len(bomb) < 100_000
+
+    status, body = _post(bomb)
+    assert (status, body) == (413, {"detail": "input_too_large"})
+
+
+@pytest.mark.parametrize("body", [b"not gzip at all", gzip.compress(b'{"html": "x"}')[:-12]])
+def test_invalid_or_truncated_gzip_is_rejected_with_400(body) -> None:
+    assert _post(body) == (400, {"detail": "bad_gzip"})
+
+
+def test_plain_bodies_pass_through() -> None:
+    assert _post(b'{"html": "x"}', gzipped=False)[1]["body"] == 13
+
+
+# --- browser pool ----------------------------------------------------------
+
+class _FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def set_content(self, html, **kwargs):
+        if self.browser.gate is not None:
+            await self.browser.gate.wait()
+        if html == "crash":
+            self.browser.connected = False
+            raise RuntimeError("Target closed")
+
+    async def pdf(self, **kwargs):
+        return b"%PDF-1.4 fake"
+
+
+class _FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def new_page(self):
+        return _FakePage(self.browser)
+
+    async def close(self):
+        pass
+
+
+class _FakeBrowser:
+    version = "120.0"
+
+    def __init__(self, gate):
+        self.gate = gate
+        self.connected = True
+        self.closed = False
+
+    def on(self, event, callback):
+        pass
+
+    def is_connected(self):
+        return self.connected and not self.closed
+
+    async def new_context(self):
+        return _FakeContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class _FakePlaywright:
+    def __init__(self):
+        self.gate = None
+        self.launched = []
+        self.chromium = self
+
+    async def launch(self):
+        browser = _FakeBrowser(self.gate)
+        self.launched.append(browser)
+        return browser
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(service, "BROWSER_POOL_SIZE", 1)
+    monkeypatch.setattr(service, "BROWSER_MAX_RENDERS", 2)
+    monkeypatch.setattr(service, "BROWSER_MAX_RSS_MB", 0)
+    monkeypatch.setattr(service, "RENDER_CONCURRENCY", 1)
+    monkeypatch.setattr(service, "RENDER_QUEUE_MAX", 1)
+    monkeypatch.setattr(service, "REQUEST_TIMEOUT", 5)
+
+    def _make():
+        browser_pool = service.BrowserPool()
+        browser_pool._pw = _FakePlaywright()
+        return browser_pool
+
+    return _make
+
+
+def test_browsers_are_recycled_after_max_renders(pool) -> None:
+    async def scenario():
+        browser_pool = pool()
+        for _ in range(5):
+            assert await browser_pool.render("<p>x</p>") == b"%PDF-1.4 fake"
+        return browser_pool
+
+    browser_pool = asyncio.run(scenario())
+    launched = browser_pool._pw.launched
+    snapshot = browser_pool.snapshot()
+    assert (snapshot["renders"], snapshot["launched"], snapshot["recycled"]) == (5, 3, 2)
+    assert [b.closed for b in launched] == [True, True, False]
+    assert snapshot["browsers"] == [{"id": 2, "renders": 1, "active": 0, "retiring": False}]
+
+
+def test_disconnected_browser_is_replaced(pool) -> None:
+    async def scenario():
+        browser_pool = pool()
+        with pytest.raises(service.HTTPException) as exc:
+            await browser_pool.render("crash")
+        assert exc.value.detail == "render_failed"
+        await browser_pool.render("<p>x</p>")
+        return browser_pool
+
+    browser_pool = asyncio.run(scenario())
+    snapshot = browser_pool.snapshot()
+    assert (snapshot["failures"], snapshot["recycled"], snapshot["launched"]) == (1, 1, 2)
+    assert browser_pool._pw.launched[0].closed
+
+
+def test_full_queue_is_rejected_with_retry_after(pool) -> None:
+    async def scenario():
+        browser_pool = pool()
+        browser_pool._pw.gate = gate = asyncio.Event()
+        running = asyncio.ensure_future(browser_pool.render("<p>1</p>"))
+        waiting = asyncio.ensure_future(browser_pool.render("<p>2</p>"))
+        while browser_pool.waiting < 1 or browser_pool.in_flight < 1:
+            await asyncio.sleep(0)
+        with pytest.raises(service.HTTPException) as exc:
+            await browser_pool.render("<p>3</p>")
+        gate.set()
+        assert await running == await waiting == b"%PDF-1.4 fake"
+        return browser_pool, exc.value
+
+    browser_pool, rejected = asyncio.run(scenario())
+    assert (rejected.status_code, rejected.detail) == (503, "queue_full")
+    assert rejected.headers["Retry-After"] == "2"
+    snapshot = browser_pool.snapshot()
+    assert (snapshot["rejected"], snapshot["renders"], snapshot["waiting"], snapshot["inFlight"]) == (1, 2, 0, 0)
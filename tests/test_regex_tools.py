@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import difflib
+
+import pytest
+
+from api._lib import regex_tools
+from api._lib.regex_tools import (
+    ReplaceRule,
+    RuleSet,
+    SpanDiff,
+    TooManyMatchesError,
+    compile_expression,
+    compile_replacer,
+)
+
+
+def test_case_sensitive_literal_skips_the_regex_engine() -> None:
+    replacer = compile_replacer("a.b", r"\1$", mode="literal", case_sensitive=True)
+
+    assert replacer.compiled is None
+    assert replacer.apply("a.b axb a.b") == (r"\1$ axb \1$", 2)
+    with pytest.raises(TooManyMatchesError):
+        replacer.apply("a.b a.b", max_matches=1)
+
+
+def test_case_insensitive_literal_inserts_replacement_verbatim() -> None:
+    replacer = compile_replacer("Foo", r"C:\new", mode="literal", case_sensitive=False)
+
+    assert replacer.compiled is not None
+    assert replacer.apply("foo FOO", concurrent=True) == (r"C:\new C:\new", 2)
+
+
+def test_regex_replacement_is_one_pass_with_groups() -> None:
+    replacer = compile_replacer(r"(?P<word>\w+)@(\d)", r"\g<word>#\2", mode="regex", case_sensitive=True)
+
+    assert replacer.apply("a@1 b@2 c@x") == ("a#1 b#2 c@x", 2)
+
+
+@pytest.mark.parametrize("pattern, replacement", [("(a", ""), ("(a)", r"\2"), ("(a)", r"\g<missing>"), ("", "x")])
+def test_invalid_rules_raise_value_error(pattern, replacement) -> None:
+    with pytest.raises(ValueError):
+        compile_replacer(pattern, replacement, mode="regex", case_sensitive=True)
+
+
+def test_dotall_follows_multiline_unless_overridden() -> None:
+    text = "a\nb"
+    assert compile_expression("a.b", mode="regex", multiline=True, case_sensitive=True, whole_word=False).search(text)
+    assert not compile_expression(
+        "a.b", mode="regex", multiline=True, case_sensitive=True, whole_word=False, dotall=False
+    ).search(text)
+    replacer = compile_replacer("^b", "c", mode="regex", case_sensitive=True, dotall=False)
+    assert replacer.apply(text) == ("a\nc", 1)
+
+
+def test_timeouts_surface_as_regex_timeout_error() -> None:
+    replacer = compile_replacer(r"(a|aa)+$", "", mode="regex", case_sensitive=True)
+    with pytest.raises(regex_tools.RegexTimeoutError):
+        replacer.apply("a" * 40 + "!", timeout=0.05)
+
+
+def test_rule_set_swaps_values_in_one_pass() -> None:
+    rules = RuleSet([ReplaceRule("cat", "dog", case_sensitive=True), ReplaceRule("dog", "cat", case_sensitive=True)])
+
+    assert rules.apply("cat dog dog") == ("dog cat cat", [1, 2])
+
+
+def test_rule_set_prefers_longest_literal_then_rule_order() -> None:
+    rules = RuleSet([
+        ReplaceRule("foo", "1"),
+        ReplaceRule("foobar", "2"),
+        ReplaceRule("FOO", "3"),  # duplicate of rule 1 once case is ignored
+        ReplaceRule(r"\d+", "<n>", mode="regex"),
+    ])
+
+    assert rules.apply("FooBar foo 42 fooba") == ("2 1 <n> 1ba", [2, 1, 0, 1])
+
+
+def test_rule_set_keeps_regex_groups_per_rule() -> None:
+    rules = RuleSet([
+        ReplaceRule(r"(\w)\1", r"<\1>", mode="regex", case_sensitive=True),
+        ReplaceRule(r"x(?P<d>\d)", r"[\g<d>]", mode="regex", case_sensitive=True),
+        ReplaceRule("$", r"\1", case_sensitive=True),
+    ])
+
+    assert rules.apply("aab x5 $ cc") == (r"<a>b [5] \1 <c>", [2, 1, 1])
+
+
+def test_rule_set_reports_the_failing_rule() -> None:
+    with pytest.raises(ValueError, match="Rule 2"):
+        RuleSet([ReplaceRule("a"), ReplaceRule("(", mode="regex")])
+    with pytest.raises(TooManyMatchesError):
+        RuleSet([ReplaceRule("a"), ReplaceRule("b")]).apply("abab", max_matches=3)
+
+
+def _reference_hunks(old: str, new: str, context: int) -> str:
+    return "\n".join(list(difflib.unified_diff(old.splitlines(), new.splitlines(), n=context, lineterm=""))[2:])
+
+
+@pytest.mark.parametrize("context", [0, 1, 2])
+def test_span_diff_matches_difflib_for_line_edits(context) -> None:
+    text = "".join(f"line {i} foo\n" if i % 7 in (0, 1) else f"line {i}\r\n" for i in range(40))
+    edits = []
+    new, _ = RuleSet([ReplaceRule("foo", "bar", case_sensitive=True)]).apply(text, edits=edits)
+
+    diff = SpanDiff(text, edits, context=context)
+    assert "\n".join(diff.render()) == _reference_hunks(text, new, context)
+    assert diff.render(1, 2) == diff.render()[1:2]
+
+
+def test_span_diff_handles_edits_across_lines() -> None:
+    text = "keep\nfoo\nbar\nkeep\nkeep\nkeep\nkeep\nend"
+    edits = []
+    RuleSet([
+        ReplaceRule("foo\nbar", "joined", case_sensitive=True),
+        ReplaceRule("end", "end\nmore", case_sensitive=True),
+    ]).apply(text, edits=edits)
+
+    assert SpanDiff(text, edits, context=1).render() == [
+        "@@ -1,4 +1,3 @@\n keep\n-foo\n-bar\n+joined\n keep",
+        "@@ -8 +7,2 @@\n end\n+more",
+    ]
+
+
+def test_span_diff_handles_edits_that_join_a_lone_cr_to_a_newline() -> None:
+    text = "one\rfoo\ntwo\n"
+    edits = []
+    RuleSet([ReplaceRule("foo", "", case_sensitive=True)]).apply(text, edits=edits)
+
+    # "one\r" + "\n" now reads as a single line, so "foo" goes away entirely
+    assert SpanDiff(text, edits, context=0).render() == ["@@ -2 +1,0 @@\n-foo"]
+    assert SpanDiff(text, edits, context=1).render() == ["@@ -1,3 +1,2 @@\n one\n-foo\n two"]
+
+
+def test_span_diff_skips_edits_that_change_nothing() -> None:
+    text = "a\nb\n"
+    edits = []
+    RuleSet([ReplaceRule("a", "a", case_sensitive=True)]).apply(text, edits=edits)
+
+    assert edits == [(0, 1, "a")]
+    assert len(SpanDiff(text, edits)) == 0
+
+
+def test_rule_set_finds_literals_that_do_not_casefold_back() -> None:
+    rules = RuleSet([ReplaceRule("i", "<i>"), ReplaceRule("ı", "<dotless>"), ReplaceRule("x", "y")])
+
+    assert rules.apply("İ I ı x") == ("<i> <i> <dotless> y", [2, 1, 1])
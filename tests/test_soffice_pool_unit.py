@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from convert_backend import libreoffice_converter, soffice_pool
+from convert_backend.soffice_pool import SofficePool, SofficePoolError
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="uses a POSIX shell shim")
+
+
+def _fake_soffice(tmp_path: Path, *, listen: bool = True, handoff: bool = True) -> Path:
+    """Shim that listens on --accept ports and 'converts' by writing a file.
+
+    With ``handoff=False`` a client conversion fails while a listener holds
+    the same profile, like a build without working single-instance IPC.
+    """
+
+    log = tmp_path / "calls.log"
+    script = tmp_path / "fake_soffice.py"
+    script.write_text(
+        textwrap.dedent(
+            f"""
+            import os, socket, sys, time
+            from pathlib import Path
+            from urllib.parse import unquote, urlparse
+            args = sys.argv[1:]
+            profile = next(a for a in args if a.startswith("-env:UserInstallation="))
+            lock = Path(unquote(urlparse(profile.split("=", 1)[1]).path)) / ".lock"
+            with open({str(log)!r}, "a") as fh:
+                fh.write(("listen" if any(a.startswith("--accept=") for a in args) else "convert") + "\\n")
+            accept = next((a for a in args if a.startswith("--accept=")), None)
+            if accept:
+                if not {listen!r}:
+                    sys.exit(1)
+                port = int(accept.split("port=")[1].split(";")[0])
+                sock = socket.socket()
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                sock.bind(("127.0.0.1", port))
+                sock.listen()
+                lock.write_text(str(os.getpid()))
+                while True:
+                    time.sleep(1)
+            fmt = args[args.index("--convert-to") + 1]
+            outdir = Path(args[args.index("--outdir") + 1])
+            src = Path(args[-1])
+            if not {handoff!r} and lock.exists():
+                try:
+                    os.kill(int(lock.read_text()), 0)
+                except OSError:
+                    pass
+                else:
+                    sys.stderr.write("profile locked")
+                    sys.exit(1)
+            if src.suffix == ".bad":
+                sys.stderr.write("boom")
+                sys.exit(1)
+            (outdir / (src.stem + "." + fmt)).write_text("converted " + src.name)
+            """
+        ),
+        "utf-8",
+    )
+    shim = tmp_path / "soffice"
+    shim.write_text(f"#!/bin/sh\nexec {sys.executable} {script} \"$@\"\n", "utf-8")
+    shim.chmod(0o755)
+    return shim
+
+
+def _calls(tmp_path: Path) -> list[str]:
+    return (tmp_path / "calls.log").read_text().split()
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "doc.docx"
+    path.write_bytes(b"fake")
+    return path
+
+
+def test_pool_reuses_listener_and_restarts_after_max_jobs(tmp_path, source) -> None:
+    pool = SofficePool(str(_fake_soffice(tmp_path)), size=1, max_jobs=2, timeout_s=10, profile_root=tmp_path / "p")
+    try:
+        for idx in range(3):
+            out = pool.convert(source, tmp_path / f"out{idx}", "html")
+            assert out.read_text() == "converted doc.docx"
+    finally:
+        pool.shutdown()
+
+    assert _calls(tmp_path).count("listen") == 2
+    # three jobs plus the one-off handoff probe
+    assert _calls(tmp_path).count("convert") == 4
+    status = pool.status()
+    assert status["jobs"] == 3 and status["coldJobs"] == 0
+    assert status["instances"][0]["restarts"] >= 1
+
+
+def test_pool_restarts_instance_after_failed_job(tmp_path, source) -> None:
+    bad = tmp_path / "broken.bad"
+    bad.write_bytes(b"x")
+    pool = SofficePool(str(_fake_soffice(tmp_path)), size=1, max_jobs=0, timeout_s=10, profile_root=tmp_path / "p")
+    try:
+        with pytest.raises(SofficePoolError):
+            pool.convert(bad, tmp_path / "out", "html")
+        pool.convert(source, tmp_path / "out", "html")
+    finally:
+        pool.shutdown()
+
+    assert _calls(tmp_path).count("listen") == 2
+    assert pool.status()["failures"] == 1
+
+
+def test_pool_falls_back_to_cold_jobs_without_listener(tmp_path, source, monkeypatch) -> None:
+    monkeypatch.setattr(soffice_pool, "STARTUP_TIMEOUT_SECONDS", 2)
+    pool = SofficePool(str(_fake_soffice(tmp_path, listen=False)), size=1, timeout_s=10, profile_root=tmp_path / "p")
+
+    out = pool.convert(source, tmp_path / "out", "html")
+
+    assert out.exists()
+    status = pool.status()
+    assert status["coldJobs"] == 1
+    assert status["listenersDisabled"]
+
+
+def test_pool_falls_back_to_cold_jobs_when_handoff_fails(tmp_path, source) -> None:
+    pool = SofficePool(
+        str(_fake_soffice(tmp_path, handoff=False)), size=1, timeout_s=10, profile_root=tmp_path / "p"
+    )
+    try:
+        out = pool.convert(source, tmp_path / "out", "html")
+        pool.convert(source, tmp_path / "out2", "html")
+    finally:
+        pool.shutdown()
+
+    assert out.read_text() == "converted doc.docx"
+    status = pool.status()
+    assert status["coldJobs"] == 2
+    assert "handoff failed" in status["listenersDisabled"]
+    assert _calls(tmp_path).count("listen") == 1
+    assert not status["instances"][0]["running"]
+
+
+def test_missing_output_is_an_error_not_a_guess(tmp_path) -> None:
+    source = tmp_path / "doc.bin"
+    source.write_bytes(b"fake")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    (out_dir / "stale.html").write_text("old result")
+    pool = SofficePool(str(_fake_soffice(tmp_path)), size=1, timeout_s=10, profile_root=tmp_path / "p")
+    # The shim writes "<stem>.<fmt>", so a filter suffix names a different file
+    try:
+        with pytest.raises(SofficePoolError, match="did not produce output"):
+            pool._run_job(pool._instances[0], source, out_dir, "html:XHTML")
+    finally:
+        pool.shutdown()
+
+
+def test_availability_probe_is_cached(monkeypatch) -> None:
+    calls = []
+    monkeypatch.setattr(libreoffice_converter, "_PROBE", None)
+    monkeypatch.setattr(libreoffice_converter, "_probe_libreoffice", lambda: calls.append(1) or True)
+
+    assert libreoffice_converter.is_libreoffice_available()
+    assert libreoffice_converter.is_libreoffice_available()
+    assert len(calls) == 1